@@ -0,0 +1,92 @@
+"""Throughput benchmark for the message archive and the !history lookup.
+
+Feeds messages through `MessageArchive.submit()` in bursts (as the ingest
+middleware does), reports the per-message cost seen by workers, the
+end-to-end archive rate until everything is committed, and `recent()`
+latency percentiles once the table is populated.
+
+Usage: poetry run python scripts/bench_archive.py [--messages 200000] [--conversations 500]
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import random
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+from signal_ai.services.archive import MessageArchive
+from signal_ai.storage import SqliteDatabase
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Benchmark the message archive")
+    parser.add_argument("--messages", type=int, default=200_000)
+    parser.add_argument("--conversations", type=int, default=500)
+    parser.add_argument("--burst", type=int, default=1_000)
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--queries", type=int, default=2_000)
+    parser.add_argument("--seed", type=int, default=7)
+    return parser.parse_args()
+
+
+async def _run(args: argparse.Namespace, path: Path) -> None:
+    rng = random.Random(args.seed)
+    conversations = [f"+{rng.randrange(10**10, 10**11)}" for _ in range(args.conversations)]
+    db = SqliteDatabase(str(path))
+    archive = MessageArchive(
+        db,
+        capacity=args.messages,
+        batch_size=args.batch_size,
+        flush_interval=0.05,
+        retention_days=0,
+        max_messages=0,
+    )
+    archive.start()
+
+    base_ms = int(time.time() * 1000)
+    submit_s = 0.0
+    started = time.perf_counter()
+    for offset in range(0, args.messages, args.burst):
+        burst_started = time.perf_counter()
+        for index in range(offset, min(offset + args.burst, args.messages)):
+            conversation = conversations[index % len(conversations)]
+            archive.submit(conversation, conversation, base_ms + index, f"message {index}")
+        submit_s += time.perf_counter() - burst_started
+        # Yield like a worker between messages so the flusher can run.
+        await asyncio.sleep(0)
+    while len(archive):
+        await asyncio.sleep(0.01)
+    await archive.flush()
+    total_s = time.perf_counter() - started
+
+    latencies: list[float] = []
+    for _ in range(args.queries):
+        query_started = time.perf_counter()
+        await archive.recent(rng.choice(conversations), 10)
+        latencies.append((time.perf_counter() - query_started) * 1000)
+    await archive.stop()
+    await db.close()
+
+    quantiles = statistics.quantiles(latencies, n=100)
+    print(f"messages={args.messages} conversations={args.conversations} batch={args.batch_size}")
+    print(f"submit: {submit_s / args.messages * 1e9:.0f} ns/message on the worker path")
+    print(f"archive: {total_s:.2f}s end-to-end, {args.messages / total_s:,.0f} messages/s")
+    print(
+        f"history(10): p50={quantiles[49]:.3f} ms p99={quantiles[98]:.3f} ms "
+        f"over {args.queries} queries"
+    )
+
+
+def main() -> int:
+    args = parse_args()
+    with tempfile.TemporaryDirectory() as tmp:
+        asyncio.run(_run(args, Path(tmp) / "archive.db"))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,187 @@
+"""Argument parsing cost per command message: ad-hoc handlers versus `ArgSpec`.
+
+The baseline is the parsing the handlers used to do on every call, copied
+here verbatim: `partition`/`split("|")` for `!profile`, `urlparse` and
+`parse_qs` over every token for `!addpack`, a second regex search for
+`!roll` and a token loop for `!find`. The compiled grammars each command
+module declares with `signal_ai.arguments` parse the same corpus of real
+command strings.
+
+Usage: poetry run python scripts/bench_args.py [--messages 200000] [--repeat 5]
+"""
+
+from __future__ import annotations
+
+import argparse
+import re
+import time
+from typing import Any, Callable
+from urllib.parse import parse_qs, urlparse
+
+from signal_ai.arguments import ArgError, ArgSpec
+from signal_ai.commands.advanced import ADD_PACK, PROFILE, SEARCH
+from signal_ai.commands.contacts import CONTACTS
+from signal_ai.commands.find import FIND
+from signal_ai.commands.history import HISTORY
+from signal_ai.commands.roll import ROLL
+from signal_ai.services.registration import split_numbers
+
+CORPUS: tuple[tuple[str, str], ...] = (
+    ("!profile", "!profile signal-ai bot|answers !help|"),
+    ("!profile", "!profile Weekend Planner"),
+    ("!addpack", "!addpack https://signal.art/addstickers/#pack_id=9acc9e8aba563d26a4994e69263e3b25&pack_key=5a6dff3948c28efb9b7aaf93ecc375c69fc316e78077ed26867a14d10a0f6a12"),
+    ("!addpack", "!addpack 9acc9e8aba563d26a4994e69263e3b25:5a6dff3948c28efb9b7aaf93ecc375c69fc316e78077ed26867a14d10a0f6a12"),
+    ("!search", "!search +15551234567, +15557654321; +442071838750"),
+    ("!search", "!search"),
+    ("!roll", "!roll 4d20"),
+    ("!history", "!history 25"),
+    ("!history", "!history"),
+    ("!find", "!find -n 10 from:+15551234567 lunch friday"),
+    ("!find", "!find all deploy rollback"),
+    ("!contacts", "!contacts fault"),
+)
+
+ROLL_PATTERN = re.compile(r"!roll\s+(\d+)d(\d+)", re.IGNORECASE)
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Benchmark command argument parsing")
+    parser.add_argument("--messages", type=int, default=200_000)
+    parser.add_argument("--repeat", type=int, default=5, help="Best of N runs per message.")
+    return parser.parse_args()
+
+
+def _profile(text: str) -> Any:
+    _, _, payload = text.partition(" ")
+    parts = [segment.strip() for segment in payload.split("|") if segment.strip()]
+    if not parts:
+        return None
+    return parts[0], parts[1] if len(parts) > 1 else None, parts[2] if len(parts) > 2 else None
+
+
+def _addpack(text: str) -> Any:
+    pack_id = None
+    pack_key = None
+    for token in text.split():
+        if token.startswith("!addpack"):
+            continue
+        parsed = urlparse(token)
+        fragment = parse_qs(parsed.fragment)
+        query = parse_qs(parsed.query)
+        pack_id = fragment.get("pack_id", [None])[0] or query.get("pack_id", [None])[0] or pack_id
+        pack_key = fragment.get("pack_key", [None])[0] or query.get("pack_key", [None])[0] or pack_key
+        if pack_id and pack_key:
+            break
+        if not pack_id and not pack_key and len(token.split(":")) == 2:
+            pack_id, pack_key = token.split(":", 1)
+            break
+    return pack_id, pack_key
+
+
+def _search(text: str) -> Any:
+    _, _, payload = text.partition(" ")
+    return split_numbers(payload)
+
+
+def _roll(text: str) -> Any:
+    # The trigger regex already matched once to route the message here.
+    ROLL_PATTERN.search(text)
+    match = ROLL_PATTERN.search(text)
+    return (int(match.group(1)), int(match.group(2))) if match else None
+
+
+def _history(text: str) -> Any:
+    parts = text.split()
+    if len(parts) > 1 and parts[1].isdigit():
+        return max(1, min(50, int(parts[1])))
+    return 10
+
+
+def _find(text: str) -> Any:
+    limit = 5
+    source = None
+    everywhere = False
+    terms: list[str] = []
+    tokens = text.split()[1:]
+    index = 0
+    while index < len(tokens):
+        token = tokens[index]
+        if token == "-n" and index + 1 < len(tokens) and tokens[index + 1].isdigit():
+            limit = max(1, min(20, int(tokens[index + 1])))
+            index += 2
+            continue
+        if token.startswith("from:") and len(token) > 5:
+            source = token[5:]
+        elif token == "all" and not terms:
+            everywhere = True
+        else:
+            terms.append(token)
+        index += 1
+    return limit, source, everywhere, terms
+
+
+def _contacts(text: str) -> Any:
+    return "fault" in text.lower()
+
+
+AD_HOC: dict[str, Callable[[str], Any]] = {
+    "!profile": _profile,
+    "!addpack": _addpack,
+    "!search": _search,
+    "!roll": _roll,
+    "!history": _history,
+    "!find": _find,
+    "!contacts": _contacts,
+}
+
+SPECS: dict[str, ArgSpec] = {
+    "!profile": PROFILE,
+    "!addpack": ADD_PACK,
+    "!search": SEARCH,
+    "!roll": ROLL,
+    "!history": HISTORY,
+    "!find": FIND,
+    "!contacts": CONTACTS,
+}
+
+
+def _spec_parser(spec: ArgSpec) -> Callable[[str], Any]:
+    def parse(text: str) -> Any:
+        try:
+            return spec.parse_message(text)
+        except ArgError:
+            return None
+
+    return parse
+
+
+def _time(parse: Callable[[str], Any], text: str, count: int, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for _ in range(count):
+            parse(text)
+        best = min(best, time.perf_counter() - started)
+    return best / count * 1e9
+
+
+def main() -> int:
+    args = parse_args()
+    per_message = max(1, args.messages // len(CORPUS))
+    print(f"{'command':<10} {'ad hoc ns':>10} {'argspec ns':>11} {'speedup':>8}")
+    totals = [0.0, 0.0]
+    for name in SPECS:
+        texts = [text for command, text in CORPUS if command == name]
+        ad_hoc = sum(_time(AD_HOC[name], text, per_message, args.repeat) for text in texts) / len(texts)
+        spec = _spec_parser(SPECS[name])
+        compiled = sum(_time(spec, text, per_message, args.repeat) for text in texts) / len(texts)
+        totals[0] += ad_hoc * len(texts)
+        totals[1] += compiled * len(texts)
+        print(f"{name:<10} {ad_hoc:>10.0f} {compiled:>11.0f} {ad_hoc / compiled:>7.1f}x")
+    ad_hoc, compiled = (total / len(CORPUS) for total in totals)
+    print(f"{'corpus':<10} {ad_hoc:>10.0f} {compiled:>11.0f} {ad_hoc / compiled:>7.1f}x")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
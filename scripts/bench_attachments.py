@@ -0,0 +1,115 @@
+"""Peak RSS and throughput for sending a 10 MB attachment many times.
+
+Three variants, each in its own subprocess so peak RSS is not shared:
+
+- per-send: the old pattern, `base64.b64encode(path.read_bytes()).decode()` for every send
+- streamed: `AttachmentCache` with a zero budget, a memory-mapped chunked encode per send
+- cached: `AttachmentCache` with the default budget, encoding once and sharing the string
+
+`--concurrency` sends are in flight at once, each holding its payload for
+`--hold-ms` to stand in for the HTTP request. JSON serialization of the
+request body costs the same in every variant and is left out.
+
+Usage: poetry run python scripts/bench_attachments.py [--size-mb 10] [--sends 50] [--concurrency 4]
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import base64
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from signal_ai.services.attachments import AttachmentCache
+
+VARIANTS = ("per-send", "streamed", "cached")
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Benchmark attachment encoding and caching")
+    parser.add_argument("--size-mb", type=float, default=10.0)
+    parser.add_argument("--sends", type=int, default=50)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--hold-ms", type=float, default=20.0)
+    parser.add_argument("--variant", choices=VARIANTS, help=argparse.SUPPRESS)
+    parser.add_argument("--path", help=argparse.SUPPRESS)
+    return parser.parse_args()
+
+
+def _max_rss_mb() -> float:
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+async def _run_variant(args: argparse.Namespace) -> None:
+    path = Path(args.path)
+    cache = AttachmentCache(0 if args.variant == "streamed" else 64 * 1024 * 1024)
+    semaphore = asyncio.Semaphore(args.concurrency)
+
+    async def encode() -> str:
+        if args.variant == "per-send":
+            return await asyncio.to_thread(lambda: base64.b64encode(path.read_bytes()).decode())
+        return await cache.from_file(path)
+
+    async def send() -> int:
+        async with semaphore:
+            payload = await encode()
+            await asyncio.sleep(args.hold_ms / 1000)
+            return len(payload)
+
+    baseline = _max_rss_mb()
+    started = time.perf_counter()
+    sizes = await asyncio.gather(*(send() for _ in range(args.sends)))
+    elapsed = time.perf_counter() - started
+    mb = sum(sizes) / 1024 / 1024
+    print(f"{args.variant} {elapsed:.3f} {_max_rss_mb() - baseline:.1f} {mb / elapsed:.1f}")
+
+
+def main() -> int:
+    args = parse_args()
+    if args.variant:
+        asyncio.run(_run_variant(args))
+        return 0
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "attachment.bin"
+        path.write_bytes(os.urandom(int(args.size_mb * 1024 * 1024)))
+        print(
+            f"{args.size_mb:g} MB file, {args.sends} sends, {args.concurrency} in flight, "
+            f"{args.hold_ms:g} ms hold"
+        )
+        print(f"{'variant':<10} {'seconds':>8} {'sends/s':>8} {'MB/s':>8} {'peak RSS +MB':>13}")
+        for variant in VARIANTS:
+            output = subprocess.run(
+                [
+                    sys.executable,
+                    __file__,
+                    "--variant",
+                    variant,
+                    "--path",
+                    str(path),
+                    "--sends",
+                    str(args.sends),
+                    "--concurrency",
+                    str(args.concurrency),
+                    "--hold-ms",
+                    str(args.hold_ms),
+                ],
+                check=True,
+                capture_output=True,
+                text=True,
+            ).stdout.split()
+            elapsed, rss, throughput = (float(value) for value in output[1:])
+            print(
+                f"{variant:<10} {elapsed:>8.2f} {args.sends / elapsed:>8.1f} "
+                f"{throughput:>8.0f} {rss:>13.1f}"
+            )
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
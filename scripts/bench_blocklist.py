@@ -0,0 +1,65 @@
+"""Microbenchmark for the compiled blocklist at 100k entries.
+
+Usage: poetry run python scripts/bench_blocklist.py [--entries 100000] [--lookups 1000000]
+"""
+
+from __future__ import annotations
+
+import argparse
+import random
+import time
+import uuid
+
+from signal_ai.services.blocklist import BlocklistRules
+
+
+def _entries(count: int, rng: random.Random) -> list[str]:
+    numbers = [f"+{rng.randrange(10**10, 10**11)}" for _ in range(count * 8 // 10)]
+    uuids = [str(uuid.UUID(int=rng.getrandbits(128))) for _ in range(count // 10)]
+    prefixes = [f"+{rng.randrange(100, 1000)}{rng.randrange(10, 100)}*" for _ in range(count // 20)]
+    groups = [f"group:{uuid.UUID(int=rng.getrandbits(128)).hex}" for _ in range(count // 20)]
+    return numbers + uuids + prefixes + groups
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Benchmark blocklist lookups")
+    parser.add_argument("--entries", type=int, default=100_000)
+    parser.add_argument("--lookups", type=int, default=1_000_000)
+    parser.add_argument("--seed", type=int, default=7)
+    return parser.parse_args()
+
+
+def main() -> int:
+    args = parse_args()
+    rng = random.Random(args.seed)
+    entries = _entries(args.entries, rng)
+
+    started = time.perf_counter()
+    rules = BlocklistRules.compile(entries)
+    compile_s = time.perf_counter() - started
+
+    blocked = [entry for entry in entries if entry.startswith("+") and not entry.endswith("*")]
+    probes = [
+        rng.choice(blocked) if rng.random() < 0.1 else f"+{rng.randrange(10**10, 10**11)}"
+        for _ in range(10_000)
+    ]
+    group_ids = [None, None, None, uuid.uuid4().hex]
+
+    hits = 0
+    started = time.perf_counter()
+    for index in range(args.lookups):
+        if rules.blocks(probes[index % len(probes)], group_ids[index & 3]):
+            hits += 1
+    lookup_s = time.perf_counter() - started
+
+    print(f"entries={rules.size} compile_ms={compile_s * 1000:.1f}")
+    print(
+        f"lookups={args.lookups} hits={hits} "
+        f"ns_per_lookup={lookup_s / args.lookups * 1e9:.0f} "
+        f"lookups_per_s={args.lookups / lookup_s:,.0f}"
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,88 @@
+"""Broadcast throughput: one send per recipient versus the batched, concurrent engine.
+
+The API is simulated: each send request takes `--latency-ms` plus
+`--per-recipient-ms` for every recipient it carries, and any number may be
+in flight. The baseline is the naive loop, one awaited request per
+recipient. The engine variants use `BroadcastEngine` without a store or
+DLQ; the paced run also checks that `--rate` requests/s is respected.
+
+Usage: poetry run python scripts/bench_broadcast.py [--recipients 2000] [--batch-size 50]
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import time
+from typing import Any
+
+from signal_ai.services.broadcast import BroadcastEngine
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Benchmark broadcast fan-out")
+    parser.add_argument("--recipients", type=int, default=2000)
+    parser.add_argument("--batch-size", type=int, default=50)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--latency-ms", type=float, default=40.0)
+    parser.add_argument("--per-recipient-ms", type=float, default=0.5)
+    parser.add_argument("--rate", type=float, default=10.0, help="requests/s for the paced run")
+    return parser.parse_args()
+
+
+class FakeApi:
+    def __init__(self, latency: float, per_recipient: float) -> None:
+        self._latency = latency
+        self._per_recipient = per_recipient
+        self.requests = 0
+
+    async def send(self, body: dict[str, Any]) -> None:
+        self.requests += 1
+        await asyncio.sleep(self._latency + self._per_recipient * len(body["recipients"]))
+
+
+async def _sequential(api: FakeApi, recipients: list[str]) -> None:
+    for recipient in recipients:
+        await api.send({"message": "hi", "recipients": [recipient], "number": "+1"})
+
+
+async def _engine(api: FakeApi, recipients: list[str], args: argparse.Namespace, rate: float) -> None:
+    engine = BroadcastEngine(
+        api.send, None, batch_size=args.batch_size, concurrency=args.concurrency, rate=rate
+    )
+    job = await engine.submit("+1", "hi", recipients)
+    while job.status == "running":
+        await asyncio.sleep(0.01)
+
+
+async def _run(args: argparse.Namespace) -> None:
+    recipients = [f"+1555{i:07d}" for i in range(args.recipients)]
+    latency, per_recipient = args.latency_ms / 1000, args.per_recipient_ms / 1000
+    print(
+        f"{args.recipients} recipients, {args.latency_ms:g} ms + {args.per_recipient_ms:g} ms/recipient "
+        f"per request, batch {args.batch_size}, {args.concurrency} in flight"
+    )
+    print(f"{'variant':<22} {'seconds':>8} {'requests':>9} {'req/s':>7} {'recipients/s':>13}")
+    variants = [
+        ("per-recipient", lambda api: _sequential(api, recipients)),
+        ("engine", lambda api: _engine(api, recipients, args, 0.0)),
+        (f"engine @{args.rate:g} req/s", lambda api: _engine(api, recipients, args, args.rate)),
+    ]
+    for label, run in variants:
+        api = FakeApi(latency, per_recipient)
+        started = time.perf_counter()
+        await run(api)
+        elapsed = time.perf_counter() - started
+        print(
+            f"{label:<22} {elapsed:>8.2f} {api.requests:>9} {api.requests / elapsed:>7.1f} "
+            f"{args.recipients / elapsed:>13.0f}"
+        )
+
+
+def main() -> int:
+    asyncio.run(_run(parse_args()))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
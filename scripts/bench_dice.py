@@ -0,0 +1,71 @@
+"""`!roll` cost as the dice count grows: the old per-die list versus the dice engine.
+
+The baseline is the previous handler: one `random.randint` per die, every
+roll kept in a list and formatted into the reply. The engine draws dice in
+bulk with `random.choices`, lists up to `--list-limit` rolls and summarizes
+larger terms chunk by chunk. Reported per count: time, peak traced memory and
+reply size. The baseline is skipped above `--baseline-max` dice.
+
+Usage: poetry run python scripts/bench_dice.py [--counts 10,1000,100000,1000000] [--sides 6]
+"""
+
+from __future__ import annotations
+
+import argparse
+import random
+import time
+import tracemalloc
+from typing import Callable
+
+from signal_ai.services.dice import RollLimits, format_roll, parse_expression, roll
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Benchmark !roll dice generation")
+    parser.add_argument("--counts", default="10,1000,100000,1000000")
+    parser.add_argument("--sides", type=int, default=6)
+    parser.add_argument("--list-limit", type=int, default=20)
+    parser.add_argument("--baseline-max", type=int, default=1_000_000)
+    return parser.parse_args()
+
+
+def _baseline(count: int, sides: int) -> str:
+    rolls = [random.randint(1, sides) for _ in range(count)]
+    return f"rolled {count}d{sides}: {rolls} (total={sum(rolls)})"
+
+
+def _measure(run: Callable[[], str]) -> tuple[float, float, int]:
+    started = time.perf_counter()
+    reply = run()
+    elapsed = time.perf_counter() - started
+    tracemalloc.start()
+    run()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed * 1000, peak / 1024, len(reply)
+
+
+def main() -> int:
+    args = parse_args()
+    limits = RollLimits(max_dice=10**9, max_sides=10**9, list_limit=args.list_limit)
+    print(f"{'dice':>9} {'variant':<9} {'ms':>9} {'peak KiB':>10} {'reply chars':>12}")
+    for count in (int(value) for value in args.counts.split(",")):
+        expression = parse_expression(f"{count}d{args.sides}")
+        variants: list[tuple[str, Callable[[], str]]] = [
+            ("engine", lambda: format_roll(roll(expression, limits)))
+        ]
+        if count <= args.baseline_max:
+            variants.insert(0, ("per-die", lambda: _baseline(count, args.sides)))
+        for label, run in variants:
+            ms, peak, chars = _measure(run)
+            print(f"{count:>9,} {label:<9} {ms:>9.1f} {peak:>10.0f} {chars:>12,}")
+    started = time.perf_counter()
+    for _ in range(10_000):
+        parse_expression("4d6kh3 + 2d8dl1 - 1")
+    parse_us = (time.perf_counter() - started) / 10_000 * 1e6
+    print(f"parse '4d6kh3 + 2d8dl1 - 1': {parse_us:.1f} us")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,104 @@
+"""Command dispatch cost as the number of registered commands grows.
+
+Compares scanning every trigger in turn (what per-handler registration
+does: `startswith` for literals, `search` for patterns) with the compiled
+`DispatchIndex`. Each command set is mostly literal `!name` commands plus
+one pattern trigger per 25, like `!roll`. Messages are 70% literal commands,
+10% pattern commands and 20% ordinary chat.
+
+Usage: poetry run python scripts/bench_dispatch.py [--commands 24,100,500,2000] [--lookups 200000]
+"""
+
+from __future__ import annotations
+
+import argparse
+import random
+import re
+import time
+from typing import Callable, Pattern
+
+from signal_ai.services.dispatch import DispatchIndex
+
+Trigger = str | Pattern[str]
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Benchmark command dispatch")
+    parser.add_argument("--commands", default="24,100,500,2000")
+    parser.add_argument("--lookups", type=int, default=200_000)
+    parser.add_argument("--seed", type=int, default=7)
+    return parser.parse_args()
+
+
+def _triggers(count: int) -> list[Trigger]:
+    triggers: list[Trigger] = []
+    for index in range(count):
+        if index % 25 == 24:
+            triggers.append(re.compile(rf"!dice{index}\s+(\d+)d(\d+)", re.IGNORECASE))
+        else:
+            triggers.append(f"!cmd{index}")
+    return triggers
+
+
+def _messages(triggers: list[Trigger], rng: random.Random) -> list[str]:
+    literals = [t for t in triggers if isinstance(t, str)]
+    patterns = [t for t in triggers if not isinstance(t, str)]
+    messages: list[str] = []
+    for _ in range(10_000):
+        roll = rng.random()
+        if roll < 0.7 or not patterns:
+            messages.append(f"{rng.choice(literals)} some arguments here")
+        elif roll < 0.8:
+            name = rng.choice(patterns).pattern.split("\\")[0]
+            messages.append(f"{name} {rng.randint(1, 9)}d{rng.randint(2, 20)}")
+        else:
+            messages.append("hey, are we still on for lunch tomorrow at noon?")
+    return messages
+
+
+def _linear(triggers: list[Trigger]) -> Callable[[str], Trigger | None]:
+    def lookup(text: str) -> Trigger | None:
+        lowered = text.lower()
+        for trigger in triggers:
+            if isinstance(trigger, str):
+                if lowered.startswith(trigger):
+                    return trigger
+            elif trigger.search(text):
+                return trigger
+        return None
+
+    return lookup
+
+
+def _time(lookup: Callable[[str], object], messages: list[str], lookups: int) -> tuple[float, int]:
+    hits = 0
+    started = time.perf_counter()
+    for index in range(lookups):
+        if lookup(messages[index % len(messages)]) is not None:
+            hits += 1
+    return (time.perf_counter() - started) / lookups * 1e9, hits
+
+
+def main() -> int:
+    args = parse_args()
+    rng = random.Random(args.seed)
+    print(f"{'commands':>8} {'compile ms':>10} {'linear ns':>10} {'index ns':>9} {'speedup':>8}")
+    for count in (int(value) for value in args.commands.split(",")):
+        triggers = _triggers(count)
+        messages = _messages(triggers, rng)
+        started = time.perf_counter()
+        index = DispatchIndex.compile((trigger, False, trigger) for trigger in triggers)
+        compile_ms = (time.perf_counter() - started) * 1000
+        linear_ns, linear_hits = _time(_linear(triggers), messages, args.lookups)
+        index_ns, index_hits = _time(index.lookup, messages, args.lookups)
+        if linear_hits != index_hits:
+            print(f"  hit mismatch at {count}: linear={linear_hits} index={index_hits}")
+        print(
+            f"{count:>8} {compile_ms:>10.2f} {linear_ns:>10.0f} {index_ns:>9.0f} "
+            f"{linear_ns / index_ns:>7.1f}x"
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,234 @@
+"""End-to-end load test: the real bot against the fake signal API, with no network or Docker.
+
+Starts `fake_signal_api.FakeSignalApi` on a free local port and points the
+bot's settings at it. SQLite state goes in a temporary directory. Then it
+runs `app._run_bot` in this process. Messages drawn from the `--mix` of
+commands are pushed over the receive websocket at `--rate` per second for
+`--duration` seconds. Each message comes from its own synthetic sender, so
+the first `/v2/send` addressed to that sender is its reply. Commands in the
+mix should answer with one message.
+
+Reports end-to-end latency p50/p99 overall and per command, reply
+throughput, and replies still missing `--drain` seconds after the last
+message. It also reports RSS: the process peak before the bot starts and
+after the run. The bot, the fake API and the generator share one process
+and one event loop, so the numbers include the fake's own cost.
+`--latency-ms`, `--jitter-ms` and `--error-rate` inject API faults.
+`--max-p99-ms` and `--min-throughput` make the run a regression check that
+exits 1 when either is missed.
+
+Usage: poetry run python scripts/bench_e2e.py [--rate 50] [--duration 20] [--mix "!ping=4,!echo load=3,!roll 2d6=2"] [--latency-ms 20]
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import contextlib
+import os
+import random
+import resource
+import statistics
+import tempfile
+import time
+from pathlib import Path
+from typing import Any
+
+from fake_signal_api import DEFAULT_NUMBER, FakeSignalApi, Faults, envelope
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="End-to-end load test against a fake signal API")
+    parser.add_argument("--rate", type=float, default=50.0, help="Messages per second.")
+    parser.add_argument("--duration", type=float, default=20.0, help="Seconds of load.")
+    parser.add_argument(
+        "--mix",
+        default="!ping=4,!echo load test=3,!roll 2d6=2,!balance=1",
+        help="Comma-separated command=weight pairs.",
+    )
+    parser.add_argument("--drain", type=float, default=10.0, help="Seconds to wait for replies.")
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="API latency (mean).")
+    parser.add_argument("--jitter-ms", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of failed calls.")
+    parser.add_argument("--max-p99-ms", type=float, default=None, help="Fail above this p99.")
+    parser.add_argument("--min-throughput", type=float, default=None, help="Fail below this.")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument(
+        "bot_args",
+        nargs=argparse.REMAINDER,
+        help="Extra bot flags after `--`, e.g. -- --reply-coalesce-ms 0.",
+    )
+    return parser.parse_args()
+
+
+def _mix(raw: str) -> tuple[list[str], list[float]]:
+    commands, weights = [], []
+    for part in raw.split(","):
+        command, _, weight = part.strip().rpartition("=")
+        if not command:
+            command, weight = weight, "1"
+        commands.append(command)
+        weights.append(float(weight))
+    return commands, weights
+
+
+def _quantiles(values: list[float]) -> str:
+    if len(values) < 2:
+        return "n/a"
+    q = statistics.quantiles(values, n=100, method="inclusive")
+    return f"p50={q[49] * 1000:7.1f} ms p99={q[98] * 1000:7.1f} ms max={max(values) * 1000:7.1f} ms"
+
+
+def _peak_rss_mb() -> float:
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+class _Load:
+    """Matches each reply to the message whose sender it is addressed to."""
+
+    def __init__(self) -> None:
+        self.pending: dict[str, tuple[str, float]] = {}
+        self.latencies: dict[str, list[float]] = {}
+        self.last_reply = 0.0
+        self.settled = asyncio.Event()
+
+    def sent(self, sender: str, command: str) -> None:
+        self.pending[sender] = (command, time.perf_counter())
+        self.settled.clear()
+
+    def on_send(self, body: dict[str, Any]) -> None:
+        now = time.perf_counter()
+        for recipient in body.get("recipients", []):
+            entry = self.pending.pop(recipient, None)
+            if entry is None:
+                continue
+            command, started = entry
+            self.latencies.setdefault(command, []).append(now - started)
+            self.last_reply = now
+        if not self.pending:
+            self.settled.set()
+
+
+def _bot_config(args: argparse.Namespace, tmp: Path) -> Any:
+    from signal_ai.config import parse_args as parse_bot_args
+
+    return parse_bot_args(
+        [
+            "--no-api-autostart",
+            "--no-metrics",
+            "--no-health-server",
+            "--no-warmup",
+            "--dlq-replay-interval",
+            "0",
+            "--replay-spool",
+            str(tmp / "dlq_replay.spool"),
+            # Every message has a new sender; keep quotas from shaping the load.
+            "--quota-sender-rate",
+            "0",
+            "--quota-group-rate",
+            "0",
+            *[arg for arg in args.bot_args if arg != "--"],
+        ]
+    )
+
+
+async def _warm_up(api: FakeSignalApi, load: _Load, bot: asyncio.Task[None]) -> None:
+    """Until a `!ping` gets its reply, the bot is not listening yet."""
+    attempt = 0
+    while not bot.done():
+        sender = f"+1999{attempt:07d}"
+        load.sent(sender, "warmup")
+        if await api.inject(envelope(DEFAULT_NUMBER, sender, "!ping")):
+            with contextlib.suppress(asyncio.TimeoutError):
+                await asyncio.wait_for(load.settled.wait(), 1.0)
+                return
+        load.pending.pop(sender, None)
+        attempt += 1
+        await asyncio.sleep(0.2)
+    await bot  # Surfaces the startup error.
+
+
+async def _run(args: argparse.Namespace) -> int:
+    rng = random.Random(args.seed)
+    commands, weights = _mix(args.mix)
+    load = _Load()
+    api = FakeSignalApi(
+        faults=Faults(args.latency_ms, args.jitter_ms, args.error_rate),
+        on_send=load.on_send,
+        seed=args.seed,
+    )
+    url = await api.start()
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ.update(
+            {
+                "SIGNAL_PHONE_NUMBER": DEFAULT_NUMBER,
+                "SIGNAL_SERVICE_URL": url,
+                "SIGNAL_API_URL": url,
+                "STORAGE_TYPE": "sqlite",
+                "SQLITE_DATABASE": str(Path(tmp) / "signal_ai.db"),
+            }
+        )
+        # Imported after the environment points at the fake API.
+        from signal_ai import app
+
+        baseline_rss = _peak_rss_mb()
+        bot = asyncio.create_task(app._run_bot(_bot_config(args, Path(tmp))), name="bench.bot")
+        try:
+            started = time.perf_counter()
+            await _warm_up(api, load, bot)
+            startup = time.perf_counter() - started
+            load.latencies.clear()
+
+            total = int(args.rate * args.duration)
+            started = time.perf_counter()
+            for index in range(total):
+                delay = started + index / args.rate - time.perf_counter()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                command = rng.choices(commands, weights)[0]
+                sender = f"+1888{index:07d}"
+                load.sent(sender, command)
+                await api.inject(envelope(DEFAULT_NUMBER, sender, command))
+            offered = total / (time.perf_counter() - started)
+            with contextlib.suppress(asyncio.TimeoutError):
+                await asyncio.wait_for(load.settled.wait(), args.drain)
+        finally:
+            bot.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await bot
+            await api.stop()
+
+    replies = [value for values in load.latencies.values() for value in values]
+    window = load.last_reply - started
+    throughput = len(replies) / window if replies and window > 0 else 0.0
+    print(
+        f"{total:,} messages at {args.rate:g}/s (offered {offered:.1f}/s) for {args.duration:g} s; "
+        f"API latency {args.latency_ms:g}±{args.jitter_ms:g} ms, error rate {args.error_rate:g}; "
+        f"{os.cpu_count()} CPU(s)"
+    )
+    print(f"  startup to first reply: {startup:.2f} s")
+    print(f"  replies: {len(replies):,} ({len(load.pending):,} missing), {throughput:.1f}/s")
+    print(f"  latency: {_quantiles(replies)}")
+    for command in commands:
+        print(f"    {command:<20} {_quantiles(load.latencies.get(command, []))}")
+    print(f"  RSS: peak {_peak_rss_mb():.1f} MiB (before bot start {baseline_rss:.1f} MiB)")
+    print(f"  API calls: {dict(api.requests)}; injected errors: {dict(api.errors)}")
+
+    failed = False
+    if args.max_p99_ms is not None and (
+        len(replies) < 2 or statistics.quantiles(replies, n=100, method="inclusive")[98] * 1000 > args.max_p99_ms
+    ):
+        print(f"FAIL: p99 above {args.max_p99_ms:g} ms")
+        failed = True
+    if args.min_throughput is not None and throughput < args.min_throughput:
+        print(f"FAIL: throughput below {args.min_throughput:g}/s")
+        failed = True
+    return 1 if failed else 0
+
+
+def main() -> int:
+    return asyncio.run(_run(parse_args()))
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
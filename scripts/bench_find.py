@@ -0,0 +1,128 @@
+"""Query latency of the archive's FTS5 index (what `!find` runs) on a large corpus.
+
+Builds a synthetic archive through the same batched insert path the bot
+uses (triggers keep the FTS5 index in step), runs background-style
+compaction, then times scoped and unscoped `find()` calls for rare,
+common and prefix terms.
+
+Usage: poetry run python scripts/bench_find.py [--messages 10000000] [--db /tmp/find.db]
+Pass --db to keep the corpus and re-run only the queries with --reuse.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import random
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+from signal_ai.services.archive import MessageArchive
+from signal_ai.storage import SqliteDatabase
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Benchmark FTS5 !find queries")
+    parser.add_argument("--messages", type=int, default=10_000_000)
+    parser.add_argument("--conversations", type=int, default=2_000)
+    parser.add_argument("--vocabulary", type=int, default=50_000)
+    parser.add_argument("--chunk", type=int, default=50_000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--limit", type=int, default=5)
+    parser.add_argument("--db", type=Path, default=None)
+    parser.add_argument("--reuse", action="store_true", help="Skip loading; query an existing --db.")
+    parser.add_argument("--seed", type=int, default=7)
+    return parser.parse_args()
+
+
+def _words(count: int) -> list[str]:
+    letters = "abcdefghijklmnopqrstuvwxyz"
+    return ["".join(letters[(i * 7 + k * 13) % 26] for k in range(3 + i % 6)) + str(i) for i in range(count)]
+
+
+async def _load(archive: MessageArchive, args: argparse.Namespace, rng: random.Random, words: list[str], conversations: list[str]) -> None:
+    # Zipf-ish: low word indices are far more frequent than high ones.
+    weights = [1 / (rank + 1) for rank in range(len(words))]
+    base_ms = int(time.time() * 1000) - args.messages
+    started = time.perf_counter()
+    for offset in range(0, args.messages, args.chunk):
+        count = min(args.chunk, args.messages - offset)
+        bodies = rng.choices(words, weights=weights, k=count * 10)
+        for index in range(count):
+            conversation = conversations[rng.randrange(len(conversations))]
+            body = " ".join(bodies[index * 10 : index * 10 + rng.randrange(4, 11)])
+            archive.submit(conversation, conversation, base_ms + offset + index, body)
+        while len(archive):
+            await archive.flush()
+        done = offset + count
+        if done % (args.chunk * 20) == 0 or done == args.messages:
+            elapsed = time.perf_counter() - started
+            print(f"loaded {done:,} messages, {done / elapsed:,.0f}/s", flush=True)
+    started = time.perf_counter()
+    steps = await archive.compact()
+    print(f"compaction: {steps} merge steps in {time.perf_counter() - started:.1f}s")
+
+
+async def _time_queries(archive: MessageArchive, label: str, queries: list[tuple[list[str], str | None]], limit: int) -> None:
+    latencies: list[float] = []
+    hits = 0
+    for terms, conversation in queries:
+        started = time.perf_counter()
+        hits += len(await archive.find(terms, conversation=conversation, limit=limit))
+        latencies.append((time.perf_counter() - started) * 1000)
+    q = statistics.quantiles(latencies, n=100)
+    print(f"{label:>22}: p50={q[49]:7.2f} ms p95={q[94]:7.2f} ms p99={q[98]:7.2f} ms hits={hits}")
+
+
+async def _run(args: argparse.Namespace, path: Path) -> None:
+    rng = random.Random(args.seed)
+    words = _words(args.vocabulary)
+    conversations = [f"group-{rng.getrandbits(64):016x}" for _ in range(args.conversations)]
+    db = SqliteDatabase(str(path))
+    archive = MessageArchive(
+        db,
+        capacity=args.chunk,
+        batch_size=args.chunk,
+        flush_interval=1.0,
+        retention_days=0,
+        max_messages=0,
+    )
+    if not args.reuse:
+        await _load(archive, args, rng, words, conversations)
+
+    def sample(pool: list[str], scoped: bool) -> list[tuple[list[str], str | None]]:
+        return [
+            ([rng.choice(pool)], rng.choice(conversations) if scoped else None)
+            for _ in range(args.queries)
+        ]
+
+    common = words[:20]
+    rare = words[len(words) // 2 :]
+    prefix = [word[:3] + "*" for word in words[:200]]
+    two_terms = [
+        ([rng.choice(common), rng.choice(words[20:2000])], rng.choice(conversations))
+        for _ in range(args.queries)
+    ]
+    await _time_queries(archive, "rare, scoped", sample(rare, True), args.limit)
+    await _time_queries(archive, "common, scoped", sample(common, True), args.limit)
+    await _time_queries(archive, "two terms, scoped", two_terms, args.limit)
+    await _time_queries(archive, "prefix, scoped", sample(prefix, True), args.limit)
+    await _time_queries(archive, "rare, all", sample(rare, False), args.limit)
+    await _time_queries(archive, "common, all", sample(common, False), args.limit)
+    await db.close()
+
+
+def main() -> int:
+    args = parse_args()
+    if args.db is not None:
+        asyncio.run(_run(args, args.db))
+        return 0
+    with tempfile.TemporaryDirectory() as tmp:
+        asyncio.run(_run(args, Path(tmp) / "find.db"))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
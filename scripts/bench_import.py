@@ -0,0 +1,78 @@
+"""Track CLI/bot cold-start import cost with `python -X importtime`.
+
+Runs each target in a fresh interpreter, parses the importtime report and
+prints wall time plus the most expensive cumulative imports.
+
+Usage: poetry run python scripts/bench_import.py [--runs 5] [--top 15]
+"""
+
+from __future__ import annotations
+
+import argparse
+import statistics
+import subprocess
+import sys
+import time
+
+TARGETS = {
+    "cli": "import signal_ai.cli",
+    "commands": "import signal_ai.commands",
+    "handlers": (
+        "from signal_ai.commands import CommandOptions, build_command_handlers;"
+        "build_command_handlers(CommandOptions(None, 'http://127.0.0.1:9', None))"
+    ),
+    "handlers_eager": (
+        "import importlib, signal_ai.commands as c;"
+        "[importlib.import_module(f'signal_ai.commands.{s.module}') for s in c.COMMANDS]"
+    ),
+}
+
+
+def _importtime(code: str) -> tuple[float, list[tuple[int, str, bool]]]:
+    started = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        check=True,
+        capture_output=True,
+        text=True,
+    )
+    wall = time.perf_counter() - started
+    rows: list[tuple[int, str, bool]] = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        # importtime indents nested imports; one leading space marks a top-level import.
+        top_level = not name.startswith("  ")
+        rows.append((int(cumulative), name.strip(), top_level))
+    return wall, rows
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Benchmark signal-ai import time")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=15)
+    parser.add_argument("--target", choices=sorted(TARGETS), action="append")
+    return parser.parse_args()
+
+
+def main() -> int:
+    args = parse_args()
+    for name in args.target or list(TARGETS):
+        walls: list[float] = []
+        rows: list[tuple[int, str, bool]] = []
+        for _ in range(args.runs):
+            wall, rows = _importtime(TARGETS[name])
+            walls.append(wall)
+        total_us = sum(cumulative for cumulative, _, top_level in rows if top_level)
+        print(
+            f"[{name}] wall_ms median={statistics.median(walls) * 1000:.1f} "
+            f"min={min(walls) * 1000:.1f} top_level_imports_ms={total_us / 1000:.1f}"
+        )
+        for cumulative, module, _ in sorted(rows, reverse=True)[: args.top]:
+            print(f"  {cumulative / 1000:8.1f} ms  {module}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
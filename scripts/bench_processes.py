@@ -0,0 +1,191 @@
+"""Multi-process throughput: the supervisor sharding envelopes across N workers.
+
+Runs the real `Supervisor` against stand-in workers: this script started in
+worker mode, which parses each envelope, burns `--work` SHA-256 rounds as
+handler CPU time and POSTs a reply to the fake signal API
+(`fake_signal_api.py`) served by the parent. Replies for one conversation
+must arrive in the order their envelopes were sent; the run reports
+throughput per worker count, the speed-up over one worker, and any
+ordering violations. With `--restart` a rolling restart runs halfway
+through each round to show that nothing is lost or reordered while
+workers are replaced.
+
+Usage: poetry run python scripts/bench_processes.py [--processes 1,2,4] [--messages 5000] [--restart]
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import sys
+import time
+
+import aiohttp
+import structlog
+
+from fake_signal_api import FakeSignalApi
+from signal_ai.services.supervisor import Supervisor, notify_ready
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Benchmark multi-process mode")
+    parser.add_argument("--processes", default="1,2,4", help="Worker counts to compare.")
+    parser.add_argument("--messages", type=int, default=5000)
+    parser.add_argument("--conversations", type=int, default=200)
+    parser.add_argument("--work", type=int, default=2000, help="SHA-256 rounds per message.")
+    parser.add_argument("--restart", action="store_true", help="Rolling restart mid-run.")
+    # Worker mode, set by the supervisor and the parent run.
+    parser.add_argument("--api", default=None, help=argparse.SUPPRESS)
+    parser.add_argument("--worker-index", type=int, default=None, help=argparse.SUPPRESS)
+    parser.add_argument("--worker-count", type=int, default=1, help=argparse.SUPPRESS)
+    parser.add_argument("--worker-status-fd", type=int, default=None, help=argparse.SUPPRESS)
+    return parser.parse_args()
+
+
+def _envelope(conversation: int, seq: int) -> str:
+    return json.dumps(
+        {
+            "envelope": {
+                "sourceNumber": f"+1555{conversation:07d}",
+                "timestamp": seq,
+                "dataMessage": {"message": "!bench", "timestamp": seq},
+            },
+            "account": "+15550000000",
+        }
+    )
+
+
+async def _worker(args: argparse.Namespace) -> None:
+    """Stand-in bot worker: handle envelopes in order per sender, concurrently across senders."""
+    reader = asyncio.StreamReader(limit=1 << 24)
+    await asyncio.get_running_loop().connect_read_pipe(
+        lambda: asyncio.StreamReaderProtocol(reader), sys.stdin.buffer
+    )
+    tails: dict[str, asyncio.Task[None]] = {}
+    in_flight = asyncio.Semaphore(64)
+
+    async with aiohttp.ClientSession() as session:
+
+        async def handle(raw: bytes, previous: asyncio.Task[None] | None) -> None:
+            try:
+                envelope = json.loads(raw)["envelope"]
+                digest = raw
+                for _ in range(args.work):
+                    digest = hashlib.sha256(digest).digest()
+                if previous is not None:
+                    await previous
+                async with session.post(
+                    f"{args.api}/v2/send",
+                    json={
+                        "message": digest.hex()[:16],
+                        "recipients": [envelope["sourceNumber"]],
+                        "number": "+15550000000",
+                        "seq": envelope["timestamp"],
+                        "worker": args.worker_index,
+                    },
+                ) as resp:
+                    await resp.read()
+            finally:
+                in_flight.release()
+
+        if args.worker_status_fd is not None:
+            notify_ready(args.worker_status_fd)
+        while line := await reader.readline():
+            await in_flight.acquire()
+            sender = json.loads(line)["envelope"]["sourceNumber"]
+            tails[sender] = asyncio.create_task(handle(line, tails.get(sender)))
+        await asyncio.gather(*tails.values())
+
+
+class _Replies:
+    """Counts replies and checks per-recipient ordering."""
+
+    def __init__(self) -> None:
+        self.received = 0
+        self.violations = 0
+        self.done = asyncio.Event()
+        self.expected = 0
+        self._last: dict[str, int] = {}
+
+    def reset(self, expected: int) -> None:
+        self.received = 0
+        self.violations = 0
+        self._last.clear()
+        self.expected = expected
+        self.done.clear()
+
+    def on_send(self, body: dict[str, object]) -> None:
+        recipient = body["recipients"][0]  # type: ignore[index]
+        seq = int(body["seq"])  # type: ignore[arg-type]
+        if seq <= self._last.get(recipient, -1):
+            self.violations += 1
+        self._last[recipient] = seq
+        self.received += 1
+        if self.received >= self.expected:
+            self.done.set()
+
+
+async def _round(args: argparse.Namespace, replies: _Replies, url: str, count: int) -> float:
+    command = [sys.executable, os.path.abspath(__file__), "--api", url, "--work", str(args.work)]
+    supervisor = Supervisor(command, count, queue_size=1000, drain_timeout=60.0)
+    await supervisor.start()
+    await supervisor.wait_ready()
+    replies.reset(args.messages)
+    envelopes = [
+        _envelope(i % args.conversations, i // args.conversations) for i in range(args.messages)
+    ]
+    restart: asyncio.Task[None] | None = None
+    started = time.perf_counter()
+    for index, raw in enumerate(envelopes):
+        if args.restart and index == len(envelopes) // 2:
+            restart = asyncio.create_task(supervisor.rolling_restart())
+        await supervisor.dispatch(raw)
+    await replies.done.wait()
+    elapsed = time.perf_counter() - started
+    if restart is not None:
+        await restart
+    await supervisor.stop()
+    return elapsed
+
+
+async def _bench(args: argparse.Namespace) -> None:
+    replies = _Replies()
+    api = FakeSignalApi(on_send=replies.on_send)
+    url = await api.start()
+    print(
+        f"{args.messages:,} messages, {args.conversations} conversations, "
+        f"{args.work} SHA-256 rounds each, {os.cpu_count()} CPU(s)"
+        + (", rolling restart mid-run" if args.restart else "")
+    )
+    print(f"{'processes':>9} {'seconds':>8} {'msg/s':>8} {'speed-up':>8} {'order errors':>12}")
+    baseline: float | None = None
+    try:
+        for count in (int(value) for value in args.processes.split(",")):
+            elapsed = await _round(args, replies, url, count)
+            rate = args.messages / elapsed
+            baseline = baseline or rate
+            print(
+                f"{count:>9} {elapsed:>8.2f} {rate:>8,.0f} {rate / baseline:>7.2f}x "
+                f"{replies.violations:>12}"
+            )
+    finally:
+        await api.stop()
+
+
+def main() -> int:
+    args = parse_args()
+    # Keep the table readable: worker start/stop events are info level.
+    structlog.configure(wrapper_class=structlog.make_filtering_bound_logger(logging.WARNING))
+    if args.worker_index is not None:
+        asyncio.run(_worker(args))
+    else:
+        asyncio.run(_bench(args))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,173 @@
+"""Scheduler with 100k pending jobs: heap cost per operation and end-to-end firing lag.
+
+Part one times insert and pop-min per job as the queue grows, for the
+scheduler's binary heap versus a list kept sorted with `bisect.insort`
+(O(n) insert) and an unsorted list scanned for its minimum (O(n) pop; only
+run up to `--scan-max` jobs). Part two schedules `--jobs` one-off jobs
+through `Scheduler` with delays spread over `--spread` seconds, then
+reports scheduling cost, how late jobs start (p50/p99) and event-loop
+responsiveness while they fire. With `--sqlite` jobs go through `SqliteJobStore`, and restoring
+every pending job after a restart is timed as well.
+
+Usage: poetry run python scripts/bench_scheduler.py [--jobs 100000] [--spread 5] [--sqlite]
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import bisect
+import heapq
+import random
+import statistics
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Callable
+
+from signal_ai.services.scheduler import JobStore, Scheduler, SqliteJobStore
+from signal_ai.storage import SqliteDatabase
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Benchmark the job scheduler")
+    parser.add_argument("--jobs", type=int, default=100_000)
+    parser.add_argument("--sizes", default="1000,10000,100000", help="Queue sizes for part one.")
+    parser.add_argument("--scan-max", type=int, default=10_000)
+    parser.add_argument("--spread", type=float, default=5.0, help="Delays are uniform in [0, spread) s.")
+    parser.add_argument("--batch", type=int, default=1000, help="Jobs scheduled per loop iteration.")
+    parser.add_argument("--sqlite", action="store_true", help="Persist jobs through SQLite.")
+    parser.add_argument("--seed", type=int, default=7)
+    return parser.parse_args()
+
+
+def _heap(keys: list[float]) -> None:
+    heap: list[tuple[float, int]] = []
+    for index, key in enumerate(keys):
+        heapq.heappush(heap, (key, index))
+    while heap:
+        heapq.heappop(heap)
+
+
+def _sorted_list(keys: list[float]) -> None:
+    ordered: list[tuple[float, int]] = []
+    for index, key in enumerate(keys):
+        bisect.insort(ordered, (key, index))
+    ordered.reverse()
+    while ordered:
+        ordered.pop()
+
+
+def _scan(keys: list[float]) -> None:
+    pending = list(enumerate(keys))
+    while pending:
+        position = min(range(len(pending)), key=lambda i: pending[i][1])
+        pending[position] = pending[-1]
+        pending.pop()
+
+
+def _structures(args: argparse.Namespace, rng: random.Random) -> None:
+    print(f"{'jobs':>8} {'structure':<12} {'insert+pop us/job':>18}")
+    variants: list[tuple[str, Callable[[list[float]], None]]] = [
+        ("heap", _heap),
+        ("insort", _sorted_list),
+        ("min scan", _scan),
+    ]
+    for size in (int(value) for value in args.sizes.split(",")):
+        keys = [rng.random() for _ in range(size)]
+        for label, run in variants:
+            if label == "min scan" and size > args.scan_max:
+                continue
+            started = time.perf_counter()
+            run(keys)
+            elapsed = time.perf_counter() - started
+            print(f"{size:>8,} {label:<12} {elapsed / size * 1e6:>18.2f}")
+
+
+def _quantiles(values: list[float]) -> str:
+    if len(values) < 2:
+        return "n/a"
+    q = statistics.quantiles(values, n=100)
+    return f"p50={q[49] * 1000:7.1f} ms p99={q[98] * 1000:7.1f} ms max={max(values) * 1000:7.1f} ms"
+
+
+async def _probe_loop(done: asyncio.Event) -> list[float]:
+    """Scheduling delay of a 10 ms sleep, sampled until `done` is set."""
+    stalls: list[float] = []
+    while not done.is_set():
+        started = time.perf_counter()
+        await asyncio.sleep(0.01)
+        stalls.append(time.perf_counter() - started - 0.01)
+    return stalls
+
+
+async def _end_to_end(args: argparse.Namespace, rng: random.Random) -> None:
+    lags: list[float] = []
+
+    async def record(payload: dict[str, Any]) -> None:
+        lags.append(time.time() - payload["due"])
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db = SqliteDatabase(str(Path(tmp) / "jobs.db")) if args.sqlite else None
+        store: JobStore | None = SqliteJobStore(db) if db is not None else None
+        scheduler = Scheduler(store)
+        scheduler.register("record", record)
+        scheduler.start()
+        done = asyncio.Event()
+        probe = asyncio.create_task(_probe_loop(done))
+        delays = [rng.random() * args.spread for _ in range(args.jobs)]
+        elapsed = 0.0
+        for start in range(0, args.jobs, args.batch):
+            # Like a burst of handlers: one batch per loop iteration, each job due
+            # its delay after it was scheduled.
+            started = time.perf_counter()
+            now = time.time()
+            await asyncio.gather(
+                *(
+                    scheduler.schedule("record", {"due": now + delay}, at=now + delay)
+                    for delay in delays[start : start + args.batch]
+                )
+            )
+            elapsed += time.perf_counter() - started
+            await asyncio.sleep(0)
+        while len(lags) < args.jobs:
+            await asyncio.sleep(0.05)
+        done.set()
+        stalls = await probe
+        await scheduler.stop()
+        label = "scheduler, SQLite store" if args.sqlite else "scheduler, in memory"
+        print(f"{label}: {args.jobs:,} jobs over {args.spread:g} s")
+        print(f"  schedule: {elapsed * 1e6 / args.jobs:6.1f} us/job")
+        print(f"  lag:        {_quantiles(lags)}")
+        print(f"  loop stall: {_quantiles(stalls)}")
+
+        if db is not None:
+            # Pending jobs survive a restart: reload them all into a fresh scheduler.
+            far = time.time() + 3600
+            writer = Scheduler(SqliteJobStore(db))
+            writer.register("record", record)
+            for start in range(0, args.jobs, args.batch):
+                await asyncio.gather(
+                    *(
+                        writer.schedule("record", {"due": far}, at=far + i)
+                        for i in range(start, min(args.jobs, start + args.batch))
+                    )
+                )
+            restored = Scheduler(SqliteJobStore(db))
+            restored.register("record", record)
+            started = time.perf_counter()
+            await restored._restore()
+            print(f"  restore {len(restored):,} jobs: {time.perf_counter() - started:.2f} s")
+            await db.close()
+
+
+def main() -> int:
+    args = parse_args()
+    rng = random.Random(args.seed)
+    _structures(args, rng)
+    asyncio.run(_end_to_end(args, rng))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
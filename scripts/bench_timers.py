@@ -0,0 +1,185 @@
+"""Timer wheel with 100k pending delayed actions versus one sleeping task each.
+
+Schedules `--timers` actions spread over `--spread` seconds, then reports
+scheduling cost, how late they fire (p50/p99) and event-loop responsiveness
+while they run. Memory held per pending timer is measured in a separate
+pass, since tracing allocations slows scheduling down. The baseline is the
+old pattern: one `asyncio.sleep` per delayed action, holding its coroutine.
+With `--sqlite` the wheel persists through `SqliteTimerStore`, and restoring
+every pending timer after a restart is timed as well.
+
+Usage: poetry run python scripts/bench_timers.py [--timers 100000] [--spread 5] [--batch 1000] [--sqlite]
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import random
+import statistics
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Any, Awaitable, Callable
+
+from signal_ai.services.timers import SqliteTimerStore, TimerStore, TimerWheel
+from signal_ai.storage import SqliteDatabase
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Benchmark the delayed-action timer wheel")
+    parser.add_argument("--timers", type=int, default=100_000)
+    parser.add_argument("--spread", type=float, default=5.0, help="Delays are uniform in [0, spread) s.")
+    parser.add_argument("--batch", type=int, default=1000, help="Timers scheduled per loop iteration.")
+    parser.add_argument("--tick-ms", type=float, default=50.0)
+    parser.add_argument("--sqlite", action="store_true", help="Persist timers through SQLite.")
+    parser.add_argument("--seed", type=int, default=7)
+    return parser.parse_args()
+
+
+def _quantiles(values: list[float]) -> str:
+    if len(values) < 2:
+        return "n/a"
+    q = statistics.quantiles(values, n=100)
+    return f"p50={q[49] * 1000:7.1f} ms p99={q[98] * 1000:7.1f} ms max={max(values) * 1000:7.1f} ms"
+
+
+async def _probe_loop(done: asyncio.Event) -> list[float]:
+    """Scheduling delay of a 10 ms sleep, sampled until `done` is set."""
+    stalls: list[float] = []
+    while not done.is_set():
+        started = time.perf_counter()
+        await asyncio.sleep(0.01)
+        stalls.append(time.perf_counter() - started - 0.01)
+    return stalls
+
+
+async def _measure(
+    label: str,
+    delays: list[float],
+    schedule: Callable[[float], Awaitable[None]],
+    lags: list[float],
+    batch: int,
+) -> None:
+    done = asyncio.Event()
+    total = len(delays)
+    probe = asyncio.create_task(_probe_loop(done))
+    elapsed = 0.0
+    for start in range(0, total, batch):
+        # Like a burst of handlers: one batch per loop iteration, then yield.
+        started = time.perf_counter()
+        await asyncio.gather(*(schedule(delay) for delay in delays[start : start + batch]))
+        elapsed += time.perf_counter() - started
+        await asyncio.sleep(0)
+    while len(lags) < total:
+        await asyncio.sleep(0.05)
+    done.set()
+    stalls = await probe
+    print(label)
+    print(f"  schedule: {elapsed * 1e6 / total:6.1f} us/timer")
+    print(f"  lag:      {_quantiles(lags)}")
+    print(f"  loop:     {_quantiles(stalls)} (extra delay of a 10 ms sleep)")
+
+
+async def _pending_memory(label: str, count: int, schedule: Callable[[], Awaitable[None]]) -> None:
+    tracemalloc.start()
+    await asyncio.gather(*(schedule() for _ in range(count)))
+    held, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{label:>10}: {held / count:6.0f} B per pending timer")
+
+
+async def _baseline(delays: list[float], batch: int) -> None:
+    lags: list[float] = []
+    tasks: list[asyncio.Task[None]] = []
+
+    async def delayed(delay: float, payload: dict[str, Any]) -> None:
+        await asyncio.sleep(delay)
+        lags.append(time.time() - payload["due"])
+
+    async def schedule(delay: float) -> None:
+        tasks.append(asyncio.create_task(delayed(delay, {"due": time.time() + delay})))
+
+    await _measure("sleeping task per action", delays, schedule, lags, batch)
+    await asyncio.gather(*tasks)
+
+
+async def _wheel(delays: list[float], args: argparse.Namespace, store: TimerStore | None) -> None:
+    lags: list[float] = []
+
+    async def action(payload: dict[str, Any]) -> None:
+        lags.append(time.time() - payload["due"])
+
+    wheel = TimerWheel(store, tick=args.tick_ms / 1000)
+    wheel.register("bench", action)
+    wheel.start()
+
+    async def schedule(delay: float) -> None:
+        await wheel.schedule(delay, "bench", {"due": time.time() + delay})
+
+    label = f"timer wheel ({args.tick_ms:g} ms tick{', sqlite' if store is not None else ''})"
+    await _measure(label, delays, schedule, lags, args.batch)
+    await wheel.stop()
+
+
+async def _restore(store: TimerStore, count: int, args: argparse.Namespace) -> None:
+    async def action(payload: dict[str, Any]) -> None:
+        return None
+
+    writer = TimerWheel(store, tick=args.tick_ms / 1000)
+    writer.register("bench", action)
+    await asyncio.gather(*(writer.schedule(3600, "bench") for _ in range(count)))
+
+    reader = TimerWheel(store, tick=args.tick_ms / 1000)
+    reader.register("bench", action)
+    started = time.perf_counter()
+    reader.start()
+    while len(reader) < count:
+        await asyncio.sleep(0.01)
+    print(f"restore:  {count:,} pending timers in {(time.perf_counter() - started) * 1000:.0f} ms")
+    await reader.stop()
+
+
+async def _memory(args: argparse.Namespace) -> None:
+    tasks: list[asyncio.Task[None]] = []
+
+    async def sleeper() -> None:
+        tasks.append(asyncio.create_task(asyncio.sleep(3600)))
+
+    await _pending_memory("tasks", args.timers, sleeper)
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def noop(payload: dict[str, Any]) -> None:
+        return None
+
+    wheel = TimerWheel(None, tick=args.tick_ms / 1000)
+    wheel.register("bench", noop)
+    await _pending_memory("wheel", args.timers, lambda: wheel.schedule(3600, "bench", {"due": 0.0}))
+
+
+async def _run(args: argparse.Namespace, db_path: Path) -> None:
+    rng = random.Random(args.seed)
+    delays = [rng.uniform(0, args.spread) for _ in range(args.timers)]
+    await _memory(args)
+    await _baseline(delays, args.batch)
+    await _wheel(delays, args, None)
+    if args.sqlite:
+        db = SqliteDatabase(str(db_path))
+        store = SqliteTimerStore(db)
+        await _wheel(delays, args, store)
+        await _restore(store, args.timers, args)
+        await db.close()
+
+
+def main() -> int:
+    args = parse_args()
+    with tempfile.TemporaryDirectory() as tmp:
+        asyncio.run(_run(args, Path(tmp) / "timers.db"))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
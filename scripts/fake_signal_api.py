@@ -0,0 +1,396 @@
+"""Local stand-in for signal-cli-rest-api, for load tests and runs without Docker.
+
+Serves the endpoints the bot calls: health and about, the `/v1/receive`
+websocket (json-rpc mode), `/v2/send`, remote delete, contacts, identities,
+reactions, typing indicators, receipts, sticker packs, number search,
+groups and profiles. Each route answers with canned data after the
+configured latency (mean plus uniform jitter) and fails with
+`error_status` at `error_rate`. Faults can differ per route and be
+changed while running. Envelopes passed to `inject()` or POSTed to
+`/fake/inject` are pushed to every connected receive websocket.
+`/fake/stats` returns request and error counts per route. Requests to
+paths the fake does not know get a 404 and are counted as `unhandled`.
+
+Usage: poetry run python scripts/fake_signal_api.py [--port 8080] [--latency-ms 20] [--jitter-ms 10] [--error-rate 0.01]
+then: SIGNAL_SERVICE_URL=http://127.0.0.1:8080 SIGNAL_API_URL=http://127.0.0.1:8080 poetry run python main.py --no-api-autostart
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import base64
+import hashlib
+import json
+import random
+import time
+from collections import Counter
+from dataclasses import asdict, dataclass, replace
+from typing import Any, Awaitable, Callable
+
+from aiohttp import WSMsgType, web
+
+DEFAULT_NUMBER = "+15550000000"
+SendHook = Callable[[dict[str, Any]], None]
+Handler = Callable[[web.Request], Awaitable[web.StreamResponse]]
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Fake signal-cli-rest-api server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--number", default=DEFAULT_NUMBER, help="Account the fake serves.")
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="Mean added latency.")
+    parser.add_argument("--jitter-ms", type=float, default=0.0, help="Uniform +/- jitter.")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of failed calls.")
+    parser.add_argument("--error-status", type=int, default=500)
+    parser.add_argument("--contacts", type=int, default=50, help="Contacts returned per account.")
+    return parser.parse_args()
+
+
+@dataclass(frozen=True, slots=True)
+class Faults:
+    latency_ms: float = 0.0
+    jitter_ms: float = 0.0
+    error_rate: float = 0.0
+    error_status: int = 500
+
+    async def apply(self, rng: random.Random) -> bool:
+        """Sleep the injected latency; True when this call should fail."""
+        delay = self.latency_ms + rng.uniform(-self.jitter_ms, self.jitter_ms)
+        if delay > 0:
+            await asyncio.sleep(delay / 1000)
+        return self.error_rate > 0 and rng.random() < self.error_rate
+
+
+def envelope(
+    account: str,
+    source: str,
+    text: str,
+    *,
+    timestamp: int | None = None,
+    group_id: str | None = None,
+) -> dict[str, Any]:
+    """A data-message envelope as the receive websocket delivers it."""
+    timestamp = timestamp or time.time_ns() // 1_000_000
+    data: dict[str, Any] = {
+        "timestamp": timestamp,
+        "message": text,
+        "expiresInSeconds": 0,
+        "viewOnce": False,
+    }
+    if group_id is not None:
+        data["groupInfo"] = {"groupId": group_id, "type": "DELIVER"}
+    return {
+        "envelope": {
+            "source": source,
+            "sourceNumber": source,
+            "sourceUuid": _uuid(source),
+            "sourceName": source,
+            "sourceDevice": 1,
+            "timestamp": timestamp,
+            "dataMessage": data,
+        },
+        "account": account,
+    }
+
+
+def _uuid(seed: str) -> str:
+    digest = hashlib.md5(seed.encode()).hexdigest()
+    return f"{digest[:8]}-{digest[8:12]}-{digest[12:16]}-{digest[16:20]}-{digest[20:32]}"
+
+
+def _now_ms() -> int:
+    return time.time_ns() // 1_000_000
+
+
+class FakeSignalApi:
+    """aiohttp app faking signal-cli-rest-api for one or more accounts."""
+
+    def __init__(
+        self,
+        *,
+        number: str = DEFAULT_NUMBER,
+        faults: Faults | None = None,
+        contacts: int = 50,
+        on_send: SendHook | None = None,
+        seed: int | None = None,
+    ) -> None:
+        self.number = number
+        self.faults: dict[str, Faults] = {"*": faults or Faults()}
+        self.on_send = on_send
+        self.requests: Counter[str] = Counter()
+        self.errors: Counter[str] = Counter()
+        self._contacts = contacts
+        self._rng = random.Random(seed)
+        self._clients: set[web.WebSocketResponse] = set()
+        self._connected = asyncio.Event()
+        self._sticker_packs: dict[str, list[dict[str, Any]]] = {}
+        self._groups: dict[str, list[dict[str, Any]]] = {}
+        self._runner: web.AppRunner | None = None
+        self.url = ""
+
+    def set_faults(self, route: str = "*", **changes: Any) -> None:
+        """Change faults for one route name (see `routes()`), or for every route with `*`."""
+        self.faults[route] = replace(self.faults.get(route, self.faults["*"]), **changes)
+
+    @property
+    def clients(self) -> int:
+        return len(self._clients)
+
+    async def wait_connected(self) -> None:
+        await self._connected.wait()
+
+    async def inject(self, payload: dict[str, Any] | str) -> int:
+        """Push one envelope to every receive websocket; returns how many got it."""
+        raw = payload if isinstance(payload, str) else json.dumps(payload)
+        delivered = 0
+        for ws in list(self._clients):
+            try:
+                await ws.send_str(raw)
+            except ConnectionError:
+                self._clients.discard(ws)
+            else:
+                delivered += 1
+        return delivered
+
+    def routes(self) -> list[tuple[str, str, str, Handler]]:
+        """(method, path, route name, handler); the name is what `set_faults` takes."""
+        return [
+            ("GET", "/v1/health", "health", self._health),
+            ("GET", "/v1/about", "about", self._about),
+            ("GET", "/v1/accounts", "accounts", self._accounts),
+            ("GET", "/v1/receive/{number}", "receive", self._receive),
+            ("POST", "/v2/send", "send", self._send),
+            ("DELETE", "/v1/remote-delete/{number}", "remote_delete", self._timestamp),
+            ("GET", "/v1/contacts/{number}", "contacts", self._list_contacts),
+            ("PUT", "/v1/contacts/{number}", "contacts", self._no_content),
+            ("GET", "/v1/identities/{number}", "identities", self._identities),
+            ("POST", "/v1/reactions/{number}", "reactions", self._no_content),
+            ("DELETE", "/v1/reactions/{number}", "reactions", self._no_content),
+            ("PUT", "/v1/typing-indicator/{number}", "typing_indicator", self._no_content),
+            ("DELETE", "/v1/typing-indicator/{number}", "typing_indicator", self._no_content),
+            ("POST", "/v1/receipts/{number}", "receipts", self._no_content),
+            ("GET", "/v1/sticker-packs/{number}", "sticker_packs", self._list_sticker_packs),
+            ("POST", "/v1/sticker-packs/{number}", "sticker_packs", self._add_sticker_pack),
+            ("GET", "/v1/search/{number}", "search", self._search),
+            ("GET", "/v1/groups/{number}", "groups", self._list_groups),
+            ("POST", "/v1/groups/{number}", "groups", self._create_group),
+            ("PUT", "/v1/profiles/{number}", "profiles", self._no_content),
+        ]
+
+    def build_app(self) -> web.Application:
+        app = web.Application(middlewares=[self._middleware], client_max_size=64 * 1024 * 1024)
+        for method, path, name, handler in self.routes():
+            app.router.add_route(method, path, handler, name=f"{name}:{method.lower()}")
+        app.router.add_post("/fake/inject", self._inject, name="fake:inject")
+        app.router.add_get("/fake/stats", self._stats, name="fake:stats")
+        app.router.add_post("/fake/faults", self._set_faults, name="fake:faults")
+        return app
+
+    async def start(self, host: str = "127.0.0.1", port: int = 0) -> str:
+        """Serve on `host:port` (0 picks a free port); returns the base URL."""
+        self._runner = web.AppRunner(self.build_app(), access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, host, port)
+        await site.start()
+        bound = site._server.sockets[0].getsockname()[1]  # type: ignore[union-attr]
+        self.url = f"http://{host}:{bound}"
+        return self.url
+
+    async def stop(self) -> None:
+        for ws in list(self._clients):
+            await ws.close()
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+    @web.middleware
+    async def _middleware(self, request: web.Request, handler: Handler) -> web.StreamResponse:
+        route = request.match_info.route.name or ""
+        if route.startswith("fake:"):
+            return await handler(request)
+        name = route.split(":", 1)[0] or "unhandled"
+        self.requests[name] += 1
+        if name == "unhandled":
+            message = f"fake: no route for {request.method} {request.path}"
+            return web.json_response({"error": message}, status=404)
+        faults = self.faults.get(name, self.faults["*"])
+        # The receive websocket stays up; latency and errors apply to REST calls.
+        if name != "receive" and await faults.apply(self._rng):
+            self.errors[name] += 1
+            return web.json_response(
+                {"error": "fake: injected failure"}, status=faults.error_status
+            )
+        return await handler(request)
+
+    async def _health(self, request: web.Request) -> web.Response:
+        return web.Response(status=204)
+
+    async def _about(self, request: web.Request) -> web.Response:
+        return web.json_response(
+            {
+                "versions": ["v1", "v2"],
+                "build": 2,
+                "mode": "json-rpc",
+                "version": "fake",
+                "capabilities": {},
+            }
+        )
+
+    async def _accounts(self, request: web.Request) -> web.Response:
+        return web.json_response([self.number])
+
+    async def _receive(self, request: web.Request) -> web.StreamResponse:
+        ws = web.WebSocketResponse(heartbeat=30)
+        if not ws.can_prepare(request).ok:
+            # Normal-mode polling: nothing is queued for pollers.
+            return web.json_response([])
+        await ws.prepare(request)
+        self._clients.add(ws)
+        self._connected.set()
+        try:
+            async for message in ws:
+                if message.type == WSMsgType.ERROR:
+                    break
+        finally:
+            self._clients.discard(ws)
+            if not self._clients:
+                self._connected.clear()
+        return ws
+
+    async def _send(self, request: web.Request) -> web.Response:
+        body = await request.json()
+        if not body.get("recipients") or not body.get("number"):
+            return web.json_response({"error": "number and recipients are required"}, status=400)
+        if self.on_send is not None:
+            self.on_send(body)
+        return web.json_response({"timestamp": str(_now_ms())}, status=201)
+
+    async def _timestamp(self, request: web.Request) -> web.Response:
+        return web.json_response({"timestamp": str(_now_ms())}, status=201)
+
+    async def _no_content(self, request: web.Request) -> web.Response:
+        return web.Response(status=204)
+
+    async def _list_contacts(self, request: web.Request) -> web.Response:
+        return web.json_response(
+            [
+                {
+                    "number": f"+1555{i:07d}",
+                    "uuid": _uuid(f"contact-{i}"),
+                    "name": f"Contact {i}",
+                    "profile_name": f"Contact {i}",
+                    "username": "",
+                    "color": "",
+                    "blocked": False,
+                    "message_expiration": "0",
+                }
+                for i in range(self._contacts)
+            ]
+        )
+
+    async def _identities(self, request: web.Request) -> web.Response:
+        return web.json_response(
+            [
+                {
+                    "number": f"+1555{i:07d}",
+                    "uuid": _uuid(f"contact-{i}"),
+                    "fingerprint": hashlib.sha256(f"contact-{i}".encode()).hexdigest(),
+                    "safety_number": f"{i:060d}",
+                    "status": "TRUSTED_UNVERIFIED",
+                    "added": "2024-01-01T00:00:00Z",
+                }
+                for i in range(min(self._contacts, 10))
+            ]
+        )
+
+    async def _list_sticker_packs(self, request: web.Request) -> web.Response:
+        return web.json_response(self._sticker_packs.get(request.match_info["number"], []))
+
+    async def _add_sticker_pack(self, request: web.Request) -> web.Response:
+        body = await request.json()
+        self._sticker_packs.setdefault(request.match_info["number"], []).append(
+            {
+                "pack_id": body.get("pack_id", ""),
+                "title": "fake pack",
+                "author": "fake",
+                "installed": True,
+                "url": "",
+            }
+        )
+        return web.Response(status=204)
+
+    async def _search(self, request: web.Request) -> web.Response:
+        numbers = request.query.getall("numbers", [])
+        return web.json_response([{"number": number, "registered": True} for number in numbers])
+
+    async def _list_groups(self, request: web.Request) -> web.Response:
+        return web.json_response(self._groups.get(request.match_info["number"], []))
+
+    async def _create_group(self, request: web.Request) -> web.Response:
+        body = await request.json()
+        internal = base64.b64encode(self._rng.randbytes(32)).decode()
+        group_id = "group." + base64.b64encode(internal.encode()).decode()
+        self._groups.setdefault(request.match_info["number"], []).append(
+            {
+                "id": group_id,
+                "internal_id": internal,
+                "name": body.get("name", ""),
+                "members": body.get("members", []),
+                "admins": [request.match_info["number"]],
+                "blocked": False,
+                "pending_invites": [],
+                "pending_requests": [],
+                "invite_link": "",
+            }
+        )
+        return web.json_response({"id": group_id}, status=201)
+
+    async def _inject(self, request: web.Request) -> web.Response:
+        body = await request.json()
+        delivered = 0
+        for payload in body if isinstance(body, list) else [body]:
+            delivered += await self.inject(payload)
+        return web.json_response({"delivered": delivered})
+
+    async def _stats(self, request: web.Request) -> web.Response:
+        return web.json_response(
+            {"requests": self.requests, "errors": self.errors, "clients": self.clients}
+        )
+
+    async def _set_faults(self, request: web.Request) -> web.Response:
+        body = await request.json()
+        route = body.pop("route", "*")
+        try:
+            self.set_faults(route, **body)
+        except TypeError as exc:
+            return web.json_response({"error": str(exc)}, status=400)
+        return web.json_response({"route": route, "faults": asdict(self.faults[route])})
+
+
+async def _serve(args: argparse.Namespace) -> None:
+    api = FakeSignalApi(
+        number=args.number,
+        faults=Faults(args.latency_ms, args.jitter_ms, args.error_rate, args.error_status),
+        contacts=args.contacts,
+    )
+    url = await api.start(args.host, args.port)
+    print(f"fake signal API on {url} for {args.number}; inject with POST {url}/fake/inject")
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await api.stop()
+
+
+def main() -> int:
+    args = parse_args()
+    try:
+        asyncio.run(_serve(args))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
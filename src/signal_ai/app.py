@@ -1,25 +1,103 @@
 from __future__ import annotations
 
+import asyncio
+import contextlib
+import dataclasses
+import functools
+import signal
+import sys
+import time
+from pathlib import Path
+from typing import Awaitable, Sequence
+from zoneinfo import ZoneInfo
+
 import structlog
 
 from signal_client import SignalClient
 from signal_client.config import Settings
 from signal_client.metrics_server import start_metrics_server
-from signal_client.health_server import start_health_server, HealthServer
+from signal_client.health_server import start_health_server
+from signal_client.runtime.models import QueuedMessage
 
-from .commands import CommandOptions, build_command_handlers
+from .commands import (
+    BotState,
+    CommandOptions,
+    build_command_handlers,
+    command_names,
+    dispatch_trigger,
+    register_delayed_actions,
+    register_scheduled_actions,
+    select_commands,
+)
 from .config import AppConfig
-from .middlewares import blocklist_middleware, dlq_middleware, timing_middleware
-from .services.dlq import replay_dlq_once
+from .middlewares import (
+    blocklist_middleware,
+    dlq_middleware,
+    first_message_middleware,
+    quota_middleware,
+    reply_coalescing_middleware,
+    timing_middleware,
+)
+from .services.archive import MessageArchive
+from .services.attachments import AttachmentCache
+from .services.blocklist import BlocklistEngine
+from .services.broadcast import (
+    BroadcastEngine,
+    BroadcastStore,
+    RedisBroadcastStore,
+    SqliteBroadcastStore,
+    redeliver,
+)
+from .services.cache import TtlCache
+from .services.dice import RollLimits
+from .services.dlq import (
+    BufferedDlqWriter,
+    DlqReplayer,
+    RawEnvelopes,
+    ReplayAttempts,
+    replay_dlq_once,
+)
+from .services.http import SharedHttpSession
+from .services.ingest import IngestTap
+from .services.ledger import (
+    LedgerStore,
+    RedisLedgerStore,
+    SqliteLedgerStore,
+    WriteBehindLedger,
+)
+from .services.quota import (
+    MemoryQuotaLimiter,
+    QuotaLimiter,
+    QuotaPolicy,
+    RedisQuotaLimiter,
+)
+from .services.registration import CACHE_NAMESPACE as REGISTRATION_CACHE
 from .services.health import (
+    check_http_health,
+    check_ws_health,
     ensure_signal_api_running,
-    health_check,
+    receive_ws_url,
     report_status,
     warm_api_session,
 )
+from .services.scheduler import JobStore, RedisJobStore, Scheduler, SqliteJobStore
+from .services.startup import StartupTimeline, run_concurrently
+from .services.supervisor import (
+    SHARDS_KEY,
+    Supervisor,
+    notify_ready,
+    orphaned_shards,
+    pump_websocket,
+    shard_prefix,
+)
+from .services.timers import RedisTimerStore, SqliteTimerStore, TimerStore, TimerWheel
+from .storage import SqliteDatabase, redis_client, uses_redis
 
 log = structlog.get_logger()
 
+# Longest envelope line a worker accepts from the supervisor.
+_ENVELOPE_LIMIT = 16 * 1024 * 1024
+
 
 def _startup_log(settings: Settings, dlq_enabled: bool) -> None:
     backpressure = "drop_oldest" if settings.queue_drop_oldest_on_timeout else "fail_fast"
@@ -46,58 +124,468 @@ def _startup_log(settings: Settings, dlq_enabled: bool) -> None:
 
 
 async def _run_bot(config: AppConfig) -> None:
-    overrides: dict[str, object] = {}
-    ensure_signal_api_running(config.auto_start_signal_api)
-    settings = Settings.from_sources(config=overrides)
-    await health_check(settings, timeout=config.health_timeout)
-    single_number_mode = not config.secondary_member or config.secondary_member == settings.phone_number
+    async with SharedHttpSession(
+        limit=config.http_pool_limit,
+        limit_per_host=config.http_pool_limit_per_host,
+        dns_ttl=config.http_dns_ttl,
+    ) as http:
+        await _serve(config, http)
 
+
+async def _serve(config: AppConfig, http: SharedHttpSession) -> None:
+    timeline = StartupTimeline()
+    overrides: dict[str, object] = {}
     if config.start_metrics_server:
-        start_metrics_server(port=config.metrics_port, addr=config.metrics_host)
+        timeline.sync_phase(
+            "metrics_server",
+            start_metrics_server,
+            port=config.metrics_port,
+            addr=config.metrics_host,
+        )
 
-    health_server: HealthServer | None = None
-    async with SignalClient(config=overrides) as bot:
+    dlq_writer: BufferedDlqWriter | None = None
+    archive: MessageArchive | None = None
+    # Every background component registers its stop() on the stack as soon as
+    # it starts, so a failure later in startup still shuts down what is
+    # running, in reverse start order.
+    async with contextlib.AsyncExitStack() as stack:
+        # Docker autostart blocks on subprocess; settings parsing touches the
+        # filesystem. Neither depends on the other, so run both off the loop.
+        settings, _ = await run_concurrently(
+            timeline.phase(
+                "settings", asyncio.to_thread(Settings.from_sources, config=overrides)
+            ),
+            timeline.phase(
+                "api_autostart",
+                asyncio.to_thread(ensure_signal_api_running, config.auto_start_signal_api),
+            ),
+        )
+        session = http.session
+        worker = config.worker_index is not None
+        shard = config.worker_index or 0
+        probes = [
+            timeline.phase(
+                "health_http", check_http_health(settings, config.health_timeout, session)
+            )
+        ]
+        if not worker:
+            # Workers never open the receive websocket; the supervisor owns it.
+            probes.append(
+                timeline.phase(
+                    "health_ws", check_ws_health(settings, config.health_timeout, session)
+                )
+            )
+        bot, *_ = await run_concurrently(
+            timeline.phase(
+                "client_open", stack.enter_async_context(SignalClient(config=overrides))
+            ),
+            *probes,
+        )
+        single_number_mode = (
+            not config.secondary_member or config.secondary_member == settings.phone_number
+        )
         _startup_log(bot.settings, bot.app.dead_letter_queue is not None)
         if single_number_mode:
             log.info("signal_ai.single_number_mode", phone_number=bot.settings.phone_number)
 
-        if config.warm_api_session:
-            await warm_api_session(bot)
-
         command_options = CommandOptions(
             admin_number=config.admin_number or bot.settings.phone_number,
             faulty_contacts_base_url=config.faulty_contacts_base_url,
             secondary_member=config.secondary_member,
+            http=http,
+            search_chunk_size=config.search_chunk_size,
+            search_concurrency=config.search_concurrency,
+            roll_limits=RollLimits(
+                max_dice=config.roll_max_dice,
+                max_sides=config.roll_max_sides,
+                list_limit=config.roll_list_limit,
+                max_keep=config.roll_max_keep,
+            ),
+            share_attachment=config.share_attachment,
+            schedule_max_jobs=config.schedule_max_jobs,
+            schedule_recurring_admin_only=config.schedule_recurring == "admin",
+        )
+        sqlite_db = SqliteDatabase(bot.settings.sqlite_database)
+        stack.push_async_callback(sqlite_db.close)
+        ledger_store: LedgerStore = (
+            RedisLedgerStore(redis_client(bot.settings))
+            if uses_redis(bot.settings)
+            else SqliteLedgerStore(sqlite_db)
+        )
+        ledger = WriteBehindLedger(ledger_store, flush_interval=config.ledger_flush_interval)
+        if uses_redis(bot.settings):
+            await _adopt_orphaned_shards(bot.settings, shard, config.worker_count)
+        ledger.start()
+        stack.push_async_callback(ledger.stop)
+        if config.archive_enabled:
+            # Same file, own connection and thread: batch flushes, FTS upkeep
+            # and retention sweeps never queue behind ledger/timer/job writes.
+            archive_db = SqliteDatabase(bot.settings.sqlite_database, name="signal-ai-archive")
+            stack.push_async_callback(archive_db.close)
+            archive = MessageArchive(
+                archive_db,
+                capacity=config.archive_buffer_size,
+                batch_size=config.archive_flush_batch,
+                flush_interval=config.archive_flush_interval,
+                retention_days=config.archive_retention_days,
+                max_messages=config.archive_max_messages,
+                full_text=config.archive_full_text,
+                merge_interval=config.archive_fts_merge_interval,
+            )
+            archive.start()
+            stack.push_async_callback(archive.stop)
+        timer_store: TimerStore = (
+            RedisTimerStore(
+                redis_client(bot.settings), prefix=shard_prefix("signal_ai:timers", shard)
+            )
+            if uses_redis(bot.settings)
+            else SqliteTimerStore(sqlite_db)
+        )
+        timers = TimerWheel(timer_store, tick=config.timer_tick_ms / 1000)
+        register_delayed_actions(timers, bot.api_clients)
+        timers.start()
+        stack.push_async_callback(timers.stop)
+        job_store: JobStore = (
+            RedisJobStore(redis_client(bot.settings), prefix=shard_prefix("signal_ai:jobs", shard))
+            if uses_redis(bot.settings)
+            else SqliteJobStore(sqlite_db)
+        )
+        scheduler = Scheduler(
+            job_store,
+            workers=config.scheduler_workers,
+            tz=ZoneInfo(config.schedule_timezone),
+        )
+        register_scheduled_actions(scheduler, bot.api_clients)
+        scheduler.start()
+        stack.push_async_callback(scheduler.stop)
+        if bot.app.dead_letter_queue is not None:
+            dlq_writer = BufferedDlqWriter(
+                bot.app.dead_letter_queue,
+                capacity=config.dlq_buffer_size,
+                batch_size=config.dlq_flush_batch,
+                flush_interval=config.dlq_flush_interval,
+                storm_sample_rate=config.dlq_storm_sample_rate,
+            )
+            dlq_writer.start()
+            stack.push_async_callback(dlq_writer.stop)
+        raw_envelopes = RawEnvelopes() if dlq_writer is not None else None
+        if archive is not None or raw_envelopes is not None:
+            if bot.app.queue is None:
+                raise RuntimeError("Runtime not initialized; queue missing.")
+            # Fed from the queue rather than a middleware: middlewares only see
+            # messages that matched a command trigger, and never the raw payload.
+            IngestTap(
+                archive=archive,
+                raw_envelopes=raw_envelopes,
+                trigger=dispatch_trigger(select_commands(config.enabled_commands)),
+            ).install(bot.app.queue)
+        broadcast_store: BroadcastStore = (
+            RedisBroadcastStore(
+                redis_client(bot.settings), prefix=shard_prefix("signal_ai:broadcasts", shard)
+            )
+            if uses_redis(bot.settings)
+            else SqliteBroadcastStore(sqlite_db)
+        )
+        broadcasts = BroadcastEngine(
+            bot.api_clients.messages.send,
+            broadcast_store,
+            batch_size=config.broadcast_batch_size,
+            concurrency=config.broadcast_concurrency,
+            rate=_api_rate(bot.settings),
+            dlq=dlq_writer,
+        )
+        broadcasts.start()
+        # Stops before the DLQ writer, which takes this engine's failed recipients.
+        stack.push_async_callback(broadcasts.stop)
+        timeline.sync_phase(
+            "handlers",
+            _register_handlers,
+            bot,
+            command_options,
+            config.enabled_commands,
+            BotState(
+                ledger=ledger,
+                archive=archive,
+                cache=_lookup_cache(config),
+                timers=timers,
+                attachments=AttachmentCache(int(config.attachment_cache_mb * 1024 * 1024)),
+                broadcasts=broadcasts,
+                scheduler=scheduler,
+            ),
         )
-        for handler in build_command_handlers(command_options):
-            # Ensure the admin whitelist defaults to the bot number if not provided.
-            if getattr(handler, "name", None) == "!admin" and not handler.whitelisted:
-                handler.whitelisted = [bot.settings.phone_number]  # type: ignore[attr-defined]
-            bot.register(handler)
 
-        bot.use(dlq_middleware(bot.app.dead_letter_queue))
-        bot.use(blocklist_middleware(config.blocklist))
-        bot.use(timing_middleware)
+        replay_attempts = ReplayAttempts() if config.dlq_replay_interval > 0 else None
+        bot.use(dlq_middleware(dlq_writer, replay_attempts, raw_envelopes))
 
-        if config.start_health_server:
+        blocklist = BlocklistEngine(
+            config.blocklist,
+            Path(config.blocklist_file) if config.blocklist_file else None,
+            poll_interval=config.blocklist_reload_interval,
+        )
+        blocklist.start()
+        stack.push_async_callback(blocklist.stop)
+        bot.use(blocklist_middleware(blocklist))
+
+        sender_quota = QuotaPolicy(config.quota_sender_rate, config.quota_sender_burst)
+        group_quota = QuotaPolicy(config.quota_group_rate, config.quota_group_burst)
+        if sender_quota.enabled or group_quota.enabled:
+            quota_limiter: QuotaLimiter = (
+                RedisQuotaLimiter(redis_client(bot.settings))
+                if uses_redis(bot.settings)
+                else MemoryQuotaLimiter()
+            )
+            stack.push_async_callback(quota_limiter.close)
+            bot.use(quota_middleware(quota_limiter, sender_quota, group_quota))
+
+        bot.use(first_message_middleware(timeline))
+        bot.use(
+            timing_middleware(
+                command_names(select_commands(config.enabled_commands)),
+                slow_ms=config.timing_slow_ms,
+                log_sample_rate=config.timing_log_sample_rate,
+            )
+        )
+        if config.reply_coalesce_ms > 0:
+            bot.use(reply_coalescing_middleware(config.reply_coalesce_ms / 1000))
+
+        async def _start_health_server() -> None:
             health_server = await start_health_server(
                 bot.app,
                 host=config.health_host,
                 port=config.health_port,
             )
+            stack.push_async_callback(health_server.stop)
 
-        try:
+        late_phases: list[Awaitable[None]] = []
+        if config.warm_api_session:
+            late_phases.append(timeline.phase("warmup", warm_api_session(bot)))
+        if config.start_health_server:
+            late_phases.append(timeline.phase("health_server", _start_health_server()))
+        await run_concurrently(*late_phases)
+
+        if config.dlq_replay_interval > 0 and bot.app.dead_letter_queue is not None:
+            replayer = DlqReplayer(
+                bot,
+                Path(f"{config.dlq_replay_spool}.live"),
+                interval=config.dlq_replay_interval,
+                rate=config.dlq_replay_rate,
+                high_watermark=config.dlq_replay_high_watermark,
+                batch_size=config.dlq_replay_batch_size,
+                max_attempts=config.dlq_replay_max_attempts,
+                attempts=replay_attempts,
+                divert=functools.partial(redeliver, bot.api_clients.messages.send),
+            )
+            replayer.start()
+            stack.push_async_callback(replayer.stop)
+
+        timeline.ready()
+        if worker:
+            if config.worker_status_fd is not None:
+                notify_ready(config.worker_status_fd)
+            await _consume_envelopes(bot)
+        else:
+            if uses_redis(bot.settings):
+                await _record_shards(bot.settings, 1)
             await bot.start()
-        finally:
-            if health_server is not None:
-                await health_server.stop()
 
 
-async def run(config: AppConfig) -> None:
+async def _consume_envelopes(bot: SignalClient) -> None:
+    """Worker mode: feed envelopes the supervisor writes to stdin into the worker pool.
+
+    Returns once stdin closes and every envelope read has been handled, which
+    is how the supervisor drains a worker before stopping or replacing it.
+    """
+    queue, worker_pool = bot.app.queue, bot.app.worker_pool
+    if queue is None or worker_pool is None:
+        raise RuntimeError("Runtime not initialized; queue/worker_pool missing.")
+    reader = asyncio.StreamReader(limit=_ENVELOPE_LIMIT)
+    transport, _ = await asyncio.get_running_loop().connect_read_pipe(
+        lambda: asyncio.StreamReaderProtocol(reader), sys.stdin.buffer
+    )
+    worker_pool.start()
+    try:
+        while line := await reader.readline():
+            raw = line.decode("utf-8").rstrip("\n")
+            if raw:
+                await queue.put(QueuedMessage(raw=raw, enqueued_at=time.perf_counter()))  # type: ignore[arg-type]
+        await queue.join()
+    finally:
+        transport.close()
+        worker_pool.stop()
+        await worker_pool.join()
+
+
+async def _adopt_orphaned_shards(settings: Settings, shard: int, count: int) -> None:
+    """Move timers, jobs and running broadcasts of shards a smaller run no longer has."""
+    redis = redis_client(settings)
+
+    def stores(index: int) -> tuple[RedisTimerStore, RedisJobStore, RedisBroadcastStore]:
+        return (
+            RedisTimerStore(redis, prefix=shard_prefix("signal_ai:timers", index)),
+            RedisJobStore(redis, prefix=shard_prefix("signal_ai:jobs", index)),
+            RedisBroadcastStore(redis, prefix=shard_prefix("signal_ai:broadcasts", index)),
+        )
+
+    try:
+        previous = int(await redis.get(SHARDS_KEY) or 1)
+        own_timers, own_jobs, own_broadcasts = stores(shard)
+        for orphan in orphaned_shards(previous, count, shard):
+            old_timers, old_jobs, old_broadcasts = stores(orphan)
+            timers = await old_timers.load()
+            if timers:
+                await own_timers.add(timers)
+                await old_timers.remove([timer.id for timer in timers])
+            jobs = await old_jobs.load()
+            if jobs:
+                await own_jobs.add(jobs)
+                await old_jobs.remove([job.id for job in jobs])
+            broadcasts = await old_broadcasts.load_active()
+            for job in broadcasts:
+                await own_broadcasts.save(job)
+                # Leaving "running" drops it from the orphan's active set.
+                await old_broadcasts.checkpoint(dataclasses.replace(job, status="moved"))
+            log.info(
+                "signal_ai.shard_adopted",
+                shard=orphan,
+                into=shard,
+                timers=len(timers),
+                jobs=len(jobs),
+                broadcasts=len(broadcasts),
+            )
+    finally:
+        await redis.aclose()
+
+
+async def _record_shards(settings: Settings, count: int) -> None:
+    """Once every shard past `count` was adopted, later runs need not look for them."""
+    redis = redis_client(settings)
+    try:
+        await redis.set(SHARDS_KEY, count)
+    finally:
+        await redis.aclose()
+
+
+def _worker_config(config: AppConfig) -> AppConfig:
+    """Per-worker overrides: own metrics port; singletons only on worker 0.
+
+    No worker runs the live DLQ replayer: it would feed every conversation's
+    failed messages into one worker, alongside the worker that owns the
+    conversation, and break per-conversation order.
+    """
+    assert config.worker_index is not None
+    first = config.worker_index == 0
+    return dataclasses.replace(
+        config,
+        metrics_port=config.metrics_port + 1 + config.worker_index,
+        start_health_server=config.start_health_server and first,
+        dlq_replay_interval=0.0,
+        auto_start_signal_api=False,
+    )
+
+
+async def _run_supervisor(config: AppConfig, argv: Sequence[str]) -> None:
+    """Own the receive websocket and shard envelopes across `config.processes` workers.
+
+    SIGHUP restarts the workers one at a time; SIGTERM/SIGINT drain and stop them.
+    """
+    settings, _ = await asyncio.gather(
+        asyncio.to_thread(Settings.from_sources, config={}),
+        asyncio.to_thread(ensure_signal_api_running, config.auto_start_signal_api),
+    )
+    if not uses_redis(settings):
+        raise RuntimeError("--processes needs STORAGE_TYPE=redis so workers share state.")
+    if config.start_metrics_server:
+        start_metrics_server(port=config.metrics_port, addr=config.metrics_host)
+    if config.dlq_replay_interval > 0:
+        log.warning("supervisor.dlq_replay_disabled", interval=config.dlq_replay_interval)
+    supervisor = Supervisor(
+        [sys.executable, "-m", "signal_ai", *argv],
+        config.processes,
+        queue_size=config.supervisor_shard_queue,
+        drain_timeout=config.worker_drain_timeout,
+    )
+    loop = asyncio.get_running_loop()
+    stopping = asyncio.Event()
+    restarts: set[asyncio.Task[None]] = set()
+
+    def _rolling_restart() -> None:
+        task = asyncio.create_task(supervisor.rolling_restart())
+        restarts.add(task)
+        task.add_done_callback(restarts.discard)
+
+    for signum in (signal.SIGTERM, signal.SIGINT):
+        loop.add_signal_handler(signum, stopping.set)
+    loop.add_signal_handler(signal.SIGHUP, _rolling_restart)
+    log.info("supervisor.startup", processes=config.processes)
+    try:
+        await supervisor.start()
+        async with SharedHttpSession(
+            limit=config.http_pool_limit,
+            limit_per_host=config.http_pool_limit_per_host,
+            dns_ttl=config.http_dns_ttl,
+        ) as http:
+            ingest = asyncio.create_task(
+                pump_websocket(http.session, receive_ws_url(settings), supervisor),
+                name="signal_ai.supervisor.ingest",
+            )
+            # Workers adopt leftover shards before reporting ready.
+            ready = asyncio.create_task(supervisor.wait_ready())
+            stopped = asyncio.create_task(stopping.wait())
+            await asyncio.wait({ready, stopped}, return_when=asyncio.FIRST_COMPLETED)
+            if ready.done():
+                await _record_shards(settings, config.processes)
+                log.info("supervisor.ready", processes=config.processes)
+            else:
+                ready.cancel()
+            await stopped
+            ingest.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await ingest
+    finally:
+        for task in list(restarts):
+            task.cancel()
+        await asyncio.gather(*restarts, return_exceptions=True)
+        await supervisor.stop()
+        for signum in (signal.SIGTERM, signal.SIGINT, signal.SIGHUP):
+            loop.remove_signal_handler(signum)
+
+
+def _api_rate(settings: Settings) -> float:
+    """API calls per second allowed by RATE_LIMIT/RATE_LIMIT_PERIOD (0 = unlimited)."""
+    limit, period = settings.rate_limit or 0, settings.rate_limit_period or 0
+    return limit / period if limit > 0 and period > 0 else 0.0
+
+
+def _lookup_cache(config: AppConfig) -> TtlCache:
+    return TtlCache(
+        {
+            "contacts": config.cache_contacts_ttl,
+            "identities": config.cache_identities_ttl,
+            "sticker_packs": config.cache_sticker_packs_ttl,
+            REGISTRATION_CACHE: config.cache_registration_ttl,
+        },
+        max_entries=config.cache_max_entries,
+    )
+
+
+def _register_handlers(
+    bot: SignalClient, options: CommandOptions, enabled: list[str], state: BotState
+) -> None:
+    for handler in build_command_handlers(options, enabled, state):
+        bot.register(handler)
+
+
+async def run(config: AppConfig, argv: Sequence[str] = ()) -> None:
     if config.status_only:
         await report_status(config)
         return
     if config.replay_dlq:
-        await replay_dlq_once()
+        await replay_dlq_once(config)
+        return
+    if config.worker_index is not None:
+        await _run_bot(_worker_config(config))
+        return
+    if config.processes > 1:
+        await _run_supervisor(config, argv)
         return
     await _run_bot(config)
@@ -0,0 +1,242 @@
+"""Declarative argument grammars for commands, compiled once at import.
+
+Each command that takes arguments declares an `ArgSpec`; the dispatcher
+parses the text after the command word exactly once and hands the handler a
+dict of typed values. Any `ArgError` becomes the same usage reply for every
+command.
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Any, Callable, Union
+
+_REQUIRED: Any = object()
+
+Converter = Callable[[str], Any]
+
+
+class ArgError(ValueError):
+    """The message does not fit the command's grammar; the text is shown to the user."""
+
+
+@dataclass(frozen=True, slots=True)
+class Positional:
+    """The next bare token, converted; required unless `default` is given."""
+
+    name: str
+    convert: Converter = str
+    default: Any = _REQUIRED
+    label: str | None = None
+
+
+@dataclass(frozen=True, slots=True)
+class Option:
+    """`<flag> <value>`, accepted anywhere in the arguments."""
+
+    name: str
+    flag: str
+    convert: Converter = str
+    default: Any = None
+
+
+@dataclass(frozen=True, slots=True)
+class Prefixed:
+    """A token such as `from:+1555...`, with the prefix stripped before converting."""
+
+    name: str
+    prefix: str
+    convert: Converter = str
+    default: Any = None
+
+
+@dataclass(frozen=True, slots=True)
+class Switch:
+    """A bare keyword (`all`) that sets True; only before the first positional token."""
+
+    name: str
+    word: str
+
+
+@dataclass(frozen=True, slots=True)
+class Rest:
+    """Every remaining token as a list, or with `raw` the remaining text verbatim."""
+
+    name: str
+    required: bool = False
+    raw: bool = False
+    convert: Callable[[Any], Any] | None = None
+    label: str | None = None
+
+
+Param = Union[Positional, Option, Prefixed, Switch, Rest]
+
+
+class ArgSpec:
+    """A compiled grammar: options by flag, prefixes, switches, positionals, then rest.
+
+    With `separator` the arguments are split on it instead of whitespace, so
+    `!profile name|about` yields positionals even when they contain spaces;
+    an empty segment leaves that positional at its default.
+    """
+
+    __slots__ = (
+        "usage",
+        "_separator",
+        "_options",
+        "_prefixed",
+        "_switches",
+        "_positionals",
+        "_rest",
+        "_defaults",
+        "_simple",
+        "_fields",
+    )
+
+    def __init__(self, usage: str, *params: Param, separator: str | None = None) -> None:
+        self.usage = usage
+        self._separator = separator
+        self._options = {p.flag: p for p in params if isinstance(p, Option)}
+        self._prefixed = tuple(p for p in params if isinstance(p, Prefixed))
+        self._switches = {p.word.lower(): p for p in params if isinstance(p, Switch)}
+        self._positionals = tuple(p for p in params if isinstance(p, Positional))
+        rests = [p for p in params if isinstance(p, Rest)]
+        if len(rests) > 1:
+            raise ValueError("an ArgSpec takes at most one Rest")
+        self._rest = rests[0] if rests else None
+        defaults: dict[str, Any] = {}
+        for param in params:
+            if isinstance(param, (Option, Prefixed)):
+                defaults[param.name] = param.default
+            elif isinstance(param, Switch):
+                defaults[param.name] = False
+            elif isinstance(param, Positional) and param.default is not _REQUIRED:
+                defaults[param.name] = param.default
+        self._defaults = defaults
+        # Positionals only: tokens map straight onto them, no per-token dispatch.
+        self._simple = not (self._options or self._prefixed or self._switches or self._rest)
+        self._fields = tuple((p.name, p.convert, p.label or p.name) for p in self._positionals)
+
+    def parse(self, body: str) -> dict[str, Any]:
+        """Parse the text after the command word."""
+        if self._separator is not None:
+            tokens = [part.strip() for part in body.split(self._separator)]
+            return self._parse(tokens if tokens != [""] else [], body, 0)
+        return self._parse(body.split(), body, 0)
+
+    def parse_message(self, text: str | None) -> dict[str, Any]:
+        """Parse a whole message, skipping the command word, with a single split."""
+        text = text or ""
+        if self._separator is not None:
+            return self.parse(command_body(text))
+        return self._parse(text.split()[1:], text, 1)
+
+    def _parse(self, tokens: list[str], source: str, skipped: int) -> dict[str, Any]:
+        args = self._defaults.copy()
+        positionals = self._positionals
+        if self._simple:
+            fields = self._fields
+            if len(tokens) > len(fields):
+                raise ArgError(f"unexpected argument '{tokens[len(fields)]}'")
+            for (name, convert, label), token in zip(fields, tokens):
+                if token:
+                    args[name] = _convert(convert, token, label)
+            if len(args) < len(fields):
+                _check_positionals(positionals, args)
+            return args
+
+        options = self._options
+        switches = self._switches
+        prefixed = self._prefixed
+        rest = self._rest
+        raw = rest is not None and rest.raw
+        position = 0
+        started = False
+        rest_tokens: list[str] = []
+        rest_index: int | None = None
+        index = 0
+        while index < len(tokens):
+            token = tokens[index]
+            index += 1
+            option = options.get(token) if options else None
+            if option is not None:
+                if index >= len(tokens):
+                    raise ArgError(f"{token} needs a value")
+                args[option.name] = _convert(option.convert, tokens[index], token)
+                index += 1
+                continue
+            if switches and not started:
+                switch = switches.get(token.lower())
+                if switch is not None:
+                    args[switch.name] = True
+                    continue
+            for param in prefixed:
+                if token.startswith(param.prefix) and token != param.prefix:
+                    args[param.name] = _convert(
+                        param.convert, token[len(param.prefix) :], param.prefix
+                    )
+                    break
+            else:
+                started = True
+                if position < len(positionals):
+                    positional = positionals[position]
+                    position += 1
+                    if token:
+                        args[positional.name] = _convert(
+                            positional.convert, token, positional.label or positional.name
+                        )
+                    continue
+                if rest is None:
+                    raise ArgError(f"unexpected argument '{token}'")
+                if raw:
+                    # The rest of the text verbatim, spacing and punctuation intact.
+                    rest_index = index - 1
+                    break
+                if rest_index is None:
+                    rest_index = index - 1
+                rest_tokens.append(token)
+
+        _check_positionals(positionals, args)
+        if rest is not None:
+            if rest.required and rest_index is None:
+                raise ArgError(f"missing {rest.label or rest.name}")
+            value: Any = rest_tokens
+            if raw:
+                value = "" if rest_index is None else source.split(maxsplit=rest_index + skipped)[-1]
+            if rest.convert is not None:
+                value = _convert(rest.convert, value, rest.label or rest.name)
+            args[rest.name] = value
+        return args
+
+
+def _check_positionals(positionals: tuple[Positional, ...], args: dict[str, Any]) -> None:
+    for param in positionals:
+        if param.name not in args:
+            raise ArgError(f"missing {param.label or param.name}")
+
+
+def _convert(convert: Converter, value: str, what: str) -> Any:
+    try:
+        return convert(value)
+    except ArgError:
+        raise
+    except ValueError as exc:
+        detail = str(exc) or f"bad value '{value}'"
+        raise ArgError(f"{what}: {detail}") from exc
+
+
+def clamped_int(low: int, high: int) -> Converter:
+    """Parse a whole number and clamp it into `[low, high]`."""
+
+    def convert(value: str) -> int:
+        if not value.isdigit():
+            raise ValueError(f"expected a number, got '{value}'")
+        return max(low, min(high, int(value)))
+
+    return convert
+
+
+def command_body(text: str | None) -> str:
+    """The text after the command word."""
+    parts = (text or "").split(maxsplit=1)
+    return parts[1] if len(parts) > 1 else ""
@@ -2,6 +2,7 @@ from __future__ import annotations
 
 import argparse
 import asyncio
+import sys
 from typing import Iterable
 
 from .config import AppConfig, parse_args
@@ -9,8 +10,10 @@ from .app import run
 
 
 def main(argv: Iterable[str] | None = None) -> None:
-    config: AppConfig = parse_args(argv)
-    asyncio.run(run(config))
+    args = list(sys.argv[1:] if argv is None else argv)
+    config: AppConfig = parse_args(args)
+    # Worker processes are started with the same arguments.
+    asyncio.run(run(config, args))
 
 
 def build_parser() -> argparse.ArgumentParser:
@@ -1,13 +1,13 @@
 from __future__ import annotations
 
-import asyncio
-import base64
+import re
 import time
-from typing import Iterable
-from urllib.parse import parse_qs, urlparse
+from typing import Any, Awaitable
+from urllib.parse import unquote
+
+import structlog
 
 from signal_client import Context
-from signal_client.command import command
 from signal_client.infrastructure.schemas.profiles import UpdateProfileRequest
 from signal_client.infrastructure.schemas.receipts import ReceiptRequest
 from signal_client.infrastructure.schemas.requests import (
@@ -17,43 +17,62 @@ from signal_client.infrastructure.schemas.requests import (
     SendMessageRequest,
 )
 
-from .types import CommandHandler
-from .utils import safe_api_call
+from ..arguments import ArgSpec, Positional, Rest
+from ..services.registration import RegistrationLookup, split_numbers
+from .delayed import REMOTE_DELETE, STOP_TYPING
+from .types import ArgsHandler, BotState, CommandOptions, Handler
+from .utils import attachment_payload, conversation_recipient, safe_api_call
 
+log = structlog.get_logger()
 
-def _recipient(ctx: Context) -> str:
-    if ctx.message.is_group() and ctx.message.group:
-        return ctx.message.group["groupId"]
-    return ctx.message.source
+TYPING_SECONDS = 2.0
+DELETE_AFTER_SECONDS = 1.0
+VIEW_ONCE_PAYLOAD = b"signal-ai view-once validation"
+_PACK_PARAM = re.compile(r"[#?&]pack_(id|key)=([^&#\s]*)")
 
 
-def _extract_pack_params(text: str) -> tuple[str | None, str | None]:
-    tokens = text.split()
-    pack_id = None
-    pack_key = None
-    for token in tokens:
-        if token.startswith("!addpack"):
-            continue
-        parsed = urlparse(token)
-        fragment = parse_qs(parsed.fragment)
-        query = parse_qs(parsed.query)
-        pack_id = fragment.get("pack_id", [None])[0] or query.get("pack_id", [None])[0] or pack_id
-        pack_key = fragment.get("pack_key", [None])[0] or query.get("pack_key", [None])[0] or pack_key
+def sticker_pack_ref(value: str) -> tuple[str, str]:
+    """`(pack_id, pack_key)` from a signal.art link (fragment or query) or `pack_id:pack_key`."""
+    if "=" in value:
+        found = dict(_PACK_PARAM.findall(value))
+        pack_id = unquote(found.get("id", ""))
+        pack_key = unquote(found.get("key", ""))
+        if pack_id and pack_key:
+            return pack_id, pack_key
+    elif value.count(":") == 1 and "/" not in value:
+        pack_id, pack_key = value.split(":")
         if pack_id and pack_key:
-            break
-        if not pack_id and not pack_key and len(token.split(":")) == 2:
-            pack_id, pack_key = token.split(":", 1)
-            break
-    return pack_id, pack_key
+            return pack_id, pack_key
+    raise ValueError("expected a signal.art link or pack_id:pack_key")
+
+
+PROFILE = ArgSpec(
+    "!profile <name>[|about][|base64_avatar]. Example: !profile signal-ai bot|about text",
+    Positional("name"),
+    Positional("about", default=None),
+    Positional("avatar", default=None),
+    separator="|",
+)
+ADD_PACK = ArgSpec(
+    "!addpack <signal.art url or pack_id:pack_key>. "
+    "Example: https://signal.art/addstickers/#pack_id=XXX&pack_key=YYY",
+    Positional("pack", sticker_pack_ref, label="sticker pack"),
+)
+SEARCH = ArgSpec(
+    "!search [number ...] (comma, semicolon or newline separated)",
+    Rest("numbers", raw=True, convert=split_numbers),
+)
 
 
-def build_identities_command() -> CommandHandler:
-    @command("!identities")
+def identities_handler(state: BotState) -> Handler:
     async def identities(ctx: Context) -> None:
+        number = ctx.settings.phone_number
         result = await safe_api_call(
             ctx,
             "identities",
-            ctx.identities.get_identities(ctx.settings.phone_number),
+            state.cache.get(
+                "identities", number, lambda: ctx.identities.get_identities(number)
+            ),
         )
         if result is None:
             return
@@ -72,27 +91,9 @@ def build_identities_command() -> CommandHandler:
     return identities
 
 
-def build_profile_command() -> CommandHandler:
-    @command("!profile")
-    async def profile(ctx: Context) -> None:
-        raw = ctx.message.message or ""
-        _, _, payload = raw.partition(" ")
-        parts = [segment.strip() for segment in payload.split("|") if segment.strip()]
-        if not parts:
-            await ctx.reply(
-                SendMessageRequest(
-                    message=(
-                        "usage: !profile <name>[|about][|base64_avatar]. "
-                        "Example: !profile signal-ai bot|about text"
-                    ),
-                    recipients=[],
-                )
-            )
-            return
-
-        name = parts[0]
-        about = parts[1] if len(parts) > 1 else None
-        avatar = parts[2] if len(parts) > 2 else None
+def profile_handler(state: BotState) -> ArgsHandler:
+    async def profile(ctx: Context, args: dict[str, Any]) -> None:
+        name, about, avatar = args["name"], args["about"], args["avatar"]
         request = UpdateProfileRequest(name=name, about=about, base64_avatar=avatar)
         await safe_api_call(
             ctx,
@@ -101,6 +102,8 @@ def build_profile_command() -> CommandHandler:
                 ctx.settings.phone_number, request.model_dump(exclude_none=True, by_alias=True)
             ),
         )
+        # Contact entries carry profile names; drop anything cached before the update.
+        state.cache.invalidate("contacts")
         parts_desc = [f"name='{name}'"]
         if about:
             parts_desc.append(f"about='{about}'")
@@ -117,52 +120,84 @@ def build_profile_command() -> CommandHandler:
     return profile
 
 
-def build_search_command() -> CommandHandler:
-    @command("!search")
-    async def search(ctx: Context) -> None:
-        raw = ctx.message.message or ""
-        parts: Iterable[str] = raw.split()
-        numbers = [part for part in parts if not part.startswith("!search")]
+def _numbers_summary(numbers: list[str], limit: int = 20) -> str:
+    shown = ", ".join(numbers[:limit])
+    return f"{shown}, +{len(numbers) - limit} more" if len(numbers) > limit else shown
+
+
+def search_handler(options: CommandOptions, state: BotState) -> ArgsHandler:
+    async def search(ctx: Context, args: dict[str, Any]) -> None:
+        if args["numbers"]:
+            numbers, invalid = RegistrationLookup.prepare(args["numbers"])
+        else:
+            # The sender and the bot; a sender known only by UUID is left out.
+            defaults = [ctx.message.source, ctx.settings.phone_number]
+            numbers, _ = RegistrationLookup.prepare(n for n in defaults if n)
+            invalid = []
         if not numbers:
-            numbers = [ctx.message.source, ctx.settings.phone_number]
+            await ctx.reply(
+                SendMessageRequest(
+                    message=f"search: no valid E.164 numbers ({', '.join(invalid)})",
+                    recipients=[],
+                )
+            )
+            return
 
-        result = await safe_api_call(
-            ctx,
-            "search",
-            ctx.search.search_registered_numbers(ctx.settings.phone_number, numbers),
+        bot_number = ctx.settings.phone_number
+        lookup = RegistrationLookup(
+            lambda chunk: ctx.search.search_registered_numbers(bot_number, chunk),
+            state.cache,
+            chunk_size=options.search_chunk_size,
+            concurrency=options.search_concurrency,
         )
-        if result is None:
-            return
+        results: dict[str, bool] = {}
+        failed: list[str] = []
+        done = 0
+        async for batch in lookup.lookup(numbers):
+            if batch.error is not None:
+                failed.extend(batch.numbers)
+                log.warning("command.api_failed", command="search", error=str(batch.error))
+            else:
+                results.update(batch.registered)
+            if batch.chunk and batch.chunks > 1:
+                # Stream progress for bulk lookups as each chunk lands.
+                done += 1
+                status = (
+                    f"failed: {batch.error}"
+                    if batch.error is not None
+                    else f"{sum(batch.registered.values())}/{len(batch.numbers)} registered"
+                )
+                await ctx.reply(
+                    SendMessageRequest(
+                        message=f"search chunk {done}/{batch.chunks}: {status}",
+                        recipients=[],
+                    )
+                )
 
-        registered = [
-            item.get("number")
-            or item.get("input")
-            or item.get("e164")
-            or item.get("uuid")
-            for item in result
-            if item.get("isRegistered") is True or item.get("registered") is True
-        ]
-        await ctx.reply(
-            SendMessageRequest(
-                message=(
-                    f"search: {len(registered)}/{len(result)} registered "
-                    f"({', '.join(str(n) for n in registered if n) or 'none'})"
-                ),
-                recipients=[],
-            )
+        registered = [number for number in numbers if results.get(number)]
+        message = (
+            f"search: {len(registered)}/{len(results)} registered "
+            f"({_numbers_summary(registered) or 'none'})"
         )
+        if failed:
+            message += f"; {len(failed)} not checked (API error)"
+        if invalid:
+            message += f"; skipped invalid: {', '.join(invalid[:10])}"
+        await ctx.reply(SendMessageRequest(message=message, recipients=[]))
 
     return search
 
 
-def build_sticker_packs_command() -> CommandHandler:
-    @command("!packs")
+def _installed_packs(ctx: Context, state: BotState) -> Awaitable[list[dict[str, Any]]]:
+    number = ctx.settings.phone_number
+    return state.cache.get(
+        "sticker_packs", number, lambda: ctx.sticker_packs.get_sticker_packs(number)
+    )
+
+
+def sticker_packs_handler(state: BotState) -> Handler:
     async def sticker_packs(ctx: Context) -> None:
-        packs = await safe_api_call(
-            ctx,
-            "sticker-packs",
-            ctx.sticker_packs.get_sticker_packs(ctx.settings.phone_number),
-        )
+        packs = await safe_api_call(ctx, "sticker-packs", _installed_packs(ctx, state))
         if packs is None:
             return
         if not packs:
@@ -190,22 +225,9 @@ def build_sticker_packs_command() -> CommandHandler:
     return sticker_packs
 
 
-def build_add_sticker_pack_command() -> CommandHandler:
-    @command("!addpack")
-    async def add_pack(ctx: Context) -> None:
-        pack_id, pack_key = _extract_pack_params(ctx.message.message or "")
-        if not pack_id or not pack_key:
-            await ctx.reply(
-                SendMessageRequest(
-                    message=(
-                        "usage: !addpack <signal.art url or pack_id:pack_key>. "
-                        "Example: https://signal.art/addstickers/#pack_id=XXX&pack_key=YYY"
-                    ),
-                    recipients=[],
-                )
-            )
-            return
-
+def add_sticker_pack_handler(state: BotState) -> ArgsHandler:
+    async def add_pack(ctx: Context, args: dict[str, Any]) -> None:
+        pack_id, pack_key = args["pack"]
         request = AddStickerPackRequest(pack_id=pack_id, pack_key=pack_key)
         await safe_api_call(
             ctx,
@@ -214,6 +236,7 @@ def build_add_sticker_pack_command() -> CommandHandler:
                 ctx.settings.phone_number, request.model_dump()
             ),
         )
+        state.cache.invalidate("sticker_packs", ctx.settings.phone_number)
         await ctx.reply(
             SendMessageRequest(
                 message=f"sticker pack added: {pack_id}",
@@ -224,15 +247,17 @@ def build_add_sticker_pack_command() -> CommandHandler:
     return add_pack
 
 
-def build_view_once_command() -> CommandHandler:
-    @command("!viewonce")
+def view_once_handler(options: CommandOptions, state: BotState) -> Handler:
     async def view_once(ctx: Context) -> None:
+        attachment = await safe_api_call(
+            ctx, "view-once", attachment_payload(options, state, VIEW_ONCE_PAYLOAD)
+        )
+        if attachment is None:
+            return
         payload = SendMessageRequest(
             message="view-once attachment demo",
             recipients=[],
-            base64_attachments=[
-                base64.b64encode(b"signal-ai view-once validation").decode()
-            ],
+            base64_attachments=[attachment],
             view_once=True,
         )
         await safe_api_call(ctx, "view-once", ctx.send(payload))
@@ -240,8 +265,7 @@ def build_view_once_command() -> CommandHandler:
     return view_once
 
 
-def build_quote_mentions_command() -> CommandHandler:
-    @command("!quotemention")
+def quote_mentions_handler() -> Handler:
     async def quote_mentions(ctx: Context) -> None:
         quote_text = ctx.message.message or ""
         mention_length = min(len(ctx.message.source), len(quote_text))
@@ -261,14 +285,9 @@ def build_quote_mentions_command() -> CommandHandler:
     return quote_mentions
 
 
-def build_sticker_command() -> CommandHandler:
-    @command("!sticker")
+def sticker_handler(state: BotState) -> Handler:
     async def sticker(ctx: Context) -> None:
-        packs = await safe_api_call(
-            ctx,
-            "sticker-packs",
-            ctx.sticker_packs.get_sticker_packs(ctx.settings.phone_number),
-        )
+        packs = await safe_api_call(ctx, "sticker-packs", _installed_packs(ctx, state))
         if packs is None:
             return
         if not packs:
@@ -309,10 +328,9 @@ def build_sticker_command() -> CommandHandler:
     return sticker
 
 
-def build_receipt_command() -> CommandHandler:
-    @command("!receipt")
+def receipt_handler() -> Handler:
     async def receipt(ctx: Context) -> None:
-        recipient = _recipient(ctx)
+        recipient = conversation_recipient(ctx)
         receipt_request = ReceiptRequest(
             recipient=None if ctx.message.is_group() else recipient,
             group=recipient if ctx.message.is_group() else None,
@@ -336,8 +354,7 @@ def build_receipt_command() -> CommandHandler:
     return receipt
 
 
-def build_typing_command() -> CommandHandler:
-    @command("!typing")
+def typing_handler(state: BotState) -> Handler:
     async def typing(ctx: Context) -> None:
         if ctx.message.source == ctx.settings.phone_number:
             await ctx.reply(
@@ -348,24 +365,19 @@ def build_typing_command() -> CommandHandler:
             )
             return
         await ctx.start_typing()
+        payload = {"number": ctx.settings.phone_number, "recipient": conversation_recipient(ctx)}
         try:
-            await asyncio.sleep(2)
-        finally:
+            await state.timers.schedule(TYPING_SECONDS, STOP_TYPING, payload)
+        except Exception:
             await ctx.stop_typing()
-        await ctx.reply(
-            SendMessageRequest(
-                message="typing indicator toggled",
-                recipients=[],
-            )
-        )
+            raise
 
     return typing
 
 
-def build_remote_delete_command() -> CommandHandler:
-    @command("!delete")
+def remote_delete_handler(state: BotState) -> Handler:
     async def remote_delete(ctx: Context) -> None:
-        recipient = _recipient(ctx)
+        recipient = conversation_recipient(ctx)
         send_request = SendMessageRequest(
             message="temporary message to delete",
             recipients=[recipient],
@@ -395,32 +407,31 @@ def build_remote_delete_command() -> CommandHandler:
             )
             return
 
-        await asyncio.sleep(1)
         delete_request = RemoteDeleteRequest(recipient=recipient, timestamp=timestamp)
         await safe_api_call(
             ctx,
-            "remote-delete",
-            ctx.messages.remote_delete(
-                ctx.settings.phone_number, delete_request.model_dump(exclude_none=True)
+            "schedule-delete",
+            state.timers.schedule(
+                DELETE_AFTER_SECONDS,
+                REMOTE_DELETE,
+                {
+                    "number": ctx.settings.phone_number,
+                    "recipient": recipient,
+                    "timestamp": timestamp,
+                    "request": delete_request.model_dump(exclude_none=True),
+                },
             ),
         )
-        await ctx.reply(
-            SendMessageRequest(
-                message=f"remote delete issued for {timestamp}",
-                recipients=[],
-            )
-        )
 
     return remote_delete
 
 
-def build_resilience_command() -> CommandHandler:
-    @command("!resilience")
+def resilience_handler() -> Handler:
     async def resilience(ctx: Context) -> None:
         attempts = 3
         durations: list[float] = []
         for _ in range(attempts):
-            start = time.monotonic()w
+            start = time.monotonic()
             result = await safe_api_call(ctx, "health", ctx.general.get_health())
             if result is None:
                 return
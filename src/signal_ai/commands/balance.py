@@ -1,25 +1,17 @@
 from __future__ import annotations
 
 from signal_client import Context
-from signal_client.command import command
 from signal_client.infrastructure.schemas.requests import SendMessageRequest
 
-from .types import BotState, CommandHandler
+from .types import BotState, Handler
 
 
-def build_balance_command(state: BotState) -> CommandHandler:
-    @command("!balance")
+def balance_handler(state: BotState) -> Handler:
     async def balance(ctx: Context) -> None:
         user = ctx.message.source
-        key = f"balance:{user}"
-        async with ctx.lock(key):
-            current = state.balances.get(user, 100)
-            state.balances[user] = current + 10
-            await ctx.reply(
-                SendMessageRequest(
-                    message=f"balance for {user}: {state.balances[user]}",
-                    recipients=[],
-                )
-            )
+        value = await state.ledger.increment(user, 10)
+        await ctx.reply(
+            SendMessageRequest(message=f"balance for {user}: {value}", recipients=[])
+        )
 
     return balance
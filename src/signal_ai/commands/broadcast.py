@@ -0,0 +1,99 @@
+from __future__ import annotations
+
+import re
+from dataclasses import dataclass
+from typing import Any
+
+from signal_client import Context
+from signal_client.infrastructure.schemas.requests import SendMessageRequest
+
+from ..arguments import ArgError, ArgSpec, Rest
+from ..services.broadcast import BroadcastJob
+from ..services.registration import normalize_e164, split_numbers
+from .types import ArgsHandler, BotState
+
+_UUID = re.compile(r"[0-9a-fA-F]{8}-(?:[0-9a-fA-F]{4}-){3}[0-9a-fA-F]{12}")
+
+
+@dataclass(frozen=True, slots=True)
+class BroadcastRequest:
+    """`!broadcast` parsed: `send` to `recipients`, or `status`/`cancel` of `job_id`."""
+
+    action: str
+    recipients: tuple[str, ...] = ()
+    message: str = ""
+    job_id: str | None = None
+
+
+def broadcast_recipient(value: str) -> str:
+    """An E.164 number (normalized), an account UUID or a `group.` id."""
+    number = normalize_e164(value)
+    if number is not None:
+        return number
+    value = value.strip()
+    if (value.startswith("group.") and len(value) > len("group.")) or _UUID.fullmatch(value):
+        return value
+    raise ValueError(f"not a number, uuid or group id: '{value}'")
+
+
+def broadcast_request(text: str) -> BroadcastRequest:
+    words = text.split()
+    if words[0] == "status" and len(words) <= 2:
+        return BroadcastRequest("status", job_id=words[1] if len(words) == 2 else None)
+    if words[0] == "cancel" and len(words) == 2:
+        return BroadcastRequest("cancel", job_id=words[1])
+    recipients, separator, message = text.partition("|")
+    message = message.strip()
+    if not separator or not message:
+        raise ArgError("expected <recipients> | <message>")
+    targets = tuple(broadcast_recipient(r) for r in split_numbers(recipients))
+    if not targets:
+        raise ArgError("no recipients")
+    return BroadcastRequest("send", targets, message)
+
+
+BROADCAST = ArgSpec(
+    "!broadcast <number|uuid|group.id, ...> | <message>, !broadcast status [id], "
+    "!broadcast cancel <id>",
+    Rest("request", required=True, raw=True, convert=broadcast_request, label="recipients"),
+)
+
+
+def _describe(job: BroadcastJob) -> str:
+    line = (
+        f"broadcast {job.id}: {job.status} {job.cursor}/{len(job.recipients)} "
+        f"sent={job.sent} failed={job.failed}"
+    )
+    if job.status == "running":
+        eta = f"{job.eta:.0f}s" if job.eta is not None else "?"
+        line += f" rate={job.rate:.1f}/s eta={eta}"
+    return line
+
+
+def broadcast_handler(state: BotState) -> ArgsHandler:
+    async def broadcast(ctx: Context, args: dict[str, Any]) -> None:
+        request: BroadcastRequest = args["request"]
+        engine = state.broadcasts
+        if engine is None:
+            reply = "!broadcast: broadcasts are not enabled"
+        elif request.action == "status":
+            if request.job_id is None:
+                reply = "\n".join(_describe(job) for job in engine.jobs()) or "no broadcasts"
+            else:
+                job = engine.get(request.job_id)
+                reply = _describe(job) if job else f"no broadcast {request.job_id}"
+        elif request.action == "cancel":
+            cancelled = await engine.cancel(request.job_id or "")
+            reply = (
+                f"broadcast {request.job_id} cancelled"
+                if cancelled
+                else f"no running broadcast {request.job_id}"
+            )
+        else:
+            job = await engine.submit(
+                ctx.settings.phone_number, request.message, request.recipients
+            )
+            reply = f"broadcast {job.id} started: {len(job.recipients)} recipients"
+        await ctx.reply(SendMessageRequest(message=reply, recipients=[]))
+
+    return broadcast
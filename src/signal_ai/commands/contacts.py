@@ -1,25 +1,41 @@
 from __future__ import annotations
 
+import contextlib
 from typing import Any
 
 import aiohttp
 
 from signal_client import Context
-from signal_client.command import command
 from signal_client.infrastructure.schemas.requests import SendMessageRequest
 
-from .types import CommandHandler, CommandOptions
+from ..arguments import ArgSpec, Switch
+from ..services.http import SharedHttpSession
+from .types import ArgsHandler, BotState, CommandOptions
 from .utils import safe_api_call
 
+CONTACTS = ArgSpec("!contacts [fault]", Switch("fault", "fault"))
 
-async def _fetch_contacts(ctx: Context, base_url_override: str | None) -> list[dict[str, Any]]:
+
+async def _fetch_contacts(
+    ctx: Context,
+    base_url_override: str | None,
+    http: SharedHttpSession | None,
+    state: BotState,
+) -> list[dict[str, Any]]:
     if not base_url_override:
-        return await ctx.contacts.get_contacts(ctx.settings.phone_number)
+        number = ctx.settings.phone_number
+        return await state.cache.get(
+            "contacts", number, lambda: ctx.contacts.get_contacts(number)
+        )
 
     url = f"{base_url_override.rstrip('/')}/v1/contacts/{ctx.settings.phone_number}"
     timeout = aiohttp.ClientTimeout(total=ctx.settings.api_timeout)
-    async with aiohttp.ClientSession(timeout=timeout) as session:
-        async with session.get(url) as resp:
+    async with contextlib.AsyncExitStack() as stack:
+        if http is not None:
+            session = http.session
+        else:
+            session = await stack.enter_async_context(aiohttp.ClientSession())
+        async with session.get(url, timeout=timeout) as resp:
             if not 200 <= resp.status < 300:
                 text = await resp.text()
                 raise RuntimeError(f"HTTP {resp.status}: {text}")
@@ -29,11 +45,9 @@ async def _fetch_contacts(ctx: Context, base_url_override: str | None) -> list[d
             return data
 
 
-def build_contacts_command(options: CommandOptions) -> CommandHandler:
-    @command("!contacts")
-    async def list_contacts(ctx: Context) -> None:
-        text = (ctx.message.message or "").lower()
-        base_url_override = options.faulty_contacts_base_url if "fault" in text else None
+def contacts_handler(options: CommandOptions, state: BotState) -> ArgsHandler:
+    async def list_contacts(ctx: Context, args: dict[str, Any]) -> None:
+        base_url_override = options.faulty_contacts_base_url if args["fault"] else None
         label = "contacts(fault)" if base_url_override else "contacts"
 
         if base_url_override:
@@ -47,7 +61,7 @@ def build_contacts_command(options: CommandOptions) -> CommandHandler:
         result = await safe_api_call(
             ctx,
             label,
-            _fetch_contacts(ctx, base_url_override),
+            _fetch_contacts(ctx, base_url_override, options.http, state),
         )
         if result is None:
             return
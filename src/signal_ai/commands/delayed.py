@@ -0,0 +1,66 @@
+"""Follow-up actions that commands schedule on the timer wheel or the scheduler.
+
+They run without a `Context`, possibly after a restart, so everything they
+need travels in the JSON payload and API calls go through the bot's shared
+clients. Kept free of schema imports so registering them at startup does not
+defeat lazy command loading.
+"""
+
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, Any
+
+import structlog
+
+if TYPE_CHECKING:
+    from ..services.scheduler import Scheduler
+    from ..services.timers import TimerWheel
+
+log = structlog.get_logger()
+
+REMOVE_REACTION = "react.remove_reaction"
+REMOTE_DELETE = "delete.remote_delete"
+STOP_TYPING = "typing.stop"
+SEND_MESSAGE = "schedule.send"
+
+
+def register_delayed_actions(timers: TimerWheel, clients: Any) -> None:
+    async def notify(payload: dict[str, Any], message: str) -> None:
+        await clients.messages.send(
+            {"message": message, "recipients": [payload["recipient"]], "number": payload["number"]}
+        )
+
+    async def remove_reaction(payload: dict[str, Any]) -> None:
+        await clients.reactions.remove_reaction(payload["number"], payload["request"])
+
+    async def remote_delete(payload: dict[str, Any]) -> None:
+        try:
+            await clients.messages.remote_delete(payload["number"], payload["request"])
+        except Exception as exc:  # noqa: BLE001
+            log.warning("command.api_failed", command="remote-delete", error=str(exc))
+            await notify(payload, f"remote-delete failed: {exc or exc.__class__.__name__}")
+            return
+        await notify(payload, f"remote delete issued for {payload['timestamp']}")
+
+    async def stop_typing(payload: dict[str, Any]) -> None:
+        await clients.typing_indicator.hide_typing_indicator(
+            payload["number"], {"recipient": payload["recipient"]}
+        )
+        await notify(payload, "typing indicator toggled")
+
+    timers.register(REMOVE_REACTION, remove_reaction)
+    timers.register(REMOTE_DELETE, remote_delete)
+    timers.register(STOP_TYPING, stop_typing)
+
+
+def register_scheduled_actions(scheduler: Scheduler, clients: Any) -> None:
+    async def send_message(payload: dict[str, Any]) -> None:
+        await clients.messages.send(
+            {
+                "message": payload["message"],
+                "recipients": [payload["recipient"]],
+                "number": payload["number"],
+            }
+        )
+
+    scheduler.register(SEND_MESSAGE, send_message)
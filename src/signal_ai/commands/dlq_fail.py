@@ -1,13 +1,11 @@
 from __future__ import annotations
 
 from signal_client import Context
-from signal_client.command import command
 
-from .types import CommandHandler
+from .types import Handler
 
 
-def build_dlq_fail_command() -> CommandHandler:
-    @command("!dlq-fail")
+def dlq_fail_handler() -> Handler:
     async def dlq_fail(ctx: Context) -> None:
         raise RuntimeError("intentional failure for DLQ replay")
 
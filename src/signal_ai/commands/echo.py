@@ -1,14 +1,12 @@
 from __future__ import annotations
 
 from signal_client import Context
-from signal_client.command import command
 from signal_client.infrastructure.schemas.requests import SendMessageRequest
 
-from .types import CommandHandler
+from .types import Handler
 
 
-def build_echo_command() -> CommandHandler:
-    @command("!echo")
+def echo_handler() -> Handler:
     async def echo(ctx: Context) -> None:
         await ctx.start_typing()
         try:
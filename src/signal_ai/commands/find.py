@@ -0,0 +1,52 @@
+from __future__ import annotations
+
+import time
+from typing import Any
+
+from signal_client import Context
+from signal_client.infrastructure.schemas.requests import SendMessageRequest
+
+from ..arguments import ArgSpec, Option, Prefixed, Rest, Switch, clamped_int
+from ..services.archive import conversation_key
+from .history import format_messages
+from .types import ArgsHandler, BotState, CommandOptions
+
+FIND = ArgSpec(
+    "!find [-n N] [from:<number>] [all] <terms>",
+    Option("limit", "-n", clamped_int(1, 20), default=5),
+    Prefixed("source", "from:"),
+    Switch("everywhere", "all"),
+    Rest("terms", required=True, label="search terms"),
+)
+
+
+def find_handler(options: CommandOptions, state: BotState) -> ArgsHandler:
+    async def find(ctx: Context, args: dict[str, Any]) -> None:
+        terms: list[str] = args["terms"]
+        everywhere: bool = args["everywhere"]
+        if state.archive is None:
+            reply = "message archive is disabled (set ARCHIVE_ENABLED=true)."
+        elif everywhere and ctx.message.source != options.admin_number:
+            reply = "!find all is limited to the admin number."
+        else:
+            started = time.perf_counter()
+            # Earlier !find requests (this one included) are archived like any
+            # other message and always contain the terms; leave them out.
+            matches = await state.archive.find(
+                terms,
+                conversation=None if everywhere else conversation_key(ctx),
+                source=args["source"],
+                exclude_prefix="!find",
+                limit=args["limit"],
+            )
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            if matches:
+                reply = (
+                    f"{len(matches)} match(es) in {elapsed_ms:.1f} ms:\n"
+                    + format_messages(matches, width=160)
+                )
+            else:
+                reply = f"no matches for {' '.join(terms)}"
+        await ctx.reply(SendMessageRequest(message=reply, recipients=[]))
+
+    return find
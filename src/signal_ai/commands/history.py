@@ -1,19 +1,41 @@
 from __future__ import annotations
 
+from datetime import datetime, timezone
+from typing import Any
+
 from signal_client import Context
-from signal_client.command import command
 from signal_client.infrastructure.schemas.requests import SendMessageRequest
 
-from .types import CommandHandler
+from ..arguments import ArgSpec, Positional, clamped_int
+from ..services.archive import ArchivedMessage, conversation_key
+from .types import ArgsHandler, BotState
 
+HISTORY = ArgSpec("!history [n]", Positional("limit", clamped_int(1, 50), default=10))
 
-def build_history_command() -> CommandHandler:
-    @command("!history")
-    async def recent_messages(ctx: Context) -> None:
-        pretty = (
-            "history is not available via signal-cli-rest-api; "
-            "persist the websocket stream if you need archives."
-        )
+
+def format_messages(messages: list[ArchivedMessage], *, width: int | None = None) -> str:
+    lines = []
+    for m in messages:
+        body = m.body if width is None or len(m.body) <= width else m.body[: width - 1] + "…"
+        sent = datetime.fromtimestamp(m.timestamp / 1000, tz=timezone.utc)
+        lines.append(f"{sent:%Y-%m-%d %H:%M} {m.source}: {body}")
+    return "\n".join(lines)
+
+
+def history_handler(state: BotState) -> ArgsHandler:
+    async def recent_messages(ctx: Context, args: dict[str, Any]) -> None:
+        if state.archive is None:
+            pretty = "message archive is disabled (set ARCHIVE_ENABLED=true)."
+        else:
+            limit = args["limit"]
+            # The request itself is archived too; fetch one extra and drop it.
+            messages = [
+                message
+                for message in await state.archive.recent(conversation_key(ctx), limit + 1)
+                if message.timestamp != ctx.message.timestamp
+                or message.source != ctx.message.source
+            ][-limit:]
+            pretty = format_messages(messages) or "no archived messages yet."
         await ctx.reply(
             SendMessageRequest(
                 message=f"recent messages:\n{pretty}",
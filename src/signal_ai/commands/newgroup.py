@@ -1,16 +1,14 @@
 from __future__ import annotations
 
 from signal_client import Context
-from signal_client.command import command
 from signal_client.infrastructure.schemas.groups import CreateGroupRequest
 from signal_client.infrastructure.schemas.requests import SendMessageRequest
 
-from .types import CommandHandler, CommandOptions
+from .types import CommandOptions, Handler
 from .utils import safe_api_call
 
 
-def build_new_group_command(options: CommandOptions) -> CommandHandler:
-    @command("!newgroup")
+def new_group_handler(options: CommandOptions) -> Handler:
     async def create_group(ctx: Context) -> None:
         if not options.secondary_member or options.secondary_member == ctx.settings.phone_number:
             await ctx.reply(
@@ -1,19 +1,20 @@
 from __future__ import annotations
 
-import asyncio
 import structlog
 
 from signal_client import Context
-from signal_client.command import command
 from signal_client.infrastructure.schemas.reactions import ReactionRequest
 from signal_client.infrastructure.schemas.requests import SendMessageRequest
 
-from .types import CommandHandler
+from .delayed import REMOVE_REACTION
+from .types import BotState, Handler
 
 log = structlog.get_logger()
 
+REMOVE_AFTER_SECONDS = 3.0
 
-async def _remove_own_reaction(ctx: Context, emoji: str) -> None:
+
+def _removal_payload(ctx: Context, emoji: str) -> dict[str, object]:
     request = ReactionRequest(
         reaction=emoji,
         target_author=ctx.message.source,
@@ -22,17 +23,13 @@ async def _remove_own_reaction(ctx: Context, emoji: str) -> None:
         if ctx.message.is_group() and ctx.message.group
         else ctx.message.source,
     )
-    try:
-        await ctx.reactions.remove_reaction(
-            ctx.settings.phone_number,
-            request.model_dump(by_alias=True, exclude_none=True),
-        )
-    except Exception as exc:  # noqa: BLE001
-        log.warning("command.react.remove_failed", error=str(exc))
+    return {
+        "number": ctx.settings.phone_number,
+        "request": request.model_dump(by_alias=True, exclude_none=True),
+    }
 
 
-def build_react_command() -> CommandHandler:
-    @command("!react")
+def react_handler(state: BotState) -> Handler:
     async def react(ctx: Context) -> None:
         emoji = "👍"
         await ctx.react(emoji)
@@ -42,7 +39,11 @@ def build_react_command() -> CommandHandler:
                 recipients=[],
             )
         )
-        await asyncio.sleep(3)
-        await _remove_own_reaction(ctx, emoji)
+        try:
+            await state.timers.schedule(
+                REMOVE_AFTER_SECONDS, REMOVE_REACTION, _removal_payload(ctx, emoji)
+            )
+        except Exception as exc:  # noqa: BLE001
+            log.warning("command.react.remove_failed", error=str(exc))
 
     return react
@@ -0,0 +1,254 @@
+from __future__ import annotations
+
+import importlib
+import re
+from dataclasses import dataclass
+from typing import Any, Callable, Iterable, Pattern
+
+import structlog
+
+from signal_client import Context
+from signal_client.command import command
+from signal_client.infrastructure.schemas.requests import SendMessageRequest
+
+from ..arguments import ArgError, ArgSpec
+from ..services.dispatch import DispatchIndex, trigger_pattern
+from .types import ArgsHandler, BotState, CommandHandler, CommandOptions, Handler
+
+log = structlog.get_logger()
+
+
+@dataclass(frozen=True, slots=True)
+class CommandSpec:
+    """Up-front declaration of a command; its module is imported on first match.
+
+    `factory` names a function in `signal_ai.commands.<module>` returning the
+    handler coroutine. `needs` lists the shared objects it takes as keyword
+    arguments (`options`, `state`). A literal trigger matches the message's
+    first word exactly; a pattern trigger is searched anywhere in the text.
+    `args` names an `ArgSpec` in the same module, loaded along with it: the
+    text after the command word is parsed once by the dispatcher and the
+    handler is called as `handler(ctx, args)`.
+    """
+
+    name: str
+    module: str
+    factory: str
+    trigger: str | Pattern[str] | None = None
+    needs: tuple[str, ...] = ()
+    admin_only: bool = False
+    case_sensitive: bool = False
+    args: str | None = None
+
+    def load(self, deps: dict[str, Any]) -> tuple[Handler | ArgsHandler, ArgSpec | None]:
+        module = importlib.import_module(f"{__package__}.{self.module}")
+        factory = getattr(module, self.factory)
+        args = getattr(module, self.args) if self.args else None
+        return factory(**{name: deps[name] for name in self.needs}), args
+
+
+# `!roll` has always been recognised anywhere in a message ("ok !roll 2d6"),
+# not only as the first word; its dice follow the match.
+ROLL_TRIGGER = re.compile(r"!roll\b", re.IGNORECASE)
+
+COMMANDS: tuple[CommandSpec, ...] = (
+    CommandSpec("!ping", "ping", "ping_handler"),
+    CommandSpec("!settings", "settings", "settings_handler"),
+    CommandSpec("!echo", "echo", "echo_handler"),
+    CommandSpec("!react", "react", "react_handler", needs=("state",)),
+    CommandSpec("!share", "share", "share_handler", needs=("options", "state")),
+    CommandSpec("!balance", "balance", "balance_handler", needs=("state",)),
+    CommandSpec(
+        "!roll", "roll", "roll_handler", trigger=ROLL_TRIGGER, needs=("options",), args="ROLL"
+    ),
+    CommandSpec("!identities", "advanced", "identities_handler", needs=("state",)),
+    CommandSpec("!profile", "advanced", "profile_handler", needs=("state",), args="PROFILE"),
+    CommandSpec(
+        "!search", "advanced", "search_handler", needs=("options", "state"), args="SEARCH"
+    ),
+    CommandSpec("!packs", "advanced", "sticker_packs_handler", needs=("state",)),
+    CommandSpec(
+        "!addpack", "advanced", "add_sticker_pack_handler", needs=("state",), args="ADD_PACK"
+    ),
+    CommandSpec("!viewonce", "advanced", "view_once_handler", needs=("options", "state")),
+    CommandSpec("!quotemention", "advanced", "quote_mentions_handler"),
+    CommandSpec("!sticker", "advanced", "sticker_handler", needs=("state",)),
+    CommandSpec("!receipt", "advanced", "receipt_handler"),
+    CommandSpec("!typing", "advanced", "typing_handler", needs=("state",)),
+    CommandSpec("!delete", "advanced", "remote_delete_handler", needs=("state",)),
+    CommandSpec("!resilience", "advanced", "resilience_handler"),
+    CommandSpec("!admin", "admin", "admin_handler", admin_only=True, case_sensitive=True),
+    CommandSpec(
+        "!broadcast",
+        "broadcast",
+        "broadcast_handler",
+        needs=("state",),
+        admin_only=True,
+        args="BROADCAST",
+    ),
+    CommandSpec(
+        "!contacts", "contacts", "contacts_handler", needs=("options", "state"), args="CONTACTS"
+    ),
+    CommandSpec(
+        "!schedule",
+        "schedule",
+        "schedule_handler",
+        needs=("options", "state"),
+        args="SCHEDULE",
+    ),
+    CommandSpec(
+        "!unschedule", "schedule", "unschedule_handler", needs=("state",), args="UNSCHEDULE"
+    ),
+    CommandSpec("!history", "history", "history_handler", needs=("state",), args="HISTORY"),
+    CommandSpec("!find", "find", "find_handler", needs=("options", "state"), args="FIND"),
+    CommandSpec("!newgroup", "newgroup", "new_group_handler", needs=("options",)),
+    CommandSpec("!dlq-fail", "dlq_fail", "dlq_fail_handler"),
+)
+
+
+@dataclass(slots=True)
+class _Route:
+    spec: CommandSpec
+    deps: dict[str, Any]
+    handler: Any = None
+    args: ArgSpec | None = None
+
+    def load(self) -> None:
+        if self.handler is None:
+            self.handler, self.args = self.spec.load(self.deps)
+            log.debug("command.loaded", command=self.spec.name, module=self.spec.module)
+
+    def parse(self, text: str | None) -> dict[str, Any] | None:
+        """Arguments for the loaded command: the text after its word or pattern match."""
+        if self.args is None:
+            return None
+        trigger = self.spec.trigger
+        if trigger is None or isinstance(trigger, str):
+            return self.args.parse_message(text)
+        text = text or ""
+        match = trigger.search(text)
+        return self.args.parse(text[match.end() :] if match else "")
+
+    async def __call__(self, ctx: Context, args: dict[str, Any] | None) -> None:
+        if args is None:
+            await self.handler(ctx)
+        else:
+            await self.handler(ctx, args)
+
+
+def build_dispatch_index(
+    specs: Iterable[CommandSpec], deps: dict[str, Any]
+) -> DispatchIndex[_Route]:
+    return DispatchIndex.compile(
+        (spec.trigger or spec.name, spec.case_sensitive, _Route(spec, deps)) for spec in specs
+    )
+
+
+def dispatch_trigger(specs: Iterable[CommandSpec]) -> Pattern[str]:
+    """Runtime trigger for the dispatcher: matches only messages naming an enabled command."""
+    return trigger_pattern((spec.trigger or spec.name, spec.case_sensitive) for spec in specs)
+
+
+def _dispatch_command(
+    index: DispatchIndex[_Route], trigger: Pattern[str], options: CommandOptions
+) -> CommandHandler:
+    async def dispatch(ctx: Context) -> None:
+        route = index.lookup(ctx.message.message)
+        if route is None:
+            return
+        if route.spec.admin_only:
+            admin = options.admin_number or ctx.settings.phone_number
+            if ctx.message.source != admin:
+                log.debug("command.not_whitelisted", command=route.spec.name)
+                return
+        route.load()
+        args = None
+        if route.args is not None:
+            try:
+                args = route.parse(ctx.message.message)
+            except ArgError as exc:
+                await ctx.reply(
+                    SendMessageRequest(
+                        message=f"{route.spec.name}: {exc}\nusage: {route.args.usage}",
+                        recipients=[],
+                    )
+                )
+                return
+        await route(ctx, args)
+
+    return command(trigger)(dispatch)
+
+
+def select_commands(enabled: Iterable[str] | None) -> list[CommandSpec]:
+    """Specs for the enabled command names (all when `enabled` is empty/None)."""
+    wanted = {name.strip() for name in enabled or () if name.strip()}
+    if not wanted:
+        return list(COMMANDS)
+    known = {spec.name for spec in COMMANDS}
+    unknown = wanted - known
+    if unknown:
+        log.warning("commands.unknown", names=sorted(unknown))
+    return [spec for spec in COMMANDS if spec.name in wanted]
+
+
+def build_command_handlers(
+    options: CommandOptions,
+    enabled: Iterable[str] | None = None,
+    state: BotState | None = None,
+) -> list[CommandHandler]:
+    """One dispatcher command routing to every enabled spec through a compiled index."""
+    deps: dict[str, Any] = {"options": options, "state": state or BotState()}
+    specs = select_commands(enabled)
+    index = build_dispatch_index(specs, deps)
+    return [_dispatch_command(index, dispatch_trigger(specs), options)]
+
+
+def command_names(specs: Iterable[CommandSpec] = COMMANDS) -> set[str]:
+    """Literal command names used as bounded metric labels."""
+    return {spec.name.lower() for spec in specs}
+
+
+# Factories from before the registry, each returning one command on its own
+# trigger; kept so existing `signal_ai.commands.build_*_command` callers work.
+LEGACY_BUILDERS: dict[str, str] = {
+    "build_ping_command": "!ping",
+    "build_settings_command": "!settings",
+    "build_echo_command": "!echo",
+    "build_react_command": "!react",
+    "build_share_command": "!share",
+    "build_balance_command": "!balance",
+    "build_roll_command": "!roll",
+    "build_identities_command": "!identities",
+    "build_profile_command": "!profile",
+    "build_search_command": "!search",
+    "build_sticker_packs_command": "!packs",
+    "build_add_sticker_pack_command": "!addpack",
+    "build_view_once_command": "!viewonce",
+    "build_quote_mentions_command": "!quotemention",
+    "build_sticker_command": "!sticker",
+    "build_receipt_command": "!receipt",
+    "build_typing_command": "!typing",
+    "build_remote_delete_command": "!delete",
+    "build_resilience_command": "!resilience",
+    "build_admin_command": "!admin",
+    "build_contacts_command": "!contacts",
+    "build_history_command": "!history",
+    "build_new_group_command": "!newgroup",
+    "build_dlq_fail_command": "!dlq-fail",
+}
+
+
+def legacy_builder(name: str) -> Callable[..., CommandHandler]:
+    """`build_*_command(options_or_state=None)` for one command, through the registry."""
+
+    def build(deps: CommandOptions | BotState | None = None) -> CommandHandler:
+        if isinstance(deps, CommandOptions):
+            options = deps
+        else:
+            options = CommandOptions(
+                admin_number=None, faulty_contacts_base_url="", secondary_member=None
+            )
+        state = deps if isinstance(deps, BotState) else None
+        return build_command_handlers(options, [name], state)[0]
+
+    return build
@@ -1,30 +1,49 @@
 from __future__ import annotations
 
-import random
-import re
+import asyncio
+from typing import Any
 
 from signal_client import Context
-from signal_client.command import command
 from signal_client.infrastructure.schemas.requests import SendMessageRequest
 
-from .types import CommandHandler
+from ..arguments import ArgSpec, Rest
+from ..metrics import ROLLS
+from ..services.dice import (
+    DiceError,
+    DiceExpression,
+    check_limits,
+    format_roll,
+    parse_expression,
+    roll,
+)
+from .types import ArgsHandler, CommandOptions
 
-ROLL_PATTERN = re.compile(r"!roll\s+(\d+)d(\d+)", re.IGNORECASE)
+# Rolls with more dice than this run in a worker thread so the event loop keeps serving.
+INLINE_DICE = 10_000
 
+ROLL = ArgSpec(
+    "!roll <N>d<M>[kh|kl|dh|dl<K>][+/-...], e.g. !roll 2d6 or !roll 4d6kh3+2",
+    Rest("dice", required=True, raw=True, convert=parse_expression, label="dice"),
+)
 
-def build_roll_command() -> CommandHandler:
-    @command(ROLL_PATTERN)
-    async def roll(ctx: Context) -> None:
-        match = ROLL_PATTERN.search(ctx.message.message or "")
-        if not match:
-            return
-        count, sides = int(match.group(1)), int(match.group(2))
-        rolls = [random.randint(1, sides) for _ in range(count)]
-        await ctx.reply(
-            SendMessageRequest(
-                message=f"rolled {count}d{sides}: {rolls} (total={sum(rolls)})",
-                recipients=[],
-            )
-        )
 
-    return roll
+def roll_handler(options: CommandOptions) -> ArgsHandler:
+    limits = options.roll_limits
+
+    async def roll_dice(ctx: Context, args: dict[str, Any]) -> None:
+        expression: DiceExpression = args["dice"]
+        try:
+            check_limits(expression, limits)
+            if expression.dice > INLINE_DICE:
+                result = await asyncio.to_thread(roll, expression, limits)
+            else:
+                result = roll(expression, limits)
+        except DiceError as exc:
+            ROLLS.labels(outcome="rejected").inc()
+            reply = f"!roll: {exc}"
+        else:
+            ROLLS.labels(outcome="summarized" if result.summarized else "listed").inc()
+            reply = format_roll(result)
+        await ctx.reply(SendMessageRequest(message=reply, recipients=[]))
+
+    return roll_dice
@@ -0,0 +1,169 @@
+from __future__ import annotations
+
+import re
+from dataclasses import dataclass
+from datetime import datetime, time, timedelta
+from typing import Any
+
+from signal_client import Context
+from signal_client.infrastructure.schemas.requests import SendMessageRequest
+
+from ..arguments import ArgError, ArgSpec, Positional, Rest
+from ..services.cron import parse_cron, parse_duration
+from ..services.scheduler import Job, Scheduler
+from .delayed import SEND_MESSAGE
+from .types import ArgsHandler, BotState, CommandOptions
+from .utils import conversation_recipient
+
+# Shortest `every` interval; cron is minute-granular already.
+MIN_EVERY_SECONDS = 60.0
+LIST_LIMIT = 20
+_CLOCK_TIME = re.compile(r"\d{1,2}:\d{2}")
+
+
+@dataclass(frozen=True, slots=True)
+class ScheduleRequest:
+    """`!schedule` parsed: `list`, or `add` with one of `delay`, `at`, `every` or `cron` set.
+
+    `at` is a wall-clock time (a bare `time` means its next occurrence); without
+    a UTC offset it is read in the scheduler's time zone.
+    """
+
+    action: str
+    message: str = ""
+    delay: float | None = None
+    at: datetime | time | None = None
+    every: float | None = None
+    cron: str | None = None
+
+
+def schedule_request(text: str) -> ScheduleRequest:
+    if text.strip() == "list":
+        return ScheduleRequest("list")
+    when, separator, message = text.partition("|")
+    message = message.strip()
+    if not separator or not message:
+        raise ArgError("expected <when> | <message>")
+    kind, _, value = when.strip().partition(" ")
+    value = value.strip()
+    if kind == "in":
+        return ScheduleRequest("add", message, delay=parse_duration(value))
+    if kind == "every":
+        return ScheduleRequest("add", message, every=parse_duration(value))
+    if kind == "cron":
+        return ScheduleRequest("add", message, cron=parse_cron(value).text)
+    if kind == "at":
+        if _CLOCK_TIME.fullmatch(value):
+            return ScheduleRequest("add", message, at=time.fromisoformat(value.zfill(5)))
+        try:
+            return ScheduleRequest("add", message, at=datetime.fromisoformat(value))
+        except ValueError:
+            raise ArgError(f"bad time '{value}', expected HH:MM or YYYY-MM-DD HH:MM") from None
+    raise ArgError("expected in, at, every or cron")
+
+
+SCHEDULE = ArgSpec(
+    "!schedule in 10m | <message>, !schedule at [YYYY-MM-DD] HH:MM | <message>, "
+    "!schedule every 1h | <message>, !schedule cron 0 9 * * 1-5 | <message>, !schedule list",
+    Rest("request", required=True, raw=True, convert=schedule_request, label="schedule"),
+)
+UNSCHEDULE = ArgSpec("!unschedule <id>", Positional("job", label="job id"))
+
+
+def _first_due(request: ScheduleRequest, scheduler: Scheduler, now: float) -> float:
+    if request.delay is not None:
+        return now + request.delay
+    if request.every is not None:
+        return now + request.every
+    if request.cron is not None:
+        return parse_cron(request.cron).next_after(now, scheduler.tz)
+    assert request.at is not None
+    if isinstance(request.at, time):
+        today = datetime.fromtimestamp(now, scheduler.tz).date()
+        moment = datetime.combine(today, request.at, scheduler.tz)
+        if moment.timestamp() <= now:
+            moment = datetime.combine(today + timedelta(days=1), request.at, scheduler.tz)
+        return moment.timestamp()
+    moment = request.at if request.at.tzinfo else request.at.replace(tzinfo=scheduler.tz)
+    return moment.timestamp()
+
+
+def _describe(job: Job, scheduler: Scheduler) -> str:
+    when = datetime.fromtimestamp(job.due, scheduler.tz).strftime("%Y-%m-%d %H:%M")
+    if job.cron is not None:
+        when += f" (cron {job.cron})"
+    elif job.every is not None:
+        when += f" (every {job.every:g}s)"
+    text = job.payload.get("message", "")
+    return f"{job.id} {when}: {text[:40]}{'...' if len(text) > 40 else ''}"
+
+
+def schedule_handler(options: CommandOptions, state: BotState) -> ArgsHandler:
+    async def schedule(ctx: Context, args: dict[str, Any]) -> None:
+        request: ScheduleRequest = args["request"]
+        scheduler = state.scheduler
+        recipient = conversation_recipient(ctx)
+        recurring = request.every is not None or request.cron is not None
+        if scheduler is None:
+            reply = "!schedule: the scheduler is not enabled"
+        elif request.action == "list":
+            jobs = scheduler.jobs(lambda job: job.payload.get("recipient") == recipient)
+            reply = "\n".join(_describe(job, scheduler) for job in jobs[:LIST_LIMIT])
+            if len(jobs) > LIST_LIMIT:
+                reply += f"\n... and {len(jobs) - LIST_LIMIT} more"
+            reply = reply or "nothing scheduled here"
+        elif (
+            recurring
+            and options.schedule_recurring_admin_only
+            and ctx.message.source != options.admin_number
+        ):
+            reply = "!schedule: recurring jobs are limited to the admin number"
+        elif (
+            len(scheduler.jobs(lambda job: job.payload.get("recipient") == recipient))
+            >= options.schedule_max_jobs
+        ):
+            reply = (
+                f"!schedule: this conversation already has {options.schedule_max_jobs} "
+                "pending jobs; !unschedule one first"
+            )
+        elif request.every is not None and request.every < MIN_EVERY_SECONDS:
+            reply = f"!schedule: 'every' must be at least {MIN_EVERY_SECONDS:g}s"
+        else:
+            now = scheduler.now()
+            due = _first_due(request, scheduler, now)
+            if due <= now:
+                reply = "!schedule: that time has already passed"
+            else:
+                job = await scheduler.schedule(
+                    SEND_MESSAGE,
+                    {
+                        "number": ctx.settings.phone_number,
+                        "recipient": recipient,
+                        "message": request.message,
+                        "author": ctx.message.source,
+                    },
+                    at=due,
+                    every=request.every,
+                    cron=request.cron,
+                )
+                reply = f"scheduled {_describe(job, scheduler)}"
+        await ctx.reply(SendMessageRequest(message=reply, recipients=[]))
+
+    return schedule
+
+
+def unschedule_handler(state: BotState) -> ArgsHandler:
+    async def unschedule(ctx: Context, args: dict[str, Any]) -> None:
+        scheduler = state.scheduler
+        job_id: str = args["job"]
+        job = scheduler.get(job_id) if scheduler is not None else None
+        # Only jobs that post into this conversation can be removed from it.
+        if job is None or job.payload.get("recipient") != conversation_recipient(ctx):
+            reply = f"no scheduled job {job_id} here"
+        elif scheduler is not None and await scheduler.cancel(job_id):
+            reply = f"unscheduled {job_id}"
+        else:
+            reply = f"{job_id} already ran"
+        await ctx.reply(SendMessageRequest(message=reply, recipients=[]))
+
+    return unschedule
@@ -1,14 +1,12 @@
 from __future__ import annotations
 
 from signal_client import Context
-from signal_client.command import command
 from signal_client.infrastructure.schemas.requests import SendMessageRequest
 
-from .types import CommandHandler
+from .types import Handler
 
 
-def build_settings_command() -> CommandHandler:
-    @command("!settings")
+def settings_handler() -> Handler:
     async def settings_echo(ctx: Context) -> None:
         settings = ctx.settings
         backpressure = "drop_oldest" if settings.queue_drop_oldest_on_timeout else "fail_fast"
@@ -1,20 +1,19 @@
 from __future__ import annotations
 
-import base64
-
 from signal_client import Context
-from signal_client.command import command
 from signal_client.infrastructure.schemas.link_preview import LinkPreview
 from signal_client.infrastructure.schemas.requests import (
     MessageMention,
     SendMessageRequest,
 )
 
-from .types import CommandHandler
+from .types import BotState, CommandOptions, Handler
+from .utils import attachment_payload
+
+SHARE_PAYLOAD = b"signal-ai validation"
 
 
-def build_share_command() -> CommandHandler:
-    @command("!share")
+def share_handler(options: CommandOptions, state: BotState) -> Handler:
     async def share(ctx: Context) -> None:
         mention_text = ctx.message.source
         url = "https://example.com"
@@ -25,7 +24,7 @@ def build_share_command() -> CommandHandler:
         payload = SendMessageRequest(
             message=message_text,
             recipients=[],
-            base64_attachments=[base64.b64encode(b"signal-ai validation").decode()],
+            base64_attachments=[await attachment_payload(options, state, SHARE_PAYLOAD)],
             mentions=[
                 MessageMention(
                     author=mention_text, start=mention_start, length=len(mention_text)
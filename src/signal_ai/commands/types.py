@@ -1,10 +1,59 @@
 from __future__ import annotations
 
 from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Any, Awaitable, Callable
 
 from signal_client.command import Command
 
+if TYPE_CHECKING:
+    from signal_client import Context
+
+    from ..services.archive import MessageArchive
+    from ..services.attachments import AttachmentCache
+    from ..services.broadcast import BroadcastEngine
+    from ..services.cache import TtlCache
+    from ..services.dice import RollLimits
+    from ..services.http import SharedHttpSession
+    from ..services.ledger import WriteBehindLedger
+    from ..services.scheduler import Scheduler
+    from ..services.timers import TimerWheel
+
 CommandHandler = Command
+Handler = Callable[["Context"], Awaitable[None]]
+ArgsHandler = Callable[["Context", dict[str, Any]], Awaitable[None]]
+
+
+# Defaults import their service on first use, keeping this module cheap to import.
+
+
+def _roll_limits() -> RollLimits:
+    from ..services.dice import RollLimits
+
+    return RollLimits()
+
+
+def _ledger() -> WriteBehindLedger:
+    from ..services.ledger import WriteBehindLedger
+
+    return WriteBehindLedger(None)
+
+
+def _cache() -> TtlCache:
+    from ..services.cache import TtlCache
+
+    return TtlCache({})
+
+
+def _timers() -> TimerWheel:
+    from ..services.timers import TimerWheel
+
+    return TimerWheel(None)
+
+
+def _attachments() -> AttachmentCache:
+    from ..services.attachments import AttachmentCache
+
+    return AttachmentCache()
 
 
 @dataclass(slots=True)
@@ -12,8 +61,21 @@ class CommandOptions:
     admin_number: str | None
     faulty_contacts_base_url: str
     secondary_member: str | None
+    http: SharedHttpSession | None = None
+    search_chunk_size: int = 50
+    search_concurrency: int = 4
+    roll_limits: RollLimits = field(default_factory=_roll_limits)
+    share_attachment: str | None = None
+    schedule_max_jobs: int = 20
+    schedule_recurring_admin_only: bool = True
 
 
 @dataclass(slots=True)
 class BotState:
-    balances: dict[str, int] = field(default_factory=dict)
+    ledger: WriteBehindLedger = field(default_factory=_ledger)
+    archive: MessageArchive | None = None
+    cache: TtlCache = field(default_factory=_cache)
+    timers: TimerWheel = field(default_factory=_timers)
+    attachments: AttachmentCache = field(default_factory=_attachments)
+    broadcasts: BroadcastEngine | None = None
+    scheduler: Scheduler | None = None
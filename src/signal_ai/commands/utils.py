@@ -3,14 +3,25 @@ from __future__ import annotations
 from typing import Any, Awaitable
 
 import asyncio
+import mimetypes
+import os
 import structlog
 
 from signal_client import Context
 from signal_client.infrastructure.schemas.requests import SendMessageRequest
 
+from .types import BotState, CommandOptions
+
 log = structlog.get_logger()
 
 
+def conversation_recipient(ctx: Context) -> str:
+    """Where a reply to this message goes: the group id, or the sender for a direct message."""
+    if ctx.message.is_group() and ctx.message.group:
+        return ctx.message.group["groupId"]
+    return ctx.message.source
+
+
 async def safe_api_call(ctx: Context, label: str, coro: Awaitable[Any]) -> Any | None:
     try:
         return await coro
@@ -26,3 +37,12 @@ async def safe_api_call(ctx: Context, label: str, coro: Awaitable[Any]) -> Any |
             )
         )
         return None
+
+
+async def attachment_payload(options: CommandOptions, state: BotState, fallback: bytes) -> str:
+    """`SHARE_ATTACHMENT` (streamed from disk) or `fallback`, encoded through the attachment cache."""
+    path = options.share_attachment
+    if path is None:
+        return await state.attachments.from_bytes(fallback)
+    mime, _ = mimetypes.guess_type(path)
+    return await state.attachments.from_file(path, mime=mime, filename=os.path.basename(path))
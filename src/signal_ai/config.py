@@ -12,15 +12,78 @@ def _parse_blocklist(raw: str | None) -> set[str]:
     return {item for item in (part.strip() for part in raw.split(",")) if item}
 
 
+def _parse_commands(raw: str | None) -> list[str]:
+    if not raw:
+        return []
+    return [item for item in (part.strip() for part in raw.split(",")) if item]
+
+
 @dataclass(slots=True)
 class AppConfig:
     replay_dlq: bool
+    dlq_replay_batch_size: int
+    dlq_replay_spool: str
+    dlq_replay_interval: float
+    dlq_replay_rate: float
+    dlq_replay_high_watermark: float
+    dlq_replay_max_attempts: int
+    dlq_buffer_size: int
+    dlq_flush_batch: int
+    dlq_flush_interval: float
+    dlq_storm_sample_rate: float
+    timing_slow_ms: float
+    timing_log_sample_rate: float
     metrics_host: str
     metrics_port: int
     health_host: str
     health_port: int
     health_timeout: float
     blocklist: set[str]
+    blocklist_file: str | None
+    blocklist_reload_interval: float
+    quota_sender_rate: float
+    quota_sender_burst: float
+    quota_group_rate: float
+    quota_group_burst: float
+    http_pool_limit: int
+    http_pool_limit_per_host: int
+    http_dns_ttl: int
+    ledger_flush_interval: float
+    archive_enabled: bool
+    archive_buffer_size: int
+    archive_flush_batch: int
+    archive_flush_interval: float
+    archive_retention_days: float
+    archive_max_messages: int
+    archive_full_text: bool
+    archive_fts_merge_interval: float
+    cache_max_entries: int
+    cache_contacts_ttl: float
+    cache_identities_ttl: float
+    cache_sticker_packs_ttl: float
+    cache_registration_ttl: float
+    search_chunk_size: int
+    search_concurrency: int
+    reply_coalesce_ms: float
+    timer_tick_ms: float
+    roll_max_dice: int
+    roll_max_sides: int
+    roll_list_limit: int
+    roll_max_keep: int
+    attachment_cache_mb: float
+    share_attachment: str | None
+    broadcast_batch_size: int
+    broadcast_concurrency: int
+    scheduler_workers: int
+    schedule_timezone: str
+    schedule_max_jobs: int
+    schedule_recurring: str
+    processes: int
+    worker_drain_timeout: float
+    supervisor_shard_queue: int
+    worker_index: int | None
+    worker_count: int
+    worker_status_fd: int | None
     faulty_contacts_base_url: str
     auto_start_signal_api: bool
     warm_api_session: bool
@@ -29,6 +92,7 @@ class AppConfig:
     status_only: bool
     secondary_member: str | None
     admin_number: str | None
+    enabled_commands: list[str]
 
 
 def build_arg_parser() -> argparse.ArgumentParser:
@@ -38,6 +102,77 @@ def build_arg_parser() -> argparse.ArgumentParser:
         action="store_true",
         help="Process eligible DLQ entries once and exit.",
     )
+    parser.add_argument(
+        "--replay-batch-size",
+        type=int,
+        default=int(os.environ.get("DLQ_REPLAY_BATCH_SIZE", "200")),
+        help="DLQ entries fed to the worker pool per replay batch.",
+    )
+    parser.add_argument(
+        "--replay-spool",
+        default=os.environ.get("DLQ_REPLAY_SPOOL", "dlq_replay.spool"),
+        help="Spool file holding in-progress DLQ replays so they can resume after a crash.",
+    )
+    parser.add_argument(
+        "--dlq-replay-interval",
+        type=float,
+        default=float(os.environ.get("DLQ_REPLAY_INTERVAL", "0")),
+        help="Seconds between background DLQ replay cycles in the live bot (0, the default, disables).",
+    )
+    parser.add_argument(
+        "--dlq-replay-rate",
+        type=float,
+        default=float(os.environ.get("DLQ_REPLAY_RATE", "5")),
+        help="Maximum DLQ entries per second fed back by the background replayer.",
+    )
+    parser.add_argument(
+        "--dlq-replay-high-watermark",
+        type=float,
+        default=float(os.environ.get("DLQ_REPLAY_HIGH_WATERMARK", "0.5")),
+        help="Queue fill ratio above which the background replayer backs off.",
+    )
+    parser.add_argument(
+        "--dlq-replay-max-attempts",
+        type=int,
+        default=int(os.environ.get("DLQ_REPLAY_MAX_ATTEMPTS", "3")),
+        help="Replays per DLQ entry before it is parked in `<spool>.parked` instead.",
+    )
+    parser.add_argument(
+        "--dlq-buffer-size",
+        type=int,
+        default=int(os.environ.get("DLQ_BUFFER_SIZE", "1000")),
+        help="Failures held in memory before the oldest is dropped.",
+    )
+    parser.add_argument(
+        "--dlq-flush-batch",
+        type=int,
+        default=int(os.environ.get("DLQ_FLUSH_BATCH", "100")),
+        help="Buffered failures written to the DLQ per flush.",
+    )
+    parser.add_argument(
+        "--dlq-flush-interval",
+        type=float,
+        default=float(os.environ.get("DLQ_FLUSH_INTERVAL", "0.5")),
+        help="Maximum seconds a failure waits in the buffer before being flushed.",
+    )
+    parser.add_argument(
+        "--dlq-storm-sample-rate",
+        type=float,
+        default=float(os.environ.get("DLQ_STORM_SAMPLE_RATE", "1.0")),
+        help="Fraction of new failures kept once the DLQ buffer is half full.",
+    )
+    parser.add_argument(
+        "--timing-slow-ms",
+        type=float,
+        default=float(os.environ.get("TIMING_SLOW_MS", "500")),
+        help="Always log commands slower than this many milliseconds.",
+    )
+    parser.add_argument(
+        "--timing-log-sample-rate",
+        type=float,
+        default=float(os.environ.get("TIMING_LOG_SAMPLE_RATE", "0.0")),
+        help="Fraction of fast commands that still emit a command.timing log.",
+    )
     parser.add_argument(
         "--metrics-host",
         default=os.environ.get("METRICS_HOST", "0.0.0.0"),
@@ -69,8 +204,267 @@ def build_arg_parser() -> argparse.ArgumentParser:
     parser.add_argument(
         "--blocklist",
         default=os.environ.get("BLOCKLISTED", ""),
-        help="Comma-separated list of numbers to block via middleware.",
+        help="Comma-separated blocklist entries: numbers/UUIDs, '+44*' prefixes, 'group:<id>'.",
+    )
+    parser.add_argument(
+        "--blocklist-file",
+        default=os.environ.get("BLOCKLIST_FILE"),
+        help="File with one blocklist entry per line; reloaded on change or SIGHUP.",
+    )
+    parser.add_argument(
+        "--blocklist-reload-interval",
+        type=float,
+        default=float(os.environ.get("BLOCKLIST_RELOAD_INTERVAL", "5")),
+        help="Seconds between blocklist file mtime checks.",
+    )
+    parser.add_argument(
+        "--quota-sender-rate",
+        type=float,
+        default=float(os.environ.get("QUOTA_SENDER_RATE", "0")),
+        help="Commands per second allowed per sender (0, the default, disables).",
+    )
+    parser.add_argument(
+        "--quota-sender-burst",
+        type=float,
+        default=float(os.environ.get("QUOTA_SENDER_BURST", "5")),
+        help="Token bucket size per sender.",
+    )
+    parser.add_argument(
+        "--quota-group-rate",
+        type=float,
+        default=float(os.environ.get("QUOTA_GROUP_RATE", "0")),
+        help="Commands per second allowed per group (0, the default, disables).",
+    )
+    parser.add_argument(
+        "--quota-group-burst",
+        type=float,
+        default=float(os.environ.get("QUOTA_GROUP_BURST", "15")),
+        help="Token bucket size per group.",
+    )
+    parser.add_argument(
+        "--http-pool-limit",
+        type=int,
+        default=int(os.environ.get("HTTP_POOL_LIMIT", "100")),
+        help="Total connections held by the shared HTTP session.",
+    )
+    parser.add_argument(
+        "--http-pool-limit-per-host",
+        type=int,
+        default=int(os.environ.get("HTTP_POOL_LIMIT_PER_HOST", "20")),
+        help="Connections per host held by the shared HTTP session.",
+    )
+    parser.add_argument(
+        "--http-dns-ttl",
+        type=int,
+        default=int(os.environ.get("HTTP_DNS_TTL", "300")),
+        help="Seconds the shared HTTP session caches DNS lookups.",
+    )
+    parser.add_argument(
+        "--ledger-flush-interval",
+        type=float,
+        default=float(os.environ.get("LEDGER_FLUSH_INTERVAL", "1.0")),
+        help="Seconds between !balance ledger flushes to storage (0 writes every increment through).",
+    )
+    parser.add_argument(
+        "--archive",
+        action="store_true",
+        default=os.environ.get("ARCHIVE_ENABLED", "false").lower() in {"1", "true", "yes"},
+        help="Archive incoming messages to SQLite (enables '!history' and '!find').",
+    )
+    parser.add_argument(
+        "--no-archive",
+        dest="archive",
+        action="store_false",
+        help="Do not archive incoming messages (the default).",
+    )
+    parser.add_argument(
+        "--archive-buffer-size",
+        type=int,
+        default=int(os.environ.get("ARCHIVE_BUFFER_SIZE", "10000")),
+        help="Messages buffered in memory before the oldest is dropped.",
+    )
+    parser.add_argument(
+        "--archive-flush-batch",
+        type=int,
+        default=int(os.environ.get("ARCHIVE_FLUSH_BATCH", "500")),
+        help="Messages written per archive transaction.",
+    )
+    parser.add_argument(
+        "--archive-flush-interval",
+        type=float,
+        default=float(os.environ.get("ARCHIVE_FLUSH_INTERVAL", "0.5")),
+        help="Seconds between archive flushes when the batch is not full.",
+    )
+    parser.add_argument(
+        "--archive-retention-days",
+        type=float,
+        default=float(os.environ.get("ARCHIVE_RETENTION_DAYS", "30")),
+        help="Delete archived messages older than this many days (0 keeps them).",
+    )
+    parser.add_argument(
+        "--archive-max-messages",
+        type=int,
+        default=int(os.environ.get("ARCHIVE_MAX_MESSAGES", "1000000")),
+        help="Keep at most this many archived messages (0 for no limit).",
+    )
+    parser.add_argument(
+        "--no-archive-full-text",
+        action="store_true",
+        default=os.environ.get("ARCHIVE_FULL_TEXT", "true").lower() in {"0", "false", "no"},
+        help="Do not maintain the FTS5 index over archived messages (disables '!find').",
+    )
+    parser.add_argument(
+        "--archive-fts-merge-interval",
+        type=float,
+        default=float(os.environ.get("ARCHIVE_FTS_MERGE_INTERVAL", "60")),
+        help="Seconds between background FTS5 segment merges (0 leaves merging to SQLite).",
+    )
+    parser.add_argument(
+        "--cache-max-entries",
+        type=int,
+        default=int(os.environ.get("CACHE_MAX_ENTRIES", "10000")),
+        help="Entries kept by the API lookup cache before least-recently-used eviction.",
+    )
+    parser.add_argument(
+        "--cache-contacts-ttl",
+        type=float,
+        default=float(os.environ.get("CACHE_CONTACTS_TTL", "300")),
+        help="Seconds '!contacts' results are cached (0 disables).",
+    )
+    parser.add_argument(
+        "--cache-identities-ttl",
+        type=float,
+        default=float(os.environ.get("CACHE_IDENTITIES_TTL", "300")),
+        help="Seconds '!identities' results are cached (0 disables).",
+    )
+    parser.add_argument(
+        "--cache-sticker-packs-ttl",
+        type=float,
+        default=float(os.environ.get("CACHE_STICKER_PACKS_TTL", "3600")),
+        help="Seconds the installed sticker pack list is cached (0 disables).",
+    )
+    parser.add_argument(
+        "--cache-registration-ttl",
+        type=float,
+        default=float(os.environ.get("CACHE_REGISTRATION_TTL", "3600")),
+        help="Seconds a number's '!search' registration result is cached (0 disables).",
+    )
+    parser.add_argument(
+        "--search-chunk-size",
+        type=int,
+        default=int(os.environ.get("SEARCH_CHUNK_SIZE", "50")),
+        help="Numbers per search_registered_numbers call.",
+    )
+    parser.add_argument(
+        "--search-concurrency",
+        type=int,
+        default=int(os.environ.get("SEARCH_CONCURRENCY", "4")),
+        help="Search chunks in flight at once.",
+    )
+    parser.add_argument(
+        "--reply-coalesce-ms",
+        type=float,
+        default=float(os.environ.get("REPLY_COALESCE_MS", "50")),
+        help="Window for merging consecutive text replies to one message (0 disables).",
+    )
+    parser.add_argument(
+        "--timer-tick-ms",
+        type=float,
+        default=float(os.environ.get("TIMER_TICK_MS", "50")),
+        help="Resolution of the timer wheel that runs delayed command actions.",
+    )
+    parser.add_argument(
+        "--roll-max-dice",
+        type=int,
+        default=int(os.environ.get("ROLL_MAX_DICE", "1000000")),
+        help="Most dice one '!roll' expression may throw.",
     )
+    parser.add_argument(
+        "--roll-max-sides",
+        type=int,
+        default=int(os.environ.get("ROLL_MAX_SIDES", "1000000")),
+        help="Most sides a '!roll' die may have.",
+    )
+    parser.add_argument(
+        "--roll-list-limit",
+        type=int,
+        default=int(os.environ.get("ROLL_LIST_LIMIT", "20")),
+        help="Dice per '!roll' term listed individually; larger terms reply with summary statistics.",
+    )
+    parser.add_argument(
+        "--roll-max-keep",
+        type=int,
+        default=int(os.environ.get("ROLL_MAX_KEEP", "10000")),
+        help="Dice a large keep/drop term over d100 may hold: the smaller of kept and dropped.",
+    )
+    parser.add_argument(
+        "--attachment-cache-mb",
+        type=float,
+        default=float(os.environ.get("ATTACHMENT_CACHE_MB", "64")),
+        help="Budget for encoded attachment payloads reused across sends (0 disables).",
+    )
+    parser.add_argument(
+        "--share-attachment",
+        default=os.environ.get("SHARE_ATTACHMENT"),
+        help="File sent by '!share' and '!viewonce' instead of the built-in text payload.",
+    )
+    parser.add_argument(
+        "--broadcast-batch-size",
+        type=int,
+        default=int(os.environ.get("BROADCAST_BATCH_SIZE", "50")),
+        help="Recipients per send request when '!broadcast' fans out a message.",
+    )
+    parser.add_argument(
+        "--broadcast-concurrency",
+        type=int,
+        default=int(os.environ.get("BROADCAST_CONCURRENCY", "4")),
+        help="Broadcast send requests in flight at once (still within RATE_LIMIT).",
+    )
+    parser.add_argument(
+        "--scheduler-workers",
+        type=int,
+        default=int(os.environ.get("SCHEDULER_WORKERS", "4")),
+        help="Tasks running due '!schedule' jobs concurrently.",
+    )
+    parser.add_argument(
+        "--schedule-timezone",
+        default=os.environ.get("SCHEDULE_TIMEZONE", "UTC"),
+        help="IANA time zone for '!schedule at' times and cron expressions.",
+    )
+    parser.add_argument(
+        "--schedule-max-jobs",
+        type=int,
+        default=int(os.environ.get("SCHEDULE_MAX_JOBS", "20")),
+        help="Pending '!schedule' jobs allowed per conversation.",
+    )
+    parser.add_argument(
+        "--schedule-recurring",
+        choices=("admin", "all"),
+        default=os.environ.get("SCHEDULE_RECURRING", "admin"),
+        help="Who may create recurring ('every'/'cron') '!schedule' jobs.",
+    )
+    parser.add_argument(
+        "--processes",
+        type=int,
+        default=int(os.environ.get("PROCESSES", "1")),
+        help="Worker processes fed by one supervisor, sharded by conversation (needs Redis).",
+    )
+    parser.add_argument(
+        "--worker-drain-timeout",
+        type=float,
+        default=float(os.environ.get("WORKER_DRAIN_TIMEOUT", "30")),
+        help="Seconds a stopping or restarting worker gets to finish its queued messages.",
+    )
+    parser.add_argument(
+        "--supervisor-shard-queue",
+        type=int,
+        default=int(os.environ.get("SUPERVISOR_SHARD_QUEUE", "1000")),
+        help="Envelopes buffered per worker before the supervisor stops reading the websocket.",
+    )
+    # Set by the supervisor on the worker processes it starts.
+    parser.add_argument("--worker-index", type=int, default=None, help=argparse.SUPPRESS)
+    parser.add_argument("--worker-count", type=int, default=1, help=argparse.SUPPRESS)
+    parser.add_argument("--worker-status-fd", type=int, default=None, help=argparse.SUPPRESS)
     parser.add_argument(
         "--faulty-contacts-base-url",
         default=os.environ.get("FAULT_BASE_URL", "http://127.0.0.1:9"),
@@ -111,18 +505,80 @@ def build_arg_parser() -> argparse.ArgumentParser:
         default=os.environ.get("ADMIN_NUMBER") or os.environ.get("SIGNAL_PHONE_NUMBER"),
         help="Phone number allowed to run '!admin'. Defaults to the bot number.",
     )
+    parser.add_argument(
+        "--commands",
+        default=os.environ.get("ENABLED_COMMANDS", ""),
+        help="Comma-separated commands to register (e.g. '!ping,!echo'). Defaults to all.",
+    )
     return parser
 
 
 def load_config(args: argparse.Namespace) -> AppConfig:
     return AppConfig(
         replay_dlq=bool(args.replay_dlq),
+        dlq_replay_batch_size=max(1, int(args.replay_batch_size)),
+        dlq_replay_spool=str(args.replay_spool),
+        dlq_replay_interval=max(0.0, float(args.dlq_replay_interval)),
+        dlq_replay_rate=max(0.0, float(args.dlq_replay_rate)),
+        dlq_replay_high_watermark=min(1.0, max(0.0, float(args.dlq_replay_high_watermark))),
+        dlq_replay_max_attempts=max(1, int(args.dlq_replay_max_attempts)),
+        dlq_buffer_size=max(1, int(args.dlq_buffer_size)),
+        dlq_flush_batch=max(1, int(args.dlq_flush_batch)),
+        dlq_flush_interval=max(0.01, float(args.dlq_flush_interval)),
+        dlq_storm_sample_rate=min(1.0, max(0.0, float(args.dlq_storm_sample_rate))),
+        timing_slow_ms=max(0.0, float(args.timing_slow_ms)),
+        timing_log_sample_rate=min(1.0, max(0.0, float(args.timing_log_sample_rate))),
         metrics_host=str(args.metrics_host),
         metrics_port=int(args.metrics_port),
         health_host=str(args.health_host),
         health_port=int(args.health_port),
         health_timeout=float(args.health_timeout),
         blocklist=_parse_blocklist(args.blocklist),
+        blocklist_file=str(args.blocklist_file) if args.blocklist_file else None,
+        blocklist_reload_interval=max(0.1, float(args.blocklist_reload_interval)),
+        quota_sender_rate=max(0.0, float(args.quota_sender_rate)),
+        quota_sender_burst=max(0.0, float(args.quota_sender_burst)),
+        quota_group_rate=max(0.0, float(args.quota_group_rate)),
+        quota_group_burst=max(0.0, float(args.quota_group_burst)),
+        http_pool_limit=max(1, int(args.http_pool_limit)),
+        http_pool_limit_per_host=max(1, int(args.http_pool_limit_per_host)),
+        http_dns_ttl=max(0, int(args.http_dns_ttl)),
+        ledger_flush_interval=max(0.0, float(args.ledger_flush_interval)),
+        archive_enabled=bool(args.archive),
+        archive_buffer_size=max(1, int(args.archive_buffer_size)),
+        archive_flush_batch=max(1, int(args.archive_flush_batch)),
+        archive_flush_interval=max(0.01, float(args.archive_flush_interval)),
+        archive_retention_days=max(0.0, float(args.archive_retention_days)),
+        archive_max_messages=max(0, int(args.archive_max_messages)),
+        archive_full_text=not bool(args.no_archive_full_text),
+        archive_fts_merge_interval=max(0.0, float(args.archive_fts_merge_interval)),
+        cache_max_entries=max(1, int(args.cache_max_entries)),
+        cache_contacts_ttl=max(0.0, float(args.cache_contacts_ttl)),
+        cache_identities_ttl=max(0.0, float(args.cache_identities_ttl)),
+        cache_sticker_packs_ttl=max(0.0, float(args.cache_sticker_packs_ttl)),
+        cache_registration_ttl=max(0.0, float(args.cache_registration_ttl)),
+        search_chunk_size=max(1, int(args.search_chunk_size)),
+        search_concurrency=max(1, int(args.search_concurrency)),
+        reply_coalesce_ms=max(0.0, float(args.reply_coalesce_ms)),
+        timer_tick_ms=max(1.0, float(args.timer_tick_ms)),
+        roll_max_dice=max(1, int(args.roll_max_dice)),
+        roll_max_sides=max(1, int(args.roll_max_sides)),
+        roll_list_limit=max(1, int(args.roll_list_limit)),
+        roll_max_keep=max(1, int(args.roll_max_keep)),
+        attachment_cache_mb=max(0.0, float(args.attachment_cache_mb)),
+        share_attachment=str(args.share_attachment) if args.share_attachment else None,
+        broadcast_batch_size=max(1, int(args.broadcast_batch_size)),
+        broadcast_concurrency=max(1, int(args.broadcast_concurrency)),
+        scheduler_workers=max(1, int(args.scheduler_workers)),
+        schedule_timezone=str(args.schedule_timezone or "UTC"),
+        schedule_max_jobs=max(1, int(args.schedule_max_jobs)),
+        schedule_recurring=str(args.schedule_recurring),
+        processes=max(1, int(args.processes)),
+        worker_drain_timeout=max(0.0, float(args.worker_drain_timeout)),
+        supervisor_shard_queue=max(1, int(args.supervisor_shard_queue)),
+        worker_index=args.worker_index,
+        worker_count=max(1, int(args.worker_count)),
+        worker_status_fd=args.worker_status_fd,
         faulty_contacts_base_url=str(args.faulty_contacts_base_url),
         auto_start_signal_api=not bool(args.no_api_autostart),
         warm_api_session=not bool(args.no_warmup),
@@ -131,6 +587,7 @@ def load_config(args: argparse.Namespace) -> AppConfig:
         status_only=bool(args.status),
         secondary_member=str(args.secondary_member) if args.secondary_member else None,
         admin_number=str(args.admin_number) if args.admin_number else None,
+        enabled_commands=_parse_commands(args.commands),
     )
 
 
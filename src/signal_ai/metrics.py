@@ -0,0 +1,199 @@
+from __future__ import annotations
+
+from collections import deque
+from typing import Iterator
+
+from prometheus_client import REGISTRY, Counter, Gauge, Histogram
+from prometheus_client.core import GaugeMetricFamily
+from prometheus_client.registry import Collector
+
+DLQ_REPLAYED = Counter(
+    "signal_ai_dlq_replayed_total",
+    "DLQ entries fed back into the worker pool by the replayer.",
+    ["mode"],
+)
+DLQ_REPLAY_BATCH_SECONDS = Histogram(
+    "signal_ai_dlq_replay_batch_seconds",
+    "Time to enqueue and drain one DLQ replay batch.",
+    ["mode"],
+)
+DLQ_REPLAY_BACKOFFS = Counter(
+    "signal_ai_dlq_replay_backoffs_total",
+    "Times the background DLQ replayer yielded to a saturated live path.",
+)
+DLQ_PARKED = Counter(
+    "signal_ai_dlq_parked_total",
+    "DLQ entries set aside after running out of replay attempts.",
+)
+DLQ_BUFFER_EVENTS = Counter(
+    "signal_ai_dlq_buffer_events_total",
+    "Buffered DLQ writer outcomes (flushed, coalesced, dropped, sampled_out, failed).",
+    ["outcome"],
+)
+DLQ_BUFFER_DEPTH = Gauge(
+    "signal_ai_dlq_buffer_depth",
+    "Failures waiting in the buffered DLQ writer.",
+)
+QUOTA_THROTTLED = Counter(
+    "signal_ai_quota_throttled_total",
+    "Messages dropped by the per-sender/per-group token buckets.",
+    ["scope"],
+)
+QUOTA_BUCKETS = Gauge(
+    "signal_ai_quota_buckets",
+    "Live token buckets held in process memory.",
+    ["backend"],
+)
+HTTP_CONNECTIONS = Counter(
+    "signal_ai_http_connections_total",
+    "Connections handed out by the shared HTTP session, new vs reused keep-alive.",
+    ["outcome"],
+)
+STARTUP_PHASE_SECONDS = Gauge(
+    "signal_ai_startup_phase_seconds",
+    "Duration of each startup phase; 'ready' and 'first_message' are offsets from process start.",
+    ["phase"],
+)
+ARCHIVE_EVENTS = Counter(
+    "signal_ai_archive_messages_total",
+    "Message archive outcomes (archived, duplicate, dropped, failed, expired).",
+    ["outcome"],
+)
+ARCHIVE_BUFFER_DEPTH = Gauge(
+    "signal_ai_archive_buffer_depth",
+    "Messages waiting in the archive buffer.",
+)
+ARCHIVE_FTS_MERGE_SECONDS = Histogram(
+    "signal_ai_archive_fts_merge_seconds",
+    "Duration of one background FTS5 compaction pass over the message archive.",
+)
+CACHE_REQUESTS = Counter(
+    "signal_ai_cache_requests_total",
+    "API lookup cache outcomes (hit, miss, coalesced, bypass, evicted) per namespace.",
+    ["namespace", "outcome"],
+)
+CACHE_ENTRIES = Gauge(
+    "signal_ai_cache_entries",
+    "Entries held by the API lookup cache.",
+)
+ATTACHMENT_CACHE_BYTES = Gauge(
+    "signal_ai_attachment_cache_bytes",
+    "Encoded attachment payload bytes held by the attachment cache.",
+)
+REPLY_BATCH_SIZE = Histogram(
+    "signal_ai_reply_batch_size",
+    "Replies merged into each outbound API call; sum/count is the coalescing ratio.",
+    buckets=(1, 2, 3, 4, 6, 8, 12, 16),
+)
+ROLLS = Counter(
+    "signal_ai_rolls_total",
+    "!roll outcomes (listed, summarized, rejected).",
+    ["outcome"],
+)
+TIMER_EVENTS = Counter(
+    "signal_ai_timers_total",
+    "Delayed action outcomes (scheduled, restored, fired, failed, cancelled).",
+    ["outcome"],
+)
+TIMERS_PENDING = Gauge(
+    "signal_ai_timers_pending",
+    "Delayed actions waiting on the timer wheel.",
+)
+TIMER_LAG_SECONDS = Histogram(
+    "signal_ai_timer_lag_seconds",
+    "How late each delayed action started relative to its due time.",
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 5.0, 30.0),
+)
+SCHEDULED_JOBS = Counter(
+    "signal_ai_scheduled_jobs_total",
+    "Scheduled job events (scheduled, fired, failed, cancelled, restored).",
+    ["outcome"],
+)
+SCHEDULED_JOBS_PENDING = Gauge(
+    "signal_ai_scheduled_jobs_pending",
+    "Scheduled jobs waiting for their due time, recurring ones included.",
+)
+SCHEDULED_JOB_LAG_SECONDS = Histogram(
+    "signal_ai_scheduled_job_lag_seconds",
+    "Delay between a job's due time and its action starting.",
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 5.0, 30.0),
+)
+SUPERVISOR_ENVELOPES = Counter(
+    "signal_ai_supervisor_envelopes_total",
+    "Envelopes the supervisor routed to each worker process.",
+    labelnames=("worker",),
+)
+SUPERVISOR_SHARD_DEPTH = Gauge(
+    "signal_ai_supervisor_shard_depth",
+    "Envelopes queued in the supervisor for each worker process.",
+    labelnames=("worker",),
+)
+WORKER_RESTARTS = Counter(
+    "signal_ai_worker_restarts_total",
+    "Worker process restarts, by reason (rolling, crash).",
+    labelnames=("reason",),
+)
+BROADCAST_RECIPIENTS = Counter(
+    "signal_ai_broadcast_recipients_total",
+    "Broadcast deliveries by outcome (sent, failed, redelivered, dropped).",
+    ["outcome"],
+)
+BROADCASTS_ACTIVE = Gauge(
+    "signal_ai_broadcasts_active",
+    "Broadcasts currently being delivered.",
+)
+BROADCAST_RATE = Gauge(
+    "signal_ai_broadcast_rate",
+    "Recipients attempted per second by each running broadcast.",
+    ["job"],
+)
+BROADCAST_ETA = Gauge(
+    "signal_ai_broadcast_eta_seconds",
+    "Estimated seconds until each running broadcast completes (-1 until known).",
+    ["job"],
+)
+COMMAND_LATENCY = Histogram(
+    "signal_ai_command_latency_seconds",
+    "Handler latency per resolved command name.",
+    ["command"],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0),
+)
+
+
+class LatencyQuantiles(Collector):
+    """Sliding-window p50/p95/p99 per command, computed at scrape time.
+
+    Recording is a deque append; sorting happens only when Prometheus
+    scrapes, so the per-message cost stays constant.
+    """
+
+    QUANTILES = (0.5, 0.95, 0.99)
+
+    def __init__(self, window: int = 1024) -> None:
+        self._window = window
+        self._samples: dict[str, deque[float]] = {}
+
+    def observe(self, command: str, seconds: float) -> None:
+        samples = self._samples.get(command)
+        if samples is None:
+            samples = self._samples.setdefault(command, deque(maxlen=self._window))
+        samples.append(seconds)
+
+    def collect(self) -> Iterator[GaugeMetricFamily]:
+        family = GaugeMetricFamily(
+            "signal_ai_command_latency_quantile_seconds",
+            "Command latency quantiles over the most recent samples.",
+            labels=["command", "quantile"],
+        )
+        for command, samples in list(self._samples.items()):
+            ordered = sorted(list(samples))
+            if not ordered:
+                continue
+            for quantile in self.QUANTILES:
+                index = min(len(ordered) - 1, int(quantile * len(ordered)))
+                family.add_metric([command, str(quantile)], ordered[index])
+        yield family
+
+
+COMMAND_LATENCY_QUANTILES = LatencyQuantiles()
+REGISTRY.register(COMMAND_LATENCY_QUANTILES)
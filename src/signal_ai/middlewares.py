@@ -1,12 +1,22 @@
 from __future__ import annotations
 
+import contextlib
+import json
+import random
 import time
-from typing import Awaitable, Callable, Coroutine
+from typing import Any, Awaitable, Callable, Iterable, cast
 
 import structlog
 
 from signal_client import Context
-from signal_client.services.dead_letter_queue import DeadLetterQueue
+from signal_client.infrastructure.schemas.requests import SendMessageRequest
+
+from .metrics import COMMAND_LATENCY, COMMAND_LATENCY_QUANTILES
+from .services.blocklist import BlocklistEngine
+from .services.dlq import BufferedDlqWriter, RawEnvelopes, ReplayAttempts
+from .services.outbound import CoalescingContext, ReplyLane
+from .services.quota import QuotaLimiter, QuotaPolicy, check_quota
+from .services.startup import StartupTimeline
 
 log = structlog.get_logger()
 
@@ -15,54 +25,173 @@ MiddlewareCallable = Callable[
 ]
 
 
-def dlq_middleware(dlq: DeadLetterQueue | None) -> MiddlewareCallable:
+def _rebuilt_envelope(ctx: Context) -> dict[str, Any]:
+    data_message: dict[str, Any] = {
+        "message": ctx.message.message,
+        "timestamp": ctx.message.timestamp,
+    }
+    if ctx.message.group:
+        data_message["groupInfo"] = ctx.message.group
+    return {
+        "envelope": {
+            "source": ctx.message.source,
+            "timestamp": ctx.message.timestamp,
+            "dataMessage": data_message,
+        }
+    }
+
+
+def dlq_payload(
+    ctx: Context, exc: BaseException, attempts: int = 0, raw: str | None = None
+) -> dict[str, Any]:
+    """Build the DLQ record for a failed message.
+
+    `raw` is the websocket payload as received, which the ingest tap keeps
+    because signal-client never puts it on the context; it is filed as is,
+    next to the failure metadata. Only when that entry is gone (evicted, or
+    no tap installed) is an envelope rebuilt from the parsed message.
+    """
+    return {
+        "raw": raw if raw is not None else json.dumps(_rebuilt_envelope(ctx)),
+        "error": exc.__class__.__name__,
+        "failed_at": int(time.time()),
+        "attempts": attempts,
+    }
+
+
+def dlq_middleware(
+    writer: BufferedDlqWriter | None,
+    attempts: ReplayAttempts | None = None,
+    raw_envelopes: RawEnvelopes | None = None,
+) -> MiddlewareCallable:
     async def middleware(
         ctx: Context, next_callable: Callable[[Context], Awaitable[None]]
     ) -> None:
+        key = (ctx.message.source, ctx.message.timestamp)
+        # Taken up front so messages that succeed free their entry too.
+        raw = raw_envelopes.pop(*key) if raw_envelopes is not None else None
         try:
             await next_callable(ctx)
         except Exception as exc:  # noqa: BLE001
             log.error("command.exception", error=str(exc))
-            if dlq is not None:
-                payload = {
-                    "envelope": {
-                        "source": ctx.message.source,
-                        "timestamp": ctx.message.timestamp,
-                        "dataMessage": {
-                            "message": ctx.message.message,
-                            "timestamp": ctx.message.timestamp,
-                        },
-                    }
-                }
-                if ctx.message.group:
-                    payload["envelope"]["dataMessage"]["groupInfo"] = ctx.message.group
-                await dlq.send(payload)
+            if writer is not None:
+                count = attempts.pop(*key) if attempts is not None else 0
+                writer.submit(key, dlq_payload(ctx, exc, count, raw))
             raise
 
     return middleware
 
 
-async def timing_middleware(
-    ctx: Context, next_callable: Callable[[Context], Awaitable[None]]
-) -> None:
-    started = time.perf_counter()
-    await next_callable(ctx)
-    elapsed_ms = (time.perf_counter() - started) * 1000
-    log.info(
-        "command.timing",
-        command=ctx.message.message,
-        elapsed_ms=elapsed_ms,
-        worker=structlog.contextvars.get_contextvars().get("worker_id"),
-    )
+def command_label(text: str | None, known: frozenset[str]) -> str:
+    """Map message text to a bounded metric label: the command name or `other`."""
+    parts = text.split(maxsplit=1) if text else None
+    if not parts:
+        return "other"
+    token = parts[0]
+    if token in known:
+        return token
+    lowered = token.lower()
+    return lowered if lowered in known else "other"
+
+
+def timing_middleware(
+    commands: Iterable[str], *, slow_ms: float, log_sample_rate: float
+) -> MiddlewareCallable:
+    known = frozenset(commands)
+
+    async def middleware(
+        ctx: Context, next_callable: Callable[[Context], Awaitable[None]]
+    ) -> None:
+        started = time.perf_counter()
+        try:
+            await next_callable(ctx)
+        finally:
+            elapsed = time.perf_counter() - started
+            label = command_label(ctx.message.message, known)
+            COMMAND_LATENCY.labels(command=label).observe(elapsed)
+            COMMAND_LATENCY_QUANTILES.observe(label, elapsed)
+            elapsed_ms = elapsed * 1000
+            slow = elapsed_ms >= slow_ms
+            if slow or (log_sample_rate and random.random() < log_sample_rate):
+                log.info(
+                    "command.timing",
+                    command=label,
+                    elapsed_ms=elapsed_ms,
+                    slow=slow,
+                    worker=structlog.contextvars.get_contextvars().get("worker_id"),
+                )
+
+    return middleware
+
+
+def first_message_middleware(timeline: StartupTimeline) -> MiddlewareCallable:
+    async def middleware(
+        ctx: Context, next_callable: Callable[[Context], Awaitable[None]]
+    ) -> None:
+        timeline.first_message()
+        await next_callable(ctx)
+
+    return middleware
 
 
-def blocklist_middleware(blocklist: set[str]) -> MiddlewareCallable:
+def blocklist_middleware(engine: BlocklistEngine) -> MiddlewareCallable:
     async def middleware(
         ctx: Context, next_callable: Callable[[Context], Awaitable[None]]
     ) -> None:
-        if ctx.message.source in blocklist:
-            log.info("command.blocked", source=ctx.message.source)
+        group = ctx.message.group
+        group_id = group.get("groupId") if group else None
+        if engine.rules.blocks(ctx.message.source, group_id):
+            log.info("command.blocked", source=ctx.message.source, group_id=group_id)
             return
         await next_callable(ctx)
 
     return middleware
+
+
+_SLOW_DOWN = {
+    "sender": "Slow down: you are sending commands too fast. Try again in a few seconds.",
+    "group": "Slow down: this group is sending commands too fast. Try again in a few seconds.",
+}
+
+
+def quota_middleware(
+    limiter: QuotaLimiter, sender_policy: QuotaPolicy, group_policy: QuotaPolicy
+) -> MiddlewareCallable:
+    async def middleware(
+        ctx: Context, next_callable: Callable[[Context], Awaitable[None]]
+    ) -> None:
+        group = ctx.message.group
+        group_id = group.get("groupId") if group else None
+        throttled = await check_quota(
+            limiter, ctx.message.source, group_id, sender_policy, group_policy
+        )
+        if throttled is None:
+            await next_callable(ctx)
+            return
+        log.debug("command.throttled", source=ctx.message.source, scope=throttled.scope)
+        if throttled.notify:
+            try:
+                await ctx.reply(
+                    SendMessageRequest(message=_SLOW_DOWN[throttled.scope], recipients=[])
+                )
+            except Exception as exc:  # noqa: BLE001
+                log.warning("command.throttle_notice_failed", error=str(exc))
+
+    return middleware
+
+
+def reply_coalescing_middleware(window: float) -> MiddlewareCallable:
+    async def middleware(
+        ctx: Context, next_callable: Callable[[Context], Awaitable[None]]
+    ) -> None:
+        lane = ReplyLane(window=window)
+        try:
+            await next_callable(cast(Context, CoalescingContext(ctx, lane)))
+        except Exception:
+            # The handler's own failure wins; still deliver what it replied so far.
+            with contextlib.suppress(Exception):
+                await lane.drain()
+            raise
+        await lane.drain()
+
+    return middleware
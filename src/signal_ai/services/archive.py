@@ -0,0 +1,384 @@
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import sqlite3
+import time
+from collections import deque
+from typing import TYPE_CHECKING, NamedTuple
+
+import structlog
+
+from ..metrics import ARCHIVE_BUFFER_DEPTH, ARCHIVE_EVENTS, ARCHIVE_FTS_MERGE_SECONDS
+from ..storage import SqliteDatabase
+
+if TYPE_CHECKING:
+    from signal_client import Context
+
+log = structlog.get_logger()
+
+_SCHEMA = (
+    "CREATE TABLE IF NOT EXISTS signal_ai_messages ("
+    "id INTEGER PRIMARY KEY, conversation TEXT NOT NULL, source TEXT NOT NULL, "
+    "timestamp INTEGER NOT NULL, body TEXT NOT NULL)",
+    # Serves !history lookups and drops replayed duplicates in one index.
+    "CREATE UNIQUE INDEX IF NOT EXISTS signal_ai_messages_conversation "
+    "ON signal_ai_messages (conversation, timestamp, source)",
+    # Lets the retention sweep range-scan expired rows instead of the table.
+    "CREATE INDEX IF NOT EXISTS signal_ai_messages_timestamp "
+    "ON signal_ai_messages (timestamp)",
+)
+# Rows deleted per retention transaction, so the sweep never holds the
+# database's write lock for long against other writers on the same file.
+_RETENTION_CHUNK = 2_000
+
+# External-content FTS5 index over the archive, kept in step by triggers so
+# each batched insert/retention delete updates it in the same transaction.
+# `conversation` is indexed too, letting a scoped query intersect inside FTS.
+_FTS_SCHEMA = (
+    "CREATE VIRTUAL TABLE IF NOT EXISTS signal_ai_messages_fts USING fts5("
+    "conversation, body, content='signal_ai_messages', content_rowid='id', prefix='2 3')",
+    "CREATE TRIGGER IF NOT EXISTS signal_ai_messages_fts_insert "
+    "AFTER INSERT ON signal_ai_messages BEGIN "
+    "INSERT INTO signal_ai_messages_fts (rowid, conversation, body) "
+    "VALUES (new.id, new.conversation, new.body); END",
+    "CREATE TRIGGER IF NOT EXISTS signal_ai_messages_fts_delete "
+    "AFTER DELETE ON signal_ai_messages BEGIN "
+    "INSERT INTO signal_ai_messages_fts (signal_ai_messages_fts, rowid, conversation, body) "
+    "VALUES ('delete', old.id, old.conversation, old.body); END",
+)
+# FTS5's default; used when no background compaction task is running.
+_FTS_AUTOMERGE = 4
+
+
+def fts_phrase(text: str) -> str:
+    """Quote `text` as one FTS5 string so user input is never parsed as query syntax."""
+    return '"' + text.replace('"', '""') + '"'
+
+
+def fts_query(terms: list[str]) -> str:
+    """AND of the given terms; a trailing `*` on a term keeps prefix matching."""
+    parts = []
+    for term in terms:
+        prefix = term.endswith("*") and len(term) > 1
+        word = term.rstrip("*") if prefix else term
+        if word:
+            parts.append(fts_phrase(word) + ("*" if prefix else ""))
+    return " AND ".join(parts)
+
+
+def conversation_key(ctx: Context) -> str:
+    """Group id for group messages, otherwise the sender."""
+    group = ctx.message.group
+    if ctx.message.is_group() and group and group.get("groupId"):
+        return str(group["groupId"])
+    return ctx.message.source
+
+
+class ArchivedMessage(NamedTuple):
+    conversation: str
+    source: str
+    timestamp: int
+    body: str
+
+
+class MessageArchive:
+    """Write-behind archive of incoming messages in a WAL-mode SQLite table.
+
+    The ingest path calls `submit()`, which only appends to a bounded
+    in-memory buffer (dropping the oldest message when full). A background
+    task inserts the buffer in batched transactions and applies retention:
+    messages older than `retention_days` and anything beyond the newest
+    `max_messages` rows are deleted.
+
+    With `full_text` an FTS5 index follows the table through triggers, and a
+    separate task merges its segments in small steps every `merge_interval`
+    seconds so no single write pays for a large merge.
+    """
+
+    def __init__(
+        self,
+        db: SqliteDatabase,
+        *,
+        capacity: int,
+        batch_size: int,
+        flush_interval: float,
+        retention_days: float = 30.0,
+        max_messages: int = 1_000_000,
+        retention_interval: float = 300.0,
+        full_text: bool = True,
+        merge_interval: float = 60.0,
+        merge_pages: int = 256,
+    ) -> None:
+        self._db = db
+        self._capacity = capacity
+        self._batch_size = batch_size
+        self._flush_interval = flush_interval
+        self._retention_days = retention_days
+        self._max_messages = max_messages
+        self._retention_interval = retention_interval
+        self._full_text = full_text
+        self._merge_interval = merge_interval
+        self._merge_pages = merge_pages
+        self._pending: deque[ArchivedMessage] = deque()
+        self._wakeup = asyncio.Event()
+        self._task: asyncio.Task[None] | None = None
+        self._merge_task: asyncio.Task[None] | None = None
+        self._stopping = False
+        self._ready = False
+        self._last_retention = 0.0
+
+    def __len__(self) -> int:
+        return len(self._pending)
+
+    def submit(self, conversation: str, source: str, timestamp: int, body: str) -> None:
+        if len(self._pending) >= self._capacity:
+            self._pending.popleft()
+            ARCHIVE_EVENTS.labels(outcome="dropped").inc()
+        self._pending.append(ArchivedMessage(conversation, source, int(timestamp), body))
+        ARCHIVE_BUFFER_DEPTH.set(len(self._pending))
+        if len(self._pending) >= self._batch_size:
+            self._wakeup.set()
+
+    async def _ensure_schema(self) -> None:
+        if self._ready:
+            return
+
+        full_text = self._full_text
+        # With the compaction task running, writes skip inline merging;
+        # `crisismerge` still bounds the segment count if the task falls behind.
+        automerge = 0 if self._merge_interval > 0 else _FTS_AUTOMERGE
+
+        def create(conn: sqlite3.Connection) -> bool:
+            for statement in _SCHEMA:
+                conn.execute(statement)
+            if not full_text:
+                return False
+            exists = conn.execute(
+                "SELECT 1 FROM sqlite_master WHERE name = 'signal_ai_messages_fts'"
+            ).fetchone()
+            for statement in _FTS_SCHEMA:
+                conn.execute(statement)
+            conn.execute(
+                "INSERT INTO signal_ai_messages_fts (signal_ai_messages_fts, rank) "
+                "VALUES ('automerge', ?)",
+                (automerge,),
+            )
+            if exists or conn.execute("SELECT 1 FROM signal_ai_messages LIMIT 1").fetchone() is None:
+                return False
+            # Index messages archived before full-text search was enabled.
+            conn.execute(
+                "INSERT INTO signal_ai_messages_fts (signal_ai_messages_fts) VALUES ('rebuild')"
+            )
+            return True
+
+        if await self._db.run(create):
+            log.info("archive.fts_rebuilt")
+        self._ready = True
+
+    async def flush(self) -> int:
+        if not self._pending:
+            return 0
+        batch = [self._pending.popleft() for _ in range(min(self._batch_size, len(self._pending)))]
+        ARCHIVE_BUFFER_DEPTH.set(len(self._pending))
+
+        def insert(conn: sqlite3.Connection) -> int:
+            # rowcount, unlike total_changes, leaves out the FTS triggers' writes.
+            return conn.executemany(
+                "INSERT OR IGNORE INTO signal_ai_messages "
+                "(conversation, source, timestamp, body) VALUES (?, ?, ?, ?)",
+                batch,
+            ).rowcount
+
+        try:
+            await self._ensure_schema()
+            inserted = await self._db.transaction(insert)
+        except Exception as exc:  # noqa: BLE001
+            ARCHIVE_EVENTS.labels(outcome="failed").inc(len(batch))
+            log.warning("archive.flush_failed", error=str(exc), messages=len(batch))
+            return 0
+        ARCHIVE_EVENTS.labels(outcome="archived").inc(inserted)
+        if inserted < len(batch):
+            ARCHIVE_EVENTS.labels(outcome="duplicate").inc(len(batch) - inserted)
+        return inserted
+
+    async def apply_retention(self) -> int:
+        await self._ensure_schema()
+        cutoff_ms = int((time.time() - self._retention_days * 86400) * 1000)
+        max_messages = self._max_messages
+        removed = 0
+        if self._retention_days > 0:
+            removed += await self._delete_chunked(
+                "SELECT id FROM signal_ai_messages WHERE timestamp < ? LIMIT ?", cutoff_ms
+            )
+        if max_messages > 0:
+            # Ids only grow, so everything at or below the newest row past the
+            # cap can go; later inserts never land below that boundary.
+            boundary = await self._db.run(
+                lambda conn: conn.execute(
+                    "SELECT id FROM signal_ai_messages ORDER BY id DESC LIMIT 1 OFFSET ?",
+                    (max_messages,),
+                ).fetchone()
+            )
+            if boundary is not None:
+                removed += await self._delete_chunked(
+                    "SELECT id FROM signal_ai_messages WHERE id <= ? ORDER BY id LIMIT ?",
+                    boundary[0],
+                )
+        if removed:
+            ARCHIVE_EVENTS.labels(outcome="expired").inc(removed)
+            log.info("archive.retention", removed=removed)
+        return removed
+
+    async def _delete_chunked(self, select: str, bound: int) -> int:
+        """Delete the rows `select` picks, `_RETENTION_CHUNK` per transaction."""
+
+        def delete_chunk(conn: sqlite3.Connection) -> int:
+            return conn.execute(
+                f"DELETE FROM signal_ai_messages WHERE id IN ({select})",
+                (bound, _RETENTION_CHUNK),
+            ).rowcount
+
+        removed = 0
+        while True:
+            count = await self._db.transaction(delete_chunk)
+            removed += count
+            if count < _RETENTION_CHUNK:
+                return removed
+
+    async def recent(self, conversation: str, limit: int) -> list[ArchivedMessage]:
+        """Newest `limit` messages of a conversation, oldest first, including unflushed ones."""
+        await self._ensure_schema()
+
+        def select(conn: sqlite3.Connection) -> list[ArchivedMessage]:
+            rows = conn.execute(
+                "SELECT conversation, source, timestamp, body FROM signal_ai_messages "
+                "WHERE conversation = ? ORDER BY timestamp DESC LIMIT ?",
+                (conversation, limit),
+            ).fetchall()
+            return [ArchivedMessage(*row) for row in rows]
+
+        stored = await self._db.run(select)
+        buffered = [message for message in self._pending if message.conversation == conversation]
+        merged = {(m.timestamp, m.source): m for m in stored + buffered}
+        return [merged[key] for key in sorted(merged)][-limit:]
+
+    async def find(
+        self,
+        terms: list[str],
+        *,
+        conversation: str | None,
+        source: str | None = None,
+        exclude_prefix: str | None = None,
+        limit: int,
+    ) -> list[ArchivedMessage]:
+        """Newest messages containing all `terms`, optionally scoped to a conversation/sender."""
+        if not self._full_text:
+            raise RuntimeError("Full-text search is disabled for this archive.")
+        match = fts_query(terms)
+        if not match:
+            return []
+        if conversation is not None:
+            match = f"conversation : {fts_phrase(conversation)} AND ({match})"
+        await self._ensure_schema()
+
+        def select(conn: sqlite3.Connection) -> list[ArchivedMessage]:
+            # FTS5 walks rowids newest-first without sorting; the outer filters
+            # only re-check exact equality for the tokenized conversation match.
+            sql = (
+                "SELECT m.conversation, m.source, m.timestamp, m.body "
+                "FROM signal_ai_messages_fts f JOIN signal_ai_messages m ON m.id = f.rowid "
+                "WHERE signal_ai_messages_fts MATCH ?"
+            )
+            params: list[object] = [match]
+            if conversation is not None:
+                sql += " AND m.conversation = ?"
+                params.append(conversation)
+            if source is not None:
+                sql += " AND m.source = ?"
+                params.append(source)
+            if exclude_prefix:
+                sql += " AND substr(m.body, 1, ?) != ?"
+                params.extend((len(exclude_prefix), exclude_prefix))
+            sql += " ORDER BY f.rowid DESC LIMIT ?"
+            params.append(limit)
+            return [ArchivedMessage(*row) for row in conn.execute(sql, params)]
+
+        return await self._db.run(select)
+
+    async def merge_step(self) -> bool:
+        """Run one bounded FTS5 merge step; False once there is nothing left to merge."""
+        await self._ensure_schema()
+        pages = self._merge_pages
+
+        def merge(conn: sqlite3.Connection) -> bool:
+            before = conn.total_changes
+            conn.execute(
+                "INSERT INTO signal_ai_messages_fts (signal_ai_messages_fts, rank) "
+                "VALUES ('merge', ?)",
+                (pages,),
+            )
+            # FTS5 reports merge work through the change counter; fewer than
+            # two changes means the segments are already fully merged.
+            return conn.total_changes - before >= 2
+
+        return await self._db.run(merge)
+
+    async def compact(self) -> int:
+        """Merge FTS5 segments step by step, yielding the connection between steps."""
+        steps = 0
+        started = time.perf_counter()
+        while await self.merge_step():
+            steps += 1
+            await asyncio.sleep(0)
+        ARCHIVE_FTS_MERGE_SECONDS.observe(time.perf_counter() - started)
+        if steps:
+            log.debug("archive.fts_merged", steps=steps)
+        return steps
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run(), name="signal_ai.archive")
+        if self._full_text and self._merge_task is None and self._merge_interval > 0:
+            self._merge_task = asyncio.create_task(
+                self._compact_loop(), name="signal_ai.archive_compact"
+            )
+
+    async def stop(self) -> None:
+        if self._merge_task is not None:
+            self._merge_task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._merge_task
+            self._merge_task = None
+        if self._task is not None:
+            # Wake the loop and let it finish its pass instead of cancelling it:
+            # on 3.11, cancelling `wait_for` as its timeout fires can hang.
+            self._stopping = True
+            self._wakeup.set()
+            await self._task
+            self._task = None
+        while self._pending:
+            await self.flush()
+
+    async def _run(self) -> None:
+        while not self._stopping:
+            with contextlib.suppress(asyncio.TimeoutError):
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self._flush_interval)
+            self._wakeup.clear()
+            while self._pending:
+                await self.flush()
+            now = time.monotonic()
+            if not self._stopping and now - self._last_retention >= self._retention_interval:
+                self._last_retention = now
+                try:
+                    await self.apply_retention()
+                except Exception as exc:  # noqa: BLE001
+                    log.warning("archive.retention_failed", error=str(exc))
+
+    async def _compact_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self._merge_interval)
+            try:
+                await self.compact()
+            except Exception as exc:  # noqa: BLE001
+                log.warning("archive.fts_merge_failed", error=str(exc))
@@ -0,0 +1,220 @@
+from __future__ import annotations
+
+import asyncio
+import binascii
+import functools
+import hashlib
+import os
+from collections import OrderedDict
+from typing import Awaitable, Callable
+
+from ..metrics import ATTACHMENT_CACHE_BYTES, CACHE_REQUESTS
+from .cache import LoadCancelled
+
+NAMESPACE = "attachments"
+# Bytes read per step; a multiple of 3 so base64 pieces join without padding.
+CHUNK = 3 * 256 * 1024
+# In-memory payloads above this size are hashed and encoded off the event loop.
+INLINE_BYTES = 256 * 1024
+# File identities (path, size, mtime, inode) remembered to skip re-hashing.
+MAX_FILE_DIGESTS = 4096
+
+FileIdentity = tuple[str, int, int, int]
+
+
+def _header(mime: str | None, filename: str | None) -> str:
+    """The data-URI prefix signal-cli-rest-api accepts in `base64_attachments`."""
+    if mime is None and filename is None:
+        return ""
+    name = f";filename={filename}" if filename else ""
+    return f"data:{mime or 'application/octet-stream'}{name};base64,"
+
+
+def _encoded_length(size: int) -> int:
+    return (size + 2) // 3 * 4
+
+
+def _encode(data: bytes, header: str) -> str:
+    """Base64 of `data` behind `header`, built in one preallocated buffer."""
+    prefix = header.encode("ascii")
+    out = bytearray(len(prefix) + _encoded_length(len(data)))
+    out[: len(prefix)] = prefix
+    position = len(prefix)
+    with memoryview(data) as source:
+        for offset in range(0, len(data), CHUNK):
+            piece = binascii.b2a_base64(source[offset : offset + CHUNK], newline=False)
+            out[position : position + len(piece)] = piece
+            position += len(piece)
+    return out.decode("ascii")
+
+
+def hash_file(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as handle:
+        buffer = bytearray(CHUNK)
+        view = memoryview(buffer)
+        while read := handle.readinto(buffer):
+            digest.update(view[:read])
+    return digest.hexdigest()
+
+
+def encode_file(path: str, header: str = "", *, digest: bool = True) -> tuple[str, str]:
+    """`(sha256, payload)` from one chunked pass over the file.
+
+    Reads go into a single reusable `CHUNK` buffer, so the file is never held
+    in memory as a whole; only the encoded output grows to full size. With
+    `digest=False` the hash is skipped and returned empty.
+    """
+    hasher = hashlib.sha256() if digest else None
+    with open(path, "rb") as handle:
+        size = os.fstat(handle.fileno()).st_size
+        prefix = header.encode("ascii")
+        out = bytearray(len(prefix) + _encoded_length(size))
+        out[: len(prefix)] = prefix
+        position = len(prefix)
+        buffer = bytearray(CHUNK)
+        view = memoryview(buffer)
+        while read := handle.readinto(buffer):
+            chunk = view[:read]
+            if hasher is not None:
+                hasher.update(chunk)
+            piece = binascii.b2a_base64(chunk, newline=False)
+            out[position : position + len(piece)] = piece
+            position += len(piece)
+    # A file that shrank while being read leaves unused space at the end.
+    del out[position:]
+    return (hasher.hexdigest() if hasher is not None else ""), out.decode("ascii")
+
+
+class AttachmentCache:
+    """Encoded attachment payloads keyed by content hash, LRU within a byte budget.
+
+    The same asset sent again, to any recipient or from any command, reuses
+    one encoded string instead of reading and base64-encoding it each time.
+    Files are identified by `(path, size, mtime, inode)` so an unchanged
+    file is not even re-hashed; an edited file gets a new digest. Concurrent
+    misses for one payload share a single encode. Payloads larger than the
+    whole budget are encoded but not kept; `max_bytes=0` disables caching.
+    """
+
+    def __init__(self, max_bytes: int = 64 * 1024 * 1024) -> None:
+        self._max_bytes = max_bytes
+        self._entries: OrderedDict[str, str] = OrderedDict()
+        self._bytes = 0
+        self._digests: OrderedDict[FileIdentity, str] = OrderedDict()
+        self._inflight: dict[str, asyncio.Future[str]] = {}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @property
+    def size_bytes(self) -> int:
+        return self._bytes
+
+    async def from_bytes(
+        self, data: bytes, *, mime: str | None = None, filename: str | None = None
+    ) -> str:
+        """Encoded payload for in-memory `data`, for `base64_attachments`."""
+        header = _header(mime, filename)
+        if len(data) > INLINE_BYTES:
+            digest = await asyncio.to_thread(lambda: hashlib.sha256(data).hexdigest())
+        else:
+            digest = hashlib.sha256(data).hexdigest()
+
+        key = f"{digest}:{header}"
+
+        async def load() -> tuple[str, str]:
+            if len(data) > INLINE_BYTES:
+                return key, await asyncio.to_thread(_encode, data, header)
+            return key, _encode(data, header)
+
+        return await self._get(key, load)
+
+    async def from_file(
+        self, path: str | os.PathLike[str], *, mime: str | None = None, filename: str | None = None
+    ) -> str:
+        """Encoded payload for the file at `path`, streamed from disk on a miss."""
+        path = os.fspath(path)
+        header = _header(mime, filename)
+        if self._max_bytes <= 0:
+            CACHE_REQUESTS.labels(namespace=NAMESPACE, outcome="bypass").inc()
+            _, payload = await asyncio.to_thread(
+                functools.partial(encode_file, path, header, digest=False)
+            )
+            return payload
+        stat = await asyncio.to_thread(os.stat, path)
+        identity = (path, stat.st_size, stat.st_mtime_ns, stat.st_ino)
+        digest = self._digests.get(identity)
+        if digest is None:
+            digest = await asyncio.to_thread(hash_file, path)
+            self._remember(identity, digest)
+        else:
+            self._digests.move_to_end(identity)
+
+        async def load() -> tuple[str, str]:
+            actual, payload = await asyncio.to_thread(encode_file, path, header)
+            if actual != digest:
+                # Rewritten between hashing and encoding: file it under what was read.
+                self._digests.pop(identity, None)
+            return f"{actual}:{header}", payload
+
+        return await self._get(f"{digest}:{header}", load)
+
+    def _remember(self, identity: FileIdentity, digest: str) -> None:
+        self._digests[identity] = digest
+        while len(self._digests) > MAX_FILE_DIGESTS:
+            self._digests.popitem(last=False)
+
+    async def _get(self, key: str, loader: Callable[[], Awaitable[tuple[str, str]]]) -> str:
+        """Cached payload for `key`; `loader` returns the key to file its payload under."""
+        if self._max_bytes <= 0:
+            CACHE_REQUESTS.labels(namespace=NAMESPACE, outcome="bypass").inc()
+            _, payload = await loader()
+            return payload
+        cached = self._entries.get(key)
+        if cached is not None:
+            self._entries.move_to_end(key)
+            CACHE_REQUESTS.labels(namespace=NAMESPACE, outcome="hit").inc()
+            return cached
+        while (pending := self._inflight.get(key)) is not None:
+            CACHE_REQUESTS.labels(namespace=NAMESPACE, outcome="coalesced").inc()
+            try:
+                return await asyncio.shield(pending)
+            except LoadCancelled:
+                # The leader was cancelled, not this caller: join the next
+                # flight or become its leader.
+                continue
+
+        CACHE_REQUESTS.labels(namespace=NAMESPACE, outcome="miss").inc()
+        future: asyncio.Future[str] = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            stored_key, payload = await loader()
+        except asyncio.CancelledError:
+            future.set_exception(LoadCancelled())
+            future.exception()
+            raise
+        except BaseException as exc:
+            future.set_exception(exc)
+            future.exception()
+            raise
+        finally:
+            if self._inflight.get(key) is future:
+                del self._inflight[key]
+        self._store(stored_key, payload)
+        future.set_result(payload)
+        return payload
+
+    def _store(self, key: str, payload: str) -> None:
+        if len(payload) > self._max_bytes:
+            return
+        previous = self._entries.pop(key, None)
+        if previous is not None:
+            self._bytes -= len(previous)
+        self._entries[key] = payload
+        self._bytes += len(payload)
+        while self._bytes > self._max_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self._bytes -= len(evicted)
+            CACHE_REQUESTS.labels(namespace=NAMESPACE, outcome="evicted").inc()
+        ATTACHMENT_CACHE_BYTES.set(self._bytes)
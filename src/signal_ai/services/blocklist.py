@@ -0,0 +1,158 @@
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import os
+import signal
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Iterable
+
+import structlog
+
+log = structlog.get_logger()
+
+GROUP_PREFIX = "group:"
+_END = ""
+
+
+@dataclass(frozen=True, slots=True)
+class BlocklistRules:
+    """Immutable compiled blocklist.
+
+    Entry syntax (one per line in files, comma-separated on the CLI):
+    `+15551234567` or a UUID blocks that sender, `+44*` blocks every sender
+    starting with `+44`, and `group:<groupId>` blocks a group. Lines starting
+    with `#` are ignored.
+    """
+
+    exact: frozenset[str]
+    groups: frozenset[str]
+    prefixes: dict[str, Any]
+    size: int
+
+    @classmethod
+    def compile(cls, entries: Iterable[str]) -> BlocklistRules:
+        exact: set[str] = set()
+        groups: set[str] = set()
+        trie: dict[str, Any] = {}
+        for entry in entries:
+            entry = entry.strip()
+            if not entry or entry.startswith("#"):
+                continue
+            if entry.startswith(GROUP_PREFIX):
+                groups.add(entry[len(GROUP_PREFIX):])
+            elif entry.endswith("*"):
+                node = trie
+                for char in entry[:-1]:
+                    node = node.setdefault(char, {})
+                node[_END] = True
+            else:
+                exact.add(entry)
+        return cls(
+            exact=frozenset(exact),
+            groups=frozenset(groups),
+            prefixes=trie,
+            size=len(exact) + len(groups) + _count_terminals(trie),
+        )
+
+    def matches_prefix(self, source: str) -> bool:
+        node = self.prefixes
+        if not node:
+            return False
+        for char in source:
+            if _END in node:
+                return True
+            node = node.get(char)  # type: ignore[assignment]
+            if node is None:
+                return False
+        return _END in node
+
+    def blocks(self, source: str | None, group_id: str | None = None) -> bool:
+        if group_id is not None and group_id in self.groups:
+            return True
+        if not source:
+            return False
+        return source in self.exact or self.matches_prefix(source)
+
+
+def _count_terminals(node: dict[str, Any]) -> int:
+    return sum(
+        1 if key == _END else _count_terminals(child) for key, child in node.items()
+    )
+
+
+class BlocklistEngine:
+    """Holds the active rules and swaps in a new compiled set on change.
+
+    Reads of `rules` never await; reloads compile a fresh `BlocklistRules`
+    and replace the reference in one assignment. A file source is reloaded
+    when its mtime changes or when the process receives SIGHUP.
+    """
+
+    def __init__(
+        self,
+        inline: Iterable[str] = (),
+        path: Path | None = None,
+        *,
+        poll_interval: float = 5.0,
+    ) -> None:
+        self._inline = tuple(inline)
+        self._path = path
+        self._poll_interval = poll_interval
+        self._mtime: float | None = None
+        self._task: asyncio.Task[None] | None = None
+        self._reload_task: asyncio.Task[bool] | None = None
+        self.rules = BlocklistRules.compile(self._inline)
+        self.reload()
+
+    def reload(self) -> bool:
+        if self._path is None:
+            return False
+        try:
+            mtime = os.stat(self._path).st_mtime
+            lines = self._path.read_text(encoding="utf-8").splitlines()
+        except OSError as exc:
+            log.warning("blocklist.reload_failed", path=str(self._path), error=str(exc))
+            return False
+        self.rules = BlocklistRules.compile((*self._inline, *lines))
+        self._mtime = mtime
+        log.info("blocklist.reloaded", path=str(self._path), entries=self.rules.size)
+        return True
+
+    def _changed(self) -> bool:
+        if self._path is None:
+            return False
+        try:
+            return os.stat(self._path).st_mtime != self._mtime
+        except OSError:
+            return False
+
+    def _on_sighup(self) -> None:
+        if self._reload_task is None or self._reload_task.done():
+            # Compile off the loop; large files would otherwise stall workers.
+            self._reload_task = asyncio.create_task(asyncio.to_thread(self.reload))
+
+    def start(self) -> None:
+        if self._path is None or self._task is not None:
+            return
+        loop = asyncio.get_running_loop()
+        with contextlib.suppress(NotImplementedError, RuntimeError):
+            loop.add_signal_handler(signal.SIGHUP, self._on_sighup)
+        self._task = asyncio.create_task(self._watch(), name="signal_ai.blocklist_watch")
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        with contextlib.suppress(NotImplementedError, RuntimeError):
+            asyncio.get_running_loop().remove_signal_handler(signal.SIGHUP)
+        self._task.cancel()
+        with contextlib.suppress(asyncio.CancelledError):
+            await self._task
+        self._task = None
+
+    async def _watch(self) -> None:
+        while True:
+            await asyncio.sleep(self._poll_interval)
+            if self._changed():
+                await asyncio.to_thread(self.reload)
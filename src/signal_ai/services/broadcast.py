@@ -0,0 +1,464 @@
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import json
+import sqlite3
+import time
+import uuid
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Any, Awaitable, Callable, Iterable, Protocol
+
+import structlog
+
+from ..metrics import BROADCAST_ETA, BROADCAST_RATE, BROADCAST_RECIPIENTS, BROADCASTS_ACTIVE
+from ..storage import SqliteDatabase
+
+if TYPE_CHECKING:
+    from redis.asyncio import Redis
+
+    from .dlq import BufferedDlqWriter
+
+log = structlog.get_logger()
+
+SendFn = Callable[[dict[str, Any]], Awaitable[Any]]
+
+# Key marking a DLQ record as a failed broadcast delivery rather than an inbound message.
+DLQ_RECORD = "broadcast"
+
+
+@dataclass(slots=True)
+class BroadcastJob:
+    """One message to many recipients; everything before `cursor` has been attempted."""
+
+    id: str
+    number: str
+    message: str
+    recipients: list[str]
+    cursor: int = 0
+    sent: int = 0
+    failed: int = 0
+    status: str = "running"
+    created_at: float = field(default_factory=time.time)
+    rate: float = 0.0
+    eta: float | None = None
+
+    @property
+    def remaining(self) -> int:
+        return len(self.recipients) - self.cursor
+
+
+class BroadcastStore(Protocol):
+    async def save(self, job: BroadcastJob) -> None: ...
+
+    async def checkpoint(self, job: BroadcastJob) -> None:
+        """Persist `cursor`, counters and `status`."""
+        ...
+
+    async def load_active(self) -> list[BroadcastJob]: ...
+
+    async def close(self) -> None: ...
+
+
+class SqliteBroadcastStore:
+    """Broadcast jobs in `signal_ai_broadcasts`, one row per job."""
+
+    def __init__(self, db: SqliteDatabase) -> None:
+        self._db = db
+        self._ready = False
+
+    async def _ensure_schema(self) -> None:
+        if self._ready:
+            return
+
+        def create(conn: sqlite3.Connection) -> None:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS signal_ai_broadcasts "
+                "(id TEXT PRIMARY KEY, number TEXT NOT NULL, message TEXT NOT NULL, "
+                "recipients TEXT NOT NULL, cursor INTEGER NOT NULL, sent INTEGER NOT NULL, "
+                "failed INTEGER NOT NULL, status TEXT NOT NULL, created_at REAL NOT NULL)"
+            )
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS signal_ai_broadcasts_status ON signal_ai_broadcasts (status)"
+            )
+
+        await self._db.run(create)
+        self._ready = True
+
+    async def save(self, job: BroadcastJob) -> None:
+        await self._ensure_schema()
+        row = (
+            job.id,
+            job.number,
+            job.message,
+            json.dumps(job.recipients),
+            job.cursor,
+            job.sent,
+            job.failed,
+            job.status,
+            job.created_at,
+        )
+        await self._db.transaction(
+            lambda conn: conn.execute(
+                "INSERT OR REPLACE INTO signal_ai_broadcasts "
+                "(id, number, message, recipients, cursor, sent, failed, status, created_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                row,
+            )
+        )
+
+    async def checkpoint(self, job: BroadcastJob) -> None:
+        await self._ensure_schema()
+        row = (job.cursor, job.sent, job.failed, job.status, job.id)
+        await self._db.run(
+            lambda conn: conn.execute(
+                "UPDATE signal_ai_broadcasts SET cursor = ?, sent = ?, failed = ?, status = ? "
+                "WHERE id = ?",
+                row,
+            )
+        )
+
+    async def load_active(self) -> list[BroadcastJob]:
+        await self._ensure_schema()
+        rows = await self._db.run(
+            lambda conn: conn.execute(
+                "SELECT id, number, message, recipients, cursor, sent, failed, status, created_at "
+                "FROM signal_ai_broadcasts WHERE status = 'running' ORDER BY created_at"
+            ).fetchall()
+        )
+        return [
+            BroadcastJob(row[0], row[1], row[2], json.loads(row[3]), *row[4:]) for row in rows
+        ]
+
+    async def close(self) -> None:
+        # The database is shared and closed by its owner.
+        return None
+
+
+class RedisBroadcastStore:
+    """Broadcast jobs as one hash each, plus a set of the ids still running."""
+
+    def __init__(self, redis: Redis, *, prefix: str = "signal_ai:broadcasts") -> None:
+        self._redis = redis
+        self._prefix = prefix
+        self._active_key = f"{prefix}:active"
+
+    def _key(self, job_id: str) -> str:
+        return f"{self._prefix}:{job_id}"
+
+    async def save(self, job: BroadcastJob) -> None:
+        async with self._redis.pipeline(transaction=True) as pipe:
+            pipe.hset(
+                self._key(job.id),
+                mapping={
+                    "number": job.number,
+                    "message": job.message,
+                    "recipients": json.dumps(job.recipients),
+                    "cursor": job.cursor,
+                    "sent": job.sent,
+                    "failed": job.failed,
+                    "status": job.status,
+                    "created_at": job.created_at,
+                },
+            )
+            pipe.sadd(self._active_key, job.id)
+            await pipe.execute()
+
+    async def checkpoint(self, job: BroadcastJob) -> None:
+        async with self._redis.pipeline(transaction=True) as pipe:
+            pipe.hset(
+                self._key(job.id),
+                mapping={
+                    "cursor": job.cursor,
+                    "sent": job.sent,
+                    "failed": job.failed,
+                    "status": job.status,
+                },
+            )
+            if job.status != "running":
+                pipe.srem(self._active_key, job.id)
+            await pipe.execute()
+
+    async def load_active(self) -> list[BroadcastJob]:
+        ids = [i.decode() if isinstance(i, bytes) else i for i in await self._redis.smembers(self._active_key)]
+        jobs: list[BroadcastJob] = []
+        for job_id in ids:
+            raw = await self._redis.hgetall(self._key(job_id))
+            data = {
+                (k.decode() if isinstance(k, bytes) else k): (v.decode() if isinstance(v, bytes) else v)
+                for k, v in raw.items()
+            }
+            if not data:
+                continue
+            jobs.append(
+                BroadcastJob(
+                    job_id,
+                    data["number"],
+                    data["message"],
+                    json.loads(data["recipients"]),
+                    int(data["cursor"]),
+                    int(data["sent"]),
+                    int(data["failed"]),
+                    data["status"],
+                    float(data["created_at"]),
+                )
+            )
+        return sorted(jobs, key=lambda job: job.created_at)
+
+    async def close(self) -> None:
+        await self._redis.aclose()
+
+
+def unique_recipients(recipients: Iterable[str]) -> list[str]:
+    return list(dict.fromkeys(r for r in recipients if r))
+
+
+class BroadcastEngine:
+    """Sends one message to many recipients in concurrent, rate-limited batches.
+
+    Each job is split into `batch_size` recipient batches, one API call each,
+    with at most `concurrency` calls in flight and calls spaced to stay under
+    `rate` per second across every job. The cursor (every recipient before it
+    has been attempted) is checkpointed after each batch, so a restarted
+    process resumes running jobs from there; batches that finished past the
+    cursor are sent again, making delivery at-least-once. A batch the API
+    rejects is retried one recipient at a time to isolate the failures, and
+    each failed recipient goes to the DLQ as a self-contained record that
+    `redeliver()` can send again.
+    """
+
+    def __init__(
+        self,
+        send: SendFn,
+        store: BroadcastStore | None,
+        *,
+        batch_size: int = 50,
+        concurrency: int = 4,
+        rate: float = 0.0,
+        dlq: BufferedDlqWriter | None = None,
+        clock: Callable[[], float] | None = None,
+    ) -> None:
+        self._send = send
+        self._store = store
+        self._batch_size = max(1, batch_size)
+        self._concurrency = max(1, concurrency)
+        self._interval = 1.0 / rate if rate > 0 else 0.0
+        self._dlq = dlq
+        self._clock = clock or time.monotonic
+        self._next_call = 0.0
+        self._jobs: dict[str, BroadcastJob] = {}
+        self._tasks: dict[str, asyncio.Task[None]] = {}
+        self._restore_task: asyncio.Task[None] | None = None
+
+    def start(self) -> None:
+        if self._store is not None and self._restore_task is None:
+            self._restore_task = asyncio.create_task(self._restore(), name="signal_ai.broadcast_restore")
+
+    async def stop(self) -> None:
+        tasks = [t for t in (self._restore_task, *self._tasks.values()) if t is not None]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._restore_task = None
+        if self._store is not None:
+            await self._store.close()
+
+    def get(self, job_id: str) -> BroadcastJob | None:
+        return self._jobs.get(job_id)
+
+    def jobs(self) -> list[BroadcastJob]:
+        return sorted(self._jobs.values(), key=lambda job: job.created_at)
+
+    async def submit(self, number: str, message: str, recipients: Iterable[str]) -> BroadcastJob:
+        job = BroadcastJob(uuid.uuid4().hex[:8], number, message, unique_recipients(recipients))
+        if self._store is not None:
+            await self._store.save(job)
+        self._launch(job)
+        return job
+
+    async def cancel(self, job_id: str) -> bool:
+        task = self._tasks.get(job_id)
+        job = self._jobs.get(job_id)
+        if task is None or job is None:
+            return False
+        task.cancel()
+        with contextlib.suppress(asyncio.CancelledError):
+            await task
+        job.status = "cancelled"
+        if self._store is not None:
+            await self._store.checkpoint(job)
+        return True
+
+    async def _restore(self) -> None:
+        assert self._store is not None
+        try:
+            jobs = await self._store.load_active()
+        except Exception:
+            log.exception("broadcast.restore_failed")
+            return
+        for job in jobs:
+            if job.id not in self._jobs:
+                log.info("broadcast.resumed", job=job.id, cursor=job.cursor, total=len(job.recipients))
+                self._launch(job)
+
+    def _launch(self, job: BroadcastJob) -> None:
+        self._jobs[job.id] = job
+        self._tasks[job.id] = asyncio.create_task(self._run(job), name=f"signal_ai.broadcast.{job.id}")
+        BROADCASTS_ACTIVE.set(len(self._tasks))
+
+    async def _pace(self) -> None:
+        if not self._interval:
+            return
+        now = self._clock()
+        slot = max(now, self._next_call)
+        self._next_call = slot + self._interval
+        if slot > now:
+            await asyncio.sleep(slot - now)
+
+    async def _run(self, job: BroadcastJob) -> None:
+        total = len(job.recipients)
+        starts = iter(range(job.cursor, total, self._batch_size))
+        # Batches done past the cursor, with their (sent, failed) counts.
+        finished: dict[int, tuple[int, int]] = {}
+        checkpoint_lock = asyncio.Lock()
+        started = self._clock()
+        attempted_before = job.cursor
+
+        async def worker() -> None:
+            for start in starts:
+                batch = job.recipients[start : start + self._batch_size]
+                finished[start] = await self._deliver(job, batch)
+                # Counters move with the cursor, so a checkpoint never counts a
+                # batch that a resume would send again.
+                while job.cursor in finished:
+                    sent, failed = finished.pop(job.cursor)
+                    job.sent += sent
+                    job.failed += failed
+                    job.cursor = min(total, job.cursor + self._batch_size)
+                elapsed = self._clock() - started
+                job.rate = (job.cursor - attempted_before) / elapsed if elapsed > 0 else 0.0
+                job.eta = job.remaining / job.rate if job.rate > 0 else None
+                BROADCAST_RATE.labels(job=job.id).set(job.rate)
+                BROADCAST_ETA.labels(job=job.id).set(job.eta if job.eta is not None else -1)
+                if self._store is not None:
+                    # Serialized so an older cursor never lands after a newer one.
+                    async with checkpoint_lock:
+                        await self._store.checkpoint(job)
+
+        workers = [asyncio.create_task(worker()) for _ in range(self._concurrency)]
+        try:
+            await asyncio.gather(*workers)
+            job.status = "done"
+            job.eta = 0.0
+            if self._store is not None:
+                await self._store.checkpoint(job)
+            log.info("broadcast.done", job=job.id, sent=job.sent, failed=job.failed)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            # Nothing awaits this task, so a failing send path or store write
+            # would otherwise vanish and leave the job "running" until a restart.
+            log.exception("broadcast.failed", job=job.id, cursor=job.cursor)
+            await self._mark_failed(job)
+        finally:
+            for task in workers:
+                task.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
+            self._tasks.pop(job.id, None)
+            BROADCASTS_ACTIVE.set(len(self._tasks))
+            with contextlib.suppress(KeyError):
+                BROADCAST_RATE.remove(job.id)
+            with contextlib.suppress(KeyError):
+                BROADCAST_ETA.remove(job.id)
+
+    async def _mark_failed(self, job: BroadcastJob) -> None:
+        job.status = "failed"
+        job.eta = None
+        if self._store is None:
+            return
+        try:
+            await self._store.checkpoint(job)
+        except Exception:
+            log.exception("broadcast.checkpoint_failed", job=job.id)
+
+    async def _deliver(self, job: BroadcastJob, batch: list[str]) -> tuple[int, int]:
+        await self._pace()
+        try:
+            await self._send({"message": job.message, "recipients": batch, "number": job.number})
+        except asyncio.CancelledError:
+            raise
+        except Exception as exc:  # noqa: BLE001
+            if len(batch) == 1:
+                self._dead_letter(job, batch[0], exc)
+                return 0, 1
+            log.warning("broadcast.batch_failed", job=job.id, size=len(batch), error=str(exc))
+        else:
+            BROADCAST_RECIPIENTS.labels(outcome="sent").inc(len(batch))
+            return len(batch), 0
+        sent = failed = 0
+        for recipient in batch:
+            await self._pace()
+            try:
+                await self._send(
+                    {"message": job.message, "recipients": [recipient], "number": job.number}
+                )
+            except asyncio.CancelledError:
+                raise
+            except Exception as exc:  # noqa: BLE001
+                self._dead_letter(job, recipient, exc)
+                failed += 1
+            else:
+                BROADCAST_RECIPIENTS.labels(outcome="sent").inc()
+                sent += 1
+        return sent, failed
+
+    def _dead_letter(self, job: BroadcastJob, recipient: str, exc: BaseException) -> None:
+        BROADCAST_RECIPIENTS.labels(outcome="failed").inc()
+        log.warning("broadcast.recipient_failed", job=job.id, recipient=recipient, error=str(exc))
+        if self._dlq is not None:
+            self._dlq.submit(
+                (job.id, recipient),
+                {
+                    DLQ_RECORD: job.id,
+                    "number": job.number,
+                    "recipient": recipient,
+                    "message": job.message,
+                    "error": exc.__class__.__name__,
+                    "failed_at": int(time.time()),
+                },
+            )
+
+
+async def redeliver(send: SendFn, raw: str) -> bool:
+    """Re-send a failed broadcast delivery found in the DLQ; False if `raw` is not one.
+
+    A second failure is logged and dropped rather than dead-lettered again,
+    so a permanently unreachable recipient cannot cycle through the DLQ.
+    """
+    if f'"{DLQ_RECORD}"' not in raw:
+        return False
+    try:
+        record = json.loads(raw)
+    except ValueError:
+        return False
+    if not isinstance(record, dict) or DLQ_RECORD not in record:
+        return False
+    try:
+        await send(
+            {
+                "message": record["message"],
+                "recipients": [record["recipient"]],
+                "number": record["number"],
+            }
+        )
+    except Exception as exc:  # noqa: BLE001
+        BROADCAST_RECIPIENTS.labels(outcome="dropped").inc()
+        log.warning(
+            "broadcast.redeliver_failed",
+            job=record[DLQ_RECORD],
+            recipient=record["recipient"],
+            error=str(exc),
+        )
+    else:
+        BROADCAST_RECIPIENTS.labels(outcome="redelivered").inc()
+    return True
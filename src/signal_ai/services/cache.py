@@ -0,0 +1,133 @@
+from __future__ import annotations
+
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Hashable, Mapping, TypeVar
+
+from ..metrics import CACHE_ENTRIES, CACHE_REQUESTS
+
+T = TypeVar("T")
+
+
+class LoadCancelled(Exception):
+    """Set on a shared load whose leading caller was cancelled; followers retry it."""
+
+
+class TtlCache:
+    """Async LRU cache with per-namespace TTLs and single-flight loading.
+
+    Entries are keyed by `(namespace, key)`. Concurrent misses for the same
+    entry share one loader call; failures are never cached. `invalidate()`
+    drops entries and bumps the namespace generation, so a load already in
+    flight when state changed does not repopulate the cache with stale data.
+    A namespace without a positive TTL is passed straight through. If the
+    caller running a load is cancelled, a waiting caller takes the load over.
+    """
+
+    def __init__(
+        self,
+        ttls: Mapping[str, float],
+        *,
+        max_entries: int = 1024,
+        clock: Callable[[], float] | None = None,
+    ) -> None:
+        self._ttls = dict(ttls)
+        self._max_entries = max_entries
+        self._clock = clock or time.monotonic
+        self._entries: OrderedDict[tuple[str, Hashable], tuple[float, Any]] = OrderedDict()
+        self._inflight: dict[tuple[str, Hashable], asyncio.Future[Any]] = {}
+        self._generations: dict[str, int] = {}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    async def get(self, namespace: str, key: Hashable, loader: Callable[[], Awaitable[T]]) -> T:
+        ttl = self._ttls.get(namespace, 0.0)
+        if ttl <= 0:
+            CACHE_REQUESTS.labels(namespace=namespace, outcome="bypass").inc()
+            return await loader()
+
+        slot = (namespace, key)
+        entry = self._entries.get(slot)
+        if entry is not None:
+            expires, value = entry
+            if expires > self._clock():
+                self._entries.move_to_end(slot)
+                CACHE_REQUESTS.labels(namespace=namespace, outcome="hit").inc()
+                return value
+            del self._entries[slot]
+
+        while (pending := self._inflight.get(slot)) is not None:
+            CACHE_REQUESTS.labels(namespace=namespace, outcome="coalesced").inc()
+            try:
+                return await asyncio.shield(pending)
+            except LoadCancelled:
+                # The leader was cancelled, not this caller: join the next
+                # flight or become its leader.
+                continue
+
+        CACHE_REQUESTS.labels(namespace=namespace, outcome="miss").inc()
+        future: asyncio.Future[Any] = asyncio.get_running_loop().create_future()
+        self._inflight[slot] = future
+        generation = self._generations.get(namespace, 0)
+        try:
+            value = await loader()
+        except asyncio.CancelledError:
+            future.set_exception(LoadCancelled())
+            future.exception()
+            raise
+        except BaseException as exc:
+            future.set_exception(exc)
+            # Mark retrieved; waiters re-raise it, and a lone caller does not warn.
+            future.exception()
+            raise
+        finally:
+            if self._inflight.get(slot) is future:
+                del self._inflight[slot]
+        if self._generations.get(namespace, 0) == generation:
+            self._store(slot, value, ttl)
+        future.set_result(value)
+        return value
+
+    def peek(self, namespace: str, key: Hashable) -> tuple[bool, Any]:
+        """`(True, value)` for a live entry, else `(False, None)`; never loads."""
+        if self._ttls.get(namespace, 0.0) <= 0:
+            return False, None
+        slot = (namespace, key)
+        entry = self._entries.get(slot)
+        if entry is None or entry[0] <= self._clock():
+            CACHE_REQUESTS.labels(namespace=namespace, outcome="miss").inc()
+            return False, None
+        self._entries.move_to_end(slot)
+        CACHE_REQUESTS.labels(namespace=namespace, outcome="hit").inc()
+        return True, entry[1]
+
+    def put(self, namespace: str, key: Hashable, value: Any) -> None:
+        ttl = self._ttls.get(namespace, 0.0)
+        if ttl > 0:
+            self._store((namespace, key), value, ttl)
+
+    def _store(self, slot: tuple[str, Hashable], value: Any, ttl: float) -> None:
+        self._entries[slot] = (self._clock() + ttl, value)
+        self._entries.move_to_end(slot)
+        while len(self._entries) > self._max_entries:
+            (evicted, _), _ = self._entries.popitem(last=False)
+            CACHE_REQUESTS.labels(namespace=evicted, outcome="evicted").inc()
+        CACHE_ENTRIES.set(len(self._entries))
+
+    def invalidate(self, namespace: str, key: Hashable | None = None) -> int:
+        """Drop one entry (or the whole namespace when `key` is None)."""
+        self._generations[namespace] = self._generations.get(namespace, 0) + 1
+        if key is not None:
+            slots = [(namespace, key)] if (namespace, key) in self._entries else []
+        else:
+            slots = [slot for slot in self._entries if slot[0] == namespace]
+        for slot in slots:
+            del self._entries[slot]
+        # A caller that loads after invalidating must not join a stale flight.
+        for slot in [slot for slot in self._inflight if slot[0] == namespace]:
+            if key is None or slot[1] == key:
+                del self._inflight[slot]
+        CACHE_ENTRIES.set(len(self._entries))
+        return len(slots)
@@ -0,0 +1,139 @@
+"""Cron expressions and durations for scheduled jobs.
+
+Five-field cron (`minute hour day-of-month month day-of-week`) with `*`,
+lists, ranges and `/step`; day-of-week is 0-7 with both 0 and 7 meaning
+Sunday. As in classic cron, when both day fields are restricted a day
+matching either one fires. Times are evaluated in a given time zone.
+"""
+
+from __future__ import annotations
+
+import functools
+import re
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone, tzinfo
+
+_DURATION = re.compile(r"(\d+)([smhdw])")
+_UNITS = {"s": 1, "m": 60, "h": 3600, "d": 86400, "w": 604800}
+# (low, high) per field: minute, hour, day of month, month, day of week.
+_RANGES = ((0, 59), (0, 23), (1, 31), (1, 12), (0, 7))
+_NAMES = ("minute", "hour", "day of month", "month", "day of week")
+# A schedule that matches nothing within this many years never will (e.g. `0 0 31 2 *`).
+_SEARCH_YEARS = 8
+
+
+class CronError(ValueError):
+    """The cron expression or duration is malformed or can never fire."""
+
+
+def parse_duration(text: str) -> float:
+    """Seconds in a compact duration such as `90s`, `10m` or `1h30m`."""
+    text = text.strip().lower()
+    position = 0
+    total = 0
+    for match in _DURATION.finditer(text):
+        if match.start() != position:
+            break
+        total += int(match.group(1)) * _UNITS[match.group(2)]
+        position = match.end()
+    if not text or position != len(text):
+        raise CronError(f"bad duration '{text}', expected e.g. 90s, 10m, 1h30m, 2d")
+    if total <= 0:
+        raise CronError("duration must be positive")
+    return float(total)
+
+
+def _field(text: str, index: int) -> frozenset[int]:
+    low, high = _RANGES[index]
+    values: set[int] = set()
+    for part in text.split(","):
+        body, _, step_text = part.partition("/")
+        try:
+            step = int(step_text) if step_text else 1
+            if body == "*":
+                start, end = low, high
+            elif "-" in body:
+                first, _, last = body.partition("-")
+                start, end = int(first), int(last)
+            else:
+                start = end = int(body)
+                if step_text:
+                    end = high
+        except ValueError:
+            raise CronError(f"bad {_NAMES[index]} field '{text}'") from None
+        if step < 1 or not low <= start <= end <= high:
+            raise CronError(f"{_NAMES[index]} '{part}' outside {low}-{high}")
+        values.update(range(start, end + 1, step))
+    if index == 4 and 7 in values:
+        values.discard(7)
+        values.add(0)
+    return frozenset(values)
+
+
+@dataclass(frozen=True, slots=True)
+class CronExpression:
+    text: str
+    minutes: tuple[int, ...]
+    hours: frozenset[int]
+    days: frozenset[int]
+    months: frozenset[int]
+    weekdays: frozenset[int]
+    any_day: bool
+    any_weekday: bool
+
+    def _day_matches(self, moment: datetime) -> bool:
+        in_month = moment.day in self.days
+        # datetime.weekday() is Monday=0; cron is Sunday=0.
+        in_week = (moment.weekday() + 1) % 7 in self.weekdays
+        if self.any_day or self.any_weekday:
+            return in_month and in_week
+        return in_month or in_week
+
+    def next_after(self, after: float, tz: tzinfo) -> float:
+        """The first matching minute strictly after the timestamp `after`."""
+        moment = datetime.fromtimestamp(after, tz).replace(tzinfo=None, second=0, microsecond=0)
+        moment += timedelta(minutes=1)
+        limit = moment.year + _SEARCH_YEARS
+        while moment.year <= limit:
+            if moment.month not in self.months:
+                carry, month = divmod(moment.month, 12)
+                moment = datetime(moment.year + carry, month + 1, 1)
+                continue
+            if not self._day_matches(moment):
+                moment = (moment + timedelta(days=1)).replace(hour=0, minute=0)
+                continue
+            if moment.hour not in self.hours:
+                moment = (moment + timedelta(hours=1)).replace(minute=0)
+                continue
+            minute = next((m for m in self.minutes if m >= moment.minute), None)
+            if minute is None:
+                moment = (moment + timedelta(hours=1)).replace(minute=0)
+                continue
+            moment = moment.replace(minute=minute)
+            # Wall-clock times skipped by a DST change resolve to the shifted instant.
+            when = moment.replace(tzinfo=tz).timestamp()
+            if when > after:
+                return when
+            moment += timedelta(minutes=1)
+        raise CronError(f"'{self.text}' never fires")
+
+
+@functools.lru_cache(maxsize=256)
+def parse_cron(text: str) -> CronExpression:
+    fields = text.split()
+    if len(fields) != 5:
+        raise CronError(f"expected 5 fields (minute hour day month weekday), got {len(fields)}")
+    minutes, hours, days, months, weekdays = (_field(value, i) for i, value in enumerate(fields))
+    expression = CronExpression(
+        " ".join(fields),
+        tuple(sorted(minutes)),
+        hours,
+        days,
+        months,
+        weekdays,
+        any_day=fields[2] == "*",
+        any_weekday=fields[4] == "*",
+    )
+    # Reject expressions such as `0 0 30 2 *` up front rather than at first fire.
+    expression.next_after(0, timezone.utc)
+    return expression
@@ -0,0 +1,341 @@
+from __future__ import annotations
+
+import heapq
+import random
+from collections import Counter
+from dataclasses import dataclass, field
+
+# Dice drawn per random.choices call; bounds the memory a huge roll holds at once.
+CHUNK = 65_536
+# Up to this many faces a large roll keeps per-face counts (histogram, keep/drop).
+COUNTED_SIDES = 100
+_MAX_DIGITS = 9
+_RNG = random.Random()
+
+
+class DiceError(ValueError):
+    """The expression is malformed or exceeds the roll limits; the text is shown to the user."""
+
+
+@dataclass(frozen=True, slots=True)
+class RollLimits:
+    max_dice: int = 1_000_000
+    max_sides: int = 1_000_000
+    max_terms: int = 20
+    list_limit: int = 20
+    # Dice a keep/drop term over COUNTED_SIDES faces may hold while streaming:
+    # the smaller of the kept and dropped counts.
+    max_keep: int = 10_000
+
+
+@dataclass(frozen=True, slots=True)
+class DiceTerm:
+    """`<count>d<sides>` with an optional keep (`kh`/`kl`) or drop (`dh`/`dl`) modifier."""
+
+    count: int
+    sides: int
+    sign: int = 1
+    keep: int | None = None
+    keep_high: bool = True
+    text: str = ""
+
+
+@dataclass(frozen=True, slots=True)
+class DiceExpression:
+    terms: tuple[DiceTerm, ...]
+    constant: int
+    text: str
+
+    @property
+    def dice(self) -> int:
+        return sum(term.count for term in self.terms)
+
+    @property
+    def simple(self) -> bool:
+        """A single unmodified `NdM`, the shape `!roll` has always answered."""
+        return (
+            len(self.terms) == 1
+            and self.constant == 0
+            and self.terms[0].keep is None
+            and self.terms[0].sign == 1
+        )
+
+
+def _number(text: str, index: int) -> tuple[int | None, int]:
+    end = index
+    while end < len(text) and text[end].isdigit():
+        end += 1
+    if end == index:
+        return None, index
+    if end - index > _MAX_DIGITS:
+        raise DiceError(f"number too long at '{text[index:end]}'")
+    return int(text[index:end]), end
+
+
+def parse_expression(text: str) -> DiceExpression:
+    """Parse `4d6kh3+2`-style dice notation with a single left-to-right scan.
+
+    Terms are `[N]d<M>` (`d%` is d100) or plain integers joined by `+`/`-`.
+    A dice term may end in `kh<K>`/`k<K>` (keep highest), `kl<K>` (keep
+    lowest), `dh<K>` or `dl<K>` (drop). Every character is looked at once,
+    so input cost is linear however the expression is shaped.
+    """
+    source = "".join(text.split()).lower()
+    if not source:
+        raise DiceError("empty expression")
+    terms: list[DiceTerm] = []
+    constant = 0
+    index = 0
+    sign = 1
+    if source[0] in "+-":
+        sign = -1 if source[0] == "-" else 1
+        index = 1
+    while True:
+        start = index
+        count, index = _number(source, index)
+        if index < len(source) and source[index] == "d":
+            index += 1
+            if index < len(source) and source[index] == "%":
+                sides: int | None = 100
+                index += 1
+            else:
+                sides, index = _number(source, index)
+            if sides is None:
+                raise DiceError(f"expected sides after 'd' at position {index + 1}")
+            count = 1 if count is None else count
+            if count < 1 or sides < 1:
+                raise DiceError("dice count and sides must be at least 1")
+            keep: int | None = None
+            keep_high = True
+            kind: str | None = None
+            if source.startswith(("kh", "kl", "dh", "dl"), index):
+                kind = source[index : index + 2]
+                index += 2
+            elif source.startswith("k", index):
+                kind = "kh"
+                index += 1
+            if kind is not None:
+                amount, index = _number(source, index)
+                if amount is None:
+                    raise DiceError(f"expected a number after '{kind}'")
+                amount = min(amount, count)
+                if kind[0] == "k":
+                    keep, keep_high = amount, kind == "kh"
+                else:
+                    keep, keep_high = count - amount, kind == "dl"
+            terms.append(DiceTerm(count, sides, sign, keep, keep_high, source[start:index]))
+        elif count is not None:
+            constant += sign * count
+        else:
+            raise DiceError(f"unexpected '{source[index:index + 1] or 'end'}' at position {index + 1}")
+        if index == len(source):
+            break
+        if source[index] not in "+-":
+            raise DiceError(f"unexpected '{source[index]}' at position {index + 1}")
+        sign = -1 if source[index] == "-" else 1
+        index += 1
+    if not terms:
+        raise DiceError("expected at least one dice term such as 2d6")
+    return DiceExpression(tuple(terms), constant, source)
+
+
+@dataclass(slots=True)
+class TermResult:
+    """One rolled term. `rolls` is kept only for small rolls; large ones carry stats."""
+
+    term: DiceTerm
+    total: int
+    low: int
+    high: int
+    rolls: list[int] | None = None
+    dropped: list[int] | None = None
+    histogram: dict[int, int] | None = None
+    kept: int = 0
+
+
+@dataclass(slots=True)
+class RollResult:
+    expression: DiceExpression
+    terms: list[TermResult] = field(default_factory=list)
+
+    @property
+    def total(self) -> int:
+        return sum(r.term.sign * r.total for r in self.terms) + self.expression.constant
+
+    @property
+    def summarized(self) -> bool:
+        return any(r.rolls is None for r in self.terms)
+
+
+def check_limits(expression: DiceExpression, limits: RollLimits) -> None:
+    if len(expression.terms) > limits.max_terms:
+        raise DiceError(f"too many dice terms ({len(expression.terms)}, max {limits.max_terms})")
+    if expression.dice > limits.max_dice:
+        raise DiceError(f"too many dice ({expression.dice:,}, max {limits.max_dice:,})")
+    widest = max(term.sides for term in expression.terms)
+    if widest > limits.max_sides:
+        raise DiceError(f"too many sides ({widest:,}, max {limits.max_sides:,})")
+    for term in expression.terms:
+        if term.keep is not None and _streams(term, limits):
+            held = min(term.keep, term.count - term.keep)
+            if held > limits.max_keep:
+                raise DiceError(
+                    f"{term.text}: keeps and drops too many dice "
+                    f"({held:,}, max {limits.max_keep:,} of either)"
+                )
+
+
+def _streams(term: DiceTerm, limits: RollLimits) -> bool:
+    """Too many dice to list and too many faces to count: reduced chunk by chunk."""
+    return term.count > limits.list_limit and term.sides > COUNTED_SIDES
+
+
+def _small(term: DiceTerm, rng: random.Random) -> TermResult:
+    rolls = rng.choices(range(1, term.sides + 1), k=term.count)
+    dropped: list[int] | None = None
+    if term.keep is not None:
+        ordered = sorted(rolls, reverse=term.keep_high)
+        rolls, dropped = ordered[: term.keep], ordered[term.keep :]
+    return TermResult(
+        term,
+        sum(rolls),
+        min(rolls, default=0),
+        max(rolls, default=0),
+        rolls=rolls,
+        dropped=dropped,
+        kept=len(rolls),
+    )
+
+
+def _counted(term: DiceTerm, rng: random.Random) -> TermResult:
+    faces = range(1, term.sides + 1)
+    counts: Counter[int] = Counter()
+    remaining = term.count
+    while remaining:
+        size = min(CHUNK, remaining)
+        counts.update(rng.choices(faces, k=size))
+        remaining -= size
+    histogram = dict(sorted(counts.items()))
+    kept_counts = histogram
+    if term.keep is not None:
+        # Take `keep` dice from the high (or low) end of the per-face counts.
+        kept_counts = {}
+        need = term.keep
+        for face in sorted(histogram, reverse=term.keep_high):
+            if need == 0:
+                break
+            take = min(need, histogram[face])
+            kept_counts[face] = take
+            need -= take
+    return TermResult(
+        term,
+        sum(face * n for face, n in kept_counts.items()),
+        min(kept_counts, default=0),
+        max(kept_counts, default=0),
+        histogram=histogram,
+        kept=sum(kept_counts.values()),
+    )
+
+
+def _streamed(term: DiceTerm, rng: random.Random) -> TermResult:
+    faces = range(1, term.sides + 1)
+    total = 0
+    low = term.sides
+    high = 0
+    keep = term.count if term.keep is None else term.keep
+    # Hold whichever end is smaller. Keeping most dice holds the dropped end
+    # plus the die at the boundary, and subtracts the dropped ones at the end.
+    hold_kept = keep * 2 <= term.count
+    if hold_kept:
+        size_held = keep
+        select = heapq.nlargest if term.keep_high else heapq.nsmallest
+    else:
+        size_held = term.count - keep + 1
+        select = heapq.nsmallest if term.keep_high else heapq.nlargest
+    held: list[int] = []
+    remaining = term.count
+    while remaining:
+        size = min(CHUNK, remaining)
+        chunk = rng.choices(faces, k=size)
+        remaining -= size
+        if hold_kept:
+            held = select(size_held, held + chunk)
+            continue
+        total += sum(chunk)
+        low = min(low, min(chunk))
+        high = max(high, max(chunk))
+        if size_held > 1:
+            held = select(size_held, held + chunk)
+    if hold_kept:
+        total = sum(held)
+        low, high = min(held, default=0), max(held, default=0)
+    elif size_held > 1:
+        # `held` runs from the most extreme dropped die to the boundary die.
+        total -= sum(held[:-1])
+        if term.keep_high:
+            low = held[-1]
+        else:
+            high = held[-1]
+    return TermResult(term, total, low, high, kept=keep)
+
+
+def roll(
+    expression: DiceExpression, limits: RollLimits, rng: random.Random | None = None
+) -> RollResult:
+    """Roll every term, drawing dice in bulk with `random.choices`.
+
+    Terms of up to `limits.list_limit` dice keep their individual rolls. Larger
+    terms are reduced chunk by chunk to total, min and max (plus per-face
+    counts up to `COUNTED_SIDES` faces), so memory stays bounded by `CHUNK`
+    plus, for keep/drop terms, at most `limits.max_keep` held dice.
+    """
+    check_limits(expression, limits)
+    rng = rng or _RNG
+    result = RollResult(expression)
+    for term in expression.terms:
+        if term.count <= limits.list_limit:
+            result.terms.append(_small(term, rng))
+        elif not _streams(term, limits):
+            result.terms.append(_counted(term, rng))
+        else:
+            result.terms.append(_streamed(term, rng))
+    return result
+
+
+def _histogram_line(histogram: dict[int, int], sides: int) -> str:
+    if sides <= 20:
+        return " ".join(f"{face}:{histogram.get(face, 0)}" for face in range(1, sides + 1))
+    width = -(-sides // 10)
+    bins = []
+    for start in range(1, sides + 1, width):
+        end = min(sides, start + width - 1)
+        bins.append(f"{start}-{end}:{sum(histogram.get(f, 0) for f in range(start, end + 1))}")
+    return " ".join(bins)
+
+
+def format_roll(result: RollResult) -> str:
+    expression = result.expression
+    if expression.simple and not result.summarized:
+        (only,) = result.terms
+        return f"rolled {expression.text}: {only.rolls} (total={only.total})"
+    lines = [f"rolled {expression.text}: total={result.total}"]
+    for item in result.terms:
+        term = item.term
+        sign = "-" if term.sign < 0 else ""
+        if item.rolls is not None:
+            line = f"{sign}{term.text}: {item.rolls}"
+            if item.dropped:
+                line += f" dropped {item.dropped}"
+            lines.append(f"{line} = {item.total}")
+            continue
+        line = f"{sign}{term.text}: total={item.total} min={item.low} max={item.high}"
+        if item.kept:
+            line += f" mean={item.total / item.kept:.2f}"
+        if term.keep is not None:
+            line += f" (kept {item.kept:,} of {term.count:,})"
+        lines.append(line)
+        if item.histogram is not None:
+            lines.append(f"  {_histogram_line(item.histogram, term.sides)}")
+    if expression.constant:
+        lines.append(f"{expression.constant:+d}")
+    return "\n".join(lines)
@@ -0,0 +1,215 @@
+from __future__ import annotations
+
+import re
+from dataclasses import dataclass
+from typing import Generic, Iterable, Pattern, TypeVar
+
+T = TypeVar("T")
+
+# Flags that can be scoped to one branch of a combined alternation.
+_SCOPED_FLAGS = ((re.IGNORECASE, "i"), (re.MULTILINE, "m"), (re.DOTALL, "s"), (re.VERBOSE, "x"))
+_META = frozenset(".^$*+?{}[]\\|()")
+
+
+def _scoped(pattern: Pattern[str], case_sensitive: bool) -> str:
+    flags = "".join(
+        letter
+        for flag, letter in _SCOPED_FLAGS
+        if pattern.flags & flag or (flag is re.IGNORECASE and not case_sensitive)
+    )
+    return f"(?{flags}:{pattern.pattern})" if flags else f"(?:{pattern.pattern})"
+
+
+def _has_top_level_branch(source: str) -> bool:
+    depth = 0
+    in_class = False
+    escaped = False
+    for char in source:
+        if escaped:
+            escaped = False
+        elif char == "\\":
+            escaped = True
+        elif in_class:
+            in_class = char != "]"
+        elif char == "[":
+            in_class = True
+        elif char == "(":
+            depth += 1
+        elif char == ")":
+            depth -= 1
+        elif char == "|" and depth == 0:
+            return True
+    return False
+
+
+def leading_word(pattern: Pattern[str]) -> str | None:
+    """The literal word every match of `pattern` starts with, if it has one.
+
+    `!roll\\s+(\\d+)d(\\d+)` gives `!roll`: the pattern can only match where
+    `!roll` stands as a whole word in the text. Patterns that start with a
+    metacharacter, branch at the top level or run the word into more
+    pattern give None.
+    """
+    source = pattern.pattern
+    if pattern.flags & re.VERBOSE or _has_top_level_branch(source):
+        return None
+    start = 1 if source.startswith("^") else 0
+    end = start
+    while end < len(source) and source[end] not in _META and not source[end].isspace():
+        end += 1
+    rest = source[end:]
+    if end == start or not (rest in ("", "$") or rest.startswith(("\\s", "\\b", "$"))):
+        return None
+    return source[start:end]
+
+
+def trigger_pattern(triggers: Iterable[tuple[str | Pattern[str], bool]]) -> Pattern[str]:
+    """One regex matching the messages a `DispatchIndex` over `triggers` can route.
+
+    The runtime runs middlewares only for messages a registered trigger
+    matches, so the dispatcher registers this rather than a catch-all: chat
+    that is not a command never reaches the quota, timing or DLQ
+    middlewares. The archive reads every message off the queue instead.
+    """
+    literals: dict[bool, list[str]] = {True: [], False: []}
+    branches: list[str] = []
+    for trigger, case_sensitive in triggers:
+        if isinstance(trigger, str):
+            words = r"\s+".join(re.escape(part) for part in trigger.split())
+            literals[case_sensitive].append(words)
+        else:
+            branches.append(_scoped(trigger, case_sensitive))
+    for case_sensitive, alternatives in literals.items():
+        if alternatives:
+            literal = r"^\s*(?:" + "|".join(alternatives) + r")(?!\S)"
+            branches.append(literal if case_sensitive else f"(?i:{literal})")
+    if not branches:
+        return re.compile(r"(?!)")
+    try:
+        return re.compile("|".join(branches))
+    except re.error:
+        # Patterns that cannot share one alternation (see `DispatchIndex.compile`);
+        # fall back to offering every message to the dispatcher.
+        return re.compile(r"\S")
+
+
+@dataclass(frozen=True, slots=True)
+class DispatchIndex(Generic[T]):
+    """Immutable trigger lookup compiled once from every registered command.
+
+    Literal triggers are keyed by the message's first whitespace-separated
+    token: a case-sensitive dict is tried first, then a dict of lowercased
+    names. Pattern triggers that begin with a literal word, and literals
+    containing whitespace, are keyed by that word and searched only when it
+    appears in the message; the remaining patterns share one compiled
+    alternation. A lookup costs a few dict probes plus at most a handful of
+    regex searches however many commands are registered.
+    """
+
+    exact: dict[str, T]
+    folded: dict[str, T]
+    keyed_exact: dict[str, tuple[tuple[Pattern[str], T], ...]]
+    keyed_folded: dict[str, tuple[tuple[Pattern[str], T], ...]]
+    initials: frozenset[str]
+    pattern: Pattern[str] | None
+    pattern_targets: dict[str, T]
+    fallback: tuple[tuple[Pattern[str], T], ...]
+    size: int
+
+    @classmethod
+    def compile(
+        cls, routes: Iterable[tuple[str | Pattern[str], bool, T]]
+    ) -> DispatchIndex[T]:
+        """Build from `(trigger, case_sensitive, target)`; the first route for a trigger wins."""
+        exact: dict[str, T] = {}
+        folded: dict[str, T] = {}
+        keyed_exact: dict[str, list[tuple[Pattern[str], T]]] = {}
+        keyed_folded: dict[str, list[tuple[Pattern[str], T]]] = {}
+        floating: list[tuple[Pattern[str], bool, T]] = []
+        size = 0
+        for trigger, case_sensitive, target in routes:
+            size += 1
+            if isinstance(trigger, str) and len(trigger.split()) == 1 and trigger == trigger.strip():
+                if case_sensitive:
+                    exact.setdefault(trigger, target)
+                else:
+                    folded.setdefault(trigger.lower(), target)
+                continue
+            if isinstance(trigger, str):
+                word: str | None = trigger.split()[0]
+                escaped = r"\s+".join(re.escape(part) for part in trigger.split())
+                trigger = re.compile(r"^\s*" + escaped + r"(?!\S)")
+            else:
+                word = leading_word(trigger)
+            if word is None:
+                floating.append((trigger, case_sensitive, target))
+                continue
+            if case_sensitive and not trigger.flags & re.IGNORECASE:
+                keyed_exact.setdefault(word, []).append((trigger, target))
+            else:
+                if not trigger.flags & re.IGNORECASE:
+                    trigger = re.compile(trigger.pattern, trigger.flags | re.IGNORECASE)
+                keyed_folded.setdefault(word.lower(), []).append((trigger, target))
+
+        combined: Pattern[str] | None = None
+        targets: dict[str, T] = {}
+        fallback: tuple[tuple[Pattern[str], T], ...] = ()
+        if floating:
+            branches = []
+            for number, (pattern, case_sensitive, target) in enumerate(floating):
+                targets[f"_route{number}"] = target
+                branches.append(f"(?P<_route{number}>{_scoped(pattern, case_sensitive)})")
+            try:
+                combined = re.compile("|".join(branches))
+            except re.error:
+                # Clashing group names or global-only flags; search one by one.
+                targets = {}
+                fallback = tuple(
+                    (
+                        pattern
+                        if case_sensitive
+                        else re.compile(pattern.pattern, pattern.flags | re.IGNORECASE),
+                        target,
+                    )
+                    for pattern, case_sensitive, target in floating
+                )
+        initials = {word[0] for word in keyed_exact}
+        initials.update(char for word in keyed_folded for char in (word[0], word[0].upper()))
+        return cls(
+            exact=exact,
+            folded=folded,
+            keyed_exact={word: tuple(found) for word, found in keyed_exact.items()},
+            keyed_folded={word: tuple(found) for word, found in keyed_folded.items()},
+            initials=frozenset(initials),
+            pattern=combined,
+            pattern_targets=targets,
+            fallback=fallback,
+            size=size,
+        )
+
+    def lookup(self, text: str | None) -> T | None:
+        if not text:
+            return None
+        head = text.split(maxsplit=1)
+        if head:
+            target = self.exact.get(head[0])
+            if target is None:
+                target = self.folded.get(head[0].lower())
+            if target is not None:
+                return target
+        if self.initials:
+            for token in text.split():
+                if token[0] not in self.initials:
+                    continue
+                for pattern, target in self.keyed_exact.get(token, ()) + self.keyed_folded.get(
+                    token.lower(), ()
+                ):
+                    if pattern.search(text):
+                        return target
+        if self.pattern is not None:
+            match = self.pattern.search(text)
+            return self.pattern_targets[match.lastgroup] if match and match.lastgroup else None
+        for pattern, target in self.fallback:
+            if pattern.search(text):
+                return target
+        return None
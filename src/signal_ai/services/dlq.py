@@ -1,19 +1,531 @@
 from __future__ import annotations
 
+import asyncio
+import contextlib
+import functools
 import json
+import os
+import random
 import time
-from typing import Any, Dict, List
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Generator, Hashable, Iterable
 
 import structlog
 
 from signal_client import SignalClient
 from signal_client.observability.metrics import DLQ_BACKLOG
 from signal_client.runtime.models import QueuedMessage
+from signal_client.services.dead_letter_queue import DeadLetterQueue
+
+from ..config import AppConfig
+from ..metrics import (
+    DLQ_BUFFER_DEPTH,
+    DLQ_BUFFER_EVENTS,
+    DLQ_PARKED,
+    DLQ_REPLAY_BACKOFFS,
+    DLQ_REPLAYED,
+    DLQ_REPLAY_BATCH_SECONDS,
+)
+from .broadcast import redeliver
+
+# Handles a spooled payload itself instead of queueing it; True if it did.
+Divert = Callable[[str], Awaitable[bool]]
+# Messages whose replay count is remembered until they fail again or age out.
+_ATTEMPTS_CAPACITY = 10_000
 
 log = structlog.get_logger()
 
 
-async def replay_dlq_once() -> None:
+def _payload(record: Any) -> Any:
+    return record.get("payload") if isinstance(record, dict) else record
+
+
+def _payload_text(record: Any) -> str:
+    payload = _payload(record)
+    if isinstance(payload, dict) and "raw" in payload:
+        # dlq_middleware (and the runtime) file the envelope text under `raw`
+        # next to the failure metadata; replay just the envelope.
+        payload = payload["raw"]
+    if isinstance(payload, bytes):
+        payload = payload.decode()
+    if isinstance(payload, str):
+        # Spool lines are newline-delimited; JSON only carries bare newlines as
+        # whitespace, so re-encode compactly in that (rare) case.
+        return json.dumps(json.loads(payload)) if "\n" in payload else payload
+    return json.dumps(payload)
+
+
+def _envelope_keys(text: str) -> list[tuple[str, int]]:
+    """`(source, timestamp)` keys a replayed envelope can come back under."""
+    try:
+        envelope = json.loads(text).get("envelope")
+        timestamp = int(envelope["timestamp"])
+    except (ValueError, TypeError, KeyError, AttributeError):
+        return []
+    sources = {envelope.get(field) for field in ("source", "sourceNumber", "sourceUuid")}
+    return [(source, timestamp) for source in sources if isinstance(source, str) and source]
+
+
+class ReplayAttempts:
+    """Replay counts of messages this process fed back, keyed by `(source, timestamp)`.
+
+    The context a failing handler runs in carries nothing from the replayed
+    payload, so the replayer notes each entry's count here and dlq_middleware
+    files it with the record when the message fails again.
+    """
+
+    def __init__(self, capacity: int = _ATTEMPTS_CAPACITY) -> None:
+        self._capacity = capacity
+        self._counts: OrderedDict[tuple[str, int], int] = OrderedDict()
+
+    def note(self, text: str, attempts: int) -> None:
+        for key in _envelope_keys(text):
+            self._counts[key] = attempts
+            self._counts.move_to_end(key)
+        while len(self._counts) > self._capacity:
+            self._counts.popitem(last=False)
+
+    def pop(self, source: str | None, timestamp: int | None) -> int:
+        if source is None or timestamp is None:
+            return 0
+        return self._counts.pop((source, timestamp), 0)
+
+
+class RawEnvelopes:
+    """Websocket payloads of in-flight command messages, keyed by `(source, timestamp)`.
+
+    Middlewares get the parsed message only, so the ingest tap keeps the text
+    of every envelope a command trigger matched, and dlq_middleware takes it
+    back to file untouched under `raw`. Entries are taken whether or not the
+    handler fails; the oldest go first past `capacity`.
+    """
+
+    def __init__(self, capacity: int = _ATTEMPTS_CAPACITY) -> None:
+        self._capacity = capacity
+        self._raw: OrderedDict[tuple[str, int], str] = OrderedDict()
+
+    def note(self, source: str, timestamp: int, raw: str) -> None:
+        key = (source, timestamp)
+        self._raw[key] = raw
+        self._raw.move_to_end(key)
+        while len(self._raw) > self._capacity:
+            self._raw.popitem(last=False)
+
+    def pop(self, source: str | None, timestamp: int | None) -> str | None:
+        if source is None or timestamp is None:
+            return None
+        return self._raw.pop((source, timestamp), None)
+
+    def __len__(self) -> int:
+        return len(self._raw)
+
+
+def _spool_lines(
+    records: Iterable[Any], max_attempts: int, attempts: ReplayAttempts | None = None
+) -> tuple[list[str], list[str]]:
+    """Split ready DLQ records into payloads to replay and payloads to park.
+
+    An entry that already went through `max_attempts` replays is parked instead
+    of being replayed again, so a message that always fails (`!dlq-fail`) stops
+    cycling between the DLQ and the workers.
+    """
+    ready: list[str] = []
+    parked: list[str] = []
+    for record in records:
+        payload = _payload(record)
+        count = int(payload.get("attempts") or 0) + 1 if isinstance(payload, dict) else 1
+        text = _payload_text(record)
+        if count > max_attempts:
+            parked.append(text)
+            continue
+        ready.append(text)
+        if attempts is not None:
+            attempts.note(text, count)
+    return ready, parked
+
+
+class ReplaySpool:
+    """On-disk copy of ready DLQ payloads with a committed byte-offset cursor.
+
+    `DeadLetterQueue.replay()` hands back ready entries and drops them from
+    storage, so the spool is what makes a killed replay resumable. The
+    runtime's DLQ has no paging: `replay()` reads every ready entry into one
+    list, so a replay holds the whole ready backlog in memory until it is
+    written here. The methods do blocking file I/O; async callers run them
+    with `asyncio.to_thread`.
+    """
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        self.cursor_path = path.with_name(path.name + ".cursor")
+        self.parked_path = path.with_name(path.name + ".parked")
+
+    def exists(self) -> bool:
+        return self.path.exists()
+
+    def write(self, payloads: Iterable[str]) -> int:
+        tmp = self.path.with_name(self.path.name + ".tmp")
+        count = 0
+        with tmp.open("w", encoding="utf-8") as handle:
+            for payload in payloads:
+                handle.write(payload)
+                handle.write("\n")
+                count += 1
+            handle.flush()
+            os.fsync(handle.fileno())
+        self.commit(0)
+        os.replace(tmp, self.path)
+        return count
+
+    def park(self, payloads: Iterable[str]) -> int:
+        """Append payloads that ran out of replay attempts for manual inspection."""
+        count = 0
+        with self.parked_path.open("a", encoding="utf-8") as handle:
+            for payload in payloads:
+                handle.write(payload)
+                handle.write("\n")
+                count += 1
+        if count:
+            DLQ_PARKED.inc(count)
+            log.warning("dlq.replay_parked", count=count, path=str(self.parked_path))
+        return count
+
+    def cursor(self) -> int:
+        try:
+            return int(self.cursor_path.read_text(encoding="utf-8").strip() or 0)
+        except (FileNotFoundError, ValueError):
+            return 0
+
+    def commit(self, offset: int) -> None:
+        tmp = self.cursor_path.with_name(self.cursor_path.name + ".tmp")
+        tmp.write_text(str(offset), encoding="utf-8")
+        os.replace(tmp, self.cursor_path)
+
+    def batches(self, batch_size: int) -> Generator[tuple[list[str], int], None, None]:
+        with self.path.open("rb") as handle:
+            handle.seek(self.cursor())
+            while True:
+                batch: list[str] = []
+                for _ in range(batch_size):
+                    line = handle.readline()
+                    if not line:
+                        break
+                    text = line.decode("utf-8").rstrip("\n")
+                    if text:
+                        batch.append(text)
+                if not batch:
+                    return
+                yield batch, handle.tell()
+
+    def clear(self) -> None:
+        for path in (self.path, self.cursor_path):
+            path.unlink(missing_ok=True)
+
+
+class _InFlight:
+    """Counts queued replay messages until the worker pool acknowledges them."""
+
+    def __init__(self) -> None:
+        self._pending = 0
+        self._idle = asyncio.Event()
+        self._idle.set()
+
+    def track(self, raw: str) -> QueuedMessage:
+        self._pending += 1
+        self._idle.clear()
+        return QueuedMessage(raw=raw, enqueued_at=time.perf_counter(), ack=self._done)
+
+    def _done(self) -> None:
+        self._pending -= 1
+        if self._pending <= 0:
+            self._idle.set()
+
+    async def wait(self) -> None:
+        await self._idle.wait()
+
+
+async def _drain_spool(
+    queue: Any,
+    spool: ReplaySpool,
+    batch_size: int,
+    *,
+    mode: str,
+    pace: Callable[[], Awaitable[None]] | None = None,
+    divert: Divert | None = None,
+) -> int:
+    started = time.perf_counter()
+    total = 0
+    in_flight = _InFlight()
+    loop = asyncio.get_running_loop()
+    batches = spool.batches(batch_size)
+    read: asyncio.Future[tuple[list[str], int] | None] | None = None
+    try:
+        while True:
+            read = loop.run_in_executor(None, next, batches, None)
+            # Shielded so that after a cancellation `read` still tracks the
+            # thread, which keeps running the generator until the read returns.
+            step = await asyncio.shield(read)
+            if step is None:
+                break
+            batch, offset = step
+            batch_started = time.perf_counter()
+            for raw in batch:
+                if pace is not None:
+                    await pace()
+                if divert is not None and await divert(raw):
+                    continue
+                await queue.put(in_flight.track(raw))
+            # The batch is the in-flight window: workers finish it before the cursor
+            # moves, so a crash replays it instead of losing it. Waiting on the
+            # batch's own acks rather than `queue.join()` keeps live traffic from
+            # holding the cursor back.
+            await in_flight.wait()
+            await asyncio.to_thread(spool.commit, offset)
+
+            batch_elapsed = time.perf_counter() - batch_started
+            total += len(batch)
+            DLQ_REPLAYED.labels(mode=mode).inc(len(batch))
+            DLQ_REPLAY_BATCH_SECONDS.labels(mode=mode).observe(batch_elapsed)
+            elapsed = time.perf_counter() - started
+            log.info(
+                "dlq.replay_batch",
+                mode=mode,
+                size=len(batch),
+                batch_ms=batch_elapsed * 1000,
+                replayed=total,
+                rate_per_s=total / elapsed if elapsed > 0 else 0.0,
+            )
+    finally:
+        if read is None or read.done():
+            batches.close()
+        else:
+            # Cancelled mid-read: closing a generator while another thread is
+            # executing it raises ValueError over the CancelledError.
+            _close_after(read, batches)
+    return total
+
+
+def _close_after(read: asyncio.Future[Any], generator: Generator[Any, None, None]) -> None:
+    def close(done: asyncio.Future[Any]) -> None:
+        if not done.cancelled():
+            done.exception()  # the drain was cancelled; nothing awaits this read
+        generator.close()
+
+    read.add_done_callback(close)
+
+
+class BufferedDlqWriter:
+    """Bounded, coalescing buffer in front of the DLQ.
+
+    Workers call `submit()` without awaiting storage; a background task
+    flushes buffered failures in batches. Failures for the same
+    `(source, timestamp)` collapse into one entry, the oldest entry is
+    evicted once `capacity` is reached, and past half capacity new failures
+    are admitted with probability `storm_sample_rate`.
+    """
+
+    def __init__(
+        self,
+        dlq: DeadLetterQueue,
+        *,
+        capacity: int,
+        batch_size: int,
+        flush_interval: float,
+        storm_sample_rate: float = 1.0,
+    ) -> None:
+        self._dlq = dlq
+        self._capacity = capacity
+        self._batch_size = batch_size
+        self._flush_interval = flush_interval
+        self._storm_sample_rate = storm_sample_rate
+        self._pending: OrderedDict[Hashable, Any] = OrderedDict()
+        self._wakeup = asyncio.Event()
+        self._task: asyncio.Task[None] | None = None
+        self._stopping = False
+        self._seq = 0
+
+    def __len__(self) -> int:
+        return len(self._pending)
+
+    def submit(self, key: Hashable | None, payload: Any) -> None:
+        if key is None:
+            self._seq += 1
+            key = ("anon", self._seq)
+        if key in self._pending:
+            DLQ_BUFFER_EVENTS.labels(outcome="coalesced").inc()
+            return
+        if (
+            len(self._pending) * 2 >= self._capacity
+            and random.random() >= self._storm_sample_rate
+        ):
+            DLQ_BUFFER_EVENTS.labels(outcome="sampled_out").inc()
+            return
+        if len(self._pending) >= self._capacity:
+            self._pending.popitem(last=False)
+            DLQ_BUFFER_EVENTS.labels(outcome="dropped").inc()
+        self._pending[key] = payload
+        DLQ_BUFFER_DEPTH.set(len(self._pending))
+        if len(self._pending) >= self._batch_size:
+            self._wakeup.set()
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run(), name="signal_ai.dlq_writer")
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            # Wake the loop and let it finish its pass instead of cancelling it:
+            # on 3.11, cancelling `wait_for` as its timeout fires can hang.
+            self._stopping = True
+            self._wakeup.set()
+            await self._task
+            self._task = None
+        while self._pending:
+            await self.flush()
+
+    async def flush(self) -> int:
+        batch: list[Any] = []
+        while self._pending and len(batch) < self._batch_size:
+            batch.append(self._pending.popitem(last=False)[1])
+        DLQ_BUFFER_DEPTH.set(len(self._pending))
+        flushed = 0
+        for payload in batch:
+            try:
+                await self._dlq.send(payload)
+            except Exception as exc:  # noqa: BLE001
+                DLQ_BUFFER_EVENTS.labels(outcome="failed").inc()
+                log.warning("dlq.flush_failed", error=str(exc))
+            else:
+                flushed += 1
+        if flushed:
+            DLQ_BUFFER_EVENTS.labels(outcome="flushed").inc(flushed)
+        return flushed
+
+    async def _run(self) -> None:
+        while not self._stopping:
+            with contextlib.suppress(asyncio.TimeoutError):
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self._flush_interval)
+            self._wakeup.clear()
+            while self._pending:
+                await self.flush()
+
+
+class DlqReplayer:
+    """Background task that trickles ready DLQ entries into the live queue.
+
+    Entries are spooled exactly like the one-shot replay, then paced at
+    `rate` per second. Feeding stops while the runtime queue is above the
+    high watermark or intake is paused, so replays never compete with a
+    saturated live path. Entries replayed `max_attempts` times are parked
+    next to the spool instead of being fed back again; `attempts` is shared
+    with dlq_middleware to carry the count across a repeated failure.
+    """
+
+    def __init__(
+        self,
+        bot: SignalClient,
+        spool_path: Path,
+        *,
+        interval: float,
+        rate: float,
+        high_watermark: float,
+        batch_size: int,
+        max_attempts: int,
+        attempts: ReplayAttempts | None = None,
+        divert: Divert | None = None,
+    ) -> None:
+        self._bot = bot
+        self._spool = ReplaySpool(spool_path)
+        self._interval = interval
+        self._delay = 1.0 / rate if rate > 0 else 0.0
+        self._high_watermark = high_watermark
+        self._batch_size = batch_size
+        self._max_attempts = max_attempts
+        self._attempts = attempts
+        self._divert = divert
+        self._task: asyncio.Task[None] | None = None
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run(), name="signal_ai.dlq_replayer")
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._task.cancel()
+        with contextlib.suppress(asyncio.CancelledError):
+            await self._task
+        self._task = None
+
+    def _queue_high(self) -> bool:
+        queue = self._bot.app.queue
+        limit = self._bot.settings.queue_size
+        return bool(queue is not None and limit and queue.qsize() >= limit * self._high_watermark)
+
+    def saturated(self) -> bool:
+        if self._queue_high():
+            return True
+        controller = self._bot.app.intake_controller
+        # The intake controller keeps its pause deadline on the monotonic clock.
+        return (
+            controller is not None
+            and controller.snapshot().get("paused_until", 0.0) > time.monotonic()
+        )
+
+    async def _pace(self) -> None:
+        controller = self._bot.app.intake_controller
+        if controller is not None:
+            await controller.wait_if_paused()
+        backoff = self._delay or 0.1
+        while self._queue_high():
+            DLQ_REPLAY_BACKOFFS.inc()
+            await asyncio.sleep(backoff)
+            backoff = min(backoff * 2, self._interval or 5.0)
+        if self._delay:
+            await asyncio.sleep(self._delay)
+
+    async def run_once(self) -> int:
+        dlq = self._bot.app.dead_letter_queue
+        queue = self._bot.app.queue
+        if dlq is None or queue is None:
+            return 0
+        if not self._spool.exists():
+            if self.saturated():
+                DLQ_REPLAY_BACKOFFS.inc()
+                return 0
+            # No paging in the runtime's DLQ: this loads every ready entry.
+            records = await dlq.replay()
+            if not records:
+                return 0
+            ready, parked = _spool_lines(records, self._max_attempts, self._attempts)
+            del records
+            await asyncio.to_thread(self._spool.park, parked)
+            if not ready:
+                return 0
+            await asyncio.to_thread(self._spool.write, ready)
+            del ready
+        count = await _drain_spool(
+            queue, self._spool, self._batch_size, mode="live", pace=self._pace, divert=self._divert
+        )
+        await asyncio.to_thread(self._spool.clear)
+        return count
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                count = await self.run_once()
+            except asyncio.CancelledError:
+                raise
+            except Exception as exc:  # noqa: BLE001
+                log.warning("dlq.replayer_failed", error=str(exc))
+            else:
+                if count:
+                    log.info("dlq.replayer_cycle", count=count)
+            await asyncio.sleep(self._interval)
+
+
+async def replay_dlq_once(config: AppConfig) -> None:
     overrides: dict[str, object] = {}
     async with SignalClient(config=overrides) as bot:
         if bot.app.dead_letter_queue is None:
@@ -21,23 +533,45 @@ async def replay_dlq_once() -> None:
         if bot.app.queue is None or bot.app.worker_pool is None:
             raise RuntimeError("Runtime not initialized; queue/worker_pool missing.")
 
-        ready: List[Dict[str, Any]] = await bot.app.dead_letter_queue.replay()
-        if not ready:
-            log.info("dlq.empty")
-            return
+        spool = ReplaySpool(Path(config.dlq_replay_spool))
+        if spool.exists():
+            log.info("dlq.replay_resume", spool=str(spool.path), cursor=spool.cursor())
+        else:
+            # No paging in the runtime's DLQ: this loads every ready entry.
+            records = await bot.app.dead_letter_queue.replay()
+            if not records:
+                log.info("dlq.empty")
+                return
+            ready, parked = _spool_lines(records, config.dlq_replay_max_attempts)
+            del records
+            await asyncio.to_thread(spool.park, parked)
+            if not ready:
+                return
+            count = await asyncio.to_thread(spool.write, ready)
+            del ready
+            log.info("dlq.replay_spooled", count=count, spool=str(spool.path))
 
-        queue = bot.app.queue
         worker_pool = bot.app.worker_pool
-
-        for record in ready:
-            payload = record.get("payload") if isinstance(record, dict) else record
-            raw = payload if isinstance(payload, str) else json.dumps(payload)
-            await queue.put(QueuedMessage(raw=raw, enqueued_at=time.perf_counter()))  # type: ignore[arg-type]
-
+        started = time.perf_counter()
         worker_pool.start()
-        await queue.join()
-        worker_pool.stop()
-        await worker_pool.join()
+        try:
+            count = await _drain_spool(
+                bot.app.queue,
+                spool,
+                config.dlq_replay_batch_size,
+                mode="once",
+                divert=functools.partial(redeliver, bot.api_clients.messages.send),
+            )
+        finally:
+            worker_pool.stop()
+            await worker_pool.join()
+        await asyncio.to_thread(spool.clear)
 
+        elapsed = time.perf_counter() - started
         DLQ_BACKLOG.labels(queue=bot.settings.dlq_name).set(0)
-        log.info("dlq.replayed", count=len(ready))
+        log.info(
+            "dlq.replayed",
+            count=count,
+            elapsed_s=elapsed,
+            rate_per_s=count / elapsed if elapsed > 0 else 0.0,
+        )
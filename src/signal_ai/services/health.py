@@ -1,5 +1,7 @@
 from __future__ import annotations
 
+import asyncio
+import contextlib
 import subprocess
 import sys
 import time
@@ -12,6 +14,7 @@ from signal_client import SignalClient
 from signal_client.config import Settings
 
 from ..config import AppConfig
+from .http import SharedHttpSession
 
 log = structlog.get_logger()
 
@@ -45,7 +48,7 @@ def ensure_signal_api_running(auto_start: bool) -> None:
         log.info("signal_api.ensure_running", stdout=result.stdout.strip())
 
 
-def _build_ws_url(settings: Settings) -> str:
+def receive_ws_url(settings: Settings) -> str:
     service_url = settings.signal_service.rstrip("/")
     if service_url.startswith("https://"):
         ws_base = f"wss://{service_url[len('https://'):]}"
@@ -57,23 +60,38 @@ def _build_ws_url(settings: Settings) -> str:
     return f"{ws_base}{ws_path}"
 
 
-async def health_check(settings: Settings, timeout: float) -> None:
-    service_url = settings.signal_service.rstrip("/")
-    http_url = f"{service_url}/v1/health"
-    ws_url = _build_ws_url(settings)
-    timeout_obj = aiohttp.ClientTimeout(total=timeout)
-
-    async with aiohttp.ClientSession(timeout=timeout_obj) as session:
-        async with session.get(http_url) as resp:
-            body = await resp.text()
-            if not 200 <= resp.status < 300:
-                message = f"HTTP health failed ({resp.status}): {body}"
-                raise RuntimeError(message)
-
-    async with aiohttp.ClientSession(timeout=timeout_obj) as session:
-        async with session.ws_connect(ws_url, heartbeat=10) as ws:
+async def check_http_health(
+    settings: Settings, timeout: float, session: aiohttp.ClientSession
+) -> None:
+    http_url = f"{settings.signal_service.rstrip('/')}/v1/health"
+    async with session.get(http_url, timeout=aiohttp.ClientTimeout(total=timeout)) as resp:
+        body = await resp.text()
+        if not 200 <= resp.status < 300:
+            message = f"HTTP health failed ({resp.status}): {body}"
+            raise RuntimeError(message)
+
+
+async def check_ws_health(
+    settings: Settings, timeout: float, session: aiohttp.ClientSession
+) -> None:
+    async def probe() -> None:
+        async with session.ws_connect(receive_ws_url(settings), heartbeat=10) as ws:
             await ws.close()
 
+    await asyncio.wait_for(probe(), timeout)
+
+
+async def health_check(
+    settings: Settings, timeout: float, http: SharedHttpSession | None = None
+) -> None:
+    async with contextlib.AsyncExitStack() as stack:
+        if http is not None:
+            session = http.session
+        else:
+            session = await stack.enter_async_context(aiohttp.ClientSession())
+        await check_http_health(settings, timeout, session)
+        await check_ws_health(settings, timeout, session)
+
 
 async def warm_api_session(bot: SignalClient) -> None:
     started = time.perf_counter()
@@ -90,7 +108,12 @@ async def report_status(config: AppConfig) -> None:
     settings = Settings.from_sources(config={})
     http_health_ok = True
     try:
-        await health_check(settings, timeout=config.health_timeout)
+        async with SharedHttpSession(
+            limit=config.http_pool_limit,
+            limit_per_host=config.http_pool_limit_per_host,
+            dns_ttl=config.http_dns_ttl,
+        ) as http:
+            await health_check(settings, timeout=config.health_timeout, http=http)
     except Exception as exc:  # noqa: BLE001
         http_health_ok = False
         log.error("signal_ai.health_check_failed", error=str(exc))
@@ -0,0 +1,77 @@
+from __future__ import annotations
+
+from types import SimpleNamespace
+from typing import Any
+
+import aiohttp
+
+from ..metrics import HTTP_CONNECTIONS
+
+
+async def _on_connection_create_end(
+    session: aiohttp.ClientSession, ctx: SimpleNamespace, params: Any
+) -> None:
+    HTTP_CONNECTIONS.labels(outcome="new").inc()
+
+
+async def _on_connection_reuseconn(
+    session: aiohttp.ClientSession, ctx: SimpleNamespace, params: Any
+) -> None:
+    HTTP_CONNECTIONS.labels(outcome="reused").inc()
+
+
+class SharedHttpSession:
+    """App-wide aiohttp session for ad-hoc requests outside the signal-client API clients.
+
+    One keep-alive connector with DNS caching is shared by health checks and
+    helpers such as `!contacts fault`; connection reuse is exported as
+    `signal_ai_http_connections_total{outcome="new|reused"}`.
+    """
+
+    def __init__(
+        self,
+        *,
+        limit: int = 100,
+        limit_per_host: int = 20,
+        dns_ttl: int = 300,
+        keepalive_timeout: float = 30.0,
+    ) -> None:
+        self._limit = limit
+        self._limit_per_host = limit_per_host
+        self._dns_ttl = dns_ttl
+        self._keepalive_timeout = keepalive_timeout
+        self._session: aiohttp.ClientSession | None = None
+
+    @property
+    def session(self) -> aiohttp.ClientSession:
+        if self._session is None or self._session.closed:
+            raise RuntimeError("Shared HTTP session is not open.")
+        return self._session
+
+    async def open(self) -> SharedHttpSession:
+        if self._session is None or self._session.closed:
+            trace = aiohttp.TraceConfig()
+            trace.on_connection_create_end.append(_on_connection_create_end)
+            trace.on_connection_reuseconn.append(_on_connection_reuseconn)
+            connector = aiohttp.TCPConnector(
+                limit=self._limit,
+                limit_per_host=self._limit_per_host,
+                ttl_dns_cache=self._dns_ttl,
+                use_dns_cache=True,
+                keepalive_timeout=self._keepalive_timeout,
+            )
+            self._session = aiohttp.ClientSession(
+                connector=connector, trace_configs=[trace]
+            )
+        return self
+
+    async def close(self) -> None:
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    async def __aenter__(self) -> SharedHttpSession:
+        return await self.open()
+
+    async def __aexit__(self, *exc_info: object) -> None:
+        await self.close()
@@ -0,0 +1,101 @@
+from __future__ import annotations
+
+import asyncio
+import json
+from typing import TYPE_CHECKING, Any, NamedTuple, Pattern
+
+if TYPE_CHECKING:
+    from .archive import MessageArchive
+    from .dlq import RawEnvelopes
+
+
+class Envelope(NamedTuple):
+    """The fields of a received envelope the ingest path needs, without a full parse."""
+
+    conversation: str
+    source: str
+    timestamp: int
+    body: str | None
+
+
+def parse_envelope(raw: str) -> Envelope | None:
+    """Sender, timestamp and text of a websocket payload; None if it is not an envelope.
+
+    Follows the runtime's parser: the text comes from `dataMessage`, or from
+    `syncMessage.sentMessage` for messages sent from the account's own
+    devices, and group traffic belongs to the group's conversation.
+    """
+    try:
+        envelope = json.loads(raw)["envelope"]
+        source = envelope["source"]
+        timestamp = int(envelope["timestamp"])
+    except (ValueError, TypeError, KeyError):
+        return None
+    if not isinstance(source, str) or not source:
+        return None
+    message = envelope.get("dataMessage")
+    if not isinstance(message, dict):
+        sync = envelope.get("syncMessage")
+        message = sync.get("sentMessage") if isinstance(sync, dict) else None
+    if not isinstance(message, dict):
+        return Envelope(source, source, timestamp, None)
+    group = message.get("groupInfo")
+    group_id = group.get("groupId") if isinstance(group, dict) else None
+    body = message.get("message")
+    return Envelope(
+        group_id if isinstance(group_id, str) and group_id else source,
+        source,
+        timestamp,
+        body if isinstance(body, str) and body else None,
+    )
+
+
+class IngestTap:
+    """Sees every envelope as the worker pool takes it off the runtime queue.
+
+    The runtime runs middlewares only for messages a command trigger matches,
+    so anything that has to see ordinary chat hooks in here, before routing:
+    the message archive gets every text message, commands or not. Live
+    traffic, supervisor-fed envelopes and DLQ replays all pass through the
+    same queue; the archive drops replayed duplicates.
+
+    With `raw_envelopes`, the untouched payload of each message `trigger`
+    matches (every message when None) is kept for dlq_middleware.
+    """
+
+    def __init__(
+        self,
+        *,
+        archive: MessageArchive | None = None,
+        raw_envelopes: RawEnvelopes | None = None,
+        trigger: Pattern[str] | None = None,
+    ) -> None:
+        self._archive = archive
+        self._raw_envelopes = raw_envelopes
+        self._trigger = trigger
+
+    def install(self, queue: asyncio.Queue[Any]) -> None:
+        """Wrap `queue.get`, the call the worker pool's distributor takes messages with."""
+        get = queue.get
+
+        async def tapped_get() -> Any:
+            item = await get()
+            raw = getattr(item, "raw", None)
+            if isinstance(raw, str):
+                self.observe(raw)
+            return item
+
+        queue.get = tapped_get  # type: ignore[method-assign]
+
+    def observe(self, raw: str) -> None:
+        envelope = parse_envelope(raw)
+        if envelope is None or envelope.body is None:
+            return
+        if self._archive is not None:
+            self._archive.submit(
+                envelope.conversation, envelope.source, envelope.timestamp, envelope.body
+            )
+        if self._raw_envelopes is not None and (
+            self._trigger is None or self._trigger.search(envelope.body)
+        ):
+            self._raw_envelopes.note(envelope.source, envelope.timestamp, raw)
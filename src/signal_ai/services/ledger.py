@@ -0,0 +1,235 @@
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import sqlite3
+import zlib
+from typing import TYPE_CHECKING, Protocol
+
+import structlog
+
+from ..storage import SqliteDatabase
+
+if TYPE_CHECKING:
+    from redis.asyncio import Redis
+
+log = structlog.get_logger()
+
+# Stay under SQLITE_MAX_VARIABLE_NUMBER on older builds (999).
+_SQLITE_MAX_PARAMS = 900
+
+
+class LedgerStore(Protocol):
+    async def load(self, users: list[str]) -> dict[str, int]:
+        """Stored balances for the users that have one."""
+        ...
+
+    async def apply(self, deltas: dict[str, int], initial: int) -> dict[str, int]:
+        """Add each delta (seeding missing users with `initial`); return the new balances."""
+        ...
+
+    async def close(self) -> None: ...
+
+
+class SqliteLedgerStore:
+    """Balances in `signal_ai_balances`, one upsert per user inside a single transaction."""
+
+    def __init__(self, db: SqliteDatabase) -> None:
+        self._db = db
+        self._ready = False
+
+    async def _ensure_schema(self) -> None:
+        if self._ready:
+            return
+        await self._db.run(
+            lambda conn: conn.execute(
+                "CREATE TABLE IF NOT EXISTS signal_ai_balances "
+                "(user TEXT PRIMARY KEY, balance INTEGER NOT NULL)"
+            )
+        )
+        self._ready = True
+
+    async def load(self, users: list[str]) -> dict[str, int]:
+        await self._ensure_schema()
+
+        def select(conn: sqlite3.Connection) -> dict[str, int]:
+            found: dict[str, int] = {}
+            for start in range(0, len(users), _SQLITE_MAX_PARAMS):
+                chunk = users[start : start + _SQLITE_MAX_PARAMS]
+                marks = ",".join("?" * len(chunk))
+                found.update(
+                    conn.execute(
+                        f"SELECT user, balance FROM signal_ai_balances WHERE user IN ({marks})",
+                        chunk,
+                    )
+                )
+            return found
+
+        return await self._db.run(select)
+
+    async def apply(self, deltas: dict[str, int], initial: int) -> dict[str, int]:
+        await self._ensure_schema()
+
+        def upsert(conn: sqlite3.Connection) -> dict[str, int]:
+            balances: dict[str, int] = {}
+            for user, delta in deltas.items():
+                (balances[user],) = conn.execute(
+                    "INSERT INTO signal_ai_balances (user, balance) VALUES (?, ?) "
+                    "ON CONFLICT(user) DO UPDATE SET balance = balance + ? "
+                    "RETURNING balance",
+                    (user, initial + delta, delta),
+                ).fetchone()
+            return balances
+
+        return await self._db.transaction(upsert)
+
+    async def close(self) -> None:
+        # The database is shared with other stores; its owner closes it.
+        return None
+
+
+class RedisLedgerStore:
+    """Balances in Redis hashes sharded by user, updated with `HSETNX` + `HINCRBY`.
+
+    `HINCRBY` is atomic on the server, so concurrent processes never lose an
+    increment and no distributed lock is needed.
+    """
+
+    def __init__(self, redis: Redis, *, prefix: str = "signal_ai:balances", shards: int = 16) -> None:
+        self._redis = redis
+        self._prefix = prefix
+        self._shards = max(1, shards)
+
+    def _key(self, user: str) -> str:
+        return f"{self._prefix}:{zlib.crc32(user.encode()) % self._shards}"
+
+    async def load(self, users: list[str]) -> dict[str, int]:
+        async with self._redis.pipeline(transaction=False) as pipe:
+            for user in users:
+                pipe.hget(self._key(user), user)
+            values = await pipe.execute()
+        return {user: int(value) for user, value in zip(users, values) if value is not None}
+
+    async def apply(self, deltas: dict[str, int], initial: int) -> dict[str, int]:
+        async with self._redis.pipeline(transaction=True) as pipe:
+            for user, delta in deltas.items():
+                key = self._key(user)
+                pipe.hsetnx(key, user, initial)
+                pipe.hincrby(key, user, delta)
+            results = await pipe.execute()
+        return {user: int(value) for user, value in zip(deltas, results[1::2])}
+
+    async def close(self) -> None:
+        await self._redis.aclose()
+
+
+class WriteBehindLedger:
+    """Per-user integer balances with an in-memory cache in front of a store.
+
+    Increments update the cache and return immediately; deltas are flushed to
+    the store in one batch every `flush_interval` seconds and on `stop()`.
+    Updates happen between awaits on the event loop, so no lock is taken per
+    message. With `flush_interval <= 0` each increment is written through and
+    the store's value is returned, which keeps several processes sharing a
+    Redis store in agreement. Without a store balances live in memory only.
+    """
+
+    def __init__(
+        self,
+        store: LedgerStore | None,
+        *,
+        initial: int = 100,
+        flush_interval: float = 1.0,
+    ) -> None:
+        self._store = store
+        self._initial = initial
+        self._flush_interval = flush_interval
+        self._values: dict[str, int] = {}
+        self._pending: dict[str, int] = {}
+        self._loading: dict[str, asyncio.Future[None]] = {}
+        self._loader: asyncio.Task[None] | None = None
+        self._task: asyncio.Task[None] | None = None
+        self._flush_lock = asyncio.Lock()
+        self._wakeup = asyncio.Event()
+        self._stopping = False
+
+    async def _load(self, user: str) -> None:
+        if user in self._values:
+            return
+        future = self._loading.get(user)
+        if future is None:
+            future = asyncio.get_running_loop().create_future()
+            self._loading[user] = future
+            if self._loader is None:
+                # Users missed within the same loop iteration share one store read.
+                self._loader = asyncio.create_task(self._load_batch())
+        await asyncio.shield(future)
+
+    async def _load_batch(self) -> None:
+        await asyncio.sleep(0)
+        batch, self._loading = self._loading, {}
+        self._loader = None
+        try:
+            stored = await self._store.load(list(batch)) if self._store is not None else {}
+        except Exception as exc:
+            for future in batch.values():
+                future.set_exception(exc)
+                # Mark retrieved so waiters that were cancelled do not warn.
+                future.exception()
+            return
+        for user, future in batch.items():
+            self._values.setdefault(user, stored.get(user, self._initial))
+            future.set_result(None)
+
+    async def increment(self, user: str, delta: int) -> int:
+        if self._store is not None and self._flush_interval <= 0:
+            balances = await self._store.apply({user: delta}, self._initial)
+            self._values[user] = balances[user]
+            return balances[user]
+        await self._load(user)
+        self._values[user] += delta
+        self._pending[user] = self._pending.get(user, 0) + delta
+        return self._values[user]
+
+    async def flush(self) -> int:
+        if self._store is None:
+            self._pending.clear()
+            return 0
+        async with self._flush_lock:
+            if not self._pending:
+                return 0
+            batch, self._pending = self._pending, {}
+            try:
+                balances = await self._store.apply(batch, self._initial)
+            except Exception:
+                for user, delta in batch.items():
+                    self._pending[user] = self._pending.get(user, 0) + delta
+                log.exception("ledger.flush_failed", users=len(batch))
+                return 0
+            # Adopt the store's view (other processes may have written too),
+            # keeping any increments that arrived while the batch was in flight.
+            for user, value in balances.items():
+                self._values[user] = value + self._pending.get(user, 0)
+            return len(batch)
+
+    def start(self) -> None:
+        if self._task is None and self._store is not None and self._flush_interval > 0:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            # Wake the loop and let it exit after its flush: cancelling it
+            # mid-flush would lose the batch it had already taken.
+            self._stopping = True
+            self._wakeup.set()
+            await self._task
+            self._task = None
+        await self.flush()
+        if self._store is not None:
+            await self._store.close()
+
+    async def _run(self) -> None:
+        while not self._stopping:
+            with contextlib.suppress(asyncio.TimeoutError):
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self._flush_interval)
+            await self.flush()
@@ -0,0 +1,143 @@
+from __future__ import annotations
+
+import asyncio
+from typing import Any, Awaitable, Callable
+
+import structlog
+
+from ..metrics import REPLY_BATCH_SIZE
+
+log = structlog.get_logger()
+
+# Signal turns longer bodies into a long-text attachment; stay below that.
+MAX_MERGED_CHARS = 2000
+
+Send = Callable[[Any], Awaitable[Any]]
+
+
+def _plain_text(request: Any) -> str | None:
+    """The message text when `request` is a bare text reply, else None."""
+    dump = getattr(request, "model_dump", None)
+    if dump is None:
+        return None
+    fields = dump(exclude_defaults=True, exclude_none=True)
+    message = fields.pop("message", None)
+    if not isinstance(message, str) or fields.pop("recipients", None) or fields:
+        return None
+    return message
+
+
+class ReplyLane:
+    """Ordered outbound messages for one incoming message, merging text bursts.
+
+    Consecutive plain-text messages issued through the same send function
+    within `window` seconds are joined into one message (up to
+    `MAX_MERGED_CHARS`); `submit()` returns None for them without waiting for
+    the API, and a failed merged send is logged and re-raised by `drain()`.
+    Anything else (attachments, mentions, quotes, stickers) flushes the
+    pending text first and goes out on its own; `submit()` returns a task
+    that resolves to that send's own result or error. Sends run one after
+    another, so the conversation sees messages in call order.
+    """
+
+    def __init__(self, *, window: float) -> None:
+        self._window = window
+        self._texts: list[str] = []
+        self._first: Any = None
+        self._send: Send | None = None
+        self._length = 0
+        self._timer: asyncio.TimerHandle | None = None
+        self._tail: asyncio.Task[Any] | None = None
+        self._error: BaseException | None = None
+
+    def submit(self, send: Send, request: Any) -> asyncio.Task[Any] | None:
+        text = _plain_text(request)
+        if text is None:
+            self.flush()
+            return self._enqueue(send, request, 1, merged=False)
+        if self._texts and (
+            send != self._send or self._length + 1 + len(text) > MAX_MERGED_CHARS
+        ):
+            self.flush()
+        if not self._texts:
+            self._first, self._send = request, send
+            self._timer = asyncio.get_running_loop().call_later(self._window, self.flush)
+        self._texts.append(text)
+        self._length += len(text) + (1 if len(self._texts) > 1 else 0)
+        return None
+
+    def flush(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if not self._texts or self._send is None:
+            return
+        texts, first, send = self._texts, self._first, self._send
+        self._texts, self._first, self._send, self._length = [], None, None, 0
+        request = first if len(texts) == 1 else first.model_copy(update={"message": "\n".join(texts)})
+        self._enqueue(send, request, len(texts), merged=True)
+
+    def _enqueue(self, send: Send, request: Any, replies: int, *, merged: bool) -> asyncio.Task[Any]:
+        self._tail = asyncio.create_task(
+            self._send_after(self._tail, send, request, replies, merged)
+        )
+        return self._tail
+
+    async def _send_after(
+        self,
+        previous: asyncio.Task[Any] | None,
+        send: Send,
+        request: Any,
+        replies: int,
+        merged: bool,
+    ) -> Any:
+        if previous is not None:
+            await asyncio.wait([previous])
+        try:
+            result = await send(request)
+        except Exception as exc:  # noqa: BLE001
+            if not merged:
+                # The caller awaits this send and handles its failure.
+                raise
+            log.warning("reply.send_failed", error=str(exc), replies=replies)
+            if self._error is None:
+                self._error = exc
+            return None
+        REPLY_BATCH_SIZE.observe(replies)
+        return result
+
+    async def drain(self) -> None:
+        self.flush()
+        if self._tail is not None:
+            await asyncio.wait([self._tail])
+        if self._error is not None:
+            raise self._error
+
+
+class CoalescingContext:
+    """Delegates to a `Context`, routing `reply()` and `send()` through a `ReplyLane`.
+
+    A plain-text `reply()`/`send()` returns None as soon as it is queued for
+    merging: it gets no send response, and its failure surfaces when the
+    middleware drains the lane after the handler. Other requests return their
+    own response (or raise) once they went out behind the queued text. The
+    context's `reply_text`/`send_text` helpers call the wrapped context
+    directly and are not coalesced.
+    """
+
+    def __init__(self, ctx: Any, lane: ReplyLane) -> None:
+        self._ctx = ctx
+        self._lane = lane
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._ctx, name)
+
+    async def reply(self, request: Any) -> Any:
+        return await self._submit(self._ctx.reply, request)
+
+    async def send(self, request: Any) -> Any:
+        return await self._submit(self._ctx.send, request)
+
+    async def _submit(self, send: Send, request: Any) -> Any:
+        pending = self._lane.submit(send, request)
+        return None if pending is None else await pending
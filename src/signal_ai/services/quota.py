@@ -0,0 +1,223 @@
+from __future__ import annotations
+
+import math
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Callable, Protocol, Sequence
+
+import structlog
+
+from ..metrics import QUOTA_BUCKETS, QUOTA_THROTTLED
+
+if TYPE_CHECKING:
+    from redis.asyncio import Redis
+
+log = structlog.get_logger()
+
+
+@dataclass(frozen=True, slots=True)
+class QuotaPolicy:
+    rate: float
+    burst: float
+
+    @property
+    def enabled(self) -> bool:
+        return self.rate > 0 and self.burst >= 1
+
+    @property
+    def refill_seconds(self) -> float:
+        """Time for an empty bucket to refill; idle buckets older than this are full."""
+        return self.burst / self.rate
+
+
+# One bucket to spend from: (key, policy).
+Bucket = tuple[str, QuotaPolicy]
+# Index of the first empty bucket and whether this is its first denial in the
+# current notice window; None when a token was spent from every bucket.
+Denial = tuple[int, bool]
+
+
+@dataclass(frozen=True, slots=True)
+class Throttled:
+    scope: str
+    # True once per refill window of the bucket, so the sender is told to slow
+    # down once instead of after every dropped message.
+    notify: bool
+
+
+class QuotaLimiter(Protocol):
+    async def acquire(self, buckets: Sequence[Bucket]) -> Denial | None:
+        """Spend one token from every bucket, or from none if any is empty."""
+        ...
+
+    async def close(self) -> None: ...
+
+
+class MemoryQuotaLimiter:
+    """In-process token buckets with LRU eviction of idle keys.
+
+    A bucket untouched for its policy's `refill_seconds` is indistinguishable
+    from a new one, so it is dropped; eviction pops from the cold end of the
+    LRU and is amortised O(1) per call. A bucket is
+    `[tokens, updated_at, refill_seconds, notice_until]`.
+    """
+
+    def __init__(self, clock: Callable[[], float] | None = None) -> None:
+        self._clock = clock or time.monotonic
+        self._buckets: OrderedDict[str, list[float]] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+    def _refill(self, key: str, policy: QuotaPolicy, now: float) -> list[float]:
+        buckets = self._buckets
+        bucket = buckets.get(key)
+        if bucket is None:
+            bucket = buckets[key] = [policy.burst, now, policy.refill_seconds, 0.0]
+        else:
+            buckets.move_to_end(key)
+            bucket[0] = min(policy.burst, bucket[0] + (now - bucket[1]) * policy.rate)
+            bucket[1] = now
+        return bucket
+
+    def take(self, buckets: Sequence[Bucket]) -> Denial | None:
+        now = self._clock()
+        states = [self._refill(key, policy, now) for key, policy in buckets]
+        self._evict(now)
+        for index, state in enumerate(states):
+            if state[0] < 1:
+                notify = now >= state[3]
+                if notify:
+                    state[3] = now + state[2]
+                return index, notify
+        for state in states:
+            state[0] -= 1
+        return None
+
+    def _evict(self, now: float) -> None:
+        buckets = self._buckets
+        # At most two per call keeps the hot path bounded while still draining.
+        for _ in range(2):
+            if not buckets:
+                return
+            key, bucket = next(iter(buckets.items()))
+            if now - bucket[1] < bucket[2]:
+                return
+            del buckets[key]
+
+    async def acquire(self, buckets: Sequence[Bucket]) -> Denial | None:
+        denial = self.take(buckets)
+        QUOTA_BUCKETS.labels(backend="memory").set(len(self._buckets))
+        return denial
+
+    async def close(self) -> None:
+        self._buckets.clear()
+
+
+# ARGV holds (rate, burst, ttl_ms) per key. Returns {0} when every bucket had a
+# token and one was spent from each, else {index, notify} for the first empty
+# bucket (1-based) with nothing spent.
+_TOKEN_BUCKET_LUA = """
+if redis.replicate_commands then redis.replicate_commands() end
+local clock = redis.call('TIME')
+local now = tonumber(clock[1]) + tonumber(clock[2]) / 1000000
+local tokens = {}
+local denied = 0
+for i, key in ipairs(KEYS) do
+  local rate = tonumber(ARGV[i * 3 - 2])
+  local burst = tonumber(ARGV[i * 3 - 1])
+  local state = redis.call('HMGET', key, 't', 'ts')
+  local t = tonumber(state[1])
+  if t == nil then
+    t = burst
+  else
+    t = math.min(burst, t + (now - tonumber(state[2])) * rate)
+  end
+  if t < 1 and denied == 0 then
+    denied = i
+  end
+  tokens[i] = t
+end
+for i, key in ipairs(KEYS) do
+  local t = tokens[i]
+  if denied == 0 then
+    t = t - 1
+  end
+  redis.call('HSET', key, 't', t, 'ts', now)
+  redis.call('PEXPIRE', key, tonumber(ARGV[i * 3]))
+end
+if denied == 0 then
+  return {0}
+end
+local notify = 0
+local key = KEYS[denied]
+local notice_until = tonumber(redis.call('HGET', key, 'n'))
+if notice_until == nil or now >= notice_until then
+  redis.call('HSET', key, 'n', now + tonumber(ARGV[denied * 3]) / 1000)
+  notify = 1
+end
+return {denied, notify}
+"""
+
+
+class RedisQuotaLimiter:
+    """Token buckets shared by every process through a single Lua round-trip.
+
+    Keys expire once a bucket would be full again, so Redis evicts idle
+    senders itself. Redis errors fail open: throttling never blocks traffic
+    on a storage outage.
+    """
+
+    def __init__(self, redis: Redis, prefix: str = "signal_ai:quota:") -> None:
+        self._redis = redis
+        self._prefix = prefix
+        self._script = redis.register_script(_TOKEN_BUCKET_LUA)
+
+    async def acquire(self, buckets: Sequence[Bucket]) -> Denial | None:
+        args: list[float] = []
+        for _, policy in buckets:
+            args += [policy.rate, policy.burst, max(1, math.ceil(policy.refill_seconds * 1000))]
+        try:
+            result = await self._script(
+                keys=[self._prefix + key for key, _ in buckets], args=args
+            )
+        except Exception as exc:  # noqa: BLE001
+            log.warning("quota.redis_failed", error=str(exc))
+            return None
+        if not result or not int(result[0]):
+            return None
+        return int(result[0]) - 1, bool(int(result[1]))
+
+    async def close(self) -> None:
+        await self._redis.aclose()
+
+
+async def check_quota(
+    limiter: QuotaLimiter,
+    source: str | None,
+    group_id: str | None,
+    sender_policy: QuotaPolicy,
+    group_policy: QuotaPolicy,
+) -> Throttled | None:
+    """Return the throttled scope or None when allowed.
+
+    Both buckets are checked before either is spent, so a message refused by
+    its group quota does not also cost the sender a token.
+    """
+    scopes: list[str] = []
+    buckets: list[Bucket] = []
+    if source and sender_policy.enabled:
+        scopes.append("sender")
+        buckets.append((f"sender:{source}", sender_policy))
+    if group_id and group_policy.enabled:
+        scopes.append("group")
+        buckets.append((f"group:{group_id}", group_policy))
+    if not buckets:
+        return None
+    denial = await limiter.acquire(buckets)
+    if denial is None:
+        return None
+    index, notify = denial
+    QUOTA_THROTTLED.labels(scope=scopes[index]).inc()
+    return Throttled(scopes[index], notify)
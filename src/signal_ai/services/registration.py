@@ -0,0 +1,154 @@
+from __future__ import annotations
+
+import asyncio
+import re
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterator, Awaitable, Callable, Iterable
+
+import phonenumbers
+
+from .cache import TtlCache
+
+CACHE_NAMESPACE = "registration"
+
+SearchFn = Callable[[list[str]], Awaitable[list[dict[str, Any]]]]
+
+
+def normalize_e164(raw: str) -> str | None:
+    """Canonical `+<digits>` form of a pasted number, or None if it is not E.164.
+
+    Parsed with `phonenumbers`, so separators, `tel:` links and extensions
+    are handled and the length is checked against the country's plan; an
+    international `00` prefix becomes `+`. Numbers without a country code
+    are rejected rather than guessed.
+    """
+    text = raw.strip()
+    if text.startswith("00"):
+        text = "+" + text[2:]
+    if not text.startswith(("+", "tel:")):
+        return None
+    try:
+        number = phonenumbers.parse(text, None)
+    except phonenumbers.NumberParseException:
+        return None
+    if not phonenumbers.is_possible_number(number):
+        return None
+    return phonenumbers.format_number(number, phonenumbers.PhoneNumberFormat.E164)
+
+
+def split_numbers(text: str) -> list[str]:
+    """Split pasted input on commas, semicolons and newlines, keeping spaced-out numbers whole."""
+    pieces: list[str] = []
+    for piece in re.split(r"[,;\n]+", text):
+        if not piece.strip():
+            continue
+        if normalize_e164(piece) is not None:
+            pieces.append(piece.strip())
+        else:
+            pieces.extend(piece.split())
+    return pieces
+
+
+def _result_number(item: dict[str, Any]) -> str | None:
+    for field_name in ("number", "input", "e164"):
+        value = item.get(field_name)
+        if isinstance(value, str) and (number := normalize_e164(value)) is not None:
+            return number
+    return None
+
+
+def _is_registered(item: dict[str, Any]) -> bool:
+    return item.get("isRegistered") is True or item.get("registered") is True
+
+
+@dataclass(slots=True)
+class RegistrationBatch:
+    """One slice of results: served from cache (`chunk == 0`) or a finished API chunk."""
+
+    chunk: int
+    chunks: int
+    registered: dict[str, bool] = field(default_factory=dict)
+    error: BaseException | None = None
+    numbers: list[str] = field(default_factory=list)
+
+
+class RegistrationLookup:
+    """Registration checks for many numbers: dedupe, cache, chunk, fan out.
+
+    `lookup()` yields the cached answers first, then one batch per API chunk
+    in completion order, with at most `concurrency` chunks in flight. A
+    failing chunk is reported in its batch and does not stop the others.
+    """
+
+    def __init__(
+        self,
+        search: SearchFn,
+        cache: TtlCache,
+        *,
+        chunk_size: int = 50,
+        concurrency: int = 4,
+    ) -> None:
+        self._search = search
+        self._cache = cache
+        self._chunk_size = max(1, chunk_size)
+        self._concurrency = max(1, concurrency)
+
+    @staticmethod
+    def prepare(raw_numbers: Iterable[str]) -> tuple[list[str], list[str]]:
+        """Normalized unique numbers in input order, plus the inputs that were rejected."""
+        numbers: dict[str, None] = {}
+        invalid: list[str] = []
+        for raw in raw_numbers:
+            number = normalize_e164(raw)
+            if number is None:
+                invalid.append(raw)
+            else:
+                numbers.setdefault(number)
+        return list(numbers), invalid
+
+    async def _query(self, chunk: list[str]) -> dict[str, bool]:
+        result = await self._search(chunk)
+        found: dict[str, bool] = {}
+        for item in result or ():
+            number = _result_number(item)
+            if number is not None:
+                found[number] = _is_registered(item)
+        for number, registered in found.items():
+            self._cache.put(CACHE_NAMESPACE, number, registered)
+        return found
+
+    async def lookup(self, numbers: list[str]) -> AsyncIterator[RegistrationBatch]:
+        cached: dict[str, bool] = {}
+        missing: list[str] = []
+        for number in numbers:
+            hit, registered = self._cache.peek(CACHE_NAMESPACE, number)
+            if hit:
+                cached[number] = registered
+            else:
+                missing.append(number)
+        chunks = [
+            missing[start : start + self._chunk_size]
+            for start in range(0, len(missing), self._chunk_size)
+        ]
+        if cached:
+            yield RegistrationBatch(0, len(chunks), cached, numbers=list(cached))
+        if not chunks:
+            return
+
+        semaphore = asyncio.Semaphore(self._concurrency)
+
+        async def run(index: int, chunk: list[str]) -> RegistrationBatch:
+            async with semaphore:
+                try:
+                    found = await self._query(chunk)
+                except Exception as exc:  # noqa: BLE001
+                    return RegistrationBatch(index, len(chunks), error=exc, numbers=chunk)
+            return RegistrationBatch(index, len(chunks), found, numbers=chunk)
+
+        tasks = [asyncio.create_task(run(i, chunk)) for i, chunk in enumerate(chunks, start=1)]
+        try:
+            for finished in asyncio.as_completed(tasks):
+                yield await finished
+        finally:
+            for task in tasks:
+                task.cancel()
@@ -0,0 +1,457 @@
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import heapq
+import itertools
+import json
+import math
+import sqlite3
+import time
+import uuid
+from dataclasses import dataclass, field
+from datetime import timezone, tzinfo
+from typing import TYPE_CHECKING, Any, Awaitable, Callable, Protocol
+
+import structlog
+
+from ..metrics import SCHEDULED_JOB_LAG_SECONDS, SCHEDULED_JOBS, SCHEDULED_JOBS_PENDING
+from ..storage import SqliteDatabase
+from .cron import parse_cron
+
+if TYPE_CHECKING:
+    from redis.asyncio import Redis
+
+log = structlog.get_logger()
+
+Action = Callable[[dict[str, Any]], Awaitable[None]]
+
+# Rebuild the heap once cancelled or rescheduled entries outnumber live ones (and this many).
+_MIN_COMPACT = 1024
+
+
+@dataclass(slots=True)
+class Job:
+    """A named action due at `due` (wall-clock seconds); recurring with `every` or `cron`."""
+
+    id: str
+    due: float
+    action: str
+    payload: dict[str, Any] = field(default_factory=dict)
+    every: float | None = None
+    cron: str | None = None
+
+    @property
+    def recurring(self) -> bool:
+        return self.every is not None or self.cron is not None
+
+
+class JobStore(Protocol):
+    async def add(self, jobs: list[Job]) -> None:
+        """Insert or replace, so a recurring job's next `due` overwrites the last."""
+        ...
+
+    async def remove(self, ids: list[str]) -> None: ...
+
+    async def load(self) -> list[Job]: ...
+
+    async def close(self) -> None: ...
+
+
+class SqliteJobStore:
+    """Scheduled jobs in `signal_ai_jobs`, indexed by due time."""
+
+    def __init__(self, db: SqliteDatabase) -> None:
+        self._db = db
+        self._ready = False
+
+    async def _ensure_schema(self) -> None:
+        if self._ready:
+            return
+
+        def create(conn: sqlite3.Connection) -> None:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS signal_ai_jobs "
+                "(id TEXT PRIMARY KEY, due REAL NOT NULL, action TEXT NOT NULL, "
+                "payload TEXT NOT NULL, every REAL, cron TEXT)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS signal_ai_jobs_due ON signal_ai_jobs (due)")
+
+        await self._db.run(create)
+        self._ready = True
+
+    async def add(self, jobs: list[Job]) -> None:
+        await self._ensure_schema()
+        rows = [(j.id, j.due, j.action, json.dumps(j.payload), j.every, j.cron) for j in jobs]
+        await self._db.transaction(
+            lambda conn: conn.executemany(
+                "INSERT OR REPLACE INTO signal_ai_jobs (id, due, action, payload, every, cron) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                rows,
+            )
+        )
+
+    async def remove(self, ids: list[str]) -> None:
+        await self._ensure_schema()
+        await self._db.transaction(
+            lambda conn: conn.executemany(
+                "DELETE FROM signal_ai_jobs WHERE id = ?", [(job_id,) for job_id in ids]
+            )
+        )
+
+    async def load(self) -> list[Job]:
+        await self._ensure_schema()
+        rows = await self._db.run(
+            lambda conn: conn.execute(
+                "SELECT id, due, action, payload, every, cron FROM signal_ai_jobs ORDER BY due"
+            ).fetchall()
+        )
+        return [Job(row[0], row[1], row[2], json.loads(row[3]), row[4], row[5]) for row in rows]
+
+    async def close(self) -> None:
+        # The database is shared and closed by its owner.
+        return None
+
+
+class RedisJobStore:
+    """Scheduled jobs as a due-time sorted set plus a hash of their bodies."""
+
+    def __init__(self, redis: Redis, *, prefix: str = "signal_ai:jobs") -> None:
+        self._redis = redis
+        self._due_key = f"{prefix}:due"
+        self._body_key = f"{prefix}:body"
+
+    async def add(self, jobs: list[Job]) -> None:
+        async with self._redis.pipeline(transaction=True) as pipe:
+            pipe.zadd(self._due_key, {j.id: j.due for j in jobs})
+            pipe.hset(
+                self._body_key,
+                mapping={
+                    j.id: json.dumps(
+                        {"action": j.action, "payload": j.payload, "every": j.every, "cron": j.cron}
+                    )
+                    for j in jobs
+                },
+            )
+            await pipe.execute()
+
+    async def remove(self, ids: list[str]) -> None:
+        async with self._redis.pipeline(transaction=True) as pipe:
+            pipe.zrem(self._due_key, *ids)
+            pipe.hdel(self._body_key, *ids)
+            await pipe.execute()
+
+    async def load(self) -> list[Job]:
+        async with self._redis.pipeline(transaction=True) as pipe:
+            pipe.zrange(self._due_key, 0, -1, withscores=True)
+            pipe.hgetall(self._body_key)
+            due, bodies = await pipe.execute()
+        jobs: list[Job] = []
+        for raw_id, score in due:
+            body = bodies.get(raw_id)
+            if body is None:
+                continue
+            data = json.loads(body)
+            job_id = raw_id.decode() if isinstance(raw_id, bytes) else raw_id
+            jobs.append(
+                Job(job_id, float(score), data["action"], data["payload"], data["every"], data["cron"])
+            )
+        return jobs
+
+    async def close(self) -> None:
+        await self._redis.aclose()
+
+
+class Scheduler:
+    """Runs named actions at a time, every interval or on a cron schedule.
+
+    Pending jobs sit in a binary heap ordered by due time, so scheduling and
+    taking the next job are O(log n); cancelling marks the heap entry stale
+    and it is skipped when it surfaces. One loop sleeps until the earliest
+    due time, woken early only when a job is scheduled ahead of it, and hands
+    due jobs to `workers` tasks; the loop itself never runs an action.
+
+    Jobs are written to the store before `schedule()` returns (writes in the
+    same loop iteration are batched) and restored on `start()`. A finished
+    one-off job is deleted from the store; a recurring one is rewritten with
+    its next due time, counted from the previous due time so it does not
+    drift. Delivery is at-least-once: a job that was running or queued when
+    the process stopped runs again after restart. A recurring job that fell
+    behind while the bot was down fires once, then resumes its schedule.
+    """
+
+    def __init__(
+        self,
+        store: JobStore | None,
+        *,
+        workers: int = 4,
+        tz: tzinfo = timezone.utc,
+        clock: Callable[[], float] | None = None,
+    ) -> None:
+        self._store = store
+        self._workers = max(1, workers)
+        self.tz = tz
+        self._clock = clock or time.time
+        self._actions: dict[str, Action] = {}
+        self._jobs: dict[str, Job] = {}
+        self._heap: list[tuple[float, int, str]] = []
+        self._sequence = itertools.count()
+        self._running: set[str] = set()
+        self._due: asyncio.Queue[Job] = asyncio.Queue()
+        self._unsaved: list[Job] = []
+        self._saved: asyncio.Future[None] | None = None
+        self._finished: list[str] = []
+        self._rescheduled: dict[str, Job] = {}
+        self._wakeup = asyncio.Event()
+        self._alarm: asyncio.TimerHandle | None = None
+        self._alarm_due = math.inf
+        self._task: asyncio.Task[None] | None = None
+        self._worker_tasks: list[asyncio.Task[None]] = []
+
+    def __len__(self) -> int:
+        return len(self._jobs)
+
+    def register(self, name: str, action: Action) -> None:
+        self._actions[name] = action
+
+    def now(self) -> float:
+        return self._clock()
+
+    def get(self, job_id: str) -> Job | None:
+        return self._jobs.get(job_id)
+
+    def jobs(self, where: Callable[[Job], bool] | None = None) -> list[Job]:
+        """Pending jobs, soonest first; a linear scan meant for listing, not the hot path."""
+        found = [job for job in self._jobs.values() if where is None or where(job)]
+        return sorted(found, key=lambda job: job.due)
+
+    def next_due(self, job: Job, now: float) -> float:
+        """When a recurring `job` fires next, strictly after both its last due time and `now`."""
+        if job.every is not None:
+            missed = max(0, math.floor((now - job.due) / job.every))
+            return job.due + (missed + 1) * job.every
+        assert job.cron is not None
+        return parse_cron(job.cron).next_after(max(now, job.due), self.tz)
+
+    async def schedule(
+        self,
+        action: str,
+        payload: dict[str, Any] | None = None,
+        *,
+        at: float,
+        every: float | None = None,
+        cron: str | None = None,
+    ) -> Job:
+        if action not in self._actions:
+            raise KeyError(f"unknown job action: {action}")
+        if cron is not None:
+            parse_cron(cron)
+        job = Job(uuid.uuid4().hex[:10], at, action, payload or {}, every, cron)
+        if self._store is not None:
+            await self._persist(job)
+        self._jobs[job.id] = job
+        self._push(job)
+        SCHEDULED_JOBS.labels(outcome="scheduled").inc()
+        SCHEDULED_JOBS_PENDING.set(len(self._jobs))
+        return job
+
+    async def cancel(self, job_id: str) -> bool:
+        job = self._jobs.pop(job_id, None)
+        if job is None:
+            return False
+        self._rescheduled.pop(job_id, None)
+        if self._store is not None:
+            await self._store.remove([job_id])
+        self._compact()
+        SCHEDULED_JOBS.labels(outcome="cancelled").inc()
+        SCHEDULED_JOBS_PENDING.set(len(self._jobs))
+        return True
+
+    async def _persist(self, job: Job) -> None:
+        self._unsaved.append(job)
+        if self._saved is None:
+            # Jobs scheduled within the same loop iteration share one store write.
+            self._saved = asyncio.get_running_loop().create_future()
+            asyncio.create_task(self._save_batch(self._saved))
+        await asyncio.shield(self._saved)
+
+    async def _save_batch(self, future: asyncio.Future[None]) -> None:
+        await asyncio.sleep(0)
+        batch, self._unsaved, self._saved = self._unsaved, [], None
+        assert self._store is not None
+        try:
+            await self._store.add(batch)
+        except Exception as exc:
+            future.set_exception(exc)
+            # Mark retrieved so waiters that were cancelled do not warn.
+            future.exception()
+            return
+        future.set_result(None)
+
+    def _push(self, job: Job) -> None:
+        heapq.heappush(self._heap, (job.due, next(self._sequence), job.id))
+        if job.due < self._alarm_due:
+            # Earlier than the loop's alarm: wake it to re-arm.
+            self._wakeup.set()
+
+    def _live(self, entry: tuple[float, int, str]) -> bool:
+        job = self._jobs.get(entry[2])
+        return job is not None and job.due == entry[0] and entry[2] not in self._running
+
+    def _compact(self) -> None:
+        if len(self._heap) < _MIN_COMPACT or len(self._heap) < 2 * len(self._jobs):
+            return
+        self._heap = [entry for entry in self._heap if self._live(entry)]
+        heapq.heapify(self._heap)
+
+    def _pop_due(self, now: float) -> list[Job]:
+        due: list[Job] = []
+        heap = self._heap
+        while heap and heap[0][0] <= now:
+            entry = heapq.heappop(heap)
+            if not self._live(entry):
+                continue
+            job = self._jobs[entry[2]]
+            if job.recurring:
+                self._running.add(job.id)
+            else:
+                del self._jobs[job.id]
+            due.append(job)
+        return due
+
+    def _arm(self) -> None:
+        """Set the alarm for the earliest live job, dropping stale entries on top."""
+        while self._heap and not self._live(self._heap[0]):
+            heapq.heappop(self._heap)
+        due = self._heap[0][0] if self._heap else math.inf
+        if due == self._alarm_due:
+            return
+        if self._alarm is not None:
+            self._alarm.cancel()
+            self._alarm = None
+        self._alarm_due = due
+        if due != math.inf:
+            delay = max(0.0, due - self._clock())
+            self._alarm = asyncio.get_running_loop().call_later(delay, self._ring)
+
+    def _ring(self) -> None:
+        self._alarm = None
+        self._alarm_due = math.inf
+        self._wakeup.set()
+
+    async def _execute(self, job: Job) -> None:
+        SCHEDULED_JOB_LAG_SECONDS.observe(max(0.0, self._clock() - job.due))
+        try:
+            await self._actions[job.action](job.payload)
+        except Exception as exc:  # noqa: BLE001
+            SCHEDULED_JOBS.labels(outcome="failed").inc()
+            log.warning("scheduler.job_failed", action=job.action, job=job.id, error=str(exc))
+        else:
+            SCHEDULED_JOBS.labels(outcome="fired").inc()
+        if not job.recurring:
+            self._finished.append(job.id)
+            self._wakeup.set()
+            return
+        self._running.discard(job.id)
+        if self._jobs.get(job.id) is job:
+            job.due = self.next_due(job, self._clock())
+            self._rescheduled[job.id] = job
+            self._push(job)
+        self._wakeup.set()
+
+    async def _work(self) -> None:
+        while True:
+            job = await self._due.get()
+            try:
+                await self._execute(job)
+            except Exception:  # noqa: BLE001
+                log.exception("scheduler.worker_failed", job=job.id)
+            finally:
+                self._due.task_done()
+
+    async def _flush(self) -> None:
+        if self._store is None:
+            self._finished.clear()
+            self._rescheduled.clear()
+            return
+        if self._finished:
+            batch, self._finished = self._finished, []
+            try:
+                await self._store.remove(batch)
+            except Exception:
+                self._finished.extend(batch)
+                log.exception("scheduler.remove_failed", jobs=len(batch))
+        if self._rescheduled:
+            jobs, self._rescheduled = list(self._rescheduled.values()), {}
+            try:
+                await self._store.add(jobs)
+            except Exception:
+                for job in jobs:
+                    self._rescheduled.setdefault(job.id, job)
+                log.exception("scheduler.reschedule_failed", jobs=len(jobs))
+
+    async def _restore(self) -> None:
+        if self._store is None:
+            return
+        try:
+            stored = await self._store.load()
+        except Exception:
+            log.exception("scheduler.restore_failed")
+            return
+        restored = 0
+        for job in stored:
+            if job.id in self._jobs:
+                continue
+            if job.action not in self._actions:
+                log.warning("scheduler.unknown_action", action=job.action, job=job.id)
+                continue
+            self._jobs[job.id] = job
+            self._heap.append((job.due, next(self._sequence), job.id))
+            restored += 1
+        heapq.heapify(self._heap)
+        if restored:
+            SCHEDULED_JOBS.labels(outcome="restored").inc(restored)
+            log.info("scheduler.restored", jobs=restored)
+        SCHEDULED_JOBS_PENDING.set(len(self._jobs))
+
+    def start(self) -> None:
+        if self._task is None:
+            self._worker_tasks = [
+                asyncio.create_task(self._work(), name=f"signal_ai.scheduler_worker.{i}")
+                for i in range(self._workers)
+            ]
+            self._task = asyncio.create_task(self._run(), name="signal_ai.scheduler")
+
+    async def stop(self) -> None:
+        """Stop dispatching and let running jobs finish; queued and pending jobs stay in the store."""
+        if self._task is not None:
+            self._task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._task
+            self._task = None
+        if self._alarm is not None:
+            self._alarm.cancel()
+            self._alarm = None
+        while not self._due.empty():
+            self._due.get_nowait()
+            self._due.task_done()
+        # Idle workers are waiting on the empty queue; busy ones finish their job first.
+        await self._due.join()
+        for task in self._worker_tasks:
+            task.cancel()
+        await asyncio.gather(*self._worker_tasks, return_exceptions=True)
+        self._worker_tasks = []
+        await self._flush()
+        if self._store is not None:
+            await self._store.close()
+
+    async def _run(self) -> None:
+        await self._restore()
+        while True:
+            self._wakeup.clear()
+            for job in self._pop_due(self._clock()):
+                self._due.put_nowait(job)
+            SCHEDULED_JOBS_PENDING.set(len(self._jobs))
+            await self._flush()
+            self._arm()
+            await self._wakeup.wait()
@@ -0,0 +1,74 @@
+from __future__ import annotations
+
+import asyncio
+import time
+from typing import Any, Awaitable, Callable, TypeVar
+
+import structlog
+
+from ..metrics import STARTUP_PHASE_SECONDS
+
+log = structlog.get_logger()
+
+T = TypeVar("T")
+
+
+class StartupTimeline:
+    """Per-phase startup timings, exported as gauges and logged once when ready.
+
+    Phases may overlap; each records its own duration plus the offset at
+    which it finished, so the log shows both cost and critical path.
+    """
+
+    def __init__(self) -> None:
+        self._started = time.perf_counter()
+        self._phases: dict[str, dict[str, float]] = {}
+        self._first_message_seen = False
+
+    def _record(self, name: str, started: float) -> None:
+        finished = time.perf_counter()
+        elapsed = finished - started
+        self._phases[name] = {
+            "ms": round(elapsed * 1000, 2),
+            "done_at_ms": round((finished - self._started) * 1000, 2),
+        }
+        STARTUP_PHASE_SECONDS.labels(phase=name).set(elapsed)
+
+    async def phase(self, name: str, awaitable: Awaitable[T]) -> T:
+        started = time.perf_counter()
+        try:
+            return await awaitable
+        finally:
+            self._record(name, started)
+
+    def sync_phase(self, name: str, func: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+        started = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            self._record(name, started)
+
+    def ready(self) -> None:
+        total = time.perf_counter() - self._started
+        STARTUP_PHASE_SECONDS.labels(phase="ready").set(total)
+        log.info("signal_ai.startup_timeline", total_ms=round(total * 1000, 2), phases=self._phases)
+
+    def first_message(self) -> None:
+        if self._first_message_seen:
+            return
+        self._first_message_seen = True
+        elapsed = time.perf_counter() - self._started
+        STARTUP_PHASE_SECONDS.labels(phase="first_message").set(elapsed)
+        log.info("signal_ai.first_message", since_start_ms=round(elapsed * 1000, 2))
+
+
+async def run_concurrently(*awaitables: Awaitable[Any]) -> list[Any]:
+    """`asyncio.gather` that cancels the remaining steps as soon as one fails."""
+    tasks = [asyncio.ensure_future(awaitable) for awaitable in awaitables]
+    try:
+        return await asyncio.gather(*tasks)
+    except BaseException:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        raise
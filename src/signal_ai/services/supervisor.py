@@ -0,0 +1,333 @@
+"""Multi-process mode: one supervisor process feeding N bot worker processes.
+
+The supervisor owns websocket ingest and routes each raw envelope to a
+worker chosen by conversation, so one conversation is always handled by
+the same process, in arrival order. Workers are full bot processes started
+with `--worker-index/--worker-count`; they read newline-delimited envelopes
+on stdin and report readiness on a dedicated pipe. Closing a worker's stdin
+asks it to drain what it has and exit, which is how workers are stopped and
+restarted one at a time.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import json
+import os
+import re
+import zlib
+from typing import Sequence
+
+import aiohttp
+import structlog
+
+from ..metrics import SUPERVISOR_ENVELOPES, SUPERVISOR_SHARD_DEPTH, WORKER_RESTARTS
+
+log = structlog.get_logger()
+
+# Sender/conversation fields, read with regexes so the supervisor never parses JSON.
+# Escaped quotes inside message text cannot match: `"` there is always preceded by `\`.
+_GROUP_ID = re.compile(r'"groupId"\s*:\s*"([^"]+)"')
+_SOURCE_FIELDS = (
+    re.compile(r'"sourceUuid"\s*:\s*"([^"]+)"'),
+    re.compile(r'"sourceNumber"\s*:\s*"([^"]+)"'),
+    re.compile(r'"source"\s*:\s*"([^"]+)"'),
+)
+READY = b"ready\n"
+# Highest shard count any run has used; shards past the current count are adopted.
+SHARDS_KEY = "signal_ai:shards"
+# Pause before respawning a worker that exited on its own, doubled per crash in a row.
+_CRASH_BACKOFF = 1.0
+_MAX_CRASH_BACKOFF = 30.0
+
+
+def conversation_of(raw: str) -> str:
+    """Group id for group traffic, otherwise the sender; empty if neither is present."""
+    match = _GROUP_ID.search(raw)
+    if match is None:
+        for pattern in _SOURCE_FIELDS:
+            match = pattern.search(raw)
+            if match is not None:
+                break
+    return match.group(1) if match is not None else ""
+
+
+def shard_of(conversation: str, count: int) -> int:
+    # crc32 rather than hash(): it has to agree across processes and restarts.
+    return zlib.crc32(conversation.encode()) % count
+
+
+def envelope_line(raw: str) -> bytes:
+    """One stdin line per envelope; compact JSON only has newlines as whitespace."""
+    if "\n" in raw:
+        raw = json.dumps(json.loads(raw))
+    return raw.encode() + b"\n"
+
+
+def shard_prefix(base: str, shard: int) -> str:
+    """Redis key prefix for one shard's timers, jobs or broadcasts; shard 0 keeps the base."""
+    return base if shard == 0 else f"{base}:{shard}"
+
+
+def orphaned_shards(previous: int, count: int, index: int) -> list[int]:
+    """Shards left over from a run with more processes that worker `index` should adopt."""
+    return [shard for shard in range(count, previous) if shard % count == index]
+
+
+def notify_ready(fd: int) -> None:
+    """Called by a worker once it is consuming envelopes."""
+    with contextlib.suppress(OSError):
+        os.write(fd, READY)
+        os.close(fd)
+
+
+class _Control:
+    """A restart or stop request, queued behind the envelopes sent before it."""
+
+    __slots__ = ("kind", "done")
+
+    def __init__(self, kind: str) -> None:
+        self.kind = kind
+        self.done: asyncio.Future[None] = asyncio.get_running_loop().create_future()
+
+
+class WorkerProcess:
+    """One worker subprocess plus the ordered queue of envelopes bound for it.
+
+    A single feeder task writes the queue to the process's stdin, so a
+    restart queued behind earlier envelopes retires the old process only
+    after they were handed over, and the new process receives everything
+    after them: per-conversation order survives restarts. A worker that dies
+    on its own is respawned with backoff; envelopes it had read but not
+    handled are lost, and the one being written is sent again.
+    """
+
+    def __init__(
+        self,
+        index: int,
+        count: int,
+        command: Sequence[str],
+        *,
+        queue_size: int = 1000,
+        drain_timeout: float = 30.0,
+    ) -> None:
+        self.index = index
+        self._label = str(index)
+        self._command = [*command, "--worker-index", str(index), "--worker-count", str(count)]
+        self._drain_timeout = drain_timeout
+        self.queue: asyncio.Queue[bytes | _Control] = asyncio.Queue(queue_size)
+        self.ready = asyncio.Event()
+        self._proc: asyncio.subprocess.Process | None = None
+        self._spawn_lock = asyncio.Lock()
+        self._crashes = 0
+        self._watchers: set[asyncio.Task[None]] = set()
+        self._task: asyncio.Task[None] | None = None
+
+    @property
+    def pid(self) -> int | None:
+        return self._proc.pid if self._proc is not None else None
+
+    async def start(self) -> None:
+        await self._spawn()
+        self._task = asyncio.create_task(
+            self._feed(), name=f"signal_ai.supervisor.feed.{self.index}"
+        )
+
+    async def _spawn(self) -> None:
+        read_fd, write_fd = os.pipe()
+        try:
+            self._proc = await asyncio.create_subprocess_exec(
+                *self._command,
+                "--worker-status-fd",
+                str(write_fd),
+                stdin=asyncio.subprocess.PIPE,
+                pass_fds=(write_fd,),
+                # Own session: a terminal Ctrl-C reaches only the supervisor, which drains workers.
+                start_new_session=True,
+            )
+        finally:
+            os.close(write_fd)
+        self.ready.clear()
+        proc = self._proc
+        log.info("supervisor.worker_started", worker=self.index, pid=proc.pid)
+        for watcher in (self._watch_status(proc, read_fd), self._watch_exit(proc)):
+            task = asyncio.create_task(watcher)
+            self._watchers.add(task)
+            task.add_done_callback(self._watchers.discard)
+
+    async def _watch_status(self, proc: asyncio.subprocess.Process, fd: int) -> None:
+        reader = asyncio.StreamReader()
+        loop = asyncio.get_running_loop()
+        transport, _ = await loop.connect_read_pipe(
+            lambda: asyncio.StreamReaderProtocol(reader), os.fdopen(fd, "rb", buffering=0)
+        )
+        try:
+            if await reader.readline() == READY and proc is self._proc:
+                self._crashes = 0
+                self.ready.set()
+                log.info("supervisor.worker_ready", worker=self.index, pid=proc.pid)
+        finally:
+            transport.close()
+
+    async def _watch_exit(self, proc: asyncio.subprocess.Process) -> None:
+        code = await proc.wait()
+        if proc is not self._proc:
+            return
+        # Exited without being asked to.
+        WORKER_RESTARTS.labels(reason="crash").inc()
+        delay = min(_MAX_CRASH_BACKOFF, _CRASH_BACKOFF * 2**self._crashes)
+        self._crashes += 1
+        log.warning("supervisor.worker_exited", worker=self.index, code=code, respawn_in=delay)
+        await asyncio.sleep(delay)
+        async with self._spawn_lock:
+            if proc is self._proc:
+                await self._spawn()
+
+    async def _write(self, line: bytes) -> None:
+        while True:
+            proc = self._proc
+            assert proc is not None and proc.stdin is not None
+            try:
+                proc.stdin.write(line)
+                await proc.stdin.drain()
+                return
+            except (BrokenPipeError, ConnectionResetError):
+                # The exit watcher respawns it; wait for the replacement.
+                while self._proc is proc:
+                    await asyncio.sleep(0.05)
+
+    async def _retire(self) -> None:
+        """Close stdin so the worker drains and exits; force it after `drain_timeout`."""
+        async with self._spawn_lock:
+            proc, self._proc = self._proc, None
+        if proc is None:
+            return
+        assert proc.stdin is not None
+        with contextlib.suppress(OSError):
+            proc.stdin.close()
+        try:
+            await asyncio.wait_for(proc.wait(), self._drain_timeout)
+        except asyncio.TimeoutError:
+            log.warning("supervisor.worker_drain_timeout", worker=self.index, pid=proc.pid)
+            with contextlib.suppress(ProcessLookupError):
+                proc.terminate()
+            try:
+                await asyncio.wait_for(proc.wait(), 5.0)
+            except asyncio.TimeoutError:
+                with contextlib.suppress(ProcessLookupError):
+                    proc.kill()
+                await proc.wait()
+        log.info("supervisor.worker_stopped", worker=self.index, pid=proc.pid, code=proc.returncode)
+
+    async def _feed(self) -> None:
+        while True:
+            item = await self.queue.get()
+            SUPERVISOR_SHARD_DEPTH.labels(worker=self._label).set(self.queue.qsize())
+            if isinstance(item, bytes):
+                await self._write(item)
+                continue
+            await self._retire()
+            if item.kind == "stop":
+                item.done.set_result(None)
+                return
+            await self._spawn()
+            item.done.set_result(None)
+
+    async def restart(self) -> None:
+        """Replace the process once everything queued before this call was handed to it."""
+        control = _Control("restart")
+        await self.queue.put(control)
+        await control.done
+        WORKER_RESTARTS.labels(reason="rolling").inc()
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        control = _Control("stop")
+        await self.queue.put(control)
+        await control.done
+        await self._task
+        self._task = None
+        for watcher in list(self._watchers):
+            watcher.cancel()
+        await asyncio.gather(*self._watchers, return_exceptions=True)
+
+
+class Supervisor:
+    """Shards envelopes across `count` worker processes by conversation."""
+
+    def __init__(
+        self,
+        command: Sequence[str],
+        count: int,
+        *,
+        queue_size: int = 1000,
+        drain_timeout: float = 30.0,
+        ready_timeout: float = 120.0,
+    ) -> None:
+        self._workers = [
+            WorkerProcess(i, count, command, queue_size=queue_size, drain_timeout=drain_timeout)
+            for i in range(count)
+        ]
+        self._ready_timeout = ready_timeout
+        self._restarting = asyncio.Lock()
+
+    @property
+    def workers(self) -> list[WorkerProcess]:
+        return self._workers
+
+    async def start(self) -> None:
+        # Let every spawn finish before raising, so `stop()` sees each started worker.
+        results = await asyncio.gather(
+            *(worker.start() for worker in self._workers), return_exceptions=True
+        )
+        for result in results:
+            if isinstance(result, BaseException):
+                raise result
+
+    async def wait_ready(self) -> None:
+        await asyncio.gather(*(worker.ready.wait() for worker in self._workers))
+
+    async def dispatch(self, raw: str) -> None:
+        """Queue one envelope for its conversation's worker; waits while that queue is full."""
+        worker = self._workers[shard_of(conversation_of(raw), len(self._workers))]
+        await worker.queue.put(envelope_line(raw))
+        SUPERVISOR_ENVELOPES.labels(worker=worker._label).inc()
+
+    async def rolling_restart(self) -> None:
+        """Restart workers one at a time, each after the previous one reports ready."""
+        async with self._restarting:
+            log.info("supervisor.rolling_restart", workers=len(self._workers))
+            for worker in self._workers:
+                await worker.restart()
+                try:
+                    await asyncio.wait_for(worker.ready.wait(), self._ready_timeout)
+                except asyncio.TimeoutError:
+                    log.warning("supervisor.worker_not_ready", worker=worker.index)
+            log.info("supervisor.rolling_restart_done")
+
+    async def stop(self) -> None:
+        """Hand over everything queued, then drain and stop every worker."""
+        await asyncio.gather(*(worker.stop() for worker in self._workers))
+
+
+async def pump_websocket(
+    session: aiohttp.ClientSession, url: str, supervisor: Supervisor, *, heartbeat: float = 10.0
+) -> None:
+    """Read the receive websocket into `supervisor` forever, reconnecting with backoff."""
+    backoff = 1.0
+    while True:
+        try:
+            async with session.ws_connect(url, heartbeat=heartbeat) as ws:
+                log.info("supervisor.ws_connected", url=url)
+                backoff = 1.0
+                async for message in ws:
+                    if message.type == aiohttp.WSMsgType.TEXT:
+                        await supervisor.dispatch(message.data)
+                    elif message.type == aiohttp.WSMsgType.ERROR:
+                        break
+        except (aiohttp.ClientError, asyncio.TimeoutError, OSError) as exc:
+            log.warning("supervisor.ws_failed", url=url, error=str(exc))
+        await asyncio.sleep(backoff)
+        backoff = min(backoff * 2, _MAX_CRASH_BACKOFF)
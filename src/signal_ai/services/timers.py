@@ -0,0 +1,375 @@
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import json
+import math
+import sqlite3
+import time
+import uuid
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Any, Awaitable, Callable, Protocol
+
+import structlog
+
+from ..metrics import TIMER_EVENTS, TIMER_LAG_SECONDS, TIMERS_PENDING
+from ..storage import SqliteDatabase
+
+if TYPE_CHECKING:
+    from redis.asyncio import Redis
+
+log = structlog.get_logger()
+
+Action = Callable[[dict[str, Any]], Awaitable[None]]
+
+# 4 levels of 64 slots: at a 50 ms tick that spans 3.2 s, 3.4 min, 3.6 h and 9.7 days.
+_SLOT_BITS = 6
+_SLOTS = 1 << _SLOT_BITS
+_SLOT_MASK = _SLOTS - 1
+_LEVELS = 4
+# Further behind than this (suspend, clock jump) and we re-bucket instead of ticking through.
+_MAX_CATCH_UP_TICKS = _SLOTS * _SLOTS
+
+
+@dataclass(slots=True)
+class Timer:
+    """A named action due at `due` (wall-clock seconds), with a JSON-serializable payload."""
+
+    id: str
+    due: float
+    action: str
+    payload: dict[str, Any] = field(default_factory=dict)
+
+
+class TimerStore(Protocol):
+    async def add(self, timers: list[Timer]) -> None: ...
+
+    async def remove(self, ids: list[str]) -> None: ...
+
+    async def load(self) -> list[Timer]:
+        """Every timer that has not been removed, in any order."""
+        ...
+
+    async def close(self) -> None: ...
+
+
+class SqliteTimerStore:
+    """Pending timers in `signal_ai_timers`, indexed by due time."""
+
+    def __init__(self, db: SqliteDatabase) -> None:
+        self._db = db
+        self._ready = False
+
+    async def _ensure_schema(self) -> None:
+        if self._ready:
+            return
+
+        def create(conn: sqlite3.Connection) -> None:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS signal_ai_timers "
+                "(id TEXT PRIMARY KEY, due REAL NOT NULL, action TEXT NOT NULL, payload TEXT NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS signal_ai_timers_due ON signal_ai_timers (due)")
+
+        await self._db.run(create)
+        self._ready = True
+
+    async def add(self, timers: list[Timer]) -> None:
+        await self._ensure_schema()
+        rows = [(t.id, t.due, t.action, json.dumps(t.payload)) for t in timers]
+        await self._db.transaction(
+            lambda conn: conn.executemany(
+                "INSERT OR REPLACE INTO signal_ai_timers (id, due, action, payload) VALUES (?, ?, ?, ?)",
+                rows,
+            )
+        )
+
+    async def remove(self, ids: list[str]) -> None:
+        await self._ensure_schema()
+        await self._db.transaction(
+            lambda conn: conn.executemany(
+                "DELETE FROM signal_ai_timers WHERE id = ?", [(timer_id,) for timer_id in ids]
+            )
+        )
+
+    async def load(self) -> list[Timer]:
+        await self._ensure_schema()
+        rows = await self._db.run(
+            lambda conn: conn.execute(
+                "SELECT id, due, action, payload FROM signal_ai_timers ORDER BY due"
+            ).fetchall()
+        )
+        return [Timer(row[0], row[1], row[2], json.loads(row[3])) for row in rows]
+
+    async def close(self) -> None:
+        # The database is shared and closed by its owner.
+        return None
+
+
+class RedisTimerStore:
+    """Pending timers as a due-time sorted set plus a hash of their bodies."""
+
+    def __init__(self, redis: Redis, *, prefix: str = "signal_ai:timers") -> None:
+        self._redis = redis
+        self._due_key = f"{prefix}:due"
+        self._body_key = f"{prefix}:body"
+
+    async def add(self, timers: list[Timer]) -> None:
+        async with self._redis.pipeline(transaction=True) as pipe:
+            pipe.zadd(self._due_key, {t.id: t.due for t in timers})
+            pipe.hset(
+                self._body_key,
+                mapping={t.id: json.dumps({"action": t.action, "payload": t.payload}) for t in timers},
+            )
+            await pipe.execute()
+
+    async def remove(self, ids: list[str]) -> None:
+        async with self._redis.pipeline(transaction=True) as pipe:
+            pipe.zrem(self._due_key, *ids)
+            pipe.hdel(self._body_key, *ids)
+            await pipe.execute()
+
+    async def load(self) -> list[Timer]:
+        async with self._redis.pipeline(transaction=True) as pipe:
+            pipe.zrange(self._due_key, 0, -1, withscores=True)
+            pipe.hgetall(self._body_key)
+            due, bodies = await pipe.execute()
+        timers: list[Timer] = []
+        for raw_id, score in due:
+            body = bodies.get(raw_id)
+            if body is None:
+                continue
+            data = json.loads(body)
+            timer_id = raw_id.decode() if isinstance(raw_id, bytes) else raw_id
+            timers.append(Timer(timer_id, float(score), data["action"], data["payload"]))
+        return timers
+
+    async def close(self) -> None:
+        await self._redis.aclose()
+
+
+class TimerWheel:
+    """Hierarchical timing wheel that runs named actions after a delay.
+
+    `schedule()` persists the timer and returns its id; handlers do not wait
+    out the delay. Timers scheduled in the same loop iteration share one store
+    write. A single background task advances the wheel every `tick` seconds,
+    starts due actions as tasks and removes finished timers from the store in
+    batches, so delivery is at-least-once: an action that was running when the
+    process died runs again after restart. Timers left in the store are
+    restored on `start()`; those already overdue fire right away. Actions are
+    registered by name because a payload, unlike a closure, survives restarts.
+    Without a store timers live in memory only.
+    """
+
+    def __init__(
+        self,
+        store: TimerStore | None,
+        *,
+        tick: float = 0.05,
+        clock: Callable[[], float] | None = None,
+    ) -> None:
+        self._store = store
+        self._tick = tick
+        self._clock = clock or time.time
+        self._actions: dict[str, Action] = {}
+        self._timers: dict[str, Timer] = {}
+        self._wheel: list[list[dict[str, Timer]]] = [
+            [{} for _ in range(_SLOTS)] for _ in range(_LEVELS)
+        ]
+        self._ready: list[Timer] = []
+        self._now = self._tick_of(self._clock())
+        self._unsaved: list[Timer] = []
+        self._saved: asyncio.Future[None] | None = None
+        self._finished: list[str] = []
+        self._running: set[asyncio.Task[None]] = set()
+        self._wakeup = asyncio.Event()
+        self._task: asyncio.Task[None] | None = None
+
+    def __len__(self) -> int:
+        return len(self._timers)
+
+    def register(self, name: str, action: Action) -> None:
+        self._actions[name] = action
+
+    def _tick_of(self, when: float) -> int:
+        return math.floor(when / self._tick)
+
+    def _insert(self, timer: Timer) -> None:
+        # Round up so an action never starts before its due time.
+        due_tick = math.ceil(timer.due / self._tick)
+        delta = due_tick - self._now
+        if delta <= 0:
+            self._ready.append(timer)
+            return
+        level = 0
+        while level < _LEVELS - 1 and delta >= 1 << (_SLOT_BITS * (level + 1)):
+            level += 1
+        slot = (due_tick >> (_SLOT_BITS * level)) & _SLOT_MASK
+        self._wheel[level][slot][timer.id] = timer
+
+    def _unlink(self, timer: Timer) -> None:
+        for level in self._wheel:
+            for slot in level:
+                if slot.pop(timer.id, None) is not None:
+                    return
+        with contextlib.suppress(ValueError):
+            self._ready.remove(timer)
+
+    async def schedule(self, delay: float, action: str, payload: dict[str, Any] | None = None) -> str:
+        if action not in self._actions:
+            raise KeyError(f"unknown timer action: {action}")
+        timer = Timer(uuid.uuid4().hex, self._clock() + max(0.0, delay), action, payload or {})
+        if not self._timers:
+            # Nothing is bucketed, so an idle wheel can jump straight to the present.
+            self._now = self._tick_of(self._clock())
+        if self._store is not None:
+            await self._persist(timer)
+        self._timers[timer.id] = timer
+        self._insert(timer)
+        TIMER_EVENTS.labels(outcome="scheduled").inc()
+        TIMERS_PENDING.set(len(self._timers))
+        self._wakeup.set()
+        return timer.id
+
+    async def _persist(self, timer: Timer) -> None:
+        self._unsaved.append(timer)
+        if self._saved is None:
+            # Timers scheduled within the same loop iteration share one store write.
+            self._saved = asyncio.get_running_loop().create_future()
+            asyncio.create_task(self._save_batch(self._saved))
+        await asyncio.shield(self._saved)
+
+    async def _save_batch(self, future: asyncio.Future[None]) -> None:
+        await asyncio.sleep(0)
+        batch, self._unsaved, self._saved = self._unsaved, [], None
+        assert self._store is not None
+        try:
+            await self._store.add(batch)
+        except Exception as exc:
+            future.set_exception(exc)
+            # Mark retrieved so waiters that were cancelled do not warn.
+            future.exception()
+            return
+        future.set_result(None)
+
+    def cancel(self, timer_id: str) -> bool:
+        timer = self._timers.pop(timer_id, None)
+        if timer is None:
+            return False
+        self._unlink(timer)
+        self._finished.append(timer_id)
+        TIMER_EVENTS.labels(outcome="cancelled").inc()
+        TIMERS_PENDING.set(len(self._timers))
+        return True
+
+    def _advance(self, target: int) -> list[Timer]:
+        """Move the wheel to tick `target`, returning the timers that came due."""
+        if target - self._now > _MAX_CATCH_UP_TICKS:
+            self._now = target
+            self._rebucket()
+        while self._now < target:
+            self._now += 1
+            for level in range(1, _LEVELS):
+                if self._now & ((1 << (_SLOT_BITS * level)) - 1):
+                    break
+                slot = (self._now >> (_SLOT_BITS * level)) & _SLOT_MASK
+                cascading, self._wheel[level][slot] = self._wheel[level][slot], {}
+                for timer in cascading.values():
+                    self._insert(timer)
+            slot = self._now & _SLOT_MASK
+            if self._wheel[0][slot]:
+                self._ready.extend(self._wheel[0][slot].values())
+                self._wheel[0][slot] = {}
+        due, self._ready = self._ready, []
+        return due
+
+    def _rebucket(self) -> None:
+        self._wheel = [[{} for _ in range(_SLOTS)] for _ in range(_LEVELS)]
+        self._ready = []
+        for timer in self._timers.values():
+            self._insert(timer)
+
+    def _fire(self, timer: Timer) -> None:
+        if self._timers.pop(timer.id, None) is None:
+            return
+        TIMER_LAG_SECONDS.observe(max(0.0, self._clock() - timer.due))
+        task = asyncio.create_task(self._run_action(timer))
+        self._running.add(task)
+        task.add_done_callback(self._running.discard)
+
+    async def _run_action(self, timer: Timer) -> None:
+        try:
+            await self._actions[timer.action](timer.payload)
+        except Exception as exc:  # noqa: BLE001
+            TIMER_EVENTS.labels(outcome="failed").inc()
+            log.warning("timers.action_failed", action=timer.action, error=str(exc))
+        else:
+            TIMER_EVENTS.labels(outcome="fired").inc()
+        self._finished.append(timer.id)
+        self._wakeup.set()
+
+    async def _remove_finished(self) -> None:
+        if self._store is None or not self._finished:
+            self._finished.clear()
+            return
+        batch, self._finished = self._finished, []
+        try:
+            await self._store.remove(batch)
+        except Exception:
+            self._finished.extend(batch)
+            log.exception("timers.remove_failed", timers=len(batch))
+
+    async def _restore(self) -> None:
+        if self._store is None:
+            return
+        try:
+            stored = await self._store.load()
+        except Exception:
+            log.exception("timers.restore_failed")
+            return
+        restored = 0
+        for timer in stored:
+            if timer.id in self._timers:
+                continue
+            if timer.action not in self._actions:
+                log.warning("timers.unknown_action", action=timer.action, id=timer.id)
+                continue
+            self._timers[timer.id] = timer
+            self._insert(timer)
+            restored += 1
+        if restored:
+            TIMER_EVENTS.labels(outcome="restored").inc(restored)
+            log.info("timers.restored", timers=restored)
+        TIMERS_PENDING.set(len(self._timers))
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run(), name="signal_ai.timers")
+
+    async def stop(self) -> None:
+        """Stop ticking and let running actions finish; pending timers stay in the store."""
+        if self._task is not None:
+            self._task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._task
+            self._task = None
+        if self._running:
+            await asyncio.gather(*self._running, return_exceptions=True)
+        await self._remove_finished()
+        if self._store is not None:
+            await self._store.close()
+
+    async def _run(self) -> None:
+        await self._restore()
+        while True:
+            for timer in self._advance(self._tick_of(self._clock())):
+                self._fire(timer)
+            TIMERS_PENDING.set(len(self._timers))
+            await self._remove_finished()
+            if not self._timers:
+                self._wakeup.clear()
+                await self._wakeup.wait()
+                continue
+            next_tick = (self._now + 1) * self._tick
+            await asyncio.sleep(max(0.0, next_tick - self._clock()))
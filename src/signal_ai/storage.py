@@ -0,0 +1,87 @@
+from __future__ import annotations
+
+import asyncio
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor
+from typing import TYPE_CHECKING, Callable, TypeVar
+
+if TYPE_CHECKING:
+    from redis.asyncio import Redis
+    from signal_client.config import Settings
+
+T = TypeVar("T")
+
+
+def uses_redis(settings: Settings) -> bool:
+    return str(settings.storage_type).lower() == "redis"
+
+
+def redis_client(settings: Settings) -> Redis:
+    """Redis connection for signal-ai state, sharing signal-client's host/port settings."""
+    from redis.asyncio import Redis
+
+    return Redis(host=settings.redis_host, port=int(settings.redis_port))
+
+
+class SqliteDatabase:
+    """One WAL-mode SQLite connection driven from a dedicated worker thread.
+
+    Every call runs on the same thread, so the connection is never shared
+    across threads and statements from different callers serialize without
+    extra locking. The event loop only awaits the result.
+    """
+
+    def __init__(self, path: str, *, name: str = "signal-ai-sqlite") -> None:
+        self.path = path
+        self.name = name
+        self._executor: ThreadPoolExecutor | None = None
+        self._conn: sqlite3.Connection | None = None
+        self._open_lock = asyncio.Lock()
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA busy_timeout=5000")
+        return conn
+
+    async def open(self) -> SqliteDatabase:
+        async with self._open_lock:
+            if self._conn is None:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix=self.name)
+                self._conn = await self._submit(self._connect)
+        return self
+
+    async def _submit(self, fn: Callable[[], T]) -> T:
+        assert self._executor is not None
+        return await asyncio.get_running_loop().run_in_executor(self._executor, fn)
+
+    async def run(self, fn: Callable[[sqlite3.Connection], T]) -> T:
+        if self._conn is None:
+            await self.open()
+        conn = self._conn
+        assert conn is not None
+        return await self._submit(lambda: fn(conn))
+
+    async def transaction(self, fn: Callable[[sqlite3.Connection], T]) -> T:
+        def wrapped(conn: sqlite3.Connection) -> T:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                result = fn(conn)
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            conn.execute("COMMIT")
+            return result
+
+        return await self.run(wrapped)
+
+    async def close(self) -> None:
+        if self._executor is None:
+            return
+        if self._conn is not None:
+            await self._submit(self._conn.close)
+            self._conn = None
+        self._executor.shutdown(wait=True)
+        self._executor = None
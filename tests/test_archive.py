@@ -0,0 +1,114 @@
+import asyncio
+import time
+
+import pytest
+
+pytest.importorskip("structlog")
+pytest.importorskip("prometheus_client")
+
+from signal_ai.services import archive as archive_module  # noqa: E402
+from signal_ai.services.archive import MessageArchive, fts_query  # noqa: E402
+from signal_ai.storage import SqliteDatabase  # noqa: E402
+
+
+def _archive(db, **options):
+    settings = {"capacity": 100, "batch_size": 50, "flush_interval": 60.0, "merge_interval": 0}
+    settings.update(options)
+    return MessageArchive(db, **settings)
+
+
+def test_recent_includes_unflushed_and_retention(tmp_path):
+    async def main():
+        db = SqliteDatabase(str(tmp_path / "archive.db"))
+        archive = _archive(db, max_messages=2, retention_days=1)
+        now = int(time.time() * 1000)
+        archive.submit("c", "+1", now - 3 * 86_400_000, "ancient")
+        archive.submit("c", "+1", now - 2, "one")
+        archive.submit("c", "+1", now - 1, "two")
+        archive.submit("c", "+1", now, "three")
+        await archive.flush()
+        archive.submit("c", "+1", now + 1, "buffered")
+        assert [m.body for m in await archive.recent("c", 3)] == ["two", "three", "buffered"]
+        assert await archive.apply_retention() == 2
+        assert [m.body for m in await archive.recent("c", 10)] == ["two", "three", "buffered"]
+        assert await archive.find(["one"], conversation="c", limit=5) == []
+        await archive.stop()
+        await db.close()
+
+    asyncio.run(main())
+
+
+def test_buffer_drops_oldest_when_full(tmp_path):
+    archive = _archive(SqliteDatabase(str(tmp_path / "archive.db")), capacity=2)
+    for n in range(3):
+        archive.submit("c", "+1", n, str(n))
+    assert len(archive) == 2
+
+
+def test_fts_query_quotes_user_input():
+    assert fts_query(["tea", 'say "hi"', "pyth*"]) == '"tea" AND "say ""hi""" AND "pyth"*'
+    assert fts_query(["*", "OR"]) == '"*" AND "OR"'
+
+
+def test_find_scopes_and_orders(tmp_path):
+    async def main():
+        db = SqliteDatabase(str(tmp_path / "archive.db"))
+        archive = _archive(db)
+        now = int(time.time() * 1000)
+        archive.submit("group-a", "+1", now, "green tea please")
+        archive.submit("group-a", "+2", now + 1, "Tea time? NEAR OR AND")
+        archive.submit("group-b", "+1", now + 2, "teapot for tea")
+        archive.submit("group-a", "+1", now + 3, "!find tea")
+        archive.submit("group-a", "+1", now + 3, "!find tea")
+        assert await archive.flush() == 4
+
+        found = await archive.find(["tea"], conversation="group-a", exclude_prefix="!", limit=10)
+        assert [m.body for m in found] == ["Tea time? NEAR OR AND", "green tea please"]
+        found = await archive.find(["tea"], conversation=None, source="+1", limit=1)
+        assert [m.body for m in found] == ["!find tea"]
+        found = await archive.find(["tea*", "pot"], conversation=None, limit=10)
+        assert found == []
+        found = await archive.find(["teap*"], conversation=None, limit=10)
+        assert [m.conversation for m in found] == ["group-b"]
+        # Query syntax in user input is searched for, not parsed.
+        found = await archive.find(["NEAR", "OR"], conversation="group-a", limit=10)
+        assert len(found) == 1
+        await archive.compact()
+        await db.close()
+
+    asyncio.run(main())
+
+
+def test_find_without_full_text(tmp_path):
+    async def main():
+        archive = _archive(SqliteDatabase(str(tmp_path / "archive.db")), full_text=False)
+        with pytest.raises(RuntimeError):
+            await archive.find(["tea"], conversation=None, limit=5)
+
+    asyncio.run(main())
+
+
+def test_retention_deletes_in_chunks(tmp_path, monkeypatch):
+    monkeypatch.setattr(archive_module, "_RETENTION_CHUNK", 3)
+
+    async def main():
+        db = SqliteDatabase(str(tmp_path / "archive.db"))
+        archive = _archive(db, max_messages=4, retention_days=1)
+        now = int(time.time() * 1000)
+        for n in range(7):
+            archive.submit("c", "+1", now - 2 * 86_400_000 + n, f"old {n}")
+        for n in range(6):
+            archive.submit("c", "+1", now + n, f"new {n}")
+        await archive.flush()
+        plan = await db.run(
+            lambda conn: conn.execute(
+                "EXPLAIN QUERY PLAN SELECT id FROM signal_ai_messages WHERE timestamp < ?", (now,)
+            ).fetchall()
+        )
+        assert "signal_ai_messages_timestamp" in str(plan)
+        assert await archive.apply_retention() == 9
+        assert [m.body for m in await archive.recent("c", 10)] == [f"new {n}" for n in range(2, 6)]
+        await archive.stop()
+        await db.close()
+
+    asyncio.run(main())
@@ -0,0 +1,131 @@
+import pytest
+
+from signal_ai.arguments import (
+    ArgError,
+    ArgSpec,
+    Option,
+    Positional,
+    Prefixed,
+    Rest,
+    Switch,
+    clamped_int,
+    command_body,
+)
+
+FIND_LIKE = ArgSpec(
+    "!find [-n N] [from:<number>] [all] <terms>",
+    Option("limit", "-n", clamped_int(1, 20), default=5),
+    Prefixed("source", "from:"),
+    Switch("everywhere", "all"),
+    Rest("terms", required=True, label="search terms"),
+)
+
+
+def test_positionals_only():
+    spec = ArgSpec(
+        "!x <count> [size]", Positional("count", int), Positional("size", int, default=3)
+    )
+    assert spec.parse("2") == {"count": 2, "size": 3}
+    assert spec.parse_message("!x 2 9") == {"count": 2, "size": 9}
+    with pytest.raises(ArgError, match="missing count"):
+        spec.parse("")
+    with pytest.raises(ArgError, match="unexpected argument '4'"):
+        spec.parse("1 2 4")
+    with pytest.raises(ArgError, match="count: "):
+        spec.parse("two")
+
+
+def test_options_prefixes_switches_and_rest():
+    args = FIND_LIKE.parse_message("!find all -n 50 from:+15550001 hello world")
+    assert args == {
+        "limit": 20,
+        "source": "+15550001",
+        "everywhere": True,
+        "terms": ["hello", "world"],
+    }
+    # A switch word after the first term is a term; options still apply anywhere.
+    args = FIND_LIKE.parse_message("!find hello all -n 2")
+    assert args == {"limit": 2, "source": None, "everywhere": False, "terms": ["hello", "all"]}
+
+
+def test_option_errors():
+    with pytest.raises(ArgError, match="-n needs a value"):
+        FIND_LIKE.parse("hello -n")
+    with pytest.raises(ArgError, match="-n: expected a number"):
+        FIND_LIKE.parse("-n lots hello")
+    with pytest.raises(ArgError, match="missing search terms"):
+        FIND_LIKE.parse("all -n 3")
+
+
+def test_raw_rest_keeps_text_verbatim():
+    spec = ArgSpec("!say <who> <text>", Positional("who"), Rest("text", raw=True))
+    args = spec.parse_message("!say  bob   hi  there |  x")
+    assert args == {"who": "bob", "text": "hi  there |  x"}
+    assert spec.parse_message("!say bob") == {"who": "bob", "text": ""}
+
+
+def test_rest_convert_errors_become_arg_errors():
+    spec = ArgSpec("!n <numbers>", Rest("numbers", convert=lambda tokens: [int(t) for t in tokens]))
+    assert spec.parse("1 2") == {"numbers": [1, 2]}
+    with pytest.raises(ArgError, match="numbers: "):
+        spec.parse("1 x")
+
+
+def test_separator():
+    spec = ArgSpec(
+        "!profile <name>[|about]",
+        Positional("name"),
+        Positional("about", default=None),
+        separator="|",
+    )
+    args = spec.parse_message("!profile my bot | likes  tea")
+    assert args == {"name": "my bot", "about": "likes  tea"}
+    assert spec.parse_message("!profile my bot|") == {"name": "my bot", "about": None}
+    with pytest.raises(ArgError, match="missing name"):
+        spec.parse_message("!profile")
+
+
+def test_only_one_rest():
+    with pytest.raises(ValueError):
+        ArgSpec("bad", Rest("a"), Rest("b"))
+
+
+def test_command_body():
+    assert command_body("!echo  hello  world") == "hello  world"
+    assert command_body("!echo") == ""
+    assert command_body(None) == ""
+
+
+class TestCommandSpecs:
+    """The grammars the command modules declare; those modules import signal_client."""
+
+    @pytest.fixture(autouse=True)
+    def _needs_signal_client(self):
+        pytest.importorskip("signal_client")
+
+    def test_roll(self):
+        from signal_ai.commands.roll import ROLL
+
+        assert ROLL.parse_message("!roll 4d6 kh3 + 2")["dice"].text == "4d6kh3+2"
+        with pytest.raises(ArgError, match="dice: "):
+            ROLL.parse_message("!roll 2x6")
+        with pytest.raises(ArgError, match="missing dice"):
+            ROLL.parse_message("!roll")
+
+    def test_schedule(self):
+        from signal_ai.commands.schedule import SCHEDULE, UNSCHEDULE
+
+        request = SCHEDULE.parse_message("!schedule every 1h30m | stand up | now")["request"]
+        assert (request.action, request.every, request.message) == ("add", 5400.0, "stand up | now")
+        request = SCHEDULE.parse_message("!schedule cron 0  9 * * 1-5 | hi")["request"]
+        assert request.cron == "0 9 * * 1-5"
+        assert SCHEDULE.parse_message("!schedule list")["request"].action == "list"
+        with pytest.raises(ArgError):
+            SCHEDULE.parse_message("!schedule soon | hi")
+        with pytest.raises(ArgError, match="missing job id"):
+            UNSCHEDULE.parse_message("!unschedule")
+
+    def test_find(self):
+        from signal_ai.commands.find import FIND
+
+        assert FIND.parse_message("!find -n 3 tea")["limit"] == 3
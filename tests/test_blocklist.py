@@ -0,0 +1,56 @@
+import os
+
+import pytest
+
+pytest.importorskip("structlog")
+
+from signal_ai.services.blocklist import BlocklistEngine, BlocklistRules  # noqa: E402
+
+
+def test_rules():
+    rules = BlocklistRules.compile(
+        ["+15551234567", "# comment", "", " +44* ", "+4420*", "group:abc=", "6f1c-uuid"]
+    )
+    assert rules.size == 5
+    assert rules.blocks("+15551234567")
+    assert not rules.blocks("+15551234568")
+    assert rules.blocks("+447700900000")
+    assert rules.blocks("+44")
+    assert not rules.blocks("+4")
+    assert rules.blocks("6f1c-uuid")
+    assert rules.blocks("+1999", group_id="abc=")
+    assert not rules.blocks("+1999", group_id="other")
+    assert not rules.blocks(None)
+
+
+def test_prefix_trie_shares_nodes():
+    rules = BlocklistRules.compile(["+1555*", "+1*"])
+    assert rules.matches_prefix("+1200")
+    assert rules.matches_prefix("+1555")
+    assert not rules.matches_prefix("+2")
+    assert not BlocklistRules.compile([]).matches_prefix("+1")
+
+
+def test_engine_reloads_file(tmp_path):
+    path = tmp_path / "blocklist.txt"
+    path.write_text("+1555*\n", encoding="utf-8")
+    engine = BlocklistEngine(["+1999"], path)
+    assert engine.rules.blocks("+15550001") and engine.rules.blocks("+1999")
+    assert not engine._changed()
+
+    path.write_text("group:g1\n", encoding="utf-8")
+    stat = path.stat()
+    os.utime(path, (stat.st_atime, stat.st_mtime + 5))
+    assert engine._changed()
+    assert engine.reload()
+    assert not engine.rules.blocks("+15550001")
+    assert engine.rules.blocks("+1999") and engine.rules.blocks("+1", group_id="g1")
+
+
+def test_engine_keeps_rules_when_file_is_missing(tmp_path):
+    path = tmp_path / "blocklist.txt"
+    path.write_text("+1555*\n", encoding="utf-8")
+    engine = BlocklistEngine((), path)
+    path.unlink()
+    assert not engine.reload()
+    assert engine.rules.blocks("+15550001")
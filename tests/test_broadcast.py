@@ -0,0 +1,147 @@
+import asyncio
+import json
+import random
+
+import pytest
+
+pytest.importorskip("structlog")
+pytest.importorskip("prometheus_client")
+
+from signal_ai.services.broadcast import (  # noqa: E402
+    BroadcastEngine,
+    BroadcastJob,
+    SqliteBroadcastStore,
+    redeliver,
+)
+from signal_ai.storage import SqliteDatabase  # noqa: E402
+
+RECIPIENTS = [f"+1555000{n:04d}" for n in range(95)]
+
+
+class RecordingStore(SqliteBroadcastStore):
+    def __init__(self, db):
+        super().__init__(db)
+        self.checkpoints = []
+
+    async def checkpoint(self, job):
+        self.checkpoints.append((job.cursor, job.sent, job.failed))
+        await super().checkpoint(job)
+
+
+class Dlq:
+    def __init__(self):
+        self.records = []
+
+    def submit(self, key, payload):
+        self.records.append(payload)
+
+
+def test_counters_move_with_the_cursor(tmp_path):
+    async def main():
+        db = SqliteDatabase(str(tmp_path / "broadcast.db"))
+        store = RecordingStore(db)
+        rng = random.Random(5)
+
+        async def send(body):
+            # Batches finish out of order.
+            await asyncio.sleep(rng.random() / 200)
+            if "+15550000013" in body["recipients"]:
+                raise RuntimeError("unreachable")
+
+        dlq = Dlq()
+        engine = BroadcastEngine(send, store, batch_size=10, concurrency=4, dlq=dlq)
+        job = await engine.submit("+1", "hi", RECIPIENTS + [RECIPIENTS[0], ""])
+        await engine._tasks[job.id]
+        assert (job.status, job.cursor, job.sent, job.failed) == ("done", 95, 94, 1)
+        # A checkpoint never counts a batch that a resume from its cursor would send again.
+        for cursor, sent, failed in store.checkpoints:
+            assert sent + failed == cursor
+        assert [record["recipient"] for record in dlq.records] == ["+15550000013"]
+        assert await SqliteBroadcastStore(db).load_active() == []
+
+        redelivered = []
+
+        async def resend(body):
+            redelivered.append(body["recipients"])
+
+        assert await redeliver(resend, json.dumps(dlq.records[0]))
+        assert not await redeliver(resend, '{"envelope": {}}')
+        assert redelivered == [["+15550000013"]]
+        await db.close()
+
+    asyncio.run(main())
+
+
+def test_resumes_from_the_checkpointed_cursor(tmp_path):
+    async def main():
+        db = SqliteDatabase(str(tmp_path / "broadcast.db"))
+        store = SqliteBroadcastStore(db)
+        await store.save(BroadcastJob("abc", "+1", "yo", RECIPIENTS, cursor=50, sent=50))
+        calls = []
+
+        async def send(body):
+            calls.append(body["recipients"])
+
+        engine = BroadcastEngine(send, store, batch_size=10, concurrency=1)
+        engine.start()
+        await engine._restore_task
+        job = engine.get("abc")
+        await engine._tasks[job.id]
+        assert calls[0][0] == RECIPIENTS[50]
+        assert sum(len(batch) for batch in calls) == 45
+        assert (job.status, job.cursor, job.sent) == ("done", 95, 95)
+        await engine.stop()
+        await db.close()
+
+    asyncio.run(main())
+
+
+def test_cancel_keeps_the_cursor(tmp_path):
+    async def main():
+        db = SqliteDatabase(str(tmp_path / "broadcast.db"))
+        store = SqliteBroadcastStore(db)
+
+        async def slow(body):
+            await asyncio.sleep(0.02)
+
+        engine = BroadcastEngine(slow, store, batch_size=5, concurrency=1)
+        job = await engine.submit("+1", "x", RECIPIENTS)
+        await asyncio.sleep(0.07)
+        assert await engine.cancel(job.id)
+        assert job.status == "cancelled" and 0 < job.cursor < 95
+        assert job.sent == job.cursor
+        assert await store.load_active() == []
+        await engine.stop()
+        await db.close()
+
+    asyncio.run(main())
+
+
+def test_store_failure_marks_the_job_failed(tmp_path):
+    class FlakyStore(SqliteBroadcastStore):
+        async def checkpoint(self, job):
+            if job.status == "running" and job.cursor == 20:
+                raise OSError("disk full")
+            await super().checkpoint(job)
+
+    async def main():
+        db = SqliteDatabase(str(tmp_path / "broadcast.db"))
+        store = FlakyStore(db)
+        calls = []
+
+        async def send(body):
+            calls.append(body["recipients"])
+            await asyncio.sleep(0)
+
+        engine = BroadcastEngine(send, store, batch_size=10, concurrency=2)
+        job = await engine.submit("+1", "x", RECIPIENTS)
+        await engine._tasks[job.id]
+        assert job.status == "failed" and 20 <= job.cursor < len(RECIPIENTS)
+        # The other worker stops with the job instead of sending the rest.
+        assert len(calls) < 10
+        assert await store.load_active() == []
+        assert engine._tasks == {}
+        await engine.stop()
+        await db.close()
+
+    asyncio.run(main())
@@ -0,0 +1,98 @@
+import asyncio
+
+import pytest
+
+pytest.importorskip("prometheus_client")
+
+from signal_ai.services.cache import TtlCache  # noqa: E402
+
+
+class Clock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_ttl_and_single_flight():
+    async def main():
+        clock = Clock()
+        cache = TtlCache({"n": 10.0}, clock=clock)
+        calls = []
+
+        async def loader():
+            calls.append(1)
+            await asyncio.sleep(0.01)
+            return len(calls)
+
+        assert await asyncio.gather(*(cache.get("n", 1, loader) for _ in range(5))) == [1] * 5
+        assert await cache.get("n", 1, loader) == 1
+        clock.now += 10.0
+        assert await cache.get("n", 1, loader) == 2
+        assert len(calls) == 2
+
+    asyncio.run(main())
+
+
+def test_failures_are_not_cached_and_bypass_without_ttl():
+    async def main():
+        cache = TtlCache({"n": 10.0})
+        attempts = []
+
+        async def flaky():
+            attempts.append(1)
+            if len(attempts) == 1:
+                raise RuntimeError("down")
+            return "up"
+
+        with pytest.raises(RuntimeError):
+            await cache.get("n", "k", flaky)
+        assert await cache.get("n", "k", flaky) == "up"
+        assert await cache.get("other", "k", flaky) == "up"
+        assert len(attempts) == 3
+        assert cache.peek("other", "k") == (False, None)
+
+    asyncio.run(main())
+
+
+def test_cancelled_leader_hands_the_load_over():
+    async def main():
+        cache = TtlCache({"n": 10.0})
+        calls = []
+
+        async def loader():
+            calls.append(1)
+            await asyncio.sleep(0.03)
+            return len(calls)
+
+        leader = asyncio.create_task(cache.get("n", 1, loader))
+        await asyncio.sleep(0)
+        followers = [asyncio.create_task(cache.get("n", 1, loader)) for _ in range(3)]
+        await asyncio.sleep(0.01)
+        leader.cancel()
+        # One follower reloads; the others join its flight instead of failing.
+        assert await asyncio.gather(*followers) == [2, 2, 2]
+        assert len(calls) == 2
+
+    asyncio.run(main())
+
+
+def test_invalidate_drops_stale_loads():
+    async def main():
+        cache = TtlCache({"n": 10.0})
+        version = ["old"]
+
+        async def loader():
+            value = version[0]
+            await asyncio.sleep(0.01)
+            return value
+
+        pending = asyncio.create_task(cache.get("n", 1, loader))
+        await asyncio.sleep(0)
+        version[0] = "new"
+        cache.invalidate("n")
+        assert await pending == "old"
+        assert await cache.get("n", 1, loader) == "new"
+
+    asyncio.run(main())
@@ -0,0 +1,62 @@
+import pytest
+
+from signal_ai.config import parse_args
+
+KNOBS = (
+    "DLQ_REPLAY_INTERVAL",
+    "DLQ_REPLAY_MAX_ATTEMPTS",
+    "BLOCKLISTED",
+    "ENABLED_COMMANDS",
+    "ARCHIVE_ENABLED",
+    "SCHEDULE_MAX_JOBS",
+    "SCHEDULE_RECURRING",
+)
+
+
+@pytest.fixture(autouse=True)
+def _clean_env(monkeypatch):
+    for name in KNOBS:
+        monkeypatch.delenv(name, raising=False)
+
+
+def test_dlq_replay_is_off_by_default_and_clamped():
+    config = parse_args([])
+    assert config.dlq_replay_interval == 0.0
+    assert config.dlq_replay_max_attempts == 3
+    config = parse_args(["--dlq-replay-max-attempts=-3", "--dlq-replay-interval=-1"])
+    assert config.dlq_replay_max_attempts == 1
+    assert config.dlq_replay_interval == 0.0
+
+
+def test_blocklist_entries():
+    assert parse_args([]).blocklist == set()
+    config = parse_args(["--blocklist", "+1, +44* ,,group:g"])
+    assert config.blocklist == {"+1", "+44*", "group:g"}
+
+
+def test_enabled_commands():
+    assert parse_args([]).enabled_commands == []
+    assert parse_args(["--commands", "!ping, !roll"]).enabled_commands == ["!ping", "!roll"]
+
+
+def test_archive_is_opt_in(monkeypatch):
+    assert not parse_args([]).archive_enabled
+    assert parse_args(["--archive"]).archive_enabled
+    monkeypatch.setenv("ARCHIVE_ENABLED", "true")
+    assert parse_args([]).archive_enabled
+
+
+def test_schedule_limits(monkeypatch):
+    config = parse_args([])
+    assert (config.schedule_max_jobs, config.schedule_recurring) == (20, "admin")
+    assert parse_args(["--schedule-max-jobs=0"]).schedule_max_jobs == 1
+    monkeypatch.setenv("SCHEDULE_MAX_JOBS", "5")
+    monkeypatch.setenv("SCHEDULE_RECURRING", "all")
+    config = parse_args([])
+    assert (config.schedule_max_jobs, config.schedule_recurring) == (5, "all")
+    assert parse_args(["--schedule-max-jobs", "7"]).schedule_max_jobs == 7
+
+
+def test_schedule_recurring_choices():
+    with pytest.raises(SystemExit):
+        parse_args(["--schedule-recurring", "nobody"])
@@ -0,0 +1,59 @@
+from datetime import datetime, timezone
+
+import pytest
+
+from signal_ai.services.cron import CronError, parse_cron, parse_duration
+
+
+def _ts(*args: int) -> float:
+    return datetime(*args, tzinfo=timezone.utc).timestamp()
+
+
+@pytest.mark.parametrize(
+    ("text", "seconds"),
+    [("90s", 90), ("10m", 600), ("1h30m", 5400), ("2d", 172800), (" 1W ", 604800)],
+)
+def test_parse_duration(text, seconds):
+    assert parse_duration(text) == seconds
+
+
+@pytest.mark.parametrize("text", ["", "10", "m10", "1h 30m", "0s", "5x"])
+def test_parse_duration_rejects(text):
+    with pytest.raises(CronError):
+        parse_duration(text)
+
+
+def test_next_after_is_strictly_later():
+    every_minute = parse_cron("* * * * *")
+    assert every_minute.next_after(_ts(2024, 1, 1, 12, 0), timezone.utc) == _ts(2024, 1, 1, 12, 1)
+
+
+def test_next_after_steps_and_ranges():
+    expression = parse_cron("*/15 9-17 * * 1-5")
+    # Friday 17:50 -> Monday 09:00.
+    assert expression.next_after(_ts(2024, 3, 1, 17, 50), timezone.utc) == _ts(2024, 3, 4, 9, 0)
+    assert expression.next_after(_ts(2024, 3, 4, 9, 0), timezone.utc) == _ts(2024, 3, 4, 9, 15)
+
+
+def test_sunday_is_zero_and_seven():
+    assert parse_cron("0 0 * * 7").weekdays == parse_cron("0 0 * * 0").weekdays == {0}
+
+
+def test_restricted_day_fields_match_either():
+    # The 13th, or any Friday.
+    expression = parse_cron("0 12 13 * 5")
+    assert expression.next_after(_ts(2024, 9, 1), timezone.utc) == _ts(2024, 9, 6, 12, 0)
+    assert expression.next_after(_ts(2024, 9, 10), timezone.utc) == _ts(2024, 9, 13, 12, 0)
+
+
+def test_month_rollover():
+    expression = parse_cron("30 6 1 1 *")
+    assert expression.next_after(_ts(2024, 2, 1), timezone.utc) == _ts(2025, 1, 1, 6, 30)
+
+
+@pytest.mark.parametrize(
+    "text", ["* * * *", "60 * * * *", "* 24 * * *", "*/0 * * * *", "a * * * *", "0 0 30 2 *"]
+)
+def test_parse_cron_rejects(text):
+    with pytest.raises(CronError):
+        parse_cron(text)
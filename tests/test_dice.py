@@ -0,0 +1,94 @@
+import random
+
+import pytest
+
+from signal_ai.services import dice
+from signal_ai.services.dice import (
+    DiceError,
+    DiceTerm,
+    RollLimits,
+    format_roll,
+    parse_expression,
+    roll,
+)
+
+
+def test_parse_terms_and_constant():
+    expression = parse_expression("4d6kh3 + d% - 2d8dl1 + 5 - 1")
+    assert expression.constant == 4
+    first, percentile, last = expression.terms
+    assert (first.count, first.sides, first.keep, first.keep_high) == (4, 6, 3, True)
+    assert (percentile.count, percentile.sides) == (1, 100)
+    # Drop lowest 1 of 2 keeps the highest 1; the term is subtracted.
+    assert (last.count, last.keep, last.keep_high, last.sign) == (2, 1, True, -1)
+
+
+def test_keep_is_capped_at_count():
+    (term,) = parse_expression("3d6k10").terms
+    assert term.keep == 3
+
+
+def test_simple_expression():
+    assert parse_expression("2d6").simple
+    assert not parse_expression("2d6+1").simple
+    assert not parse_expression("2d6kl1").simple
+
+
+@pytest.mark.parametrize(
+    "text", ["", "d", "2d", "0d6", "2d0", "2d6*3", "5", "2d6kh", "2d6++1", "1234567890d6"]
+)
+def test_parse_rejects(text):
+    with pytest.raises(DiceError):
+        parse_expression(text)
+
+
+def test_limits():
+    limits = RollLimits(max_dice=10, max_sides=100, max_terms=2, max_keep=5)
+    for text in ("11d6", "1d101", "1d6+1d6+1d6"):
+        with pytest.raises(DiceError):
+            roll(parse_expression(text), limits)
+
+
+def test_streamed_keep_bound():
+    with pytest.raises(DiceError):
+        roll(parse_expression("100000d1000kh20000"), RollLimits(max_keep=10_000))
+
+
+def test_small_roll_keeps_individual_dice():
+    result = roll(parse_expression("4d6kh3+2"), RollLimits(), random.Random(1))
+    (term,) = result.terms
+    assert len(term.rolls) == 3 and len(term.dropped) == 1
+    assert min(term.rolls) >= max(term.dropped)
+    assert result.total == sum(term.rolls) + 2
+    assert "dropped" in format_roll(result)
+
+
+def test_counted_roll_histogram():
+    result = roll(parse_expression("1000d6kl10"), RollLimits(), random.Random(2))
+    (term,) = result.terms
+    assert term.rolls is None and sum(term.histogram.values()) == 1000
+    assert term.kept == 10 and term.total == 10 * term.low == 10
+    assert result.summarized
+
+
+@pytest.mark.parametrize(
+    ("keep", "high"),
+    [
+        (4000, True),
+        (4000, False),
+        (100, True),
+        (5000, True),
+        (0, False),
+        (2500, False),
+        (4999, True),
+    ],
+)
+def test_streamed_matches_sorting(keep, high):
+    term = DiceTerm(5000, 1000, 1, keep, high, "5000d1000")
+    result = dice._streamed(term, random.Random(3))
+    rolls = random.Random(3).choices(range(1, 1001), k=5000)
+    kept = sorted(rolls, reverse=high)[:keep]
+    assert result.total == sum(kept)
+    assert result.kept == keep
+    if kept:
+        assert (result.low, result.high) == (min(kept), max(kept))
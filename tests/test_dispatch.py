@@ -0,0 +1,47 @@
+import re
+
+from signal_ai.services.dispatch import DispatchIndex, leading_word, trigger_pattern
+
+ROUTES = [
+    ("!ping", False, "ping"),
+    ("!Admin", True, "admin"),
+    ("!two words", False, "two"),
+    (re.compile(r"!roll\s+(\d+)d(\d+)"), False, "roll"),
+    (re.compile(r"\bhey\b"), False, "hey"),
+    ("!ping", False, "shadowed"),
+]
+
+
+def test_leading_word():
+    assert leading_word(re.compile(r"!roll\s+(\d+)d(\d+)")) == "!roll"
+    assert leading_word(re.compile(r"^!ping$")) == "!ping"
+    assert leading_word(re.compile(r"!a|!b")) is None
+    assert leading_word(re.compile(r"\bhey\b")) is None
+    assert leading_word(re.compile(r"!pingx?")) is None
+
+
+def test_lookup():
+    index = DispatchIndex.compile(ROUTES)
+    assert index.size == len(ROUTES)
+    assert index.lookup("!ping") == "ping"
+    assert index.lookup("!PING now") == "ping"
+    assert index.lookup("!Admin") == "admin"
+    assert index.lookup("!admin") is None
+    assert index.lookup("  !two   words please") == "two"
+    assert index.lookup("!two") is None
+    assert index.lookup("!ROLL 2d6") == "roll"
+    assert index.lookup("well HEY you") == "hey"
+    assert index.lookup("!pingx") is None
+    assert index.lookup("") is None
+
+
+def test_trigger_pattern_matches_what_the_index_routes():
+    index = DispatchIndex.compile(ROUTES)
+    pattern = trigger_pattern((trigger, case_sensitive) for trigger, case_sensitive, _ in ROUTES)
+    texts = ("!ping", " !PING x", "!Admin", "!two  words", "!roll 2d6", "oh hey", "chat", "!admin")
+    for text in texts:
+        assert bool(pattern.search(text)) == (index.lookup(text) is not None), text
+
+
+def test_trigger_pattern_without_triggers_matches_nothing():
+    assert trigger_pattern([]).search("!ping") is None
@@ -0,0 +1,222 @@
+import asyncio
+import json
+import re
+import time
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip("signal_client")
+
+from signal_ai.middlewares import dlq_middleware  # noqa: E402
+from signal_ai.services.dlq import (  # noqa: E402
+    RawEnvelopes,
+    ReplayAttempts,
+    ReplaySpool,
+    _drain_spool,
+    _spool_lines,
+)
+from signal_ai.services.ingest import IngestTap  # noqa: E402
+
+
+def _envelope(n: int, source: str = "+1") -> str:
+    return json.dumps({"envelope": {"source": source, "sourceUuid": f"u{source}", "timestamp": n}})
+
+
+class Writer:
+    def __init__(self):
+        self.records = []
+
+    def submit(self, key, payload):
+        self.records.append(payload)
+
+
+def test_spool_cursor_resumes_after_the_last_commit(tmp_path):
+    spool = ReplaySpool(tmp_path / "replay.spool")
+    assert spool.write(_envelope(n) for n in range(5)) == 5
+    batches = spool.batches(2)
+    first, offset = next(batches)
+    assert [json.loads(line)["envelope"]["timestamp"] for line in first] == [0, 1]
+    batches.close()
+    spool.commit(offset)
+    resumed = [line for batch, _ in spool.batches(2) for line in batch]
+    assert [json.loads(line)["envelope"]["timestamp"] for line in resumed] == [2, 3, 4]
+    spool.clear()
+    assert not spool.exists() and spool.cursor() == 0
+
+
+def test_drain_commits_each_batch_only_after_its_acks(tmp_path):
+    async def main():
+        spool = ReplaySpool(tmp_path / "replay.spool")
+        spool.write(_envelope(n) for n in range(5))
+        queue = asyncio.Queue()
+        handled = []
+
+        async def worker():
+            while True:
+                message = await queue.get()
+                await asyncio.sleep(0.005)
+                handled.append(message.raw)
+                message.ack()
+
+        commits = []
+        commit = spool.commit
+
+        def record(offset):
+            commits.append(len(handled))
+            commit(offset)
+
+        spool.commit = record
+        task = asyncio.create_task(worker())
+        assert await _drain_spool(queue, spool, 2, mode="live") == 5
+        task.cancel()
+        assert commits == [2, 4, 5]
+        assert spool.cursor() == spool.path.stat().st_size
+
+    asyncio.run(main())
+
+
+def test_interrupted_drain_replays_the_unacknowledged_batch(tmp_path):
+    async def main():
+        spool = ReplaySpool(tmp_path / "replay.spool")
+        spool.write(_envelope(n) for n in range(4))
+        queue = asyncio.Queue()
+
+        async def ack_first_batch_only():
+            for _ in range(2):
+                (await queue.get()).ack()
+
+        worker = asyncio.create_task(ack_first_batch_only())
+        drain = asyncio.create_task(_drain_spool(queue, spool, 2, mode="live"))
+        await asyncio.sleep(0.05)
+        drain.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await drain
+        await worker
+        remaining = [line for batch, _ in spool.batches(10) for line in batch]
+        assert [json.loads(line)["envelope"]["timestamp"] for line in remaining] == [2, 3]
+
+    asyncio.run(main())
+
+
+def test_cancel_during_a_spool_read_closes_the_reader_afterwards(tmp_path):
+    closed = []
+
+    class SlowSpool(ReplaySpool):
+        def batches(self, batch_size):
+            try:
+                for step in super().batches(batch_size):
+                    time.sleep(0.05)
+                    yield step
+            finally:
+                closed.append(True)
+
+    async def main():
+        spool = SlowSpool(tmp_path / "replay.spool")
+        spool.write(_envelope(n) for n in range(4))
+        drain = asyncio.create_task(_drain_spool(asyncio.Queue(), spool, 2, mode="live"))
+        await asyncio.sleep(0.01)
+        drain.cancel()
+        # CancelledError, not "generator already executing" from closing it mid-read.
+        with pytest.raises(asyncio.CancelledError):
+            await drain
+        assert not closed
+        await asyncio.sleep(0.1)
+        assert closed and spool.cursor() == 0
+
+    asyncio.run(main())
+
+def test_spool_lines_park_entries_out_of_attempts():
+    records = [{"payload": {"raw": _envelope(n), "attempts": n % 4}} for n in range(8)]
+    records.append(_envelope(99))
+    ready, parked = _spool_lines(records, 3)
+    assert len(parked) == 2 and len(ready) == 7
+    assert all(json.loads(line)["envelope"]["timestamp"] % 4 == 3 for line in parked)
+    assert "\n" not in _spool_lines([{"payload": {"raw": '{\n"a": 1}'}}], 3)[0][0]
+
+
+def test_replay_attempts_by_source_or_uuid_and_bounded():
+    attempts = ReplayAttempts(capacity=4)
+    _spool_lines([{"payload": {"raw": _envelope(5), "attempts": 0}}], 3, attempts)
+    assert attempts.pop("u+1", 5) == 1
+    assert attempts.pop("+1", 5) == 1
+    assert attempts.pop("+1", 5) == 0
+    assert attempts.pop(None, 5) == 0
+    for n in range(10):
+        attempts.note(_envelope(n, f"+{n}"), 1)
+    assert len(attempts._counts) == 4
+
+
+def test_failing_message_is_parked_after_max_attempts():
+    async def main():
+        writer = Writer()
+        attempts = ReplayAttempts()
+        middleware = dlq_middleware(writer, attempts)
+        message = SimpleNamespace(source="+1", timestamp=7, message="!dlq-fail", group=None)
+        ctx = SimpleNamespace(message=message)
+
+        async def fail(ctx):
+            raise RuntimeError("always")
+
+        parked = []
+        for _ in range(5):
+            with pytest.raises(RuntimeError):
+                await middleware(ctx, fail)
+            ready, parked = _spool_lines([{"payload": writer.records.pop()}], 3, attempts)
+            if parked:
+                break
+        # The original failure plus three replays, then it stops cycling.
+        assert len(parked) == 1
+        assert json.loads(parked[0])["envelope"]["timestamp"] == 7
+
+    asyncio.run(main())
+
+
+def test_failed_envelope_round_trips_byte_for_byte(tmp_path):
+    # As signal-cli sends it: compact, non-ASCII left unescaped, fields the
+    # parsed message never exposes (attachments, mentions, quote).
+    raw = (
+        '{"envelope":{"source":"+1","sourceUuid":"u+1","sourceDevice":2,"timestamp":42,'
+        '"dataMessage":{"timestamp":42,"message":"!dlq-fail \ufffc café",'
+        '"attachments":[{"contentType":"image/jpeg","filename":"a.jpg","id":"att1",'
+        '"size":1234,"width":640,"height":480}],'
+        '"mentions":[{"name":"+2","number":"+2","uuid":"u+2","start":10,"length":1}],'
+        '"quote":{"id":41,"author":"+2","text":"earlier"},'
+        '"groupInfo":{"groupId":"grp==","type":"DELIVER"}}},"account":"+15550000000"}'
+    )
+
+    async def main():
+        writer = Writer()
+        raw_envelopes = RawEnvelopes()
+        middleware = dlq_middleware(writer, None, raw_envelopes)
+        queue = asyncio.Queue()
+        IngestTap(raw_envelopes=raw_envelopes, trigger=re.compile(r"^!dlq-fail")).install(queue)
+        await queue.put(SimpleNamespace(raw=raw, enqueued_at=0.0))
+        await queue.get()
+        message = SimpleNamespace(source="+1", timestamp=42, message="!dlq-fail", group=None)
+
+        async def fail(ctx):
+            raise RuntimeError("boom")
+
+        with pytest.raises(RuntimeError):
+            await middleware(SimpleNamespace(message=message), fail)
+        assert len(raw_envelopes) == 0
+        assert writer.records[0]["raw"] == raw
+        ready, _ = _spool_lines([{"payload": writer.records[0]}], 3)
+        spool = ReplaySpool(tmp_path / "replay.spool")
+        spool.write(ready)
+        replayed = [line for batch, _ in spool.batches(10) for line in batch]
+        assert [line.encode() for line in replayed] == [raw.encode()]
+
+    asyncio.run(main())
+
+
+def test_raw_envelopes_only_for_triggers_and_bounded():
+    raw_envelopes = RawEnvelopes(capacity=2)
+    tap = IngestTap(raw_envelopes=raw_envelopes, trigger=re.compile(r"^!"))
+    for n, text in enumerate(["chat", "!a", "!b", "!c"]):
+        body = {"timestamp": n, "message": text}
+        tap.observe(json.dumps({"envelope": {"source": "+1", "timestamp": n, "dataMessage": body}}))
+    assert len(raw_envelopes) == 2
+    assert raw_envelopes.pop("+1", 1) is None
+    assert json.loads(raw_envelopes.pop("+1", 3))["envelope"]["dataMessage"]["message"] == "!c"
@@ -0,0 +1,113 @@
+import asyncio
+import json
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip("structlog")
+pytest.importorskip("prometheus_client")
+
+from signal_ai.services.archive import MessageArchive  # noqa: E402
+from signal_ai.services.ingest import Envelope, IngestTap, parse_envelope  # noqa: E402
+from signal_ai.storage import SqliteDatabase  # noqa: E402
+
+GROUP = "grp=="
+
+
+def _raw(source, timestamp, text, group=GROUP):
+    message = {"timestamp": timestamp, "message": text}
+    if group is not None:
+        message["groupInfo"] = {"groupId": group, "type": "DELIVER"}
+    envelope = {"source": source, "timestamp": timestamp, "dataMessage": message}
+    return json.dumps({"envelope": envelope, "account": "+15550000000"})
+
+
+def _context(source, timestamp, text, replies):
+    async def reply(request):
+        replies.append(request.message)
+
+    message = SimpleNamespace(
+        source=source,
+        message=text,
+        timestamp=timestamp,
+        group={"groupId": GROUP},
+        is_group=lambda: True,
+    )
+    return SimpleNamespace(message=message, reply=reply)
+
+
+async def _ingest(archive, *raws):
+    """Run envelopes through a tapped queue the way the worker pool consumes them."""
+    queue = asyncio.Queue()
+    IngestTap(archive=archive).install(queue)
+    for raw in raws:
+        await queue.put(SimpleNamespace(raw=raw, enqueued_at=0.0))
+    while not queue.empty():
+        await queue.get()
+        queue.task_done()
+    await archive.flush()
+
+
+def test_parse_envelope():
+    assert parse_envelope(_raw("+1", 5, "hi")) == Envelope(GROUP, "+1", 5, "hi")
+    assert parse_envelope(_raw("+1", 5, "hi", group=None)) == Envelope("+1", "+1", 5, "hi")
+    sync = {"sentMessage": {"message": "note to self", "timestamp": 6}}
+    raw = json.dumps({"envelope": {"source": "+1", "timestamp": 6, "syncMessage": sync}})
+    assert parse_envelope(raw) == Envelope("+1", "+1", 6, "note to self")
+    receipt = json.dumps({"envelope": {"source": "+1", "timestamp": 7, "receiptMessage": {}}})
+    assert parse_envelope(receipt) == Envelope("+1", "+1", 7, None)
+    assert parse_envelope("not json") is None
+    assert parse_envelope('{"result": {}}') is None
+
+
+def test_plain_chat_reaches_history(tmp_path):
+    pytest.importorskip("signal_client")
+    from signal_ai.commands.history import HISTORY, history_handler
+    from signal_ai.commands.types import BotState
+
+    async def main():
+        db = SqliteDatabase(str(tmp_path / "archive.db"))
+        archive = MessageArchive(db, capacity=100, batch_size=50, flush_interval=60.0)
+        await _ingest(
+            archive,
+            _raw("+1", 1_000, "lunch at noon?"),
+            _raw("+2", 2_000, "sure, the usual place"),
+            _raw("+1", 3_000, "!history"),
+        )
+        replies = []
+        handler = history_handler(BotState(archive=archive))
+        await handler(_context("+1", 3_000, "!history", replies), HISTORY.parse_message("!history"))
+        assert "+1: lunch at noon?" in replies[0]
+        assert "+2: sure, the usual place" in replies[0]
+        assert "!history" not in replies[0]
+        await archive.stop()
+        await db.close()
+
+    asyncio.run(main())
+
+
+def test_plain_chat_is_found(tmp_path):
+    pytest.importorskip("signal_client")
+    from signal_ai.commands import CommandOptions
+    from signal_ai.commands.find import FIND, find_handler
+    from signal_ai.commands.types import BotState
+
+    async def main():
+        db = SqliteDatabase(str(tmp_path / "archive.db"))
+        archive = MessageArchive(db, capacity=100, batch_size=50, flush_interval=60.0)
+        await _ingest(
+            archive,
+            _raw("+2", 1_000, "the quarterly report is in the shared drive"),
+            _raw("+2", 2_000, "unrelated chatter"),
+            _raw("+1", 3_000, "!find quarterly"),
+        )
+        replies = []
+        handler = find_handler(CommandOptions("+15550000001", "", None), BotState(archive=archive))
+        text = "!find quarterly"
+        await handler(_context("+1", 3_000, text, replies), FIND.parse_message(text))
+        assert replies[0].startswith("1 match(es)")
+        assert "+2: the quarterly report is in the shared drive" in replies[0]
+        await archive.stop()
+        await db.close()
+
+    asyncio.run(main())
@@ -0,0 +1,68 @@
+import asyncio
+
+import pytest
+
+pytest.importorskip("structlog")
+
+from signal_ai.services.ledger import SqliteLedgerStore, WriteBehindLedger  # noqa: E402
+from signal_ai.storage import SqliteDatabase  # noqa: E402
+
+
+class SlowStore:
+    def __init__(self) -> None:
+        self.data: dict[str, int] = {}
+        self.loads: list[list[str]] = []
+
+    async def load(self, users):
+        self.loads.append(sorted(users))
+        return {user: self.data[user] for user in users if user in self.data}
+
+    async def apply(self, deltas, initial):
+        await asyncio.sleep(0.02)
+        for user, delta in deltas.items():
+            self.data[user] = self.data.get(user, initial) + delta
+        return {user: self.data[user] for user in deltas}
+
+    async def close(self):
+        return None
+
+
+def test_stop_flushes_increments_made_during_a_flush():
+    async def main():
+        store = SlowStore()
+        ledger = WriteBehindLedger(store, flush_interval=0.01)
+        ledger.start()
+        for _ in range(30):
+            await ledger.increment("a", 1)
+            await asyncio.sleep(0.003)
+        await ledger.stop()
+        assert store.data == {"a": 130}
+
+    asyncio.run(main())
+
+
+def test_misses_in_one_iteration_share_a_load():
+    async def main():
+        store = SlowStore()
+        store.data["b"] = 7
+        ledger = WriteBehindLedger(store, initial=100)
+        values = await asyncio.gather(ledger.increment("a", 1), ledger.increment("b", 1))
+        assert values == [101, 8]
+        assert store.loads == [["a", "b"]]
+
+    asyncio.run(main())
+
+
+def test_sqlite_store_round_trip(tmp_path):
+    async def main():
+        db = SqliteDatabase(str(tmp_path / "ledger.db"))
+        ledger = WriteBehindLedger(SqliteLedgerStore(db), initial=10, flush_interval=60)
+        ledger.start()
+        await ledger.increment("a", 5)
+        await ledger.increment("a", -2)
+        await ledger.stop()
+        reopened = WriteBehindLedger(SqliteLedgerStore(db), initial=10, flush_interval=0)
+        assert await reopened.increment("a", 1) == 14
+        await db.close()
+
+    asyncio.run(main())
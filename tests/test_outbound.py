@@ -0,0 +1,101 @@
+import asyncio
+import dataclasses
+
+import pytest
+
+pytest.importorskip("structlog")
+pytest.importorskip("prometheus_client")
+
+from signal_ai.services.outbound import (  # noqa: E402
+    MAX_MERGED_CHARS,
+    CoalescingContext,
+    ReplyLane,
+)
+
+
+@dataclasses.dataclass
+class Request:
+    """The slice of `SendMessageRequest` the lane relies on."""
+
+    message: str | None = None
+    recipients: list[str] = dataclasses.field(default_factory=list)
+    sticker: str | None = None
+
+    def model_dump(self, exclude_defaults=True, exclude_none=True):
+        return {key: value for key, value in dataclasses.asdict(self).items() if value}
+
+    def model_copy(self, update):
+        return dataclasses.replace(self, **update)
+
+
+class Context:
+    def __init__(self, fail_text=False):
+        self.sent = []
+        self.fail_text = fail_text
+
+    async def reply(self, request):
+        return self._record("reply", request)
+
+    async def send(self, request):
+        if request.sticker == "bad" or (self.fail_text and request.sticker is None):
+            raise RuntimeError("rejected")
+        return self._record("send", request)
+
+    def _record(self, kind, request):
+        self.sent.append((kind, request.message))
+        return {"timestamp": len(self.sent)}
+
+
+def test_merges_text_and_keeps_call_order():
+    async def main():
+        ctx = Context()
+        lane = ReplyLane(window=0.05)
+        wrapped = CoalescingContext(ctx, lane)
+        assert await wrapped.reply(Request("a")) is None
+        await wrapped.reply(Request("b"))
+        await wrapped.send(Request("c"))
+        assert await wrapped.send(Request("s", sticker="x")) == {"timestamp": 3}
+        with pytest.raises(RuntimeError):
+            await wrapped.send(Request("s", sticker="bad"))
+        await wrapped.reply(Request("d"))
+        await lane.drain()
+        assert ctx.sent == [("reply", "a\nb"), ("send", "c"), ("send", "s"), ("reply", "d")]
+
+    asyncio.run(main())
+
+
+def test_window_flushes_without_drain():
+    async def main():
+        ctx = Context()
+        lane = ReplyLane(window=0.01)
+        lane.submit(ctx.reply, Request("a"))
+        await asyncio.sleep(0.05)
+        assert ctx.sent == [("reply", "a")]
+
+    asyncio.run(main())
+
+
+def test_merged_text_stays_under_the_limit():
+    async def main():
+        ctx = Context()
+        lane = ReplyLane(window=1.0)
+        chunk = "x" * (MAX_MERGED_CHARS // 3 - 60)
+        for _ in range(4):
+            lane.submit(ctx.reply, Request(chunk))
+        await lane.drain()
+        assert [len(message) for _, message in ctx.sent] == [3 * len(chunk) + 2, len(chunk)]
+
+    asyncio.run(main())
+
+
+def test_failed_merged_send_is_raised_by_drain():
+    async def main():
+        ctx = Context(fail_text=True)
+        lane = ReplyLane(window=1.0)
+        lane.submit(ctx.send, Request("a"))
+        lane.submit(ctx.reply, Request("b"))
+        with pytest.raises(RuntimeError):
+            await lane.drain()
+        assert ctx.sent == [("reply", "b")]
+
+    asyncio.run(main())
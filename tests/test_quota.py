@@ -0,0 +1,73 @@
+import asyncio
+
+import pytest
+
+pytest.importorskip("structlog")
+pytest.importorskip("prometheus_client")
+
+from signal_ai.services.quota import (  # noqa: E402
+    MemoryQuotaLimiter,
+    QuotaPolicy,
+    Throttled,
+    check_quota,
+)
+
+SENDER = QuotaPolicy(rate=1.0, burst=3)
+GROUP = QuotaPolicy(rate=1.0, burst=1)
+
+
+class Clock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_burst_then_refill():
+    clock = Clock()
+    limiter = MemoryQuotaLimiter(clock=clock)
+    bucket = [("sender:+1", SENDER)]
+    assert [limiter.take(bucket) for _ in range(4)] == [None, None, None, (0, True)]
+    # Told once per refill window, not on every dropped message.
+    assert limiter.take(bucket) == (0, False)
+    clock.now += 1.0
+    assert limiter.take(bucket) is None
+    assert limiter.take(bucket) == (0, False)
+    clock.now += SENDER.refill_seconds
+    assert limiter.take(bucket) is None
+    assert limiter.take(bucket) is None
+
+
+def test_group_denial_does_not_spend_the_sender_token():
+    async def main():
+        limiter = MemoryQuotaLimiter(clock=Clock())
+        results = [await check_quota(limiter, "+1", "G", SENDER, GROUP) for _ in range(3)]
+        assert results == [None, Throttled("group", True), Throttled("group", False)]
+        # Only the allowed group message cost the sender a token.
+        direct = [await check_quota(limiter, "+1", None, SENDER, GROUP) for _ in range(3)]
+        assert direct == [None, None, Throttled("sender", True)]
+
+    asyncio.run(main())
+
+
+def test_disabled_policies_allow_everything():
+    async def main():
+        limiter = MemoryQuotaLimiter(clock=Clock())
+        off = QuotaPolicy(rate=0.0, burst=0)
+        assert not off.enabled
+        assert all([await check_quota(limiter, "+1", "G", off, off) is None for _ in range(10)])
+        assert len(limiter) == 0
+
+    asyncio.run(main())
+
+
+def test_idle_buckets_are_evicted():
+    clock = Clock()
+    limiter = MemoryQuotaLimiter(clock=clock)
+    for n in range(3):
+        limiter.take([(f"sender:+{n}", SENDER)])
+    clock.now += SENDER.refill_seconds
+    limiter.take([("sender:+9", SENDER)])
+    limiter.take([("sender:+9", SENDER)])
+    assert len(limiter) == 1
@@ -0,0 +1,37 @@
+import pytest
+
+pytest.importorskip("phonenumbers")
+pytest.importorskip("prometheus_client")
+
+from signal_ai.services.registration import (  # noqa: E402
+    _result_number,
+    normalize_e164,
+    split_numbers,
+)
+
+
+@pytest.mark.parametrize(
+    ("raw", "number"),
+    [
+        ("+1 (555) 123-4567", "+15551234567"),
+        ("0044 20 7183 8750", "+442071838750"),
+        ("tel:+1-555-123-4567", "+15551234567"),
+        ("+44 20 7183 8750 ext. 12", "+442071838750"),
+        ("5551234567", None),
+        ("+1555", None),
+        ("abc", None),
+        ("6f1c2f8e-1111-2222-3333-444455556666", None),
+    ],
+)
+def test_normalize_e164(raw, number):
+    assert normalize_e164(raw) == number
+
+
+def test_split_numbers_keeps_spaced_numbers_whole():
+    pieces = split_numbers("+1 555 123 4567, +44 20 7183 8750; 555 1234\n+15557654321")
+    assert pieces == ["+1 555 123 4567", "+44 20 7183 8750", "555", "1234", "+15557654321"]
+
+
+def test_result_number_falls_through_unparsable_fields():
+    assert _result_number({"number": "garbage", "input": "+1 555 123 4567"}) == "+15551234567"
+    assert _result_number({"number": "garbage"}) is None
@@ -0,0 +1,47 @@
+import pytest
+
+pytest.importorskip("signal_client")
+
+from signal_ai.arguments import ArgError  # noqa: E402
+from signal_ai.commands import CommandOptions, registry  # noqa: E402
+from signal_ai.commands.types import BotState  # noqa: E402
+
+
+ADMIN = "+15550000001"
+
+
+def test_every_spec_is_routable():
+    index = registry.build_dispatch_index(registry.COMMANDS, {})
+    trigger = registry.dispatch_trigger(registry.COMMANDS)
+    for spec in registry.COMMANDS:
+        assert index.lookup(f"{spec.name} x").spec is spec
+        assert trigger.search(f"{spec.name} x")
+    assert index.lookup("just chatting") is None and not trigger.search("just chatting")
+    assert registry.legacy_builder("!ping") is not None
+    assert set(registry.LEGACY_BUILDERS.values()) <= registry.command_names()
+
+
+def test_routes_load_their_module_and_argspec_on_first_use():
+    deps = {"options": CommandOptions(ADMIN, "", None), "state": BotState()}
+    index = registry.build_dispatch_index(registry.select_commands(["!roll", "!ping"]), deps)
+    route = index.lookup("!roll 2d6")
+    assert route.handler is None and route.args is None
+    route.load()
+    assert route.args.parse_message("!roll 2d6")["dice"].text == "2d6"
+    with pytest.raises(ArgError):
+        route.args.parse_message("!roll lots")
+    assert index.lookup("!echo hi") is None
+
+
+def test_roll_is_still_recognised_mid_message():
+    deps = {"options": CommandOptions(ADMIN, "", None), "state": BotState()}
+    index = registry.build_dispatch_index(registry.COMMANDS, deps)
+    trigger = registry.dispatch_trigger(registry.COMMANDS)
+    for text in ("ok !roll 2d6", "!ROLL 2d6", "so\n!roll 2d6"):
+        route = index.lookup(text)
+        assert route is not None and route.spec.name == "!roll" and trigger.search(text)
+        route.load()
+        assert route.parse(text)["dice"].text == "2d6"
+    assert index.lookup("ok !rolls 2d6") is None
+    with pytest.raises(ArgError, match="missing dice"):
+        index.lookup("what is !roll").parse("what is !roll")
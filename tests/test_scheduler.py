@@ -0,0 +1,173 @@
+import asyncio
+import time
+from datetime import datetime, timezone
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip("structlog")
+pytest.importorskip("prometheus_client")
+
+from signal_ai.services.cron import CronError  # noqa: E402
+from signal_ai.services.scheduler import Job, Scheduler, SqliteJobStore  # noqa: E402
+from signal_ai.storage import SqliteDatabase  # noqa: E402
+
+
+async def _noop(payload):
+    return None
+
+
+def test_runs_jobs_in_due_order():
+    async def main():
+        scheduler = Scheduler(None, workers=1)
+        fired = []
+
+        async def record(payload):
+            fired.append(payload["n"])
+
+        scheduler.register("record", record)
+        scheduler.start()
+        now = time.time()
+        for n, delay in ((3, 0.06), (1, 0.0), (2, 0.03)):
+            await scheduler.schedule("record", {"n": n}, at=now + delay)
+        cancelled = await scheduler.schedule("record", {"n": 99}, at=now + 0.02)
+        assert await scheduler.cancel(cancelled.id)
+        assert not await scheduler.cancel(cancelled.id)
+        await asyncio.sleep(0.15)
+        await scheduler.stop()
+        assert fired == [1, 2, 3]
+        assert len(scheduler) == 0
+
+    asyncio.run(main())
+
+
+def test_recurring_job_reschedules_until_cancelled():
+    async def main():
+        scheduler = Scheduler(None)
+        fired = []
+
+        async def record(payload):
+            fired.append(time.time())
+
+        scheduler.register("record", record)
+        scheduler.start()
+        job = await scheduler.schedule("record", at=time.time() + 0.02, every=0.03)
+        await asyncio.sleep(0.16)
+        await scheduler.cancel(job.id)
+        count = len(fired)
+        await asyncio.sleep(0.06)
+        await scheduler.stop()
+        assert 3 <= count <= 6
+        assert len(fired) == count
+
+    asyncio.run(main())
+
+
+def test_next_due_skips_missed_intervals_without_drift():
+    scheduler = Scheduler(None)
+    job = Job("j", 100.0, "record", every=10.0)
+    assert scheduler.next_due(job, 100.0) == 110.0
+    assert scheduler.next_due(job, 135.0) == 140.0
+
+
+def test_next_due_cron():
+    scheduler = Scheduler(None)
+    monday_9 = datetime(2024, 3, 4, 9, 0, tzinfo=timezone.utc).timestamp()
+    job = Job("j", monday_9, "record", cron="0 9 * * 1-5")
+    assert scheduler.next_due(job, monday_9) == monday_9 + 86400
+
+
+def test_schedule_validates():
+    async def main():
+        scheduler = Scheduler(None)
+        scheduler.register("record", _noop)
+        with pytest.raises(KeyError):
+            await scheduler.schedule("missing", at=0)
+        with pytest.raises(CronError):
+            await scheduler.schedule("record", at=0, cron="61 * * * *")
+
+    asyncio.run(main())
+
+
+def test_jobs_listing_is_soonest_first():
+    async def main():
+        scheduler = Scheduler(None)
+        scheduler.register("record", _noop)
+        for n in (3, 1, 2):
+            await scheduler.schedule("record", {"n": n}, at=1000.0 + n)
+        assert [job.payload["n"] for job in scheduler.jobs()] == [1, 2, 3]
+        later = scheduler.jobs(lambda job: job.payload["n"] > 1)
+        assert [job.payload["n"] for job in later] == [2, 3]
+
+    asyncio.run(main())
+
+
+def test_restores_jobs_and_catches_up_once(tmp_path):
+    async def main():
+        db = SqliteDatabase(str(tmp_path / "jobs.db"))
+        first = Scheduler(SqliteJobStore(db))
+        first.register("record", _noop)
+        now = time.time()
+        await first.schedule("record", {"n": 1}, at=now - 3600, every=60)
+        await first.schedule("record", {"n": 2}, at=now + 3600)
+        await first.stop()
+
+        fired = []
+
+        async def record(payload):
+            fired.append(payload["n"])
+
+        second = Scheduler(SqliteJobStore(db))
+        second.register("record", record)
+        second.start()
+        await asyncio.sleep(0.05)
+        await second.stop()
+        # An hour behind, the recurring job fires once and resumes its schedule.
+        assert fired == [1]
+        stored = {job.payload["n"]: job for job in await SqliteJobStore(db).load()}
+        assert now < stored[1].due <= now + 60
+        assert stored[2].due == now + 3600
+        await db.close()
+
+    asyncio.run(main())
+
+
+
+def test_schedule_command_limits_recurring_and_pending_jobs():
+    pytest.importorskip("signal_client")
+    from signal_ai.commands import CommandOptions
+    from signal_ai.commands.delayed import register_scheduled_actions
+    from signal_ai.commands.schedule import SCHEDULE, schedule_handler
+    from signal_ai.commands.types import BotState
+
+    admin = "+15550000001"
+
+    def context(source, text, replies):
+        async def reply(request):
+            replies.append(request.message)
+
+        message = SimpleNamespace(
+            source=source, message=text, timestamp=1, group=None, is_group=lambda: False
+        )
+        settings = SimpleNamespace(phone_number="+15550000000")
+        return SimpleNamespace(message=message, settings=settings, reply=reply)
+
+    async def main():
+        scheduler = Scheduler(None)
+        register_scheduled_actions(scheduler, SimpleNamespace())
+        options = CommandOptions(admin, "", None, schedule_max_jobs=2)
+        handler = schedule_handler(options, BotState(scheduler=scheduler))
+        replies = []
+        for source, text in (
+            ("+15550000002", "!schedule every 1h | standup"),
+            (admin, "!schedule every 1h | standup"),
+            (admin, "!schedule in 10m | tea"),
+            (admin, "!schedule in 10m | more tea"),
+        ):
+            await handler(context(source, text, replies), SCHEDULE.parse_message(text))
+        assert "limited to the admin" in replies[0]
+        assert replies[1].startswith("scheduled") and replies[2].startswith("scheduled")
+        assert "already has 2 pending jobs" in replies[3]
+        assert len(scheduler) == 2
+
+    asyncio.run(main())
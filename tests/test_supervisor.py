@@ -0,0 +1,151 @@
+import asyncio
+import json
+import sys
+import textwrap
+import zlib
+
+import pytest
+
+pytest.importorskip("aiohttp")
+pytest.importorskip("structlog")
+pytest.importorskip("prometheus_client")
+
+import aiohttp  # noqa: E402
+
+from signal_ai.services.supervisor import (  # noqa: E402
+    Supervisor,
+    conversation_of,
+    envelope_line,
+    orphaned_shards,
+    pump_websocket,
+    shard_of,
+    shard_prefix,
+)
+
+# Stand-in worker: reports ready, appends each stdin line to its shard's file
+# and exits once stdin closes, like a bot process draining.
+WORKER = textwrap.dedent(
+    """
+    import os, sys
+
+    args = sys.argv[2:]
+    index = args[args.index("--worker-index") + 1]
+    fd = int(args[args.index("--worker-status-fd") + 1])
+    os.write(fd, b"ready\\n")
+    os.close(fd)
+    with open(os.path.join(sys.argv[1], f"worker-{index}.log"), "a") as out:
+        for line in sys.stdin:
+            out.write(line)
+            out.flush()
+    """
+)
+
+
+def test_conversation_of():
+    group = {"envelope": {"source": "+1", "dataMessage": {"groupInfo": {"groupId": "g=="}}}}
+    assert conversation_of(json.dumps(group)) == "g=="
+    direct = {"envelope": {"sourceUuid": "u-1", "sourceNumber": "+1", "source": "+1"}}
+    assert conversation_of(json.dumps(direct)) == "u-1"
+    assert conversation_of(json.dumps({"envelope": {"source": "+1"}})) == "+1"
+    # A quoted field name inside message text is escaped and never matches.
+    text = {"envelope": {"dataMessage": {"message": '"groupId": "fake"'}, "source": "+2"}}
+    assert conversation_of(json.dumps(text)) == "+2"
+    assert conversation_of("{}") == ""
+
+
+def test_shard_of_is_stable_across_processes():
+    assert shard_of("+15550000001", 4) == zlib.crc32(b"+15550000001") % 4
+    assert {shard_of(f"+1555{n}", 3) for n in range(100)} == {0, 1, 2}
+
+
+def test_envelope_line_is_one_line():
+    assert envelope_line('{"a": 1}') == b'{"a": 1}\n'
+    assert envelope_line('{\n  "a": "x\\ny"\n}') == b'{"a": "x\\ny"}\n'
+
+
+def test_shard_prefix_and_orphans():
+    assert shard_prefix("signal_ai:jobs", 0) == "signal_ai:jobs"
+    assert shard_prefix("signal_ai:jobs", 2) == "signal_ai:jobs:2"
+    # Shrinking from 5 to 2 processes: shards 2-4 are adopted round-robin.
+    assert orphaned_shards(5, 2, 0) == [2, 4]
+    assert orphaned_shards(5, 2, 1) == [3]
+    assert orphaned_shards(2, 2, 0) == []
+
+
+def test_start_failure_still_lets_stop_reach_started_workers():
+    async def main():
+        supervisor = Supervisor(["true"], 3)
+        started, stopped = [], []
+        for worker in supervisor.workers:
+
+            async def start(worker=worker):
+                await asyncio.sleep(0.01 * worker.index)
+                if worker.index == 0:
+                    raise OSError("spawn failed")
+                started.append(worker.index)
+
+            async def stop(worker=worker):
+                if worker.index in started:
+                    stopped.append(worker.index)
+
+            worker.start, worker.stop = start, stop
+        with pytest.raises(OSError):
+            await supervisor.start()
+        await supervisor.stop()
+        assert sorted(started) == sorted(stopped) == [1, 2]
+
+    asyncio.run(main())
+
+
+def test_routes_websocket_envelopes_to_workers_in_order(tmp_path):
+    fake_signal_api = pytest.importorskip("fake_signal_api")
+    script = tmp_path / "worker.py"
+    script.write_text(WORKER, encoding="utf-8")
+    senders = [f"+1555000{n:04d}" for n in range(6)]
+
+    async def main():
+        api = fake_signal_api.FakeSignalApi()
+        url = await api.start()
+        supervisor = Supervisor([sys.executable, str(script), str(tmp_path)], 2, drain_timeout=5)
+        dispatched = asyncio.Queue()
+        dispatch = supervisor.dispatch
+
+        async def counted(raw):
+            await dispatch(raw)
+            dispatched.put_nowait(raw)
+
+        supervisor.dispatch = counted
+        await supervisor.start()
+        await asyncio.wait_for(supervisor.wait_ready(), 10)
+        async with aiohttp.ClientSession() as session:
+            ws_url = url.replace("http", "ws", 1) + f"/v1/receive/{api.number}"
+            pump = asyncio.create_task(pump_websocket(session, ws_url, supervisor))
+            await asyncio.wait_for(api.wait_connected(), 5)
+            sent = 0
+            for round_ in range(2):
+                for n in range(20):
+                    sender = senders[n % len(senders)]
+                    sent += 1
+                    await api.inject(
+                        fake_signal_api.envelope(api.number, sender, f"m{sent}", timestamp=sent)
+                    )
+                if round_ == 0:
+                    # Restarting mid-stream must neither drop nor reorder envelopes.
+                    await asyncio.wait_for(supervisor.rolling_restart(), 20)
+            for _ in range(sent):
+                await asyncio.wait_for(dispatched.get(), 5)
+            pump.cancel()
+        await supervisor.stop()
+        await api.stop()
+
+        seen = 0
+        for index in range(2):
+            lines = (tmp_path / f"worker-{index}.log").read_text(encoding="utf-8").splitlines()
+            envelopes = [json.loads(line)["envelope"] for line in lines]
+            assert {shard_of(e["sourceUuid"], 2) for e in envelopes} == {index}
+            timestamps = [e["timestamp"] for e in envelopes]
+            assert timestamps == sorted(timestamps)
+            seen += len(envelopes)
+        assert seen == sent
+
+    asyncio.run(main())
@@ -0,0 +1,140 @@
+import asyncio
+import math
+
+import pytest
+
+pytest.importorskip("structlog")
+pytest.importorskip("prometheus_client")
+
+from signal_ai.services.timers import SqliteTimerStore, TimerWheel  # noqa: E402
+from signal_ai.storage import SqliteDatabase  # noqa: E402
+
+
+class Clock:
+    def __init__(self, now: float = 1000.0) -> None:
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+
+async def _noop(payload):
+    return None
+
+
+def test_cascades_fire_each_timer_on_its_tick():
+    async def main():
+        clock = Clock()
+        wheel = TimerWheel(None, tick=0.05, clock=clock)
+        wheel.register("noop", _noop)
+        # One timer per wheel level: 0.2 s, 10 s, 20 min and 4 h.
+        for delay in (0.2, 10.0, 1200.0, 14400.0):
+            await wheel.schedule(delay, "noop", {"delay": delay})
+        fired = {}
+        tick = wheel._now
+        while len(fired) < 4:
+            tick += 1
+            for timer in wheel._advance(tick):
+                fired[timer.payload["delay"]] = (tick, timer.due)
+        for tick, due in fired.values():
+            # Never early, and late by less than one tick.
+            assert tick == math.ceil(due / 0.05)
+
+    asyncio.run(main())
+
+
+def test_clock_jump_rebuckets():
+    async def main():
+        clock = Clock()
+        wheel = TimerWheel(None, tick=0.05, clock=clock)
+        wheel.register("noop", _noop)
+        await wheel.schedule(60.0, "noop")
+        await wheel.schedule(7200.0, "noop")
+        clock.now += 3600
+        assert len(wheel._advance(wheel._tick_of(clock.now))) == 1
+
+    asyncio.run(main())
+
+
+def test_runs_in_due_order_and_cancel():
+    async def main():
+        wheel = TimerWheel(None, tick=0.005)
+        fired = []
+
+        async def record(payload):
+            fired.append(payload["n"])
+
+        wheel.register("record", record)
+        wheel.start()
+        await wheel.schedule(0.04, "record", {"n": 3})
+        await wheel.schedule(0.0, "record", {"n": 1})
+        cancelled = await wheel.schedule(0.02, "record", {"n": 99})
+        await wheel.schedule(0.02, "record", {"n": 2})
+        assert wheel.cancel(cancelled)
+        assert not wheel.cancel(cancelled)
+        await asyncio.sleep(0.15)
+        await wheel.stop()
+        assert fired == [1, 2, 3]
+        assert len(wheel) == 0
+
+    asyncio.run(main())
+
+
+def test_unknown_action():
+    async def main():
+        wheel = TimerWheel(None)
+        with pytest.raises(KeyError):
+            await wheel.schedule(1.0, "missing")
+
+    asyncio.run(main())
+
+
+def test_failing_action_does_not_stop_the_wheel():
+    async def main():
+        wheel = TimerWheel(None, tick=0.005)
+        fired = []
+
+        async def fail(payload):
+            raise RuntimeError("boom")
+
+        async def record(payload):
+            fired.append(payload)
+
+        wheel.register("fail", fail)
+        wheel.register("record", record)
+        wheel.start()
+        await wheel.schedule(0.0, "fail")
+        await wheel.schedule(0.01, "record", {"ok": True})
+        await asyncio.sleep(0.08)
+        await wheel.stop()
+        assert fired == [{"ok": True}]
+
+    asyncio.run(main())
+
+
+def test_restores_pending_timers(tmp_path):
+    async def main():
+        db = SqliteDatabase(str(tmp_path / "timers.db"))
+        first = TimerWheel(SqliteTimerStore(db), tick=0.005)
+        first.register("record", _noop)
+        await first.schedule(0.0, "record", {"n": 1})
+        await first.schedule(3600.0, "record", {"n": 2})
+        # Never started: both timers only exist in the store now.
+        await first.stop()
+
+        fired = []
+
+        async def record(payload):
+            fired.append(payload["n"])
+
+        second = TimerWheel(SqliteTimerStore(db), tick=0.005)
+        second.register("record", record)
+        second.start()
+        await asyncio.sleep(0.05)
+        await second.stop()
+        assert fired == [1]
+        remaining = await SqliteTimerStore(db).load()
+        assert [timer.payload for timer in remaining] == [{"n": 2}]
+        await db.close()
+
+    asyncio.run(main())